@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for StockSense AI.
+
+Each module is runnable on its own from ``apps/api``, e.g.
+``python -m benchmarks.bench_policy_search``.
+"""
@@ -0,0 +1,190 @@
+"""
+Benchmark for available-to-promise checks.
+
+Loads a synthetic network (items stocked at several locations, each
+item-location with a few open purchase orders or in-transit transfers)
+into an AvailabilityIndex and reports:
+
+- load: building the balances the way AvailabilityService does;
+- latency: one check at one location and across all of an item's
+  locations, and incremental updates (on-hand after a movement, a
+  receipt's outstanding quantity);
+- correctness: checks against a brute-force projection of the same
+  balances;
+- load test: threads checking random items while others promise a hot
+  item one small order at a time. Every unit promised must be held, and
+  no more than the hot item's projected balance may be promised.
+"""
+
+import argparse
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.services.availability import AvailabilityIndex, ProjectedBalance
+
+ORGANIZATION = "org"
+TODAY = date(2025, 7, 1)
+
+
+def generate(rng: np.random.Generator, n_items: int, n_locations: int, receipts: int):
+    """On hand, reserved and the scheduled receipts (day offset, quantity) of every item-location."""
+    on_hand = rng.integers(0, 200, (n_items, n_locations))
+    reserved = rng.integers(0, 20, (n_items, n_locations))
+    counts = rng.integers(0, receipts + 1, n_items * n_locations)
+    days = np.split(rng.integers(-5, 60, counts.sum()), np.cumsum(counts)[:-1])
+    quantities = np.split(rng.integers(1, 100, counts.sum()), np.cumsum(counts)[:-1])
+    raw = {
+        (series // n_locations, series % n_locations): list(zip(days[series].tolist(), quantities[series].tolist()))
+        for series in range(n_items * n_locations)
+    }
+    return on_hand, reserved, raw
+
+
+def build(on_hand: np.ndarray, reserved: np.ndarray, raw):
+    """Balances by item and location, as AvailabilityService loads them."""
+    balances = {}
+    for (item, location), scheduled in raw.items():
+        balance = ProjectedBalance(int(on_hand[item, location]), int(reserved[item, location]))
+        balances.setdefault(str(item), {})[str(location)] = balance
+        for number, (day, quantity) in enumerate(scheduled):
+            balance.schedule(f"r{number}", TODAY + timedelta(days=day), quantity)
+    return balances
+
+
+def latency(index: AvailabilityIndex, rng: np.random.Generator, n_items: int, n_locations: int, n: int) -> None:
+    items = [str(item) for item in rng.integers(0, n_items, n)]
+    locations = [[str(location)] for location in rng.integers(0, n_locations, n)]
+    days = [TODAY + timedelta(days=int(day)) for day in rng.integers(0, 60, n)]
+    quantities = rng.integers(1, 500, n).tolist()
+
+    began = time.perf_counter()
+    for item, location, day, quantity in zip(items, locations, days, quantities):
+        index.check(ORGANIZATION, item, quantity, day, location)
+    one = (time.perf_counter() - began) / n * 1e6
+    began = time.perf_counter()
+    for item, day, quantity in zip(items, days, quantities):
+        index.check(ORGANIZATION, item, quantity, day)
+    every = (time.perf_counter() - began) / n * 1e6
+    print(f"check latency: {one:.2f} us at one location, {every:.2f} us across {n_locations} locations")
+
+    began = time.perf_counter()
+    for item, location, quantity in zip(items, locations, quantities):
+        index.set_on_hand(ORGANIZATION, item, location[0], quantity)
+    on_hand = (time.perf_counter() - began) / n * 1e6
+    began = time.perf_counter()
+    for item, location, day, quantity in zip(items, locations, days, quantities):
+        index.schedule(ORGANIZATION, item, location[0], "r0", day, quantity)
+    receipt = (time.perf_counter() - began) / n * 1e6
+    print(f"updates: {on_hand:.2f} us per on-hand, {receipt:.2f} us per scheduled receipt")
+
+
+def correctness(index: AvailabilityIndex, raw, free: np.ndarray, rng: np.random.Generator, n: int) -> None:
+    n_items, n_locations = free.shape
+    for _ in range(n):
+        item = int(rng.integers(0, n_items))
+        by = TODAY + timedelta(days=int(rng.integers(-10, 70)))
+        expected = [
+            max(int(free[item, location]) + sum(quantity for day, quantity in raw[item, location]
+                                                if TODAY + timedelta(days=day) <= by), 0)
+            for location in range(n_locations)
+        ]
+        quantity = int(rng.integers(1, 2 * sum(expected) + 2))
+        promise = index.check(ORGANIZATION, str(item), quantity, by)
+        assert promise.available == sum(expected), (promise, expected)
+        assert promise.promisable == (quantity <= sum(expected))
+        assert sorted(available for _, available, _ in promise.allocations) == sorted(expected)
+        if promise.promisable:
+            assert sum(allocated for _, _, allocated in promise.allocations) == quantity
+    print(f"correctness: {n} checks match a brute-force projection")
+
+
+def load_test(index: AvailabilityIndex, n_items: int, n_locations: int, threads: int, seconds: float) -> None:
+    hot = "hot"
+    for location in range(n_locations):
+        index.set_on_hand(ORGANIZATION, hot, str(location), 500, 0)
+    index.schedule(ORGANIZATION, hot, "0", "po-1", TODAY + timedelta(days=10), 1000)
+    by = TODAY + timedelta(days=30)
+    supply = index.check(ORGANIZATION, hot, 1, by).available
+
+    checks = [0] * threads
+    promised = [0] * threads
+    refused = [0] * threads
+    stop = threading.Event()
+
+    def checker(worker: int) -> None:
+        rng = np.random.default_rng(worker)
+        items = [str(item) for item in rng.integers(0, n_items, 4096)]
+        quantities = rng.integers(1, 300, 4096).tolist()
+        done = 0
+        while not stop.is_set():
+            at = done % 4096
+            index.check(ORGANIZATION, items[at], quantities[at], by)
+            done += 1
+        checks[worker] = done
+
+    def promiser(worker: int) -> None:
+        rng = np.random.default_rng(worker)
+        quantities = rng.integers(1, 6, 4096).tolist()
+        done = 0
+        while not stop.is_set():
+            quantity = quantities[done % 4096]
+            if index.promise(ORGANIZATION, hot, quantity, by).promisable:
+                promised[worker] += quantity
+            else:
+                refused[worker] += 1
+            done += 1
+        checks[worker] = done
+
+    workers = [
+        threading.Thread(target=promiser if worker % 2 else checker, args=(worker,))
+        for worker in range(threads)
+    ]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+
+    held = sum(balance.reserved for balance in index._balances[ORGANIZATION][hot].values())
+    assert sum(promised) == held, (sum(promised), held)
+    assert sum(promised) <= supply
+    print(f"load test, {threads} threads for {elapsed:.1f}s: {sum(checks) / elapsed:,.0f} checks/s "
+          f"({sum(checks[1::2]):,} promises on one hot item, {sum(refused):,} refused once sold out); "
+          f"promised {sum(promised):,} of {supply:,} projected units, all held, none oversold")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--locations", type=int, default=5)
+    parser.add_argument("--receipts", type=int, default=3)
+    parser.add_argument("--checks", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(48)
+    on_hand, reserved, raw = generate(rng, args.items, args.locations, args.receipts)
+    free = on_hand - reserved
+    began = time.perf_counter()
+    balances = build(on_hand, reserved, raw)
+    index = AvailabilityIndex()
+    index.begin_load(ORGANIZATION)
+    index.replace(ORGANIZATION, balances)
+    n_series = args.items * args.locations
+    print(f"load: {n_series:,} item-locations with up to {args.receipts} receipts each in "
+          f"{time.perf_counter() - began:.1f}s")
+
+    correctness(index, raw, free, rng, 2000)
+    latency(index, rng, args.items, args.locations, args.checks)
+    load_test(index, args.items, args.locations, args.threads, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
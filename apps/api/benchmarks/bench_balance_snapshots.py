@@ -0,0 +1,316 @@
+"""
+Benchmark for inventory balance snapshots and point-in-time history.
+
+Correctness: items with a few locations and a long, random movement
+history are written to SQLite (aiosqlite). Snapshots are backfilled by a
+first run, extended into a later month by a second, and every item's
+history over a year (summed over its locations and at one location) must
+match a full replay of its movements backwards from current inventory,
+including the days after the last run, which are replayed on read.
+
+Scale: a year of monthly segments for a large synthetic network is built
+and saved the way the snapshot job does, and the history of single items
+over a year is read through BalanceHistoryService, with the day since
+the last run replayed from the database.
+
+Items carry no organization column in this tree's model, so the
+benchmark's single tenant owns every item.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy import event, insert, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from src.models.base import Base
+from src.models.inventory import Inventory, InventoryMovement
+from src.models.supply import ScheduledReceipt
+from src.services.anomaly_service import INBOUND_TYPES, OUTBOUND_TYPES
+from src.services.balance_service import BalanceHistoryService
+from src.services.balance_snapshots import (
+    BalanceSnapshotStore, BalanceWindow, build_segment, closing_balances, daily_balances,
+    month_records, next_month
+)
+
+MOVEMENT_TYPES = ("receipt", "shipment", "shipment", "shipment", "transfer_in", "transfer_out", "adjustment", "cycle_count")
+
+
+@compiles(UUID, "sqlite")
+def _uuid_column(type_, compiler, **kw) -> str:
+    return "CHAR(32)"  # how SQLAlchemy binds UUIDs on SQLite
+
+
+class SingleTenantBalances(BalanceHistoryService):
+    """BalanceHistoryService whose one organization owns every item."""
+
+    def __init__(self, db, item_ids):
+        super().__init__(db)
+        self.item_ids = item_ids
+
+    async def _item_exists(self, item_id, user):
+        return True
+
+    async def _item_blocks(self, user):
+        for start in range(0, len(self.item_ids), 100):
+            yield self.item_ids[start:start + 100]
+
+
+def signed(kind: str, quantity: int) -> int:
+    if kind in INBOUND_TYPES:
+        return abs(quantity)
+    if kind in OUTBOUND_TYPES:
+        return -abs(quantity)
+    return quantity
+
+
+async def seed(engine, user, n_items: int, n_locations: int, days: int, rate: float, today: date):
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.create_all,
+            tables=[Inventory.__table__, InventoryMovement.__table__, ScheduledReceipt.__table__]
+        )
+    rng = random.Random(50)
+    items = [uuid.uuid4() for _ in range(n_items)]
+    locations = [uuid.uuid4() for _ in range(n_locations)]
+    now = datetime.utcnow()
+    inventory, movements, receipts = [], [], []
+    for item_id in items:
+        for location_id in locations:
+            inventory.append({
+                "id": uuid.uuid4(), "item_id": item_id, "location_id": location_id,
+                "quantity": rng.randint(0, 500), "reserved_quantity": rng.randint(0, 20), "available_quantity": 0,
+                "safety_stock": 0, "reorder_point": 0, "last_updated": now, "created_at": now, "updated_at": now,
+                "is_active": "Y"
+            })
+            if rng.random() < 0.3:
+                receipts.append({
+                    "id": uuid.uuid4(), "organization_id": user.organization_id, "item_id": item_id,
+                    "location_id": location_id, "kind": "transfer", "reference": f"TO-{len(receipts)}",
+                    "quantity": 40, "received_quantity": rng.randint(0, 30), "expected_date": today,
+                    "status": "in_transit", "created_at": now, "updated_at": now, "is_active": "Y"
+                })
+            for offset in range(days):
+                if rng.random() < rate:
+                    kind = rng.choice(MOVEMENT_TYPES)
+                    quantity = rng.randint(1, 40) if kind not in ("adjustment", "cycle_count") else rng.randint(-10, 10)
+                    created = datetime.combine(today - timedelta(days=offset), datetime.min.time()) + \
+                        timedelta(seconds=rng.randint(0, 86399))
+                    if created > now:
+                        continue
+                    movements.append({
+                        "id": uuid.uuid4(), "item_id": item_id, "location_id": location_id, "type": kind,
+                        "quantity": quantity, "reference": "bench", "reference_type": "adjustment",
+                        "created_at": created, "updated_at": created, "is_active": "Y"
+                    })
+    async with AsyncSession(engine) as db:
+        for table, rows in ((Inventory, inventory), (InventoryMovement, movements), (ScheduledReceipt, receipts)):
+            for start in range(0, len(rows), 5000):
+                await db.execute(insert(table), rows[start:start + 5000])
+        await db.commit()
+    return items, locations, inventory, movements, receipts
+
+
+def replay(inventory, movements, receipts, start: date, days: int):
+    """Balances by (item, location) and day from a full replay of every movement."""
+    expected = {}
+    for row in inventory:
+        balances = np.zeros((days, 4), dtype=np.int64)
+        balances[:, 0] = row["quantity"]
+        balances[:, 1] = row["reserved_quantity"]
+        expected[row["item_id"], row["location_id"]] = balances
+    for receipt in receipts:
+        expected[receipt["item_id"], receipt["location_id"]][:, 2] += receipt["quantity"] - receipt["received_quantity"]
+    for movement in movements:
+        balances = expected[movement["item_id"], movement["location_id"]]
+        offset = (movement["created_at"].date() - start).days
+        balances[:max(offset, 0), 0] -= signed(movement["type"], movement["quantity"])  # closes before it
+        if 0 <= offset < days:
+            balances[offset, 3] += 1
+    return expected
+
+
+async def correctness(args: argparse.Namespace, today: date) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "balances.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _pragmas(connection, _):
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA foreign_keys=OFF")  # no item, location or organization rows
+
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    user = SimpleNamespace(organization_id=uuid.uuid4())
+    began = time.perf_counter()
+    items, locations, inventory, movements, receipts = await seed(
+        engine, user, args.items, args.locations, args.history_days, args.rate, today
+    )
+    print(f"seeded {len(inventory):,} item-locations with {len(movements):,} movements over "
+          f"{args.history_days} days in {time.perf_counter() - began:.1f}s")
+
+    try:
+        first_end = today - timedelta(days=40)
+        second_end = today - timedelta(days=10)
+        for end in (first_end, second_end):
+            async with sessions() as db:
+                began = time.perf_counter()
+                summary = await SingleTenantBalances(db, items).write_snapshots(user, end)
+            print(f"snapshot run to {end.isoformat()}: {summary['days']} days in {time.perf_counter() - began:.2f}s "
+                  f"({summary['series']:,} series, {summary['records']:,} change records in the last month)")
+
+        start = today - timedelta(days=364)
+        expected = replay(inventory, movements, receipts, start, 365)
+        snapshot, full = [], []
+        async with sessions() as db:
+            service = SingleTenantBalances(db, items)
+            for item_id in items:
+                for location_id in [None, random.choice(locations)]:
+                    began = time.perf_counter()
+                    response = await service.get_history(str(item_id), user, start, today,
+                                                         str(location_id) if location_id else None)
+                    snapshot.append(time.perf_counter() - began)
+                    got = np.array([[entry.on_hand, entry.allocated, entry.in_transit, entry.transactions]
+                                    for entry in response.history])
+                    want = sum(expected[item_id, location] for location in locations
+                               if location_id in (None, location))
+                    assert [entry.date for entry in response.history] == \
+                        [start + timedelta(days=offset) for offset in range(365)]
+                    assert (got == want).all(), (item_id, location_id, np.argwhere(got != want)[:5])
+
+                began = time.perf_counter()
+                rows = (await db.execute(
+                    select(InventoryMovement.location_id, InventoryMovement.type, InventoryMovement.quantity,
+                           InventoryMovement.created_at).where(InventoryMovement.item_id == item_id)
+                )).all()
+                replay([row for row in inventory if row["item_id"] == item_id],
+                       [{"item_id": item_id, "location_id": location_id, "type": kind, "quantity": quantity,
+                         "created_at": created_at} for location_id, kind, quantity, created_at in rows],
+                       [], start, 365)
+                full.append(time.perf_counter() - began)
+        snapshot.sort()
+        print(f"correctness: {len(snapshot):,} one-year histories (all locations and one location) match a full "
+              f"replay; p50 {snapshot[len(snapshot) // 2] * 1e3:.1f} ms from snapshots plus 10 replayed days, "
+              f"{np.median(full) * 1e3:.1f} ms for a full replay of {args.history_days} days "
+              f"(SQLite, {len(movements) / len(items):,.0f} movements per item)")
+    finally:
+        await engine.dispose()
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        shutil.rmtree(BalanceSnapshotStore(user.organization_id).root, ignore_errors=True)
+
+
+def synthetic_year(store: BalanceSnapshotStore, keys: np.ndarray, today: date, rate: float, block: int) -> float:
+    """Save the monthly segments of a year up to `today` for random daily movements; returns seconds."""
+    rng = np.random.default_rng(50)
+    month = (today - timedelta(days=365)).replace(day=1)
+    previous = np.zeros((len(keys), 3), dtype=np.int64)
+    previous[:, 0] = rng.integers(0, 500, len(keys))
+    elapsed = 0.0
+    while month < today:
+        end = min(next_month(month), today)
+        days = (end - month).days
+        began = time.perf_counter()
+        parts = [[] for _ in range(5)]
+        for start in range(0, len(keys), block):
+            rows = slice(start, start + block)
+            n = len(keys[rows])
+            active = rng.random((n, days)) < rate
+            deltas = np.where(active, rng.integers(-20, 21, (n, days)), 0)
+            closing = np.zeros((n, 3), dtype=np.int64)
+            opening, balances = daily_balances(
+                previous[rows], np.ones(n, dtype=bool), closing, np.zeros(n, dtype=bool), deltas
+            )
+            previous[rows] = balances[:, -1]
+            window = BalanceWindow(month, keys[rows], opening, balances, active.astype(np.int64))
+            for part, values in zip(parts, month_records(window, month)):
+                part.append(values)
+        store.save(month, build_segment(end, *parts))
+        elapsed += time.perf_counter() - began
+        month = end
+    return elapsed
+
+
+async def scale(args: argparse.Namespace, today: date) -> None:
+    user = SimpleNamespace(organization_id=uuid.uuid4())
+    store = BalanceSnapshotStore(user.organization_id)
+    n_items = args.scale_series // args.locations
+    items = [uuid.uuid4() for _ in range(n_items)]
+    locations = [uuid.uuid4() for _ in range(args.locations)]
+    keys = np.sort(np.array([item.bytes + location.bytes for item in items for location in locations], dtype="V32"))
+    path = os.path.join(tempfile.mkdtemp(), "balances.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _pragmas(connection, _):
+        connection.execute("PRAGMA foreign_keys=OFF")
+
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(
+                Base.metadata.create_all,
+                tables=[Inventory.__table__, InventoryMovement.__table__, ScheduledReceipt.__table__]
+            )
+        elapsed = synthetic_year(store, keys, today, args.scale_rate, 100_000)
+        months = store.months()
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(store.root) for name in names)
+        days = sum((store.load(month, mmap=True).end - month).days for month in months)
+        records = sum(len(store.load(month, mmap=True).days) for month in months)
+        print(f"scale: {len(keys):,} series, {days} days in {len(months)} monthly segments ({records:,} change records, "
+              f"{args.scale_rate:.0%} of series-days with movements) written in {elapsed:.1f}s "
+              f"({elapsed / len(months):.1f}s per month); {size / 2 ** 20:,.0f} MiB on disk, "
+              f"{size / (len(keys) * days):.2f} bytes per series-day vs {len(keys) * days * 16 / 2 ** 20:,.0f} MiB dense")
+
+        last = store.load(months[-1], mmap=True)
+        sample = random.Random(51).sample(range(n_items), 200)
+        start = today - timedelta(days=365)
+        timings = {"all locations": [], "one location": []}
+        async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+            service = SingleTenantBalances(db, [])
+            for number in sample:
+                item_id = items[number]
+                for label, location_id in (("all locations", None), ("one location", locations[number % len(locations)])):
+                    began = time.perf_counter()
+                    response = await service.get_history(str(item_id), user, start, today,
+                                                         str(location_id) if location_id else None)
+                    timings[label].append(time.perf_counter() - began)
+                    assert len(response.history) == 366
+                # The history ends at the last snapshot's closing balances
+                key = np.array(item_id.bytes + locations[number % len(locations)].bytes, dtype="V32")
+                row = int(np.searchsorted(last.keys, key))
+                assert response.history[-2].on_hand == closing_balances(last, np.array([row]))[0, 0]
+        for label, values in timings.items():
+            values.sort()
+            print(f"one item's history over 366 days, {label}: p50 {values[len(values) // 2] * 1e3:.2f} ms, "
+                  f"p99 {values[int(len(values) * 0.99)] * 1e3:.2f} ms ({len(months)} segments read, today replayed)")
+    finally:
+        await engine.dispose()
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        shutil.rmtree(store.root, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--locations", type=int, default=4)
+    parser.add_argument("--history-days", type=int, default=450)
+    parser.add_argument("--rate", type=float, default=0.3)
+    parser.add_argument("--scale-series", type=int, default=1_000_000)
+    parser.add_argument("--scale-rate", type=float, default=0.1)
+    args = parser.parse_args()
+    today = datetime.utcnow().date()
+    asyncio.run(correctness(args, today))
+    asyncio.run(scale(args, today))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark for cold-start forecasting.
+
+Generates a synthetic catalog (categories, subcategories, brands, color /
+size / material attributes and tags) whose demand level depends on the
+category, subcategory and brand, with a weekday pattern per category.
+Embeds and indexes the established items, then queries with new items
+drawn from the same catalog:
+
+- build: embedding (tokenizing included) and index build time at 5M items;
+- query: latency per new item (embedding, search, forecast), and recall
+  of the approximate top-10 against an exact scan (a neighbour counts if
+  it is as similar as the exact 10th, so ties between identical
+  attribute sets do not count as misses);
+- accuracy: error of the borrowed daily level against the new items'
+  true level, next to the mean level of their category.
+"""
+
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+
+from src.services.cold_start import (
+    COLD_START_NEIGHBOURS, INDEX_BLOCK_ROWS, INDEX_PROBES, ItemEmbedder, build_index, item_tokens,
+    neighbour_forecast, search
+)
+
+END = date(2025, 7, 1)
+COLORS = ["black", "white", "red", "blue", "green", "grey", "navy", "beige", "pink", "brown", "yellow", "orange"]
+SIZES = ["xs", "s", "m", "l", "xl", "xxl"]
+MATERIALS = ["cotton", "wool", "steel", "plastic", "glass", "oak", "leather", "linen", "nylon", "ceramic"]
+
+
+class Catalog:
+    def __init__(self, rng: np.random.Generator, categories: int = 50, brands: int = 2000, tags: int = 300):
+        self.rng = rng
+        self.categories = categories
+        self.brands = brands
+        self.tags = tags
+        self.category_effect = rng.normal(0, 0.8, categories)
+        self.subcategory_effect = rng.normal(0, 0.5, categories * 10)
+        self.brand_effect = rng.normal(0, 0.4, brands)
+        self.brand_home = rng.integers(0, categories, brands)
+        self.week = 1 + 0.3 * np.sin(2 * np.pi * (np.arange(7)[None, :] + rng.uniform(0, 7, (categories, 1))) / 7)
+
+    def sample(self, n: int):
+        rng = self.rng
+        brand = rng.integers(0, self.brands, n)
+        category = np.where(rng.random(n) < 0.8, self.brand_home[brand], rng.integers(0, self.categories, n))
+        subcategory = category * 10 + rng.integers(0, 10, n)
+        color, size, material = rng.integers(0, len(COLORS), n), rng.integers(0, len(SIZES), n), rng.integers(0, len(MATERIALS), n)
+        n_tags = rng.integers(0, 4, n)
+        tag_ids = rng.integers(0, self.tags, (n, 3))
+        items = [
+            item_tokens(
+                f"category-{category[i]}", f"sub-{subcategory[i]}", f"brand-{brand[i]}",
+                {"color": COLORS[color[i]], "size": SIZES[size[i]], "material": MATERIALS[material[i]]},
+                [f"tag-{tag}" for tag in tag_ids[i, :n_tags[i]]],
+            )
+            for i in range(n)
+        ]
+        log_level = (self.category_effect[category] + self.subcategory_effect[subcategory]
+                     + self.brand_effect[brand] + rng.normal(0, 0.3, n))
+        levels = np.exp(log_level + 1.0).astype(np.float32)
+        shapes = (self.week[category] * rng.uniform(0.9, 1.1, (n, 7))).astype(np.float32)
+        return items, levels, shapes, category
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--exact", type=int, default=100)
+    parser.add_argument("--block", type=int, default=250_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(41)
+    catalog = Catalog(rng)
+    embedder = ItemEmbedder()
+    vectors = np.empty((args.items, embedder.dim), dtype=np.float16)
+    levels = np.empty(args.items, dtype=np.float32)
+    shapes = np.empty((args.items, 7), dtype=np.float32)
+    categories = np.empty(args.items, dtype=np.int32)
+    embedding = 0.0
+    for start in range(0, args.items, args.block):
+        items, block_levels, block_shapes, block_categories = catalog.sample(min(args.block, args.items - start))
+        began = time.perf_counter()
+        stop = start + len(items)
+        vectors[start:stop] = embedder.embed(items)
+        embedding += time.perf_counter() - began
+        levels[start:stop], shapes[start:stop], categories[start:stop] = block_levels, block_shapes, block_categories
+    keys = np.zeros((args.items, 2), dtype=np.int64)
+    keys[:, 0] = np.arange(args.items)
+    keys = keys.view("V16").ravel()
+
+    began = time.perf_counter()
+    index = build_index(keys, vectors, levels, shapes, END)
+    building = time.perf_counter() - began
+    print(f"{args.items:,} items: embedding {embedding:.1f}s ({args.items / embedding / 1e3:.0f}k items/s, "
+          f"{len(embedder._codes):,} distinct tokens), index build {building:.1f}s "
+          f"({len(index.centroids):,} lists, {index.vectors.nbytes / 2**20:,.0f} MiB of vectors)")
+
+    items, true_levels, _, query_categories = catalog.sample(args.queries)
+    latencies = []
+    borrowed = np.empty(args.queries)
+    for i, tokens in enumerate(items):
+        began = time.perf_counter()
+        query = ItemEmbedder().embed([tokens])[0]
+        rows, similarities = search(index, query)
+        forecast = neighbour_forecast(index, rows, similarities, END, 28, 0.95)
+        latencies.append(time.perf_counter() - began)
+        borrowed[i] = forecast["point"].mean()  # four whole weeks
+    latencies = np.array(latencies) * 1e3
+    print(f"query (embed + search {INDEX_PROBES} lists + forecast), {args.queries} new items: "
+          f"p50 {np.percentile(latencies, 50):.2f} ms, p99 {np.percentile(latencies, 99):.2f} ms")
+
+    # Recall against an exact scan of every vector
+    queries = ItemEmbedder().embed(items[:args.exact])
+    exact = np.full((args.exact, COLD_START_NEIGHBOURS), -np.inf, dtype=np.float32)
+    for start in range(0, args.items, INDEX_BLOCK_ROWS * 8):
+        block = index.vectors[start:start + INDEX_BLOCK_ROWS * 8].astype(np.float32) @ queries.T
+        exact = -np.sort(-np.concatenate([exact, block.T], axis=1), axis=1)[:, :COLD_START_NEIGHBOURS]
+    found = []
+    for i in range(args.exact):
+        _, similarities = search(index, queries[i])
+        found.append(np.count_nonzero(similarities >= exact[i, -1] - 2e-3) / COLD_START_NEIGHBOURS)
+    print(f"recall@{COLD_START_NEIGHBOURS} against an exact scan: {np.mean(found):.3f}")
+
+    category_means = np.bincount(categories, weights=levels) / np.bincount(categories)
+    log_error = np.abs(np.log(borrowed / true_levels))
+    baseline = np.abs(np.log(category_means[query_categories] / true_levels))
+    print(f"daily level of new items, median |log error|: neighbours {np.median(log_error):.3f}, "
+          f"category mean {np.median(baseline):.3f}")
+
+
+if __name__ == "__main__":
+    main()
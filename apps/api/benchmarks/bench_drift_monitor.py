@@ -0,0 +1,112 @@
+"""
+Benchmark for the forecast drift monitor.
+
+Times one day of actuals recorded into the running statistics of 1M
+series (each update is O(1) per series) and the drift check, next to
+recomputing error statistics over a trailing window of residuals as a
+periodic accuracy job would. Then replays 160 days of residuals of a
+frozen forecast for synthetic series (a quarter intermittent), where
+some series shift their demand level on day 90, and reports how many
+series trip before and after the shift and how fast.
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+from src.services.drift_monitor import (
+    DriftMonitorStore, ForecastDriftError, check_drift, empty_stats, record_residuals, tripped_tests
+)
+
+SHIFT_DAY = 90
+
+
+def update_cost(n_series: int, window: int) -> None:
+    rng = np.random.default_rng(5)
+    stats = empty_stats(date(2025, 1, 1), np.zeros(n_series, dtype="V32"))
+    residuals = rng.normal(0, 3, (n_series, 30)).astype(np.float32)
+    record_residuals(stats, residuals[:, :20])
+
+    began = time.perf_counter()
+    for day in range(20, 30):
+        stats = record_residuals(stats, residuals[:, day:day + 1])
+    update = (time.perf_counter() - began) / 10
+
+    began = time.perf_counter()
+    try:
+        check_drift(stats)
+    except ForecastDriftError:
+        pass
+    check = time.perf_counter() - began
+
+    history = rng.normal(0, 3, (n_series, window)).astype(np.float32)
+    began = time.perf_counter()
+    mean, std = history.mean(axis=1), history.std(axis=1)
+    bias = history.sum(axis=1) / np.abs(history).mean(axis=1)
+    recompute = time.perf_counter() - began
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DriftMonitorStore(tmp)
+        began = time.perf_counter()
+        store.save("bench", stats)
+        store.load("bench")
+        io = time.perf_counter() - began
+
+    print(f"{n_series:,} series: record one day {update:6.3f}s ({update / n_series * 1e9:5.1f} ns/actual)  "
+          f"check {check:6.3f}s  store save+load {io:5.2f}s  "
+          f"vs recompute over {window} days {recompute:6.2f}s")
+
+
+def detection(n_series: int, n_days: int) -> None:
+    rng = np.random.default_rng(2)
+    base = rng.gamma(2.0, 5.0, (n_series, 1))
+    mean = base * (1 + 0.5 * np.sin(2 * np.pi * np.arange(n_days) / 7))
+    quarter = n_series // 4
+    mean[:quarter] = 0.3
+    groups = {
+        "intermittent x3": slice(0, quarter // 5),
+        "intermittent": slice(quarter // 5, quarter),
+        "x1.5": slice(quarter, quarter + n_series // 10),
+        "x0.6": slice(quarter + n_series // 10, quarter + n_series // 5),
+        "x1.2": slice(quarter + n_series // 5, quarter + n_series // 4),
+        "stable": slice(quarter + n_series // 4, n_series),
+    }
+    shift = np.ones((n_series, 1))
+    for name, factor in (("intermittent x3", 3), ("x1.5", 1.5), ("x0.6", 0.6), ("x1.2", 1.2)):
+        shift[groups[name]] = factor
+    actuals = rng.poisson(mean).astype(np.float32)
+    actuals[:, SHIFT_DAY:] = rng.poisson(mean[:, SHIFT_DAY:] * shift)
+    residuals = actuals - mean.astype(np.float32)
+
+    stats = empty_stats(date(2025, 1, 1), np.zeros(n_series, dtype="V32"))
+    first_alarm = np.full(n_series, -1)
+    for day in range(n_days):
+        stats = record_residuals(stats, residuals[:, day:day + 1])
+        drifted = np.logical_or.reduce(list(tripped_tests(stats).values()))
+        first_alarm[(first_alarm < 0) & drifted] = day
+
+    print(f"{n_series:,} series, frozen forecast, demand shift on day {SHIFT_DAY} of {n_days}:")
+    for name, rows in groups.items():
+        alarms = first_alarm[rows]
+        before = (alarms >= 0) & (alarms < SHIFT_DAY)
+        after = alarms >= SHIFT_DAY
+        delay = f"median {np.median(alarms[after]) - SHIFT_DAY:.0f} days after" if after.any() else ""
+        print(f"  {name:<16} tripped before shift {before.mean():6.1%}  after {after.mean():6.1%}  {delay}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=1_000_000)
+    parser.add_argument("--window", type=int, default=90)
+    parser.add_argument("--detection-series", type=int, default=20_000)
+    args = parser.parse_args()
+
+    update_cost(args.series, args.window)
+    detection(args.detection_series, 160)
+
+
+if __name__ == "__main__":
+    main()
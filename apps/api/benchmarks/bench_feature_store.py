@@ -0,0 +1,183 @@
+"""
+Benchmark for the feature store.
+
+Build: materializes the features of synthetic series (weekly seasonal
+Poisson demand, a list price per series, item promotions entered a week
+or two ahead) the way FeatureService appends them: a backfill in windows
+ending at lookahead origins, then daily appends, each writing one
+observed partition and the lookahead of the new origin. Reports build
+time per day and per partition at 1M series, files on disk per day, and
+the time to read three covariates of every series over a tournament
+window.
+
+Correctness (small scale): lags and trailing means against the demand
+matrix, and point-in-time reads: a backtest as of an origin sees no
+demand from the origin on, no lag reaching past it and no promotion
+entered after it.
+"""
+
+import argparse
+import os
+import shutil
+import time
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.services.feature_store import (
+    FEATURE_LOOKAHEAD_DAYS, FeatureStore, PromotionSpan, append_observed, empty_feature_state, next_origin,
+    promotions, with_feature_series, write_lookahead
+)
+
+START = date(2025, 1, 6)
+
+
+def generate(rng: np.random.Generator, n_series: int, n_days: int) -> np.ndarray:
+    base = rng.gamma(2.0, 5.0, (n_series, 1)).astype(np.float32)
+    week = 1 + 0.4 * np.sin(2 * np.pi * np.arange(n_days, dtype=np.float32) / 7)
+    return rng.poisson(base * week).astype(np.float32)
+
+
+def promotion_spans(rng: np.random.Generator, n_series: int, n_days: int, count: int):
+    spans = []
+    for _ in range(count):
+        first = int(rng.integers(0, n_days + FEATURE_LOOKAHEAD_DAYS))
+        rows = np.sort(rng.choice(n_series, int(rng.integers(1, 50)), replace=False))
+        spans.append(PromotionSpan(
+            rows=rows,
+            start=START + timedelta(days=first),
+            end=START + timedelta(days=first + int(rng.integers(3, 14))),
+            discount=float(rng.choice([0.1, 0.2, 0.3])),
+            entered=START + timedelta(days=first - int(rng.integers(0, 15))),
+        ))
+    return spans
+
+
+def initial_state(n_series: int):
+    state, _ = with_feature_series(empty_feature_state(START), [uuid.UUID(int=row).bytes * 2 for row in range(n_series)])
+    return state
+
+
+def build(store: FeatureStore, organization_id, state, values, list_price, spans, end: date):
+    """Append up to `end` as FeatureService does; returns the state and (days, seconds) per window."""
+    timings = []
+    while state.end < end:
+        began = time.perf_counter()
+        window_end = next_origin(state.end, end)
+        first = (state.end - START).days
+        window = (window_end - state.end).days
+        window_start = state.end
+        observed = promotions(spans, list_price, window_start, window)
+        state = append_observed(
+            state, values[:, first:first + window], observed,
+            lambda day, table: store.write_partition(organization_id, day, day + timedelta(days=1), table)
+        )
+        for offset in range(window):
+            store.thin_lookahead(organization_id, window_start + timedelta(days=offset))
+        origin = state.end
+        planned = promotions(spans, list_price, origin, FEATURE_LOOKAHEAD_DAYS, known_before=origin)
+        write_lookahead(state, planned, lambda day, table: store.write_partition(organization_id, day, origin, table))
+        store.save(organization_id, state)
+        timings.append((window, time.perf_counter() - began))
+    return state, timings
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def correctness(store: FeatureStore) -> None:
+    rng = np.random.default_rng(31)
+    organization_id = uuid.uuid4()
+    n_series, n_days = 300, 70
+    values = generate(rng, n_series, n_days)
+    values[rng.random(values.shape) < 0.02] = np.nan  # masked spikes
+    list_price = rng.uniform(1, 50, n_series).astype(np.float32)
+    spans = promotion_spans(rng, n_series, n_days, 60)
+    try:
+        build(store, organization_id, initial_state(n_series), values, list_price, spans, START + timedelta(days=n_days))
+        frame = store.read(organization_id, START, START + timedelta(days=n_days))
+        columns = frame.columns
+        assert np.array_equal(columns["demand"], values, equal_nan=True)
+        for lag in (1, 7, 28):
+            assert np.array_equal(columns[f"lag_{lag}"][:, lag:], values[:, :-lag], equal_nan=True)
+            assert np.isnan(columns[f"lag_{lag}"][:, :lag]).all()
+        with np.errstate(invalid="ignore"):
+            trailing = np.array([np.nanmean(values[:, day - 7:day], axis=1) for day in range(7, n_days)]).T
+        assert np.allclose(columns["mean_7"][:, 7:], trailing, equal_nan=True)
+
+        origin = next_origin(START + timedelta(days=35), START + timedelta(days=n_days))
+        at = (origin - START).days
+        backtest = store.read(organization_id, origin - timedelta(days=28), origin + timedelta(days=FEATURE_LOOKAHEAD_DAYS),
+                              as_of=origin).columns
+        assert np.array_equal(backtest["demand"][:, :28], values[:, at - 28:at], equal_nan=True)
+        assert np.isnan(backtest["demand"][:, 28:]).all()
+        for lag in (1, 7, 14, 28):
+            ahead = backtest[f"lag_{lag}"][:, 28:]
+            assert np.isnan(ahead[:, lag:]).all()
+            assert np.array_equal(ahead[:, :lag], values[:, at - lag:at], equal_nan=True)
+        planned = promotions(spans, list_price, origin, FEATURE_LOOKAHEAD_DAYS, known_before=origin)
+        assert np.array_equal(backtest["promo"][:, 28:], planned.promo.astype(np.float32))
+        hindsight = promotions(spans, list_price, origin, FEATURE_LOOKAHEAD_DAYS)
+        late = int((hindsight.promo & ~planned.promo).sum())
+        print(f"correctness: lags, means and point-in-time reads match; {late} promo cells entered after the "
+              f"origin are hidden from the backtest")
+    finally:
+        shutil.rmtree(store._directory(organization_id), ignore_errors=True)
+
+
+def scale(store: FeatureStore, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(32)
+    organization_id = uuid.uuid4()
+    n = args.series
+    days = args.backfill + args.daily
+    values = generate(rng, n, days)
+    list_price = rng.uniform(1, 50, n).astype(np.float32)
+    spans = promotion_spans(rng, n, days, n // 100)
+    try:
+        state, timings = build(store, organization_id, initial_state(n), values, list_price, spans,
+                               START + timedelta(days=args.backfill))
+        seconds = sum(elapsed for _, elapsed in timings)
+        windows = len(timings)
+        print(f"\nbackfill, {n:,} series x {args.backfill} days in {windows} windows: {seconds:.1f}s "
+              f"({seconds / args.backfill:.2f}s per day incl. a {FEATURE_LOOKAHEAD_DAYS}-day lookahead per window)")
+
+        daily = []
+        for _ in range(args.daily):
+            state, timing = build(store, organization_id, state, values, list_price, spans, state.end + timedelta(days=1))
+            daily.append(timing[0][1])
+        partitions = 1 + FEATURE_LOOKAHEAD_DAYS
+        print(f"daily append, {n:,} series: {np.median(daily):.1f}s median ({partitions} partitions, "
+              f"{np.median(daily) / partitions * 1e3:.0f} ms each, {n * partitions / np.median(daily) / 1e6:.1f}M rows/s)")
+
+        root = store._directory(organization_id)
+        observed_days = (state.end - START).days
+        print(f"on disk: {directory_bytes(root) / 2**20:,.0f} MiB for {observed_days} observed days "
+              f"({directory_bytes(root) / 2**20 / observed_days:.0f} MiB per day incl. lookahead versions)")
+
+        began = time.perf_counter()
+        end = state.end
+        frame = store.read(organization_id, end - timedelta(days=args.window), end,
+                           as_of=end - timedelta(days=28), columns=("promo", "discount", "price_index"))
+        elapsed = time.perf_counter() - began
+        print(f"point-in-time read, 3 columns x {n:,} series x {args.window} days: {elapsed:.1f}s "
+              f"({frame.columns['promo'].nbytes * 3 / 2**20:,.0f} MiB)")
+    finally:
+        shutil.rmtree(store._directory(organization_id), ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=1_000_000)
+    parser.add_argument("--backfill", type=int, default=28)
+    parser.add_argument("--daily", type=int, default=3)
+    parser.add_argument("--window", type=int, default=56)
+    args = parser.parse_args()
+    store = FeatureStore()
+    correctness(store)
+    scale(store, args)
+
+
+if __name__ == "__main__":
+    main()
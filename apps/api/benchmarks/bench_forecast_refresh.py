@@ -0,0 +1,69 @@
+"""
+Benchmark for incremental forecast refresh.
+
+Builds ETS/Croston smoothing states for synthetic daily demand (weekly
+seasonality, a quarter of the series intermittent) after histories of
+different lengths, then times a refresh that absorbs 1, 7 and 28 new
+days including the store load and save, next to recomputing the state
+from the whole history as a full retrain would. Incremental cost should
+follow the new days and stay flat as the history grows.
+"""
+
+import argparse
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.services.forecast_state import ForecastStateStore, absorb, empty_state, series_key, with_series
+
+START = date(2024, 1, 1)
+
+
+def generate(rng: np.random.Generator, n_series: int, n_days: int) -> np.ndarray:
+    base = rng.gamma(2.0, 5.0, (n_series, 1))
+    week = 1 + 0.5 * np.sin(2 * np.pi * np.arange(n_days) / 7)
+    values = rng.poisson(base * week).astype(np.float32)
+    values[:n_series // 4] = rng.poisson(0.3, (n_series // 4, n_days))
+    return values
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=200_000)
+    parser.add_argument("--history", type=int, nargs="+", default=[180, 365, 730])
+    parser.add_argument("--new-days", type=int, nargs="+", default=[1, 7, 28])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    keys = [series_key(uuid.uuid4(), uuid.uuid4()) for _ in range(args.series)]
+    values = generate(rng, args.series, max(args.history) + max(args.new_days))
+    organization_id = uuid.uuid4()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ForecastStateStore(tmp)
+        for history in args.history:
+            state, _ = with_series(empty_state(START), keys)
+            began = time.perf_counter()
+            state = absorb(state, values[:, :history])
+            full = time.perf_counter() - began
+            store.save(organization_id, state)
+
+            timings = []
+            for new_days in args.new_days:
+                began = time.perf_counter()
+                current = store.load(organization_id)
+                refreshed = absorb(current, values[:, history:history + new_days])
+                store.save(organization_id, refreshed)
+                timings.append(time.perf_counter() - began)
+                store.save(organization_id, state)
+            incremental = "  ".join(f"+{d:>2}d {t:6.2f}s" for d, t in zip(args.new_days, timings))
+            print(f"{args.series:,} series, {history:>3} days of history: full recompute {full:6.2f}s  "
+                  f"incremental {incremental}")
+            assert refreshed.end == START + timedelta(days=history + args.new_days[-1])
+
+
+if __name__ == "__main__":
+    main()
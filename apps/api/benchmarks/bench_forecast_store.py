@@ -0,0 +1,110 @@
+"""
+Benchmark for the forecast store.
+
+Writes one forecast run of synthetic series (28-day point forecasts from
+random smoothing states plus p5/p50/p95 quantiles, 400 categories) and reports its size on disk next
+to the same forecasts as JSON lists per row, then the read latency of a
+single item-location, an item across its locations, a category, and a
+page of 100 deep into the run, including the ForecastResponse build the
+API does for a page.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import date, datetime
+
+import numpy as np
+
+from src.services.forecast_service import ForecastService, normal_quantiles
+from src.services.forecast_state import empty_state, forecast
+from src.services.forecast_store import ForecastRun, ForecastStore
+
+HORIZON = 28
+QUANTILES = [0.05, 0.5, 0.95]
+LOCATIONS = 10
+
+
+def timed(fn, repeat: int) -> float:
+    """Median milliseconds of `repeat` calls."""
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    n_series = args.series - args.series % LOCATIONS
+    rng = np.random.default_rng(9)
+    items = np.array([uuid.uuid4().bytes for _ in range(n_series // LOCATIONS)], dtype="V16")
+    locations = np.array([uuid.uuid4().bytes for _ in range(LOCATIONS)], dtype="V16")
+    item_ids, location_ids = np.repeat(items, LOCATIONS), np.tile(locations, n_series // LOCATIONS)
+    categories = [f"Category {i % 400}" for i in range(n_series // LOCATIONS) for _ in range(LOCATIONS)]
+    # Forecasts as the smoothing state produces them: level, damped trend
+    # and a weekly season per series, Croston for a quarter of them
+    state = empty_state(date.today(), n_series)._replace(
+        level=rng.gamma(2.0, 5.0, n_series).astype(np.float32),
+        trend=rng.normal(0, 0.05, n_series).astype(np.float32),
+        season=rng.normal(0, 2.0, (n_series, 7)).astype(np.float32),
+        size=rng.gamma(2.0, 2.0, n_series).astype(np.float32),
+        interval=np.where(np.arange(n_series) % 4 == 0, rng.uniform(1.5, 10, n_series), 1).astype(np.float32),
+        observed=np.full(n_series, 365, dtype=np.int32),
+    )
+    point = forecast(state, HORIZON)
+    mae = (np.sqrt(state.level) * 0.8).astype(np.float32)
+    quantiles = normal_quantiles(point, mae, QUANTILES)
+    run = ForecastRun("bench", datetime.utcnow(), "bench", date.today(), HORIZON, "daily", QUANTILES, n_series, "organization")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ForecastStore(tmp)
+        began = time.perf_counter()
+        store.write_run("org", run, item_ids, location_ids, categories, ["ets"] * n_series, mae, point, quantiles)
+        write = time.perf_counter() - began
+        path = os.path.join(tmp, "org", "bench")
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+        reader = store.open("org", "bench")
+        service = ForecastService.__new__(ForecastService)
+        sample = service._forecast_responses(run, reader.read_range(0, 2000))
+        json_bytes = sum(len(json.dumps({
+            "forecast_values": r.forecast_values, "confidence_intervals": r.confidence_intervals
+        })) for r in sample) / len(sample)
+        raw = n_series * HORIZON * (1 + len(QUANTILES)) * 4
+
+        print(f"{n_series:,} series x {HORIZON} days, point + {len(QUANTILES)} quantiles: written in {write:.1f}s")
+        print(f"  store {size / 1e6:7.1f} MB ({size / n_series:5.0f} B/series), raw float32 {raw / 1e6:7.1f} MB, "
+              f"JSON lists per row ~{json_bytes * n_series / 1e6:7.1f} MB ({json_bytes:5.0f} B/series)")
+
+        picks = random.Random(1).sample(range(n_series), 200)
+        keys = [(str(uuid.UUID(bytes=item_ids[i].tobytes())), str(uuid.UUID(bytes=location_ids[i].tobytes()))) for i in picks]
+        it = iter(keys * 2)
+        single = timed(lambda: reader.read_rows(reader.find(*next(it))), 200)
+        it = iter(keys * 2)
+        item = timed(lambda: reader.read_rows(reader.item_rows(next(it)[0])), 200)
+        names = iter([f"Category {i}" for i in range(400)] * 2)
+        category_size = int(np.diff(reader.category_rows("Category 7"))[0])
+        category = timed(lambda: reader.read_range(*reader.category_rows(next(names))), 50)
+        offsets = iter(random.Random(2).sample(range(n_series - 100), 100))
+        page = timed(lambda: reader.read_range(*(lambda o: (o, o + 100))(next(offsets))), 100)
+        offsets = iter(random.Random(3).sample(range(n_series - 100), 100))
+        responses = timed(lambda: service._forecast_responses(run, reader.read_range(*(lambda o: (o, o + 100))(next(offsets)))), 100)
+        reader.close()
+
+        print(f"  read (median): item-location {single:6.2f} ms  item x {LOCATIONS} locations {item:6.2f} ms  "
+              f"category (~{category_size:,} series) {category:6.2f} ms  page of 100 {page:6.2f} ms  "
+              f"page of 100 as ForecastResponse {responses:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
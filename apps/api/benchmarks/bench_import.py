@@ -0,0 +1,142 @@
+"""
+Benchmark for catalog file imports.
+
+Writes synthetic item CSVs (2% of rows invalid) and runs the import
+pipeline on them: block reads, vectorized validation, reject file and
+the catalog load. The load's key lookup and write go to a stand-in that
+discards rows, so this measures the application side, not Postgres. Each
+file size runs in a fresh process and reports peak RSS, which should not
+grow with the file. The baseline validates the same rows one ItemUpsert
+model at a time from csv.DictReader, as a per-row import would, next to
+the vectorized validation alone.
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+
+from src.schemas.inventory import ItemUpsert
+from src.services import import_service
+from src.services.catalog_service import CatalogService
+from src.services.import_service import ImportService
+
+HEADER = ["SKU", "Name", "Description", "Category", "Brand", "Unit Of Measure", "Cost", "Price", "Tags", "Is Active"]
+
+
+class DiscardingCatalog(CatalogService):
+    """CatalogService with an empty table that drops every write."""
+
+    def __init__(self, db=None):
+        super().__init__(db)
+
+    async def _existing(self, model, key, keys):
+        return {}
+
+    async def _write(self, model, key, rows):
+        pass
+
+
+def write_csv(path: str, n_rows: int) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(n_rows):
+            bad = i % 50 == 0
+            writer.writerow([
+                f"SKU-{i:09d}", "" if bad else f"Item {i}", "Imported from the ERP catalog export",
+                f"Category {i % 40}", f"Brand {i % 300}", "EA",
+                "n/a" if bad else f"{(i % 500) / 10:.2f}", f"{(i % 700) / 10 + 1:.2f}", "erp|import", "yes",
+            ])
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_import(path: str) -> None:
+    import_service.CatalogService = DiscardingCatalog
+    user = SimpleNamespace(organization_id=uuid.uuid4(), id=uuid.uuid4())
+    service = ImportService(db=None)
+    upload_id = uuid.uuid4().hex
+    upload = service.upload_path(user, upload_id, "csv")
+    os.makedirs(os.path.dirname(upload), exist_ok=True)
+    os.symlink(path, upload)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    try:
+        summary = await service.import_file("items", upload_id, "csv", user)
+    finally:
+        os.remove(upload)
+        rejects = service.rejects_path(user, upload_id)
+        if rejects:
+            os.remove(rejects)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['rows']:>10,} rows {os.path.getsize(path) / 1e6:7.0f} MB  {summary['rows'] / elapsed:9,.0f} rows/s  "
+          f"{elapsed:6.1f}s  peak RSS {peak_rss_mb():6.1f} MB (baseline {baseline:.1f} MB)  "
+          f"created {summary.get('created', 0):,} rejected {summary.get('rejected', 0):,}")
+
+
+def per_row_baseline(path: str, n_rows: int) -> None:
+    fields = {name: name.lower().replace(" ", "_") for name in HEADER}
+    start = time.perf_counter()
+    valid = 0
+    with open(path, newline="") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            if i >= n_rows:
+                break
+            record = {fields[name]: value for name, value in row.items() if value != ""}
+            record["tags"] = record.get("tags", "").split("|")
+            record["is_active"] = record.get("is_active") == "yes"
+            try:
+                ItemUpsert(**record)
+                valid += 1
+            except ValueError:
+                pass
+    elapsed = time.perf_counter() - start
+    print(f"per-row ItemUpsert: {n_rows:,} rows {n_rows / elapsed:9,.0f} rows/s (validation only, {valid:,} valid)")
+
+
+def vectorized_baseline(path: str, n_rows: int) -> None:
+    start = time.perf_counter()
+    rows = valid = 0
+    columns = None
+    for table, _ in import_service.read_csv_blocks(path):
+        columns = columns or import_service.resolve_columns(table.column_names, "items")
+        records, _, _ = import_service.validate_block(table, "items", columns)
+        rows += table.num_rows
+        valid += len(records)
+        if rows >= n_rows:
+            break
+    elapsed = time.perf_counter() - start
+    print(f"vectorized:         {rows:,} rows {rows / elapsed:9,.0f} rows/s (validation only, {valid:,} valid)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[250_000, 1_000_000, 4_000_000])
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        asyncio.run(run_import(args.run))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f"items-{n_rows}.csv")
+            write_csv(path, n_rows)
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_import", "--run", path], check=True)
+        per_row_baseline(path, min(args.rows[-1], 100_000))
+        vectorized_baseline(path, min(args.rows[-1], 100_000))
+
+
+if __name__ == "__main__":
+    main()
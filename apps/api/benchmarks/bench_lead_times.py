@@ -0,0 +1,58 @@
+"""
+Benchmark for lead-time learning and lead-time demand convolution.
+
+Fits lead-time distributions for synthetic supplier routes from receipt
+history, then computes safety stock for supplier-SKU pairs through the
+cached convolution, cold and warm.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.services.lead_time_service import (
+    fit_lead_time_distributions, lead_time_key, safety_stock_batch
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=100_000)
+    parser.add_argument("--routes", type=int, default=5_000)
+    parser.add_argument("--receipts", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    route_index = rng.integers(0, args.routes, args.receipts)
+    route_scale = rng.uniform(1.0, 4.0, args.routes)
+    lead_times = rng.gamma(4.0, route_scale[route_index]).astype(np.int64)
+
+    start = time.perf_counter()
+    pmfs, _ = fit_lead_time_distributions(route_index, lead_times, args.routes)
+    keys = [lead_time_key(row) for row in pmfs]
+    fit_time = time.perf_counter() - start
+
+    demand_mean = np.round(rng.lognormal(1.0, 1.5, args.pairs), 2) + 0.05
+    demand_std = demand_mean * rng.choice([0.3, 0.5, 1.0], args.pairs)
+    distribution = ["normal" if mean >= 1 else "poisson" for mean in demand_mean]
+    pair_routes = [keys[i] for i in rng.integers(0, args.routes, args.pairs)]
+    service_level = rng.choice([0.90, 0.95, 0.99], args.pairs)
+
+    start = time.perf_counter()
+    safety_stock_batch(distribution, demand_mean, demand_std, pair_routes, service_level)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    safety_stock_batch(distribution, demand_mean, demand_std, pair_routes, service_level)
+    warm = time.perf_counter() - start
+
+    print(f"receipts:            {args.receipts:,} over {args.routes:,} routes")
+    print(f"fit distributions:   {fit_time:.2f} s")
+    print(f"supplier-SKU pairs:  {args.pairs:,}")
+    print(f"safety stock (cold): {cold:.1f} s")
+    print(f"safety stock (warm): {warm:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for order rounding and load building.
+
+Rounds synthetic planned order lines to packs, pallets, MOQs and price
+breaks, then builds them into truck loads per lane.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.services.load_builder import TruckProfile, apply_price_breaks, build_loads, round_order_quantities
+
+
+def generate_lines(n_lines: int, n_lanes: int, seed: int = 13):
+    """Synthetic order lines with packing data and two price breaks each."""
+    rng = np.random.default_rng(seed)
+    planned = rng.gamma(1.2, 40.0, n_lines)
+    case_pack = rng.choice([1, 4, 6, 12, 24], n_lines)
+    pallet_qty = case_pack * rng.choice([0, 20, 40, 60], n_lines)
+    moq = rng.choice([0, 24, 48, 100], n_lines)
+    unit_cost = rng.lognormal(2.0, 0.8, n_lines)
+    tier_quantity = np.column_stack([np.full(n_lines, 100.0), np.full(n_lines, 500.0)])
+    tier_price = unit_cost[:, None] * np.array([0.95, 0.9])[None, :]
+    unit_volume = rng.uniform(0.0005, 0.02, n_lines)
+    unit_weight = rng.uniform(0.1, 8.0, n_lines)
+    lane = rng.integers(0, n_lanes, n_lines)
+    return planned, case_pack, pallet_qty, moq, unit_cost, tier_quantity, tier_price, unit_volume, unit_weight, lane
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--lanes", type=int, default=2_000)
+    args = parser.parse_args()
+
+    (planned, case_pack, pallet_qty, moq, unit_cost, tier_quantity, tier_price,
+     unit_volume, unit_weight, lane) = generate_lines(args.lines, args.lanes)
+    truck = TruckProfile()
+
+    start = time.perf_counter()
+    quantity = round_order_quantities(planned, case_pack, moq, pallet_qty)
+    quantity, unit_price = apply_price_breaks(quantity, unit_cost, case_pack, tier_quantity, tier_price)
+    rounding = time.perf_counter() - start
+    print(f"rounding + price breaks: {rounding:.3f} s ({args.lines:,} lines)")
+
+    packs = quantity // case_pack
+    for local_search in (False, True):
+        start = time.perf_counter()
+        loads = build_loads(lane, packs, unit_volume * case_pack, unit_weight * case_pack, truck, local_search)
+        elapsed = time.perf_counter() - start
+        utilization = np.maximum(
+            loads["load_volume_m3"] / truck.volume_m3, loads["load_weight_kg"] / truck.weight_kg
+        )
+        print(f"load building (local search={local_search}): {elapsed:.2f} s, "
+              f"{utilization.size:,} trucks, mean utilization {utilization.mean():.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark for the per-series model selection tournament.
+
+Plays tournaments (ETS, Croston, random forest, seasonal ARIMA on a
+28-day holdout) over synthetic series of four kinds: weekly seasonal
+Poisson demand, demand around an autocorrelated AR(1) level, trending
+demand and intermittent demand. Reports time per model and how many
+series each model had to run for after early stopping, with and without
+early stopping on a subset, and the total for 100k series on a 32-core
+box extrapolated from the measured core-seconds per series.
+
+Selection quality is checked on the following 28 days: each series is
+forecast by its winner, by ETS alone and by the best model in hindsight.
+"""
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+from src.services.model_tournament import (
+    TOURNAMENT_CHUNK_SERIES, TOURNAMENT_HISTORY_DAYS, TOURNAMENT_HOLDOUT_DAYS, TOURNAMENT_MODELS,
+    play_chunk, run_tournament
+)
+
+
+def generate(rng: np.random.Generator, n_series: int, n_days: int) -> np.ndarray:
+    days = np.arange(n_days)
+    kind = np.arange(n_series) % 4
+    base = rng.gamma(2.0, 5.0, (n_series, 1))
+    week = 1 + 0.4 * np.sin(2 * np.pi * days / 7 + rng.uniform(0, 2 * np.pi, (n_series, 1)))
+    mean = base * week
+
+    level = np.zeros((n_series, n_days))
+    shocks = rng.normal(0, 0.15, (n_series, n_days))
+    for day in range(1, n_days):
+        level[:, day] = 0.95 * level[:, day - 1] + shocks[:, day]
+    mean = np.where((kind == 1)[:, None], base * np.exp(level), mean)
+    mean = np.where((kind == 2)[:, None], base * week * (1 + rng.uniform(-0.4, 1.0, (n_series, 1)) * days / n_days), mean)
+    values = rng.poisson(mean).astype(np.float32)
+
+    intermittent = kind == 3
+    occurs = rng.random((intermittent.sum(), n_days)) < rng.uniform(0.05, 0.3, (intermittent.sum(), 1))
+    values[intermittent] = np.where(occurs, np.ceil(rng.gamma(1.5, 4.0, occurs.shape)), 0)
+    return values
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--series", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--subset", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(21)
+    values = generate(rng, args.series, TOURNAMENT_HISTORY_DAYS + TOURNAMENT_HOLDOUT_DAYS)
+    history = values[:, :TOURNAMENT_HISTORY_DAYS]
+
+    began = time.perf_counter()
+    result = run_tournament(history, workers=args.workers)
+    elapsed = time.perf_counter() - began
+    core_seconds = result.seconds.sum()
+    print(f"{args.series:,} series x {TOURNAMENT_HISTORY_DAYS} days, {args.workers} worker(s): {elapsed:.1f}s wall, "
+          f"{core_seconds:.1f} core-s ({core_seconds / args.series * 1e3:.1f} ms/series)")
+    wins = np.bincount(result.winners, minlength=len(TOURNAMENT_MODELS))
+    for code, model in enumerate(TOURNAMENT_MODELS):
+        print(f"  {model:>13}: ran for {result.evaluated[code]:>6,} series, {result.seconds[code]:7.1f}s, "
+              f"won {wins[code]:>6,}")
+
+    # Chunks are independent, so the pool scales with cores until the
+    # chunk count runs out
+    target = 100_000
+    waves = math.ceil(target / TOURNAMENT_CHUNK_SERIES / 32)
+    per_chunk = core_seconds / args.series * TOURNAMENT_CHUNK_SERIES
+    print(f"  extrapolated: {target:,} series on 32 cores ~ {waves} waves x {per_chunk:.0f}s = "
+          f"{waves * per_chunk / 60:.1f} min")
+
+    subset = history[:args.subset]
+    began = time.perf_counter()
+    full = play_chunk(subset, dominance=0)
+    exhaustive = time.perf_counter() - began
+    began = time.perf_counter()
+    early = play_chunk(subset)
+    stopped = time.perf_counter() - began
+    agree = (full.winners == early.winners).mean()
+    print(f"\n{args.subset} series, every model for every series: {exhaustive:.1f}s; with early stopping: "
+          f"{stopped:.1f}s ({exhaustive / stopped:.1f}x), same winner for {agree:.1%}")
+
+    # Next 28 days: train every model on the full history, score the new holdout
+    future = play_chunk(values[:args.subset], dominance=0).errors
+    rows = np.arange(args.subset)
+    chosen = future[rows, early.winners]
+    chosen = np.where(np.isnan(chosen), future[:, 0], chosen)
+    print(f"MAE on the following {TOURNAMENT_HOLDOUT_DAYS} days: winner {np.nanmean(chosen):.3f} "
+          f"(without early stopping {np.nanmean(future[rows, full.winners]):.3f}), "
+          f"ETS only {np.nanmean(future[:, 0]):.3f}, "
+          + ", ".join(f"{model} only {np.nanmean(future[:, code]):.3f}" for code, model in enumerate(TOURNAMENT_MODELS[1:], 1))
+          + f", best in hindsight {np.nanmean(np.nanmin(future, axis=1)):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark for the multi-echelon network planner.
+
+Includes a synthetic network generator (DCs feeding stores) and plans the
+whole network in SKU chunks, the way the nightly batch does.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.services.network_planner import NetworkGraph, plan_network
+
+
+def generate_network(n_dcs: int, n_stores: int, seed: int = 3):
+    """Synthetic two-echelon network: stores spread evenly across DCs.
+
+    Returns:
+        Tuple of (graph, lead times, holding cost factor per node).
+    """
+    rng = np.random.default_rng(seed)
+    locations = [(f"DC{d:03d}", None) for d in range(n_dcs)]
+    locations += [(f"ST{s:05d}", f"DC{s % n_dcs:03d}") for s in range(n_stores)]
+    graph = NetworkGraph.from_locations(locations)
+    lead_time = np.concatenate([rng.integers(5, 15, n_dcs), rng.integers(1, 4, n_stores)])
+    holding_factor = np.concatenate([np.full(n_dcs, 0.6), np.ones(n_stores)])
+    return graph, lead_time, holding_factor
+
+
+def generate_chunk(graph: NetworkGraph, n_skus: int, rng: np.random.Generator):
+    """Synthetic demand, stock and unit costs for one chunk of SKUs."""
+    stores = graph.is_leaf
+    demand_mean = np.zeros((graph.n, n_skus), dtype=np.float32)
+    demand_mean[stores] = rng.gamma(0.6, 2.0, (int(stores.sum()), n_skus))
+    demand_std = demand_mean * rng.uniform(0.3, 1.2, n_skus)[None, :]
+    on_hand = np.floor(demand_mean * rng.uniform(3, 20, (graph.n, 1)))
+    on_hand[~stores] = rng.integers(0, 5000, (int((~stores).sum()), n_skus))
+    unit_cost = rng.lognormal(2.5, 1.0, n_skus)
+    return demand_mean, demand_std, on_hand, unit_cost
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dcs", type=int, default=50)
+    parser.add_argument("--stores", type=int, default=5_000)
+    parser.add_argument("--skus", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=500)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph, lead_time, holding_factor = generate_network(args.dcs, args.stores)
+    print(f"graph build:      {time.perf_counter() - start:.3f} s ({graph.n:,} nodes, {len(graph.levels)} echelons)")
+
+    rng = np.random.default_rng(5)
+    planning = 0.0
+    lines = 0
+    for start_sku in range(0, args.skus, args.chunk):
+        n_skus = min(args.chunk, args.skus - start_sku)
+        demand_mean, demand_std, on_hand, unit_cost = generate_chunk(graph, n_skus, rng)
+        holding_cost = holding_factor[:, None] * unit_cost[None, :] * 0.25 / 365
+
+        start = time.perf_counter()
+        result = plan_network(
+            graph, demand_mean, demand_std, on_hand, np.zeros_like(on_hand),
+            lead_time, holding_cost, service_level=0.95,
+        )
+        planning += time.perf_counter() - start
+        lines += int(np.count_nonzero(result["planned_orders"]))
+
+    cells = graph.n * args.skus
+    print(f"location-SKUs:    {cells:,}")
+    print(f"planning time:    {planning:.1f} s ({cells / planning / 1e6:.1f}M location-SKUs/s)")
+    print(f"planned lines:    {lines:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for the memoized (s,S) policy search.
+
+Generates a synthetic network of item-locations with realistic demand,
+lead-time and cost profiles and reports solve time per SKU and in total.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.services.policy_search import optimize_s_s_batch, solve_profile
+
+LEAD_TIMES = np.array([1, 2, 3, 5, 7, 10, 14, 21, 28])
+SERVICE_LEVELS = np.array([0.90, 0.95, 0.98, 0.99])
+ORDERING_COSTS = np.array([25.0, 50.0, 100.0, 250.0])
+
+
+def generate_network(n_skus: int, seed: int = 7):
+    """Synthetic item-location demand and cost profiles."""
+    rng = np.random.default_rng(seed)
+    demand_mean = np.round(rng.lognormal(mean=1.0, sigma=1.5, size=n_skus), 2) + 0.05
+    cv = rng.choice([0.2, 0.3, 0.5, 0.8, 1.0, 1.5], size=n_skus)
+    demand_std = demand_mean * cv
+    lead_time = rng.choice(LEAD_TIMES, size=n_skus)
+    unit_cost = rng.choice(np.array([2, 5, 10, 20, 50, 100, 250, 500.0]), size=n_skus)
+    holding_cost = unit_cost * 0.25 / 365
+    service_level = rng.choice(SERVICE_LEVELS, size=n_skus)
+    shortage_cost = holding_cost * service_level / (1 - service_level)
+    ordering_cost = rng.choice(ORDERING_COSTS, size=n_skus)
+    return demand_mean, demand_std, lead_time, holding_cost, shortage_cost, ordering_cost
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--skus", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    network = generate_network(args.skus)
+    solve_profile.cache_clear()
+
+    start = time.perf_counter()
+    result = optimize_s_s_batch(*network, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    unique = int(result["unique_profiles"])
+    print(f"item-locations:     {args.skus:,}")
+    print(f"unique profiles:    {unique:,}")
+    print(f"total solve time:   {elapsed:.1f} s")
+    print(f"per SKU:            {elapsed / args.skus * 1e6:.1f} us")
+    print(f"per unique profile: {elapsed / unique * 1e3:.2f} ms")
+
+    start = time.perf_counter()
+    optimize_s_s_batch(*network, workers=1)
+    print(f"warm-cache rerun:   {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark for demand prediction memoization.
+
+Simulates dashboards polling predict_demand: each round every tracked
+series is requested by several concurrent viewers, and between rounds
+movements arrive for a share of the series. Compares computing every
+request from the stored smoothing state with the memoized path, and
+reports how many predictions were computed, hit rate and per-request
+cost. A refresh (new state version) at the end must orphan everything.
+"""
+
+import argparse
+import asyncio
+import shutil
+import time
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.schemas.forecast import ForecastRequest
+from src.services.forecast_quantiles import QuantileCalibrationStore, normal_calibration
+from src.services.forecast_service import ForecastService
+from src.services.forecast_state import ForecastStateStore, absorb, empty_state, key_ids, with_series, series_key
+from src.services.prediction_cache import PredictionCache, set_prediction_cache
+
+END = date(2025, 7, 1)
+
+
+def build_state(n_series: int, organization_id: uuid.UUID) -> np.ndarray:
+    rng = np.random.default_rng(8)
+    keys = [series_key(uuid.uuid4(), uuid.uuid4()) for _ in range(n_series)]
+    state, _ = with_series(empty_state(date.fromordinal(END.toordinal() - 56)), keys)
+    state = absorb(state, rng.poisson(rng.gamma(2.0, 5.0, (n_series, 1)), (n_series, 56)).astype(np.float32))
+    ForecastStateStore().save(organization_id, state)
+    QuantileCalibrationStore().save(organization_id, normal_calibration(END))
+    return state.keys
+
+
+async def run(args: argparse.Namespace) -> None:
+    organization_id = uuid.uuid4()
+    user = SimpleNamespace(organization_id=organization_id, id=uuid.uuid4())
+    service = ForecastService(db=None)
+    rng = np.random.default_rng(9)
+    try:
+        keys = build_state(args.state_series, organization_id)
+        tracked = [key_ids(key) for key in keys[rng.choice(len(keys), args.tracked, replace=False)].tolist()]
+        requests = [
+            ForecastRequest(item_id=item_id, location_id=location_id, forecast_horizon=28, model_type="ets")
+            for item_id, location_id in tracked
+        ]
+
+        # Every request computed from the stored state
+        began = time.perf_counter()
+        for request in requests:
+            await service._predict_demand(request, user)
+        direct = (time.perf_counter() - began) / len(requests)
+
+        cache = PredictionCache(max_entries=args.tracked * 2)
+        set_prediction_cache(cache)
+        calls = 0
+        compute = service._predict_demand
+
+        async def counted(request, user):
+            nonlocal calls
+            calls += 1
+            return await compute(request, user)
+
+        service._predict_demand = counted
+        began = time.perf_counter()
+        for _ in range(args.rounds):
+            await asyncio.gather(*(
+                service.predict_demand(request, user) for request in requests for _ in range(args.viewers)
+            ))
+            for i in rng.choice(len(tracked), int(args.moving * len(tracked)), replace=False):
+                cache.invalidate_series(organization_id, *tracked[i])
+        elapsed = time.perf_counter() - began
+        total = args.rounds * args.viewers * len(requests)
+        print(f"{args.state_series:,} series in state, {len(requests)} tracked x {args.viewers} concurrent viewers "
+              f"x {args.rounds} rounds, {args.moving:.0%} of series moving per round")
+        print(f"  direct:   {direct * 1e3:7.3f} ms/request")
+        print(f"  memoized: {elapsed / total * 1e3:7.3f} ms/request, {calls:,} computed for {total:,} requests "
+              f"(hit rate {cache.hits / (cache.hits + cache.misses):.1%}), {len(cache):,} entries")
+
+        # A refresh writes a new state version: every fingerprint changes
+        ForecastStateStore().save(organization_id, ForecastStateStore().load(organization_id))
+        before = calls
+        await asyncio.gather(*(service.predict_demand(request, user) for request in requests))
+        print(f"  after a state refresh: {calls - before} of {len(requests)} recomputed")
+        assert calls - before == len(requests)
+    finally:
+        set_prediction_cache(None)
+        for store in (ForecastStateStore(), QuantileCalibrationStore()):
+            shutil.rmtree(store._directory(organization_id), ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--state-series", type=int, default=200_000)
+    parser.add_argument("--tracked", type=int, default=500)
+    parser.add_argument("--viewers", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--moving", type=float, default=0.05)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
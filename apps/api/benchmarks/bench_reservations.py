@@ -0,0 +1,199 @@
+"""
+Benchmark for stock reservations under contention.
+
+Thousands of concurrent reservations compete for one hot item-location,
+a share of them multi-line (the hot item plus another item). They run
+through ReservationService against SQLite (aiosqlite), each on its own
+session, with demand several times the hot item's stock. Afterwards:
+
+- no oversell: reserved never exceeds on hand, and equals the units of
+  the reservations that succeeded;
+- atomic multi-line holds: a refused reservation left nothing reserved
+  on its other lines;
+- consistency: available_quantity = quantity - reserved_quantity;
+- lifecycle: releasing some holds, committing some and expiring the rest
+  with the sweeper leaves exactly the committed units reserved.
+
+The database here is SQLite, which serializes writers the way row locks
+serialize updates of a hot row in Postgres; throughput on Postgres is
+not measured by this benchmark. The same contention runs on Postgres in
+tests/test_services/test_reservation_service.py.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import event, select, update, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+
+from src.models.base import Base
+from src.models.inventory import Item, Inventory
+from src.models.reservation import Reservation, ReservationLine
+from src.schemas.inventory import ReservationCreate, ReservationLineRequest
+from src.services.reservation_service import ReservationService
+
+
+@compiles(UUID, "sqlite")
+def _uuid_column(type_, compiler, **kw) -> str:
+    return "CHAR(32)"  # how SQLAlchemy binds UUIDs on SQLite
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_column(type_, compiler, **kw) -> str:
+    return "JSON"
+
+
+async def seed(engine, organization_id, hot_stock: int, n_other: int):
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.create_all,
+            tables=[Item.__table__, Inventory.__table__, Reservation.__table__, ReservationLine.__table__]
+        )
+    hot = (uuid.uuid4(), uuid.uuid4())
+    others = [(uuid.uuid4(), uuid.uuid4()) for _ in range(n_other)]
+    now = datetime.utcnow()
+    async with AsyncSession(engine) as db:
+        for (item_id, location_id), quantity in [(hot, hot_stock)] + [(other, 1_000_000) for other in others]:
+            db.add(Item(
+                id=item_id, organization_id=organization_id, sku=str(item_id), name="Item", category="bench",
+                created_at=now, updated_at=now
+            ))
+            db.add(Inventory(
+                item_id=item_id, location_id=location_id, quantity=quantity, reserved_quantity=0,
+                available_quantity=quantity, safety_stock=0, reorder_point=0, last_updated=now
+            ))
+        await db.commit()
+    return hot, others
+
+
+async def inventory_row(sessions, key):
+    async with sessions() as db:
+        row = (await db.execute(
+            select(Inventory.quantity, Inventory.reserved_quantity, Inventory.available_quantity)
+            .where(Inventory.item_id == key[0], Inventory.location_id == key[1])
+        )).one()
+    return row
+
+
+async def contest(sessions, user, hot, others, n: int, concurrency: int, multi_line: float):
+    rng = random.Random(49)
+    requests = []
+    for number in range(n):
+        lines = [ReservationLineRequest(item_id=str(hot[0]), location_id=str(hot[1]), quantity=rng.randint(1, 3))]
+        if rng.random() < multi_line:
+            other = rng.choice(others)
+            lines.append(ReservationLineRequest(item_id=str(other[0]), location_id=str(other[1]), quantity=rng.randint(1, 5)))
+        requests.append(ReservationCreate(reference=f"SO-{number}", lines=lines, ttl_seconds=600))
+
+    pending = asyncio.Queue()
+    for request in requests:
+        pending.put_nowait(request)
+    held, refused, latencies = [], [], []
+
+    async def worker() -> None:
+        while not pending.empty():
+            request = pending.get_nowait()
+            async with sessions() as db:
+                began = time.perf_counter()
+                try:
+                    held.append((request, await ReservationService(db).reserve(request, user)))
+                except ValueError:
+                    refused.append(request)
+                latencies.append(time.perf_counter() - began)
+
+    began = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return held, refused, latencies, time.perf_counter() - began
+
+
+async def run(args: argparse.Namespace) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "reservations.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 60})
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _pragmas(connection, _):
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=OFF")  # no location or organization rows
+
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    user = SimpleNamespace(organization_id=uuid.uuid4())
+    hot, others = await seed(engine, user.organization_id, args.stock, args.others)
+
+    held, refused, latencies, elapsed = await contest(
+        sessions, user, hot, others, args.reservations, args.concurrency, args.multi_line
+    )
+    hot_held = sum(line.quantity for _, response in held for line in response.lines if line.item_id == str(hot[0]))
+    quantity, reserved, available = await inventory_row(sessions, hot)
+    assert reserved == hot_held, (reserved, hot_held)
+    assert reserved <= quantity and available == quantity - reserved
+    async with sessions() as db:
+        other_reserved = (await db.execute(
+            select(func.sum(Inventory.reserved_quantity)).where(Inventory.item_id != hot[0])
+        )).scalar()
+    other_held = sum(line.quantity for _, response in held for line in response.lines if line.item_id != str(hot[0]))
+    assert other_reserved == other_held, (other_reserved, other_held)  # refused multi-line holds left nothing behind
+    latencies.sort()
+    print(f"{args.reservations:,} reservations ({args.multi_line:.0%} multi-line) on one hot item with "
+          f"{args.stock:,} units, {args.concurrency} concurrent sessions: {len(held):,} held, {len(refused):,} refused "
+          f"in {elapsed:.2f}s ({args.reservations / elapsed:,.0f} reservations/s, p50 "
+          f"{latencies[len(latencies) // 2] * 1e3:.1f} ms, p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.1f} ms)")
+    print(f"hot item: {reserved:,} of {quantity:,} units reserved, {available:,} available; "
+          f"oversold 0, reserved equals held units on every row")
+
+    # Release a tenth, commit a tenth, let the rest expire
+    rng = random.Random(50)
+    rng.shuffle(held)
+    tenth = len(held) // 10
+    began = time.perf_counter()
+    for _, response in held[:tenth]:
+        async with sessions() as db:
+            await ReservationService(db).release_reservation(response.id, user)
+    for _, response in held[tenth:2 * tenth]:
+        async with sessions() as db:
+            await ReservationService(db).commit_reservation(response.id, user)
+    lifecycle = time.perf_counter() - began
+    async with sessions() as db:
+        await db.execute(
+            update(Reservation).where(Reservation.status == 'held')
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db.commit()
+    began = time.perf_counter()
+    async with sessions() as db:
+        expired = await ReservationService(db).expire_reservations()
+    sweep = time.perf_counter() - began
+
+    committed = sum(line.quantity for _, response in held[tenth:2 * tenth]
+                    for line in response.lines if line.item_id == str(hot[0]))
+    quantity, reserved, available = await inventory_row(sessions, hot)
+    assert expired == len(held) - 2 * tenth, expired
+    assert reserved == committed and available == quantity - reserved, (reserved, committed)
+    print(f"lifecycle: {tenth:,} released and {tenth:,} committed in {lifecycle:.2f}s "
+          f"({2 * tenth / lifecycle:,.0f}/s); sweeper expired {expired:,} holds in {sweep * 1e3:.0f} ms; "
+          f"{reserved:,} units left reserved = committed units")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservations", type=int, default=5000)
+    parser.add_argument("--stock", type=int, default=2000)
+    parser.add_argument("--others", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--multi-line", type=float, default=0.3)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
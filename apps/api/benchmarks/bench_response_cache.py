@@ -0,0 +1,63 @@
+"""
+Benchmark for the response cache.
+
+Simulates dashboards polling a cached endpoint: bursts of concurrent
+requests per organization against a query with a fixed latency, with
+writes invalidating an organization's entries between bursts. Reports
+how many queries reached the database, hit rate and per-request cost.
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.core.cache import InMemoryCacheBackend, ResponseCache
+
+
+async def run(organizations: int, concurrency: int, rounds: int, query_ms: float, rows: int) -> None:
+    cache = ResponseCache(InMemoryCacheBackend(max_entries=organizations * 3))
+    queries = 0
+    payload = [{"item_id": f"item-{i}", "location_id": f"loc-{i % 40}", "current_quantity": i % 17, "reorder_point": 10} for i in range(rows)]
+
+    async def query():
+        nonlocal queries
+        queries += 1
+        await asyncio.sleep(query_ms / 1000)
+        return payload
+
+    start = time.perf_counter()
+    requests = 0
+    for round_ in range(rounds):
+        if round_ % 10 == 9:
+            # A write in every organization, e.g. a stock movement
+            for org in range(organizations):
+                await cache.invalidate(f"org-{org}")
+        await asyncio.gather(*(
+            cache.get_or_compute(f"org-{org}", "/alerts/low-stock", (), query)
+            for org in range(organizations)
+            for _ in range(concurrency)
+        ))
+        requests += organizations * concurrency
+    elapsed = time.perf_counter() - start
+
+    uncached = requests * query_ms / 1000 / concurrency  # same concurrency, no cache
+    print(f"organizations={organizations} concurrent requests/org={concurrency} rounds={rounds} query={query_ms} ms rows={rows}")
+    print(f"requests {requests:,}, database queries {queries:,} "
+          f"(hit rate {cache.hits / requests:.1%}), {elapsed:.2f}s total, "
+          f"{elapsed / requests * 1e6:.1f} us/request")
+    print(f"without cache: {requests:,} queries, >= {uncached:.1f}s at the same concurrency")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--organizations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--query-ms", type=float, default=40.0)
+    parser.add_argument("--rows", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.organizations, args.concurrency, args.rounds, args.query_ms, args.rows))
+
+
+if __name__ == "__main__":
+    main()
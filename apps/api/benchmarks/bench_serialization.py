@@ -0,0 +1,94 @@
+"""
+Microbenchmark for list response serialization.
+
+Compares the per-row model path (ItemResponse.from_model, FastAPI
+response validation, jsonable_encoder and the stdlib encoder) with the
+fast path (tuple rows to dicts, encoded by orjson) on rows with UUID,
+Decimal and datetime values, and checks both produce the same JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.core.serialization import dumps, rows_to_dicts
+from src.schemas.inventory import ItemResponse, LowStockAlert
+
+
+def generate_item_rows(n_rows: int):
+    """Tuple rows in ItemResponse field order, as the column query returns them."""
+    now = datetime(2024, 5, 1, 8, 30, 15, 123456)
+    organization_id, user_id = uuid.uuid4(), uuid.uuid4()
+    rows = []
+    for i in range(n_rows):
+        rows.append((
+            f"Item {i}", f"SKU-{i:07d}", "Stock keeping unit used for benchmarking", None,
+            Decimal("12.34") + i % 100, Decimal("19.99") + i % 50, Decimal("1.250"), "30x20x10",
+            365, Decimal("4.5"), 7, None, True,
+            uuid.uuid4(), organization_id, user_id, now - timedelta(days=i % 365), now,
+        ))
+    return list(ItemResponse.__fields__), rows
+
+
+def generate_alert_rows(n_rows: int):
+    rows = [
+        (uuid.uuid4(), f"Item {i}", f"SKU-{i:07d}", uuid.uuid4(), f"Store {i % 40}", i % 10, 10, (i % 10) / 4.5)
+        for i in range(n_rows)
+    ]
+    return list(LowStockAlert.__fields__), rows
+
+
+async def model_path(field, schema, keys, rows) -> bytes:
+    """Baseline: one model per row, then FastAPI's validation and encoder."""
+    if schema is ItemResponse:
+        content = [ItemResponse.from_model(SimpleNamespace(**dict(zip(keys, row)))) for row in rows]
+    else:
+        content = [schema(**{key: str(value) if isinstance(value, uuid.UUID) else value for key, value in zip(keys, row)}) for row in rows]
+    serialized = await serialize_response(field=field, response_content=content)
+    return json.dumps(serialized, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast_path(keys, rows) -> bytes:
+    return dumps(rows_to_dicts(keys, rows))
+
+
+def best_of(repeats: int, fn) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    for schema, (keys, rows) in ((ItemResponse, generate_item_rows(args.rows)), (LowStockAlert, generate_alert_rows(args.rows))):
+        field = create_response_field(name="Response", type_=List[schema])
+        baseline = loop.run_until_complete(model_path(field, schema, keys, rows))
+        fast = fast_path(keys, rows)
+        assert json.loads(baseline) == json.loads(fast), "fast path output differs"
+
+        before = best_of(args.repeats, lambda: loop.run_until_complete(model_path(field, schema, keys, rows)))
+        after = best_of(args.repeats, lambda: fast_path(keys, rows))
+        print(f"{schema.__name__} x {args.rows}: model path {before * 1000:.1f} ms ({args.rows / before:,.0f} rows/s), "
+              f"fast path {after * 1000:.2f} ms ({args.rows / after:,.0f} rows/s), {before / after:.0f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Memory benchmark for streaming query results.
+
+Loads a table with 1M inventory-like rows and reads it back, once fully
+buffered (`execute(...).all()` / `scalars().all()`) and once through the
+server-side cursor helpers in src.core.database. Each mode runs in a fresh
+process and reports its peak RSS next to the RSS before the read.
+
+Consumers:
+  entities  ORM objects, aggregated (e.g. alert scans)
+  rows      column tuples, aggregated (e.g. lead-time fitting)
+  dicts     column tuples turned into response dicts (list endpoints)
+
+Uses SQLite through aiosqlite by default; pass --url to run against
+Postgres (asyncpg), which is what production uses.
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import Column, Float, Integer, String, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from src.core.database import stream_partitions, stream_scalars
+from src.core.serialization import rows_to_dicts
+
+Base = declarative_base()
+
+
+class BenchRow(Base):
+    __tablename__ = "bench_streaming_rows"
+
+    id = Column(Integer, primary_key=True)
+    item_name = Column(String(255))
+    item_sku = Column(String(100))
+    location_name = Column(String(255))
+    quantity = Column(Integer)
+    reorder_point = Column(Integer)
+    days_of_stock = Column(Float)
+
+
+COLUMNS = (BenchRow.id, BenchRow.item_name, BenchRow.item_sku, BenchRow.location_name,
+           BenchRow.quantity, BenchRow.reorder_point, BenchRow.days_of_stock)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def load(url: str, n_rows: int) -> None:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, n_rows, 50_000):
+            await conn.execute(insert(BenchRow), [
+                {"id": i, "item_name": f"Item {i}", "item_sku": f"SKU-{i:08d}", "location_name": f"Store {i % 300}",
+                 "quantity": i % 20, "reorder_point": 10, "days_of_stock": (i % 20) / 3.0}
+                for i in range(start, min(start + 50_000, n_rows))
+            ])
+    await engine.dispose()
+
+
+async def consume(url: str, consumer: str, streamed: bool) -> int:
+    engine = create_async_engine(url)
+    async with AsyncSession(engine) as db:
+        # Warm up the connection so its buffers count towards the baseline
+        await db.execute(select(func.count(BenchRow.id)))
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        if consumer == "entities":
+            query = select(BenchRow)
+            if streamed:
+                low = sum([1 async for row in stream_scalars(db, query) if row.quantity <= row.reorder_point])
+            else:
+                low = sum(1 for row in (await db.execute(query)).scalars().all() if row.quantity <= row.reorder_point)
+            count = low
+        elif consumer == "rows":
+            query = select(*COLUMNS)
+            total = 0
+            if streamed:
+                async for partition in stream_partitions(db, query):
+                    total += sum(row[4] for row in partition)
+            else:
+                total = sum(row[4] for row in (await db.execute(query)).all())
+            count = total
+        else:
+            query = select(*COLUMNS)
+            keys = list(query.selected_columns.keys())
+            if streamed:
+                response = []
+                async for partition in stream_partitions(db, query):
+                    response.extend(rows_to_dicts(keys, partition))
+            else:
+                response = rows_to_dicts(keys, (await db.execute(query)).all())
+            count = len(response)
+        elapsed = time.perf_counter() - start
+        print(f"{consumer:<9} {'streamed' if streamed else 'buffered':<9} "
+              f"peak RSS {peak_rss_mb():7.1f} MB (baseline {baseline:.1f} MB)  {elapsed:6.2f}s  (result {count:,})")
+    await engine.dispose()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--consume", nargs=2, metavar=("CONSUMER", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.consume:
+        asyncio.run(consume(args.url, args.consume[0], args.consume[1] == "streamed"))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        asyncio.run(load(url, args.rows))
+        print(f"rows={args.rows:,}")
+        for consumer in ("entities", "rows", "dicts"):
+            for mode in ("buffered", "streamed"):
+                subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_streaming", "--url", url, "--consume", consumer, mode],
+                    check=True,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Load test for WebSocket progress fan-out.
+
+Subscribes thousands of consumers to a handful of job topics in the
+ProgressHub, a share of them deliberately slow, and publishes a stream of
+progress updates and partial-result messages. Reports publish cost,
+delivery latency and the peak buffered messages, which must stay bounded
+no matter how slow consumers are.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.realtime.hub import MAX_SUBSCRIBER_BUFFER, ProgressHub, job_topic
+
+
+async def consume(subscription, delay: float, latencies: list, received: list) -> None:
+    """Read until the terminal message, sleeping `delay` per message."""
+    count = 0
+    while True:
+        message = await subscription.get()
+        latencies.append(time.perf_counter() - message["sent_at"])
+        count += 1
+        if message["status"] != "running":
+            received.append(count)
+            return
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def run(subscribers: int, topics: int, updates: int, slow_share: float, slow_delay: float) -> None:
+    hub = ProgressHub()
+    fast_latencies, slow_latencies, fast_received, slow_received = [], [], [], []
+    tasks = []
+    n_slow = int(subscribers * slow_share)
+    for i in range(subscribers):
+        subscription = hub.subscribe(job_topic(i % topics))
+        slow = i < n_slow
+        tasks.append(asyncio.create_task(consume(
+            subscription,
+            slow_delay if slow else 0.0,
+            slow_latencies if slow else fast_latencies,
+            slow_received if slow else fast_received,
+        )))
+    await asyncio.sleep(0)
+
+    publish_times = []
+    peak_pending = 0
+    start = time.perf_counter()
+    for step in range(updates):
+        for topic in range(topics):
+            # Every tenth update carries partial results and is not coalesced
+            partial = step % 10 == 0
+            message = {"type": "job_update", "status": "running", "progress": step / updates, "sent_at": time.perf_counter()}
+            if partial:
+                message["data"] = {"lines": list(range(20))}
+            t0 = time.perf_counter()
+            hub.publish(job_topic(topic), message, coalesce=not partial)
+            publish_times.append(time.perf_counter() - t0)
+        # Let consumers run between publish rounds as an event loop would
+        await asyncio.sleep(0)
+        if step % 50 == 0:
+            peak_pending = max(peak_pending, max(
+                s.pending() for subs in hub._subscribers.values() for s in subs
+            ))
+    for topic in range(topics):
+        hub.publish(job_topic(topic), {"type": "job_update", "status": "succeeded", "progress": 1.0, "sent_at": time.perf_counter()})
+    publish_seconds = time.perf_counter() - start
+    await asyncio.gather(*tasks)
+    total_seconds = time.perf_counter() - start
+
+    fanned = updates * topics * (subscribers // topics)
+    publish_ms = sorted(t * 1000 for t in publish_times)
+    print(f"subscribers={subscribers} topics={topics} updates/topic={updates} slow={n_slow}")
+    print(f"publish: {publish_seconds:.2f}s total, {fanned / publish_seconds:,.0f} deliveries/s, "
+          f"per publish p50 {statistics.median(publish_ms):.3f} ms, p99 {publish_ms[int(len(publish_ms) * 0.99)]:.3f} ms")
+    print(f"all consumers done after {total_seconds:.2f}s")
+    for name, latencies, received in (("fast", fast_latencies, fast_received), ("slow", slow_latencies, slow_received)):
+        if not latencies:
+            continue
+        latencies_ms = sorted(t * 1000 for t in latencies)
+        print(f"{name}: latency p50 {statistics.median(latencies_ms):.1f} ms, "
+              f"p99 {latencies_ms[int(len(latencies_ms) * 0.99)]:.1f} ms, "
+              f"messages/consumer {statistics.mean(received):.0f} of {updates + 1} published")
+    print(f"peak pending per subscriber: {peak_pending} (bound {MAX_SUBSCRIBER_BUFFER})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=5_000)
+    parser.add_argument("--topics", type=int, default=50)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--slow-share", type=float, default=0.1)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.topics, args.updates, args.slow_share, args.slow_delay))
+
+
+if __name__ == "__main__":
+    main()
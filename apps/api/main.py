@@ -8,12 +8,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import asyncio
 import time
 import structlog
 
 # Import routers and dependencies
 from src.core.database import init_db
-from src.api import auth_router, inventory_router
+from src.api import auth_router, inventory_router, jobs_router, realtime_router, exports_router, imports_router, forecasts_router
+from src.jobs.broker import get_broker
+from src.realtime import get_hub, relay_events
+from src.services.reservation_service import sweep_reservations
 
 # Setup structured logging
 logger = structlog.get_logger()
@@ -34,10 +38,18 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error("Failed to initialize database", error=str(e))
     
+    # Relay job progress published by workers to local WebSocket subscribers
+    relay = asyncio.create_task(relay_events(get_broker(), get_hub()))
+    
+    # Expire stale reservation holds
+    sweeper = asyncio.create_task(sweep_reservations())
+    
     yield
     
     # Shutdown
     logger.info("Shutting down StockSense AI API server")
+    relay.cancel()
+    sweeper.cancel()
 
 # Create FastAPI application instance
 app = FastAPI(
@@ -158,6 +170,11 @@ async def root():
 # Include API routers
 app.include_router(auth_router, prefix="/api/v1")
 app.include_router(inventory_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
+app.include_router(exports_router, prefix="/api/v1")
+app.include_router(imports_router, prefix="/api/v1")
+app.include_router(forecasts_router, prefix="/api/v1")
+app.include_router(realtime_router)
 
 # Startup event
 @app.on_event("startup")
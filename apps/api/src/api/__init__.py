@@ -6,9 +6,13 @@ This package contains all API endpoints organized by functionality.
 
 from .auth import router as auth_router
 from .inventory import router as inventory_router
+from .jobs import router as jobs_router
+from .realtime import router as realtime_router
+from .exports import router as exports_router
+from .imports import router as imports_router
+from .forecasts import router as forecasts_router
 
 # Import other routers as they are created
-# from .forecasts import router as forecasts_router
 # from .policies import router as policies_router
 # from .orders import router as orders_router
 # from .analytics import router as analytics_router
@@ -16,7 +20,11 @@ from .inventory import router as inventory_router
 __all__ = [
     "auth_router",
     "inventory_router",
-    # "forecasts_router",
+    "jobs_router",
+    "realtime_router",
+    "exports_router",
+    "imports_router",
+    "forecasts_router",
     # "policies_router",
     # "orders_router",
     # "analytics_router",
@@ -0,0 +1,53 @@
+"""
+Export API routes for StockSense AI.
+
+Provides bulk columnar exports (Arrow IPC stream or Parquet) of items,
+locations, inventory levels and movements for BI and notebooks.
+"""
+
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+import structlog
+
+from ..core.database import AsyncSessionLocal
+from ..core.auth import require_read_inventory
+from ..models.user import User
+from ..services.export_service import ExportService, EXPORT_FORMATS
+
+logger = structlog.get_logger()
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("arrow", regex="^(arrow|parquet)$"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to export"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    time_column: Optional[str] = Query(None),
+    current_user: User = Depends(require_read_inventory)
+):
+    """Stream items, locations, inventory or movements in a columnar format."""
+    selected = [name.strip() for name in columns.split(",") if name.strip()] if columns else None
+    try:
+        ExportService.resolve_columns(dataset, selected, time_column)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    async def stream():
+        # The export outlives the request handler, so it owns its session
+        async with AsyncSessionLocal() as db:
+            async for chunk in ExportService(db).export(
+                dataset, current_user, format, selected, since, until, time_column
+            ):
+                if chunk:
+                    yield chunk
+    
+    extension = "arrows" if format == "arrow" else "parquet"
+    return StreamingResponse(
+        stream(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'}
+    )
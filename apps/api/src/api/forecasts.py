@@ -0,0 +1,54 @@
+"""
+Forecast API routes for StockSense AI.
+
+Serves stored forecast runs with filtering and pagination, and creates
+forecasts for single item-locations.
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import get_db
+from ..core.auth import require_read_forecasts, require_write_forecasts
+from ..models.user import User
+from ..services.forecast_service import ForecastService
+from ..schemas.forecast import ForecastCreate, ForecastResponse, ForecastRunResponse
+
+logger = structlog.get_logger()
+router = APIRouter(prefix="/forecasts", tags=["forecasts"])
+
+@router.get("", response_model=List[ForecastResponse])
+async def get_forecasts(
+    item_id: Optional[str] = Query(None),
+    location_id: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    run_id: Optional[str] = Query(None, description="Stored run, the latest organization-wide run by default"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(require_read_forecasts),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get stored forecasts with filtering and pagination."""
+    service = ForecastService(db)
+    return await service.get_forecasts(current_user, item_id, location_id, skip, limit, category, run_id)
+
+@router.get("/runs", response_model=List[ForecastRunResponse])
+async def get_forecast_runs(
+    current_user: User = Depends(require_read_forecasts),
+    db: AsyncSession = Depends(get_db)
+):
+    """List stored forecast runs, newest first."""
+    service = ForecastService(db)
+    return await service.get_forecast_runs(current_user)
+
+@router.post("", response_model=ForecastResponse)
+async def create_forecast(
+    forecast_data: ForecastCreate,
+    current_user: User = Depends(require_write_forecasts),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create and store a forecast for one item-location."""
+    service = ForecastService(db)
+    return await service.create_forecast(forecast_data, current_user)
@@ -0,0 +1,98 @@
+"""
+Import API routes for StockSense AI.
+
+Provides catalog file imports (CSV or Excel) run as background jobs,
+their reject files, and saved column mappings.
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Request
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import get_db
+from ..core.auth import require_read_inventory, require_write_inventory
+from ..models.user import User
+from ..services.import_service import ImportService
+from ..services.job_service import JobService
+from ..schemas.imports import ImportMappingCreate, ImportMappingResponse
+from ..schemas.job import JobSubmit, JobResponse
+
+logger = structlog.get_logger()
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+@router.post("/mappings", response_model=ImportMappingResponse)
+async def create_mapping(
+    mapping_data: ImportMappingCreate,
+    current_user: User = Depends(require_write_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Save a column mapping for a recurring import file layout."""
+    service = ImportService(db)
+    try:
+        return await service.create_mapping(mapping_data, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/mappings", response_model=List[ImportMappingResponse])
+async def list_mappings(
+    dataset: Optional[str] = Query(None, regex="^(items|locations)$"),
+    current_user: User = Depends(require_read_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the organization's import mappings."""
+    service = ImportService(db)
+    return await service.list_mappings(current_user, dataset)
+
+@router.delete("/mappings/{mapping_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_mapping(
+    mapping_id: str,
+    current_user: User = Depends(require_write_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Delete an import mapping."""
+    service = ImportService(db)
+    if not await service.delete_mapping(mapping_id, current_user):
+        raise HTTPException(status_code=404, detail="Import mapping not found")
+
+@router.post("/{dataset}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def import_file(
+    request: Request,
+    dataset: str = Path(..., regex="^(items|locations)$"),
+    format: str = Query("csv", regex="^(csv|xlsx)$"),
+    mapping_id: Optional[str] = Query(None),
+    current_user: User = Depends(require_write_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Upload a CSV or Excel file (as the raw request body) and queue its import.
+    
+    Track the returned job; its result counts rows per outcome, and
+    rejected rows can be downloaded from /imports/{upload_id}/rejects.
+    """
+    service = ImportService(db)
+    upload_id = await service.save_upload(request.stream(), format, current_user)
+    try:
+        await service.check_upload(dataset, upload_id, format, current_user, mapping_id)
+    except ValueError as e:
+        service.remove_upload(current_user, upload_id, format)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    params = {"dataset": dataset, "upload_id": upload_id, "format": format, "mapping_id": mapping_id}
+    return await JobService(db).submit_job(JobSubmit(type="catalog_import", params=params), current_user)
+
+@router.get("/{upload_id}/rejects")
+async def get_rejects(
+    upload_id: str,
+    current_user: User = Depends(require_read_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Download the rejected rows of an import, with their row numbers and errors."""
+    service = ImportService(db)
+    try:
+        path = service.rejects_path(current_user, upload_id)
+    except ValueError:
+        path = None
+    if not path:
+        raise HTTPException(status_code=404, detail="No rejected rows")
+    return FileResponse(path, media_type="text/csv", filename=f"{upload_id}-rejects.csv")
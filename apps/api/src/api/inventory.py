@@ -4,26 +4,81 @@ Inventory API routes for StockSense AI.
 Provides endpoints for inventory management operations.
 """
 
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Optional
+import tempfile
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 
-from ..core.database import get_db
+from ..core.database import get_db, AsyncSessionLocal
+from ..core.cache import cached_response
+from ..core.serialization import FastJSONResponse, dumps
 from ..core.auth import get_current_active_user, require_read_inventory, require_write_inventory
 from ..models.user import User
 from ..services.inventory_service import InventoryService
+from ..services.catalog_service import CatalogService
+from ..services.anomaly_service import AnomalyService
+from ..services.availability_service import AvailabilityService
+from ..services.reservation_service import ReservationService
+from ..services.balance_service import BalanceHistoryService
 from ..schemas.inventory import (
     ItemCreate, ItemUpdate, ItemResponse,
     LocationCreate, LocationUpdate, LocationResponse,
     InventoryCreate, InventoryUpdate, InventoryResponse,
     MovementCreate, MovementResponse,
-    InventorySummary, LowStockAlert
+    InventorySummary, LowStockAlert,
+    UpsertStatus, DemandAnomalyResponse,
+    ScheduledReceiptCreate, ScheduledReceiptResponse,
+    AvailabilityCheck, AvailabilityResponse,
+    ReservationCreate, ReservationResponse,
+    BalanceHistoryResponse
 )
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
+# Request bodies larger than this are spooled to disk while syncing
+BULK_SPOOL_BYTES = 16 * 1024 * 1024
+
+async def _spool_body(request: Request):
+    """Copy the request body to a spooled temporary file.
+    
+    The body must be read before the streamed response starts, as the
+    response listens on the same ASGI channel for disconnects.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_BYTES)
+    async for data in request.stream():
+        spool.write(data)
+    spool.seek(0)
+    return spool
+
+async def _ndjson_records(spool) -> AsyncIterator[Any]:
+    """Parse newline-delimited JSON records from a spooled body."""
+    with spool:
+        for line_number, line in enumerate(spool, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                yield {"_error": f"Line {line_number} is not valid JSON"}
+
+def _bulk_upsert_response(request_spool, current_user: User, upsert) -> StreamingResponse:
+    """Stream per-record statuses as NDJSON, ending with a summary line."""
+    async def stream():
+        counts: Dict[str, int] = {}
+        # The sync outlives the request handler, so it owns its session
+        async with AsyncSessionLocal() as db:
+            async for result in upsert(CatalogService(db), _ndjson_records(request_spool), current_user):
+                counts[result["status"]] = counts.get(result["status"], 0) + 1
+                yield dumps(result) + b"\n"
+        yield dumps({"summary": counts}) + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.post("/items", response_model=ItemResponse)
 async def create_item(
     item_data: ItemCreate,
@@ -45,7 +100,7 @@ async def get_items(
 ):
     """Get inventory items with filtering and pagination."""
     service = InventoryService(db)
-    return await service.get_items(current_user, skip, limit, category_id, search)
+    return FastJSONResponse(await service.get_item_rows(current_user, skip, limit, category_id, search))
 
 @router.get("/items/{item_id}", response_model=ItemResponse)
 async def get_item(
@@ -86,30 +141,57 @@ async def create_location(
 
 @router.get("/locations", response_model=List[LocationResponse])
 async def get_locations(
+    request: Request,
     current_user: User = Depends(require_read_inventory),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all locations for the organization."""
+    """Get all locations for the organization (cached, supports If-None-Match)."""
     service = InventoryService(db)
-    return await service.get_locations(current_user)
+    return await cached_response(
+        request, current_user.organization_id, "/locations",
+        lambda: service.get_location_rows(current_user)
+    )
 
 @router.get("/summary", response_model=InventorySummary)
 async def get_inventory_summary(
+    request: Request,
     current_user: User = Depends(require_read_inventory),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get inventory summary statistics."""
+    """Get inventory summary statistics (cached, supports If-None-Match)."""
     service = InventoryService(db)
-    return await service.get_inventory_summary(current_user)
+    return await cached_response(
+        request, current_user.organization_id, "/summary",
+        lambda: service.get_inventory_summary(current_user)
+    )
 
 @router.get("/alerts/low-stock", response_model=List[LowStockAlert])
 async def get_low_stock_alerts(
+    request: Request,
     current_user: User = Depends(require_read_inventory),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get low stock alerts."""
+    """Get low stock alerts (cached, supports If-None-Match)."""
     service = InventoryService(db)
-    return await service.get_low_stock_alerts(current_user)
+    return await cached_response(
+        request, current_user.organization_id, "/alerts/low-stock",
+        lambda: service.get_low_stock_alert_rows(current_user)
+    )
+
+@router.get("/anomalies", response_model=List[DemandAnomalyResponse])
+async def get_anomalies(
+    item_id: Optional[str] = Query(None),
+    location_id: Optional[str] = Query(None),
+    kind: Optional[str] = Query(None, regex="^(spike|negative_balance)$"),
+    since: Optional[date] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(require_read_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get demand anomaly flags from the last anomaly scan."""
+    service = AnomalyService(db)
+    return await service.get_anomalies(current_user, item_id, location_id, kind, since, skip, limit)
 
 @router.post("/movements", response_model=MovementResponse)
 async def record_movement(
@@ -120,3 +202,130 @@ async def record_movement(
     """Record inventory movement."""
     service = InventoryService(db)
     return await service.record_movement(movement_data, current_user)
+
+@router.get("/balances/{item_id}/history", response_model=BalanceHistoryResponse)
+async def get_balance_history(
+    item_id: str,
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    location_id: Optional[str] = Query(None),
+    current_user: User = Depends(require_read_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get an item's daily balance history from the balance snapshots."""
+    service = BalanceHistoryService(db)
+    try:
+        history = await service.get_history(item_id, current_user, start_date, end_date, location_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not history:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return history
+
+@router.post("/atp", response_model=AvailabilityResponse)
+async def check_availability(
+    request: AvailabilityCheck,
+    current_user: User = Depends(require_read_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Check whether a quantity can be promised by a date across locations."""
+    service = AvailabilityService(db)
+    return await service.check_availability(request, current_user)
+
+@router.post("/scheduled-receipts", response_model=ScheduledReceiptResponse)
+async def create_scheduled_receipt(
+    receipt_data: ScheduledReceiptCreate,
+    current_user: User = Depends(require_write_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Record an open purchase order line or in-transit transfer."""
+    service = AvailabilityService(db)
+    return await service.create_scheduled_receipt(receipt_data, current_user)
+
+@router.post("/reservations", response_model=ReservationResponse)
+async def reserve_stock(
+    reservation_data: ReservationCreate,
+    current_user: User = Depends(require_write_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Hold stock for an order; every line is held or none is."""
+    service = ReservationService(db)
+    try:
+        return await service.reserve(reservation_data, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/reservations/{reservation_id}", response_model=ReservationResponse)
+async def get_reservation(
+    reservation_id: str,
+    current_user: User = Depends(require_read_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a reservation with its lines."""
+    service = ReservationService(db)
+    reservation = await service.get_reservation(reservation_id, current_user)
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    return reservation
+
+@router.post("/reservations/{reservation_id}/commit", response_model=ReservationResponse)
+async def commit_reservation(
+    reservation_id: str,
+    current_user: User = Depends(require_write_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Keep a hold until its order ships."""
+    service = ReservationService(db)
+    try:
+        reservation = await service.commit_reservation(reservation_id, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    return reservation
+
+@router.post("/reservations/{reservation_id}/release", response_model=ReservationResponse)
+async def release_reservation(
+    reservation_id: str,
+    current_user: User = Depends(require_write_inventory),
+    db: AsyncSession = Depends(get_db)
+):
+    """Give back the stock a reservation holds."""
+    service = ReservationService(db)
+    try:
+        reservation = await service.release_reservation(reservation_id, current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    return reservation
+
+@router.post("/items/bulk-upsert", response_model=List[UpsertStatus])
+async def bulk_upsert_items(
+    request: Request,
+    current_user: User = Depends(require_write_inventory)
+):
+    """Create or update items by SKU from an NDJSON body (one item per line).
+    
+    Streams one NDJSON status line per record, then a summary line.
+    """
+    spool = await _spool_body(request)
+    return _bulk_upsert_response(
+        spool, current_user,
+        lambda service, records, user: service.upsert_items(records, user)
+    )
+
+@router.post("/locations/bulk-upsert", response_model=List[UpsertStatus])
+async def bulk_upsert_locations(
+    request: Request,
+    current_user: User = Depends(require_write_inventory)
+):
+    """Create or update locations by code from an NDJSON body (one location per line).
+    
+    Streams one NDJSON status line per record, then a summary line.
+    """
+    spool = await _spool_body(request)
+    return _bulk_upsert_response(
+        spool, current_user,
+        lambda service, records, user: service.upsert_locations(records, user)
+    )
@@ -0,0 +1,74 @@
+"""
+Job API routes for StockSense AI.
+
+Provides endpoints for submitting, tracking and cancelling background jobs.
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import get_db
+from ..core.auth import get_current_active_user
+from ..models.user import User
+from ..services.job_service import JobService
+from ..schemas.job import JobSubmit, JobResponse
+from ..jobs import handlers  # noqa: F401  registers the job handlers
+from ..jobs.runner import JOB_PERMISSIONS
+
+logger = structlog.get_logger()
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    job_data: JobSubmit,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Submit a forecast, model training or replenishment planning job."""
+    if not current_user.has_permission(JOB_PERMISSIONS[job_data.type]):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Insufficient permissions"
+        )
+    service = JobService(db)
+    return await service.submit_job(job_data, current_user)
+
+@router.get("", response_model=List[JobResponse])
+async def list_jobs(
+    status: Optional[str] = Query(None, regex="^(queued|running|succeeded|failed|cancelled)$"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """List the organization's jobs, newest first."""
+    service = JobService(db)
+    return await service.list_jobs(current_user, status, skip, limit)
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a job's status, progress and result."""
+    service = JobService(db)
+    job = await service.get_job(job_id, current_user)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Cancel a queued or running job."""
+    service = JobService(db)
+    job = await service.cancel_job(job_id, current_user)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,110 @@
+"""
+Real-time API routes for StockSense AI.
+
+WebSocket endpoints streaming job progress and replenishment plan lines
+as they are produced. Clients authenticate with an access token in the
+`token` query parameter, since browsers cannot set headers on WebSocket
+handshakes.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+import structlog
+
+from ..core.database import AsyncSessionLocal
+from ..core.auth import authenticate_token
+from ..models.user import User
+from ..realtime.hub import Subscription, get_hub, is_terminal, job_topic, plan_topic
+from ..services.job_service import JobService
+
+logger = structlog.get_logger()
+router = APIRouter(tags=["realtime"])
+
+# Close codes in the application range (4000-4999)
+WS_UNAUTHORIZED = 4401
+WS_NOT_FOUND = 4404
+
+async def _authenticate(websocket: WebSocket, token: Optional[str]) -> Optional[User]:
+    """Authenticate a WebSocket handshake, closing it on failure."""
+    user = None
+    if token:
+        async with AsyncSessionLocal() as db:
+            user = await authenticate_token(token, db)
+    if user is None:
+        await websocket.close(code=WS_UNAUTHORIZED)
+    return user
+
+async def _stream(websocket: WebSocket, subscription: Subscription) -> None:
+    """Send a subscription's messages until a terminal one or a disconnect."""
+    # Nothing is expected from the client; receiving only notices it leaving
+    receiver = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            sender = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                sender.cancel()
+                if receiver.result().get("type") == "websocket.disconnect":
+                    return
+                receiver = asyncio.ensure_future(websocket.receive())
+                continue
+            message = sender.result()
+            await websocket.send_json(message)
+            if is_terminal(message):
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        get_hub().unsubscribe(subscription)
+
+@router.websocket("/ws/jobs/{job_id}")
+async def job_updates(websocket: WebSocket, job_id: str, token: Optional[str] = Query(None)):
+    """Stream status and progress updates of a background job."""
+    await websocket.accept()
+    user = await _authenticate(websocket, token)
+    if user is None:
+        return
+    
+    # Subscribe before reading the job so no update falls in between
+    subscription = get_hub().subscribe(job_topic(job_id))
+    try:
+        async with AsyncSessionLocal() as db:
+            job = await JobService(db).get_job(job_id, user)
+    except Exception:
+        job = None
+    if job is None:
+        get_hub().unsubscribe(subscription)
+        await websocket.close(code=WS_NOT_FOUND)
+        return
+    
+    # The hub's retained state is fresher than the throttled database row
+    # unless the job has already finished
+    state = {
+        "type": "job_update",
+        "job_id": job.id,
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.progress_message,
+        "error": job.error,
+    }
+    if subscription.pending() == 0 or is_terminal(state):
+        subscription.put(state, "state")
+    
+    logger.info("Job updates subscribed", job_id=job_id, user_id=str(user.id))
+    await _stream(websocket, subscription)
+
+@router.websocket("/ws/plan/{plan_id}")
+async def plan_updates(websocket: WebSocket, plan_id: str, token: Optional[str] = Query(None)):
+    """Stream replenishment plan lines as each SKU chunk is planned."""
+    await websocket.accept()
+    user = await _authenticate(websocket, token)
+    if user is None:
+        return
+    
+    subscription = get_hub().subscribe(plan_topic(user.organization_id, plan_id))
+    logger.info("Plan updates subscribed", plan_id=plan_id, user_id=str(user.id))
+    await _stream(websocket, subscription)
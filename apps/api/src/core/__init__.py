@@ -5,7 +5,7 @@ This package contains database configuration, authentication,
 and other core functionality.
 """
 
-from .database import get_db, init_db, close_db, check_db_health
+from .database import get_db, init_db, close_db, check_db_health, stream_partitions, stream_rows, stream_scalars
 from .auth import (
     get_current_user,
     get_current_active_user,
@@ -32,6 +32,9 @@ __all__ = [
     "init_db",
     "close_db",
     "check_db_health",
+    "stream_partitions",
+    "stream_rows",
+    "stream_scalars",
     
     # Authentication
     "get_current_user",
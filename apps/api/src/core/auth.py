@@ -106,6 +106,27 @@ async def get_current_user(
     
     return user
 
+async def authenticate_token(token: str, db: AsyncSession) -> Optional[User]:
+    """Resolve an access token to an active user, or None if it is invalid.
+    
+    Used where the bearer header is unavailable, e.g. WebSocket handshakes.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    
+    user_id = payload.get("sub")
+    if user_id is None or payload.get("type") != "access":
+        return None
+    
+    from sqlalchemy import select
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is None or not user.is_active:
+        return None
+    return user
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user."""
     if not current_user.is_active:
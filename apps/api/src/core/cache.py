@@ -0,0 +1,260 @@
+"""
+Response caching for StockSense AI.
+
+Hot read endpoints polled by dashboards are cached per organization as
+serialized JSON with an ETag. Entries expire after a TTL and the
+in-process backend evicts least recently used entries beyond its size
+limit. Writes invalidate an organization's entries by bumping its cache
+generation, which is part of every key, so invalidation is O(1) and works
+the same for the shared Redis backend. Concurrent misses for the same key
+are coalesced so only one request runs the query.
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response, status
+import structlog
+
+from .serialization import dumps
+
+logger = structlog.get_logger()
+
+# Cache configuration
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory or redis
+CACHE_TTL_SECONDS = 30
+CACHE_MAX_ENTRIES = 10_000
+
+# Redis connection from environment; a database in the URL wins over REDIS_DB
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+
+REDIS_KEY_PREFIX = "stocksense:cache:"
+
+
+@dataclass
+class CachedResponse:
+    """Serialized response body and its entity tag."""
+
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_content(cls, content: Any) -> "CachedResponse":
+        body = dumps(content)
+        return cls(body=body, etag='"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"')
+
+
+class CacheBackend(ABC):
+    """Interface shared by the cache backends."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """Cached response under a key, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        """Cache a response under a key for ttl seconds."""
+
+    @abstractmethod
+    async def generation(self, namespace: str) -> int:
+        """Current generation of a namespace; part of its cache keys."""
+
+    @abstractmethod
+    async def invalidate(self, namespace: str) -> None:
+        """Orphan every entry of a namespace by bumping its generation."""
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Process-local TTL cache with LRU eviction."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def invalidate(self, namespace: str) -> None:
+        # Orphaned entries age out through the TTL or LRU eviction
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis-backed cache shared by all API processes.
+
+    Size is bounded by the TTL here and by the server's maxmemory policy
+    (allkeys-lru) rather than by the application.
+    """
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = REDIS_KEY_PREFIX):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url, db=REDIS_DB)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raw = await self.redis.hmget(self.prefix + key, "body", "etag")
+        if raw[0] is None:
+            return None
+        return CachedResponse(body=raw[0], etag=raw[1].decode())
+
+    async def set(self, key: str, value: CachedResponse, ttl: float) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.prefix + key, mapping={"body": value.body, "etag": value.etag})
+            pipe.pexpire(self.prefix + key, int(ttl * 1000))
+            await pipe.execute()
+
+    async def generation(self, namespace: str) -> int:
+        return int(await self.redis.get(self.prefix + "generation:" + namespace) or 0)
+
+    async def invalidate(self, namespace: str) -> None:
+        await self.redis.incr(self.prefix + "generation:" + namespace)
+
+
+class ResponseCache:
+    """Per-organization response cache with single-flight misses."""
+
+    def __init__(self, backend: CacheBackend, ttl: float = CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._inflight: Dict[str, "asyncio.Future[CachedResponse]"] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def key(self, organization_id: Any, endpoint: str, params: Iterable[Tuple[str, str]] = ()) -> str:
+        namespace = str(organization_id)
+        generation = await self.backend.generation(namespace)
+        query = "&".join(f"{name}={value}" for name, value in sorted(params))
+        return f"{namespace}:{generation}:{endpoint}?{query}"
+
+    async def get_or_compute(
+        self,
+        organization_id: Any,
+        endpoint: str,
+        params: Iterable[Tuple[str, str]],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> CachedResponse:
+        """Return the cached response, computing it once on a miss.
+
+        Requests that miss while the same key is being computed wait for
+        that computation instead of running their own query.
+        """
+        key = await self.key(organization_id, endpoint, params)
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        while inflight is not None:
+            try:
+                value = await asyncio.shield(inflight)
+                self.hits += 1
+                return value
+            except asyncio.CancelledError:
+                # The leading request went away; take over unless we were cancelled too
+                if not inflight.cancelled():
+                    raise
+            inflight = self._inflight.get(key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = CachedResponse.from_content(await compute())
+            await self.backend.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody waited for is not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def invalidate(self, organization_id: Any) -> None:
+        """Drop every cached response of an organization."""
+        try:
+            await self.backend.invalidate(str(organization_id))
+        except Exception as e:
+            logger.warning("Failed to invalidate response cache", organization_id=str(organization_id), error=str(e))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+async def cached_response(
+    request: Request,
+    organization_id: Any,
+    endpoint: str,
+    compute: Callable[[], Awaitable[Any]],
+) -> Response:
+    """Serve a JSON response from the cache, answering 304 for a matching ETag.
+
+    The cache key covers the organization, the endpoint and the query
+    parameters, so endpoints must only depend on those.
+    """
+    cached = await get_response_cache().get_or_compute(
+        organization_id, endpoint, request.query_params.multi_items(), compute
+    )
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache using the configured backend."""
+    global _cache
+    if _cache is None:
+        backend = RedisCacheBackend() if CACHE_BACKEND == "redis" else InMemoryCacheBackend()
+        _cache = ResponseCache(backend)
+    return _cache
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """Swap the process-wide response cache, e.g. in tests."""
+    global _cache
+    _cache = cache
@@ -6,7 +6,7 @@ and database initialization utilities.
 """
 
 import asyncio
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, AsyncIterator, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
 from sqlalchemy import event
@@ -29,6 +29,9 @@ engine = create_async_engine(
     pool_recycle=300,
 )
 
+# Rows fetched per round trip when streaming large results
+STREAM_BATCH_ROWS = 1000
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -49,6 +52,40 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+async def stream_partitions(
+    db: AsyncSession,
+    statement,
+    batch_rows: int = STREAM_BATCH_ROWS,
+    scalars: bool = False
+) -> AsyncIterator[Sequence[Any]]:
+    """Run a query on a server-side cursor, yielding rows in batches.
+    
+    Only one batch is held in memory at a time; ORM objects of earlier
+    batches can be garbage collected once the caller drops them. Other
+    queries may run on the session between batches.
+    
+    Args:
+        batch_rows: Rows fetched per round trip (yield_per).
+        scalars: Yield the first column of each row, e.g. ORM entities.
+    """
+    result = await db.stream(statement.execution_options(yield_per=batch_rows))
+    if scalars:
+        result = result.scalars()
+    async for partition in result.partitions(batch_rows):
+        yield partition
+
+async def stream_rows(db: AsyncSession, statement, batch_rows: int = STREAM_BATCH_ROWS) -> AsyncIterator[Any]:
+    """Iterate the rows of a query from a server-side cursor."""
+    async for partition in stream_partitions(db, statement, batch_rows):
+        for row in partition:
+            yield row
+
+async def stream_scalars(db: AsyncSession, statement, batch_rows: int = STREAM_BATCH_ROWS) -> AsyncIterator[Any]:
+    """Iterate the first column (e.g. ORM entities) of a query from a server-side cursor."""
+    async for partition in stream_partitions(db, statement, batch_rows, scalars=True):
+        for value in partition:
+            yield value
+
 async def init_db() -> None:
     """Initialize database tables."""
     try:
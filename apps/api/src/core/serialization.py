@@ -0,0 +1,44 @@
+"""
+Fast JSON serialization for StockSense AI.
+
+Large list endpoints skip per-row Pydantic models: rows are fetched as
+tuples, turned into plain dicts and encoded with orjson, which handles
+UUID, datetime and numpy values natively. Decimals are encoded as floats,
+matching FastAPI's default encoder.
+"""
+
+from decimal import Decimal
+from typing import Any, Iterable, List, Dict, Sequence
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import orjson
+
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any, sort_keys: bool = False) -> bytes:
+    """Serialize content to JSON bytes; sorted keys give a canonical form."""
+    return orjson.dumps(content, default=_default, option=_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _OPTIONS)
+
+
+def rows_to_dicts(keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Turn tuple rows into dicts keyed by column name."""
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, bypassing response model validation."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
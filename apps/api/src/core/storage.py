@@ -0,0 +1,14 @@
+"""
+File storage location for StockSense AI.
+
+Forecast state, forecast runs, balance snapshots, feature blocks and
+import uploads are kept as files under one base directory. Point
+DATA_DIR at a persistent volume shared by the API and the job workers;
+it defaults to the system temporary directory.
+"""
+
+import os
+import tempfile
+
+# Base directory of the on-disk stores, from environment
+DATA_DIR = os.getenv("DATA_DIR", tempfile.gettempdir())
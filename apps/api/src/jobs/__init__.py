@@ -0,0 +1,31 @@
+"""
+Background jobs for StockSense AI.
+
+This package contains the job brokers, the job runner and the worker
+process that executes long-running forecast and planning jobs.
+"""
+
+from .broker import (
+    JobBroker,
+    InMemoryBroker,
+    RedisBroker,
+    DEFAULT_ORG_CONCURRENCY,
+    get_broker,
+    set_broker,
+)
+from .runner import JobContext, JobCancelled, JOB_HANDLERS, JOB_PERMISSIONS, job_handler, execute_job
+
+__all__ = [
+    "JobBroker",
+    "InMemoryBroker",
+    "RedisBroker",
+    "DEFAULT_ORG_CONCURRENCY",
+    "get_broker",
+    "set_broker",
+    "JobContext",
+    "JobCancelled",
+    "JOB_HANDLERS",
+    "JOB_PERMISSIONS",
+    "job_handler",
+    "execute_job",
+]
@@ -0,0 +1,223 @@
+"""
+Job brokers for StockSense AI.
+
+A broker holds one FIFO queue of job ids per organization and hands jobs
+to workers round-robin across organizations, never running more than an
+organization's concurrency limit at once. This keeps one tenant's large
+run from starving everyone else.
+
+Brokers also carry real-time progress events from workers to the API
+processes, which fan them out to WebSocket subscribers via their local
+ProgressHub.
+
+RedisBroker is used in deployments; InMemoryBroker is a drop-in
+replacement for tests and single-process development.
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+import json
+import os
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Redis connection from environment; a database in the URL wins over REDIS_DB
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+
+REDIS_KEY_PREFIX = "stocksense:jobs:"
+
+# Jobs of one organization that may run at the same time, unless the
+# organization's settings say otherwise
+DEFAULT_ORG_CONCURRENCY = 2
+
+# Atomically pick the next organization below its limit, rotating the ring
+# of organizations with queued jobs so each gets a turn.
+_DEQUEUE_SCRIPT = """
+local prefix = ARGV[1]
+local ring = prefix .. 'ring'
+local n = redis.call('LLEN', ring)
+for i = 1, n do
+    local org = redis.call('LMOVE', ring, ring, 'LEFT', 'RIGHT')
+    local queue = prefix .. 'queue:' .. org
+    if redis.call('LLEN', queue) == 0 then
+        redis.call('LREM', ring, 0, org)
+        redis.call('SREM', prefix .. 'ring_members', org)
+    else
+        local limit = tonumber(redis.call('HGET', prefix .. 'limits', org) or ARGV[2])
+        local running = tonumber(redis.call('HGET', prefix .. 'running', org) or '0')
+        if running < limit then
+            redis.call('HINCRBY', prefix .. 'running', org, 1)
+            return {org, redis.call('LPOP', queue)}
+        end
+    end
+end
+return false
+"""
+
+_ENQUEUE_SCRIPT = """
+local prefix = ARGV[1]
+local org = ARGV[2]
+redis.call('RPUSH', prefix .. 'queue:' .. org, ARGV[3])
+redis.call('HSET', prefix .. 'limits', org, ARGV[4])
+if redis.call('SADD', prefix .. 'ring_members', org) == 1 then
+    redis.call('RPUSH', prefix .. 'ring', org)
+end
+return 1
+"""
+
+
+class JobBroker(ABC):
+    """Interface shared by the job brokers."""
+
+    @abstractmethod
+    async def enqueue(self, organization_id: str, job_id: str, limit: int = DEFAULT_ORG_CONCURRENCY) -> None:
+        """Queue a job for an organization with the given concurrency limit."""
+
+    @abstractmethod
+    async def dequeue(self) -> Optional[Tuple[str, str]]:
+        """Claim the next runnable job as (organization_id, job_id), or None."""
+
+    @abstractmethod
+    async def release(self, organization_id: str) -> None:
+        """Free the organization slot held by a finished job."""
+
+    async def wait(self, timeout: float) -> None:
+        """Sleep until a job may have become runnable, at most timeout seconds."""
+        await asyncio.sleep(timeout)
+
+    @abstractmethod
+    async def publish(self, topic: str, message: Dict[str, Any], coalesce: bool = False) -> None:
+        """Publish a progress event to every API process."""
+
+    async def events(self) -> AsyncIterator[Tuple[str, Dict[str, Any], bool]]:
+        """Events published by other processes, as (topic, message, coalesce)."""
+        return
+        yield
+
+    async def close(self) -> None:
+        """Release broker connections."""
+
+
+class InMemoryBroker(JobBroker):
+    """Process-local broker for tests and single-process development."""
+
+    def __init__(self):
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._limits: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+        self._changed = asyncio.Event()
+
+    async def enqueue(self, organization_id: str, job_id: str, limit: int = DEFAULT_ORG_CONCURRENCY) -> None:
+        self._queues.setdefault(organization_id, deque()).append(job_id)
+        self._limits[organization_id] = limit
+        self._changed.set()
+
+    async def dequeue(self) -> Optional[Tuple[str, str]]:
+        for organization_id in list(self._queues):
+            queue = self._queues[organization_id]
+            # Rotate so the next call starts with the following organization
+            self._queues.move_to_end(organization_id)
+            if not queue:
+                del self._queues[organization_id]
+                continue
+            if self._running.get(organization_id, 0) < self._limits.get(organization_id, DEFAULT_ORG_CONCURRENCY):
+                self._running[organization_id] = self._running.get(organization_id, 0) + 1
+                return organization_id, queue.popleft()
+        return None
+
+    async def release(self, organization_id: str) -> None:
+        self._running[organization_id] = max(self._running.get(organization_id, 0) - 1, 0)
+        self._changed.set()
+
+    async def wait(self, timeout: float) -> None:
+        self._changed.clear()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def publish(self, topic: str, message: Dict[str, Any], coalesce: bool = False) -> None:
+        # Publisher and subscribers share this process
+        from ..realtime.hub import get_hub
+        get_hub().publish(topic, message, coalesce)
+
+    def running(self, organization_id: str) -> int:
+        """Jobs currently claimed for an organization."""
+        return self._running.get(organization_id, 0)
+
+
+class RedisBroker(JobBroker):
+    """Redis-backed broker shared by the API and all worker processes."""
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = REDIS_KEY_PREFIX):
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url, db=REDIS_DB, decode_responses=True)
+        self.prefix = prefix
+        self._enqueue = self.redis.register_script(_ENQUEUE_SCRIPT)
+        self._dequeue = self.redis.register_script(_DEQUEUE_SCRIPT)
+
+    async def enqueue(self, organization_id: str, job_id: str, limit: int = DEFAULT_ORG_CONCURRENCY) -> None:
+        await self._enqueue(args=[self.prefix, organization_id, job_id, limit])
+        await self.redis.publish(self.prefix + "wakeup", organization_id)
+
+    async def dequeue(self) -> Optional[Tuple[str, str]]:
+        claimed = await self._dequeue(args=[self.prefix, DEFAULT_ORG_CONCURRENCY])
+        if not claimed:
+            return None
+        return claimed[0], claimed[1]
+
+    async def release(self, organization_id: str) -> None:
+        running = await self.redis.hincrby(self.prefix + "running", organization_id, -1)
+        if running < 0:
+            await self.redis.hset(self.prefix + "running", organization_id, 0)
+        await self.redis.publish(self.prefix + "wakeup", organization_id)
+
+    async def wait(self, timeout: float) -> None:
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(self.prefix + "wakeup")
+            await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        finally:
+            await pubsub.close()
+
+    async def publish(self, topic: str, message: Dict[str, Any], coalesce: bool = False) -> None:
+        payload = json.dumps({"topic": topic, "message": message, "coalesce": coalesce}, default=str)
+        await self.redis.publish(self.prefix + "events", payload)
+
+    async def events(self) -> AsyncIterator[Tuple[str, Dict[str, Any], bool]]:
+        pubsub = self.redis.pubsub()
+        try:
+            await pubsub.subscribe(self.prefix + "events")
+            async for raw in pubsub.listen():
+                if raw.get("type") != "message":
+                    continue
+                event = json.loads(raw["data"])
+                yield event["topic"], event["message"], event["coalesce"]
+        finally:
+            await pubsub.close()
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+_broker: Optional[JobBroker] = None
+
+
+def get_broker() -> JobBroker:
+    """Process-wide broker, connecting to Redis on first use."""
+    global _broker
+    if _broker is None:
+        _broker = RedisBroker()
+    return _broker
+
+
+def set_broker(broker: Optional[JobBroker]) -> None:
+    """Swap the process-wide broker, e.g. for an InMemoryBroker in tests."""
+    global _broker
+    _broker = broker
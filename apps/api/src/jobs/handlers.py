@@ -0,0 +1,195 @@
+"""
+Job handlers for StockSense AI.
+
+Wraps the long-running service operations so they can be submitted as
+background jobs instead of being run inside an HTTP request.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.user import User
+from ..realtime.hub import plan_topic
+from ..schemas.forecast import ForecastCreate
+from ..services.anomaly_service import ANOMALY_HISTORY_DAYS, AnomalyService
+from ..services.balance_service import BalanceHistoryService
+from ..services.forecast_service import ForecastService
+from ..services.import_service import ImportService
+from ..services.lead_time_service import LeadTimeService
+from ..services.replenishment_service import ReplenishmentService
+from .runner import JobContext, job_handler
+
+# Loads sent per plan update once a plan's lines are built into trucks
+PLAN_LOADS_PER_MESSAGE = 500
+
+
+@job_handler("forecast", "write:forecasts")
+async def run_forecast(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a forecast."""
+    await context.report(0.0, "Forecasting")
+    forecast = await ForecastService(db).create_forecast(ForecastCreate(**params), user)
+    await context.report(
+        1.0,
+        "Forecast completed",
+        data={"item_id": forecast.item_id, "location_id": forecast.location_id, "forecast_values": forecast.forecast_values},
+    )
+    return forecast.dict()
+
+
+@job_handler("forecast_refresh", "write:forecasts")
+async def run_forecast_refresh(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Absorb the days of demand since the last refresh into the forecast state."""
+    await context.report(0.0, "Refreshing forecasts")
+
+    async def progress(fraction: float, message: str) -> None:
+        await context.report(fraction, message)
+
+    end = params.get("end")
+    return await ForecastService(db).refresh_forecasts(
+        user, end=date.fromisoformat(end) if end else None, progress=progress
+    )
+
+
+@job_handler("model_tournament", "write:forecasts")
+async def run_model_tournament(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick each series' forecast model for model_type "auto" by tournament."""
+    await context.report(0.0, "Loading demand history")
+
+    async def progress(fraction: float, message: str) -> None:
+        await context.report(fraction, message)
+
+    end = params.get("end")
+    return await ForecastService(db).select_models(
+        user, end=date.fromisoformat(end) if end else None, refit=bool(params.get("refit", False)), progress=progress
+    )
+
+
+@job_handler("similarity_index", "write:forecasts")
+async def run_similarity_index(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Index established items for cold-start forecasts of new items."""
+    await context.report(0.0, "Loading demand profiles")
+
+    async def progress(fraction: float, message: str) -> None:
+        await context.report(fraction, message)
+
+    end = params.get("end")
+    return await ForecastService(db).build_similarity_index(
+        user, end=date.fromisoformat(end) if end else None, progress=progress
+    )
+
+
+@job_handler("train_model", "write:forecasts")
+async def run_train_model(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Train a forecasting model."""
+    await context.report(0.0, "Training model")
+    model_id = await ForecastService(db).train_model(params, user)
+    return {"model_id": model_id}
+
+
+@job_handler("replenishment_plan", "write:orders")
+async def run_replenishment_plan(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a multi-echelon replenishment plan, streaming its lines per SKU chunk.
+
+    Plan lines, then its loads, go to the plan's subscribers
+    (`/ws/plan/{plan_id}`, with plan_id defaulting to "rep_<job id>");
+    job subscribers get progress. The job result is the plan id and
+    summary only, so the plan is never held in the job row.
+    """
+    plan_id = params.get("plan_id") or f"rep_{context.job_id}"
+    topic = plan_topic(user.organization_id, plan_id)
+    await context.report(0.0, "Planning", data={"plan_id": plan_id})
+
+    async def progress(fraction: float, message: str, lines: List[Dict[str, Any]]) -> None:
+        await context.publish(topic, {
+            "type": "plan_update",
+            "plan_id": plan_id,
+            "status": "running",
+            "progress": fraction,
+            "lines": lines,
+        })
+        await context.report(fraction, message)
+
+    plan = await ReplenishmentService(db).create_replenishment_plan({**params, "plan_id": plan_id}, user, progress=progress)
+    for start in range(0, len(plan["loads"]), PLAN_LOADS_PER_MESSAGE):
+        await context.publish(topic, {
+            "type": "plan_update",
+            "plan_id": plan_id,
+            "status": "running",
+            "progress": 1.0,
+            "loads": plan["loads"][start:start + PLAN_LOADS_PER_MESSAGE],
+        })
+    await context.publish(topic, {
+        "type": "plan_update",
+        "plan_id": plan_id,
+        "status": "completed",
+        "summary": plan["summary"],
+    })
+    return {"plan_id": plan_id, "summary": plan["summary"]}
+
+
+@job_handler("catalog_import", "write:inventory")
+async def run_catalog_import(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Import an uploaded item or location file, checkpointing after every block."""
+    service = ImportService(db)
+
+    async def progress(fraction: float, message: str, checkpoint: Dict[str, Any]) -> None:
+        await context.report(fraction, message, checkpoint=checkpoint)
+
+    summary = await service.import_file(
+        params["dataset"],
+        params["upload_id"],
+        params.get("format", "csv"),
+        user,
+        mapping_id=params.get("mapping_id"),
+        progress=progress,
+        checkpoint=context.checkpoint,
+    )
+    service.remove_upload(user, params["upload_id"], params.get("format", "csv"))
+    return summary
+
+
+@job_handler("anomaly_scan", "write:inventory")
+async def run_anomaly_scan(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Flag demand spikes and negative balances over the organization's history."""
+    await context.report(0.0, "Scanning for anomalies")
+
+    async def progress(fraction: float, message: str) -> None:
+        await context.report(fraction, message)
+
+    end = params.get("end")
+    return await AnomalyService(db).scan(
+        user,
+        days=int(params.get("days", ANOMALY_HISTORY_DAYS)),
+        end=date.fromisoformat(end) if end else None,
+        progress=progress,
+    )
+
+
+@job_handler("balance_snapshot", "write:inventory")
+async def run_balance_snapshot(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Snapshot the daily balances of every item-location since the last run."""
+    await context.report(0.0, "Snapshotting balances")
+
+    async def progress(fraction: float, message: str) -> None:
+        await context.report(fraction, message)
+
+    end = params.get("end")
+    return await BalanceHistoryService(db).write_snapshots(
+        user, end=date.fromisoformat(end) if end else None, progress=progress
+    )
+
+
+@job_handler("lead_times", "write:policies")
+async def run_lead_times(context: JobContext, db: AsyncSession, user: User, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Learn lead-time distributions per supplier route from purchase order receipts.
+
+    Params carry the order timestamp of each PO reference (`order_dates`,
+    ISO format) as the ERP reports them. The learned pmfs are what policy
+    requests take as `lead_time_pmf`.
+    """
+    await context.report(0.0, "Learning lead times")
+    order_dates = {reference: datetime.fromisoformat(at) for reference, at in params.get("order_dates", {}).items()}
+    profiles = await LeadTimeService(db).learn_lead_times(user, order_dates, days=int(params.get("days", 365)))
+    return {"routes": {route: profile._asdict() for route, profile in profiles.items()}}
@@ -0,0 +1,253 @@
+"""
+Job execution for StockSense AI.
+
+Handlers are registered per job type and run with a JobContext through
+which they report progress, save checkpoints to resume from after a
+restart, and notice cancellation requests. Progress and status changes
+are also published through the broker for WebSocket subscribers.
+"""
+
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+import structlog
+
+from ..models.job import Job
+from ..models.user import User
+from ..realtime.hub import job_topic
+from .broker import JobBroker, get_broker
+
+logger = structlog.get_logger()
+
+# Minimum seconds between progress writes; checkpoints are always written
+PROGRESS_INTERVAL = 1.0
+
+# Seconds between heartbeats written for a running job, independent of
+# whether its handler reports progress
+HEARTBEAT_INTERVAL = 30.0
+
+JobHandler = Callable[["JobContext", AsyncSession, User, Dict[str, Any]], Awaitable[Any]]
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+JOB_PERMISSIONS: Dict[str, str] = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+def job_handler(job_type: str, permission: str) -> Callable[[JobHandler], JobHandler]:
+    """Register a coroutine as the handler for a job type.
+
+    Args:
+        job_type: Job type accepted by the submit endpoint.
+        permission: Permission a user needs to submit it.
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[job_type] = handler
+        JOB_PERMISSIONS[job_type] = permission
+        return handler
+    return register
+
+
+class JobContext:
+    """Progress, checkpoint and cancellation channel for a running job."""
+
+    def __init__(
+        self,
+        job_id: Any,
+        session_factory: async_sessionmaker,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        broker: Optional[JobBroker] = None,
+        attempt: Optional[int] = None,
+    ):
+        self.job_id = job_id
+        self.session_factory = session_factory
+        self.attempt = attempt  # attempt this context writes for
+        self.checkpoint = checkpoint  # last saved checkpoint, if resuming
+        self.broker = broker or get_broker()
+        self._last_report = 0.0
+
+    async def publish(self, topic: str, message: Dict[str, Any], coalesce: bool = False) -> None:
+        """Publish a real-time update; failures never interrupt the job."""
+        try:
+            await self.broker.publish(topic, jsonable_encoder(message), coalesce)
+        except Exception as e:
+            logger.warning("Failed to publish job update", job_id=str(self.job_id), error=str(e))
+
+    async def report(
+        self,
+        progress: float,
+        message: Optional[str] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+        data: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Record progress (0..1) and optionally a checkpoint.
+
+        Every report is published to the job's subscribers, where bare
+        progress updates are coalesced and `data` (partial results) is
+        delivered as is. Database writes are throttled and go through their
+        own session so they are visible while the handler's transaction is
+        still open. Raises JobCancelled when the job has been cancelled or
+        another attempt has taken it over.
+        """
+        update_message = {
+            "type": "job_update",
+            "job_id": str(self.job_id),
+            "status": "running",
+            "progress": min(max(float(progress), 0.0), 1.0),
+            "message": message,
+        }
+        if data is not None:
+            update_message["data"] = data
+        await self.publish(job_topic(self.job_id), update_message, coalesce=data is None)
+
+        now = time.monotonic()
+        if checkpoint is None and progress < 1.0 and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+
+        values: Dict[str, Any] = {
+            "progress": min(max(float(progress), 0.0), 1.0),
+            "heartbeat_at": datetime.utcnow(),
+        }
+        if message is not None:
+            values["progress_message"] = message[:255]
+        if checkpoint is not None:
+            values["checkpoint"] = jsonable_encoder(checkpoint)
+            self.checkpoint = checkpoint
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(Job)
+                .where(*_current_attempt(self.job_id, self.attempt))
+                .values(**values)
+                .returning(Job.cancel_requested)
+            )
+            cancelled = result.scalar_one_or_none()
+            await db.commit()
+        if cancelled is None or cancelled:
+            raise JobCancelled()
+
+
+def _current_attempt(job_id: Any, attempt: Optional[int]) -> list:
+    """Conditions matching a job only while the given attempt still runs it."""
+    conditions = [Job.id == job_id, Job.status == "running"]
+    if attempt is not None:
+        conditions.append(Job.attempts == attempt)
+    return conditions
+
+
+async def _send_heartbeats(job_id: Any, attempt: int, session_factory: async_sessionmaker) -> None:
+    """Keep a running job's heartbeat fresh until cancelled.
+
+    Runs beside the handler so jobs whose work happens in an executor, and
+    never reports progress, are not mistaken for orphans and requeued.
+    """
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            async with session_factory() as db:
+                await db.execute(
+                    update(Job).where(*_current_attempt(job_id, attempt)).values(heartbeat_at=datetime.utcnow())
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning("Job heartbeat failed", job_id=str(job_id), error=str(e))
+
+
+async def publish_status(broker: JobBroker, job: Job, status: str, **fields: Any) -> None:
+    """Publish a job status change to its subscribers."""
+    message = {
+        "type": "job_update",
+        "job_id": str(job.id),
+        "status": status,
+        "progress": fields.pop("progress", job.progress),
+        "message": job.progress_message,
+        **fields,
+    }
+    try:
+        await broker.publish(job_topic(job.id), jsonable_encoder(message), coalesce=True)
+    except Exception as e:
+        logger.warning("Failed to publish job status", job_id=str(job.id), error=str(e))
+
+
+async def execute_job(job_id: Any, session_factory: Optional[async_sessionmaker] = None) -> Optional[str]:
+    """Run a queued job to completion and record its outcome.
+
+    The job is claimed with a conditional update, so of several workers
+    (or a worker and a cancellation) exactly one moves it out of "queued".
+    Jobs that are no longer queued are skipped. The outcome is only
+    written while this attempt still owns the job; a run superseded by a
+    requeue leaves the newer attempt's status alone.
+
+    Returns:
+        Final job status, or None if the job was skipped or superseded.
+    """
+    from . import handlers  # noqa: F401  registers the job handlers
+
+    if session_factory is None:
+        from ..core.database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+
+    async with session_factory() as db:
+        now = datetime.utcnow()
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(
+                status="running",
+                attempts=Job.attempts + 1,
+                started_at=func.coalesce(Job.started_at, now),
+                heartbeat_at=now,
+            )
+            .returning(Job)
+        )
+        job = result.scalar_one_or_none()
+        await db.commit()
+        if job is None:
+            return None
+        attempt = job.attempts
+        user = await db.get(User, job.created_by)
+        handler = JOB_HANDLERS.get(job.type)
+        logger.info("Job started", job_id=str(job_id), type=job.type, attempt=attempt)
+
+        broker = get_broker()
+        await publish_status(broker, job, "running")
+        context = JobContext(job_id, session_factory, checkpoint=job.checkpoint, broker=broker, attempt=attempt)
+        heartbeat = asyncio.create_task(_send_heartbeats(job_id, attempt, session_factory))
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job type: {job.type}")
+            result = await handler(context, db, user, job.params or {})
+            status, values = "succeeded", {"result": jsonable_encoder(result), "progress": 1.0}
+        except JobCancelled:
+            await db.rollback()
+            status, values = "cancelled", {}
+        except Exception as e:
+            await db.rollback()
+            logger.error("Job failed", job_id=str(job_id), error=str(e))
+            status, values = "failed", {"error": str(e)}
+        finally:
+            heartbeat.cancel()
+
+        result = await db.execute(
+            update(Job)
+            .where(*_current_attempt(job_id, attempt))
+            .values(status=status, finished_at=datetime.utcnow(), **values)
+            .returning(Job.id)
+        )
+        recorded = result.scalar_one_or_none() is not None
+        await db.commit()
+        if not recorded:
+            logger.warning("Job attempt superseded, outcome discarded", job_id=str(job_id), attempt=attempt)
+            return None
+        job = await db.get(Job, job_id, populate_existing=True)
+        await publish_status(broker, job, status, error=values.get("error"))
+        logger.info("Job finished", job_id=str(job_id), status=status)
+        return status
@@ -0,0 +1,145 @@
+"""
+Job worker for StockSense AI.
+
+Claims jobs from the broker and executes each one in a separate process
+from a process pool, so CPU-heavy forecasting and planning never block
+the dispatcher or each other. Run with:
+
+    python -m src.jobs.worker --processes 4
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Set
+import argparse
+import asyncio
+import os
+import signal
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+import structlog
+
+from .broker import JobBroker, get_broker
+from .runner import execute_job
+
+logger = structlog.get_logger()
+
+# Seconds between scans for jobs orphaned by a lost worker
+STALE_SCAN_INTERVAL = 60.0
+
+
+def _run_in_process(job_id: str) -> Optional[str]:
+    """Process pool entry point: run one job on a fresh event loop."""
+    return asyncio.run(execute_job(job_id))
+
+
+class Worker:
+    """Dispatcher that runs claimed jobs up to a fixed number at a time.
+
+    With processes > 0 jobs run in a process pool; with processes=0 they
+    run inline on the dispatcher's event loop, which together with an
+    InMemoryBroker lets tests drive jobs synchronously.
+    """
+
+    def __init__(
+        self,
+        broker: Optional[JobBroker] = None,
+        processes: int = os.cpu_count() or 1,
+        concurrency: Optional[int] = None,
+        session_factory: Optional[async_sessionmaker] = None,
+        poll_interval: float = 1.0
+    ):
+        if session_factory is None:
+            from ..core.database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.broker = broker or get_broker()
+        self.processes = processes
+        self.concurrency = concurrency or max(processes, 1)
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.pool = ProcessPoolExecutor(max_workers=processes) if processes > 0 else None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    async def run(self) -> None:
+        """Dispatch jobs until stop() is called, then drain running jobs."""
+        logger.info("Worker started", processes=self.processes, concurrency=self.concurrency)
+        stale_scan = asyncio.create_task(self._scan_stale_jobs())
+        try:
+            while not self._stopping.is_set():
+                if not await self._dispatch():
+                    await self.broker.wait(self.poll_interval)
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            stale_scan.cancel()
+            if self.pool is not None:
+                self.pool.shutdown(wait=True)
+            logger.info("Worker stopped")
+
+    async def run_until_idle(self) -> None:
+        """Run jobs until the broker has nothing runnable left (for tests)."""
+        while True:
+            await self._dispatch()
+            if not self._tasks:
+                return
+            await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+
+    def stop(self) -> None:
+        """Stop claiming new jobs."""
+        self._stopping.set()
+
+    async def _dispatch(self) -> bool:
+        """Claim jobs into free slots. Returns whether any job was started."""
+        started = False
+        while len(self._tasks) < self.concurrency:
+            claimed = await self.broker.dequeue()
+            if claimed is None:
+                break
+            task = asyncio.create_task(self._run(*claimed))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            started = True
+        return started
+
+    async def _run(self, organization_id: str, job_id: str) -> None:
+        """Execute one job and free its organization slot afterwards."""
+        try:
+            if self.pool is not None:
+                await asyncio.get_running_loop().run_in_executor(self.pool, _run_in_process, job_id)
+            else:
+                await execute_job(job_id, self.session_factory)
+        except Exception as e:
+            logger.error("Job execution crashed", job_id=job_id, error=str(e))
+        finally:
+            await self.broker.release(organization_id)
+
+    async def _scan_stale_jobs(self) -> None:
+        """Periodically queue again jobs orphaned by a lost worker."""
+        from ..services.job_service import JobService
+
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    await JobService(db, self.broker).requeue_stale_jobs()
+            except Exception as e:
+                logger.warning("Stale job scan failed", error=str(e))
+            await asyncio.sleep(STALE_SCAN_INTERVAL)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="StockSense AI job worker")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        worker = Worker(processes=args.processes)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,12 @@ including users, organizations, items, locations, inventory, and movements.
 from .base import Base, BaseModel
 from .user import User, Organization
 from .inventory import Item, Location, Inventory, InventoryMovement
+from .job import Job
+from .import_mapping import ImportMapping
+from .anomaly import DemandAnomaly
+from .promotion import Promotion
+from .supply import ScheduledReceipt
+from .reservation import Reservation, ReservationLine
 
 __all__ = [
     # Base
@@ -23,4 +29,19 @@ __all__ = [
     'Location', 
     'Inventory',
     'InventoryMovement',
+    'ScheduledReceipt',
+    'Reservation',
+    'ReservationLine',
+    
+    # Jobs
+    'Job',
+    
+    # Imports
+    'ImportMapping',
+    
+    # Data cleansing
+    'DemandAnomaly',
+    
+    # Demand features
+    'Promotion',
 ]
@@ -0,0 +1,33 @@
+"""
+Demand anomaly model for data cleansing.
+
+Flags written by the anomaly scan: demand spikes on daily shipment
+series and days on which the reconstructed stock balance went negative.
+Forecasting masks flagged days instead of learning from them.
+"""
+
+from sqlalchemy import Column, String, Float, Date, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from .base import BaseModel
+
+class DemandAnomaly(BaseModel):
+    """Anomaly flag for one item-location and day."""
+    
+    __tablename__ = 'demand_anomalies'
+    __table_args__ = (
+        Index('ix_demand_anomalies_series_day', 'organization_id', 'item_id', 'location_id', 'day'),
+    )
+    
+    # References
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False)
+    item_id = Column(UUID(as_uuid=True), ForeignKey('items.id'), nullable=False)
+    location_id = Column(UUID(as_uuid=True), ForeignKey('locations.id'), nullable=False)
+    
+    # Flag
+    day = Column(Date, nullable=False)
+    kind = Column(String(20), nullable=False)  # spike, negative_balance
+    value = Column(Float, nullable=False)  # units shipped, or the lowest balance of the day
+    score = Column(Float, nullable=True)  # robust z-score of a spike
+    
+    def __repr__(self) -> str:
+        return f"<DemandAnomaly(kind='{self.kind}', day={self.day}, value={self.value})>"
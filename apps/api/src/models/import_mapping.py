@@ -0,0 +1,31 @@
+"""
+Import mapping model for catalog file imports.
+
+A mapping records how the columns of a recurring source file (an ERP or
+supplier export) map onto item or location fields, so the same file
+layout can be imported again without reshaping it first.
+"""
+
+from sqlalchemy import Column, String, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from .base import BaseModel
+
+class ImportMapping(BaseModel):
+    """Saved column mapping for a catalog import."""
+    
+    __tablename__ = 'import_mappings'
+    __table_args__ = (UniqueConstraint('organization_id', 'name'),)
+    
+    # Ownership
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False, index=True)
+    created_by = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    
+    # Mapping
+    name = Column(String(100), nullable=False)
+    dataset = Column(String(20), nullable=False)  # items, locations
+    columns = Column(JSONB, nullable=False)  # source column -> field
+    defaults = Column(JSONB, nullable=True)  # field -> value for missing or empty cells
+    delimiter = Column(String(1), nullable=False, default=',')
+    
+    def __repr__(self) -> str:
+        return f"<ImportMapping(name='{self.name}', dataset='{self.dataset}')>"
@@ -12,11 +12,19 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from .base import BaseModel
 
+# Movement types that add to and take from on-hand stock; other types
+# (adjustment, cycle_count) are signed deltas as recorded
+INBOUND_TYPES = ("receipt", "transfer_in")
+OUTBOUND_TYPES = ("shipment", "transfer_out")
+
 class Item(BaseModel):
     """Item model representing products or SKUs in the inventory system."""
     
     __tablename__ = 'items'
     
+    # References
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False, index=True)
+    
     # Basic info
     sku = Column(String(100), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False, index=True)
@@ -42,6 +50,9 @@ class Item(BaseModel):
     # Status
     is_active = Column(Boolean, default=True, nullable=False)
     
+    # Catalog sync
+    content_hash = Column(String(32), nullable=True)  # Hash of the last synced record
+    
     # Relationships
     inventory_levels = relationship("Inventory", back_populates="item")
     movements = relationship("InventoryMovement", back_populates="item")
@@ -54,6 +65,9 @@ class Location(BaseModel):
     
     __tablename__ = 'locations'
     
+    # References
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False, index=True)
+    
     # Basic info
     code = Column(String(50), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False, index=True)
@@ -84,9 +98,12 @@ class Location(BaseModel):
     # Status
     is_active = Column(Boolean, default=True, nullable=False)
     
+    # Catalog sync
+    content_hash = Column(String(32), nullable=True)  # Hash of the last synced record
+    
     # Relationships
-    parent = relationship("Location", remote_side=[id])
-    children = relationship("Location")
+    parent = relationship("Location", remote_side="Location.id", back_populates="children")
+    children = relationship("Location", back_populates="parent")
     inventory_levels = relationship("Inventory", back_populates="location")
     movements = relationship("InventoryMovement", back_populates="location")
     
@@ -136,7 +153,7 @@ class InventoryMovement(BaseModel):
     type = Column(String(50), nullable=False, index=True)  # receipt, shipment, transfer_in, transfer_out, adjustment, cycle_count
     quantity = Column(Integer, nullable=False)
     reference = Column(String(100), nullable=False, index=True)  # PO number, SO number, etc.
-    reference_type = Column(String(50), nullable=False)  # po, so, to, adjustment, cycle_count
+    reference_type = Column(String(50), nullable=False)  # po, so, to, adjustment, cycle_count, return, manual
     
     # Additional info
     notes = Column(Text, nullable=True)
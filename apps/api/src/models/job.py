@@ -0,0 +1,46 @@
+"""
+Background job model for long-running forecast and planning runs.
+
+Jobs are submitted through the API, executed by worker processes and
+report progress and resumable checkpoints back to this table.
+"""
+
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from .base import BaseModel
+
+class Job(BaseModel):
+    """Job model tracking a queued or running background task."""
+    
+    __tablename__ = 'jobs'
+    
+    # Ownership
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False, index=True)
+    created_by = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    
+    # Task
+    type = Column(String(50), nullable=False, index=True)  # forecast, train_model, replenishment_plan
+    status = Column(String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed, cancelled
+    params = Column(JSONB, nullable=True)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    
+    # Progress
+    progress = Column(Float, nullable=False, default=0.0)  # 0..1
+    progress_message = Column(String(255), nullable=True)
+    checkpoint = Column(JSONB, nullable=True)  # handler state to resume from after a restart
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    
+    # Timing
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    
+    @property
+    def is_finished(self) -> bool:
+        """Check if the job has reached a terminal status."""
+        return self.status in ('succeeded', 'failed', 'cancelled')
+    
+    def __repr__(self) -> str:
+        return f"<Job(type='{self.type}', status='{self.status}', progress={self.progress})>"
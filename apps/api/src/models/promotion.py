@@ -0,0 +1,35 @@
+"""
+Promotion model for demand features.
+
+Planned price promotions of an item, at one location or at all of them.
+The feature store turns them into promo flags and effective prices per
+series and day, counting a promotion only from the day it was entered so
+backtests see the plan as it stood at the time.
+"""
+
+from sqlalchemy import Column, String, Float, Date, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from .base import BaseModel
+
+class Promotion(BaseModel):
+    """Price promotion of an item over a range of days."""
+    
+    __tablename__ = 'promotions'
+    __table_args__ = (
+        Index('ix_promotions_organization_days', 'organization_id', 'start_date', 'end_date'),
+    )
+    
+    # References
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False)
+    item_id = Column(UUID(as_uuid=True), ForeignKey('items.id'), nullable=False, index=True)
+    location_id = Column(UUID(as_uuid=True), ForeignKey('locations.id'), nullable=True)  # None: every location
+    
+    # Promotion
+    name = Column(String(255), nullable=True)
+    kind = Column(String(20), nullable=False, default='price_cut')  # price_cut, display, feature
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)  # last promoted day
+    discount = Column(Float, nullable=False, default=0)  # fraction off the list price
+    
+    def __repr__(self) -> str:
+        return f"<Promotion(item_id={self.item_id}, start_date={self.start_date}, end_date={self.end_date}, discount={self.discount})>"
@@ -0,0 +1,48 @@
+"""
+Stock reservation models.
+
+A reservation holds units of one or more item-locations for an order.
+Holds expire unless committed; committed reservations keep their units
+reserved until outbound movements against the order fulfil them.
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from .base import BaseModel
+
+class Reservation(BaseModel):
+    """Units held for an order across one or more item-locations."""
+    
+    __tablename__ = 'reservations'
+    __table_args__ = (
+        Index('ix_reservations_expiry', 'status', 'expires_at'),
+        Index('ix_reservations_reference', 'organization_id', 'reference'),
+    )
+    
+    # References
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False)
+    reference = Column(String(100), nullable=False)  # SO or cart number
+    
+    # Lifecycle
+    status = Column(String(20), nullable=False, default='held')  # held, committed, released, expired
+    expires_at = Column(DateTime, nullable=True)  # None once committed
+    
+    def __repr__(self) -> str:
+        return f"<Reservation(reference='{self.reference}', status='{self.status}')>"
+
+class ReservationLine(BaseModel):
+    """Units of one item at one location held by a reservation."""
+    
+    __tablename__ = 'reservation_lines'
+    
+    # References
+    reservation_id = Column(UUID(as_uuid=True), ForeignKey('reservations.id'), nullable=False, index=True)
+    item_id = Column(UUID(as_uuid=True), ForeignKey('items.id'), nullable=False)
+    location_id = Column(UUID(as_uuid=True), ForeignKey('locations.id'), nullable=False)
+    
+    # Quantities
+    quantity = Column(Integer, nullable=False)
+    fulfilled_quantity = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self) -> str:
+        return f"<ReservationLine(item_id={self.item_id}, location_id={self.location_id}, qty={self.quantity})>"
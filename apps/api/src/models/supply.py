@@ -0,0 +1,37 @@
+"""
+Scheduled receipt model for available-to-promise.
+
+Open purchase order lines and in-transit transfers expected at a
+location. Receipts recorded against the same reference draw them down;
+the availability engine counts what is still outstanding from its
+expected date on.
+"""
+
+from sqlalchemy import Column, String, Integer, Date, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from .base import BaseModel
+
+class ScheduledReceipt(BaseModel):
+    """Expected inbound supply of an item at a location."""
+    
+    __tablename__ = 'scheduled_receipts'
+    __table_args__ = (
+        Index('ix_scheduled_receipts_series', 'organization_id', 'item_id', 'location_id'),
+        Index('ix_scheduled_receipts_reference', 'organization_id', 'reference'),
+    )
+    
+    # References
+    organization_id = Column(UUID(as_uuid=True), ForeignKey('organizations.id'), nullable=False)
+    item_id = Column(UUID(as_uuid=True), ForeignKey('items.id'), nullable=False)
+    location_id = Column(UUID(as_uuid=True), ForeignKey('locations.id'), nullable=False)
+    
+    # Supply
+    kind = Column(String(20), nullable=False)  # purchase_order, transfer
+    reference = Column(String(100), nullable=False)  # PO or transfer number
+    quantity = Column(Integer, nullable=False)
+    received_quantity = Column(Integer, nullable=False, default=0)
+    expected_date = Column(Date, nullable=False)
+    status = Column(String(20), nullable=False, default='open')  # open, in_transit, closed, cancelled
+    
+    def __repr__(self) -> str:
+        return f"<ScheduledReceipt(reference='{self.reference}', qty={self.quantity}, expected={self.expected_date})>"
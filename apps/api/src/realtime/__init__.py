@@ -0,0 +1,18 @@
+"""
+Real-time updates for StockSense AI.
+
+This package contains the in-process pub/sub hub behind the WebSocket
+endpoints and the relay that feeds it with events from job workers.
+"""
+
+from .hub import ProgressHub, Subscription, get_hub, job_topic, plan_topic
+from .relay import relay_events
+
+__all__ = [
+    "ProgressHub",
+    "Subscription",
+    "get_hub",
+    "job_topic",
+    "plan_topic",
+    "relay_events",
+]
@@ -0,0 +1,151 @@
+"""
+In-process pub/sub hub for real-time job and plan updates.
+
+Each WebSocket connection holds a Subscription with a bounded buffer.
+Publishing never blocks on slow consumers: progress updates that carry
+no payload are coalesced so only the latest is pending per connection,
+and when a buffer is full the oldest pending update is dropped and the
+subscriber is told how many it missed.
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+import asyncio
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Pending messages per connection before the oldest are dropped
+MAX_SUBSCRIBER_BUFFER = 256
+
+# Topics whose latest state is kept for subscribers that join late
+MAX_RETAINED_TOPICS = 10_000
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled", "completed")
+
+
+def is_terminal(message: Dict[str, Any]) -> bool:
+    """Check if a message reports a finished job or plan."""
+    return message.get("status") in TERMINAL_STATUSES
+
+
+class Subscription:
+    """Bounded, coalescing message buffer for one subscriber."""
+
+    def __init__(self, topic: str, max_buffer: int = MAX_SUBSCRIBER_BUFFER):
+        self.topic = topic
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._pending: Deque[List[Any]] = deque()  # [coalesce key, message]
+        self._by_key: Dict[str, List[Any]] = {}
+        self._ready = asyncio.Event()
+
+    def put(self, message: Dict[str, Any], coalesce_key: Optional[str] = None) -> None:
+        """Queue a message without blocking.
+
+        A message with a coalesce key replaces a pending one with the same
+        key in place. Terminal messages are never dropped.
+        """
+        if coalesce_key is not None:
+            entry = self._by_key.get(coalesce_key)
+            if entry is not None:
+                entry[1] = message
+                return
+        while len(self._pending) >= self.max_buffer and not is_terminal(message):
+            key, _ = self._pending.popleft()
+            if key is not None:
+                self._by_key.pop(key, None)
+            self.dropped += 1
+        entry = [coalesce_key, message]
+        self._pending.append(entry)
+        if coalesce_key is not None:
+            self._by_key[coalesce_key] = entry
+        self._ready.set()
+
+    def pending(self) -> int:
+        """Number of messages waiting to be sent."""
+        return len(self._pending)
+
+    async def get(self) -> Dict[str, Any]:
+        """Wait for the next message; reports drops in a `dropped` field."""
+        while not self._pending:
+            self._ready.clear()
+            await self._ready.wait()
+        key, message = self._pending.popleft()
+        if key is not None:
+            self._by_key.pop(key, None)
+        if self.dropped:
+            message = {**message, "dropped": self.dropped}
+            self.dropped = 0
+        return message
+
+
+class ProgressHub:
+    """Topic-based fan-out of updates to local subscribers."""
+
+    def __init__(self, max_retained: int = MAX_RETAINED_TOPICS):
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._latest: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_retained = max_retained
+
+    def subscribe(self, topic: str, max_buffer: int = MAX_SUBSCRIBER_BUFFER) -> Subscription:
+        """Subscribe to a topic, starting with its latest known state."""
+        subscription = Subscription(topic, max_buffer)
+        self._subscribers.setdefault(topic, set()).add(subscription)
+        latest = self._latest.get(topic)
+        if latest is not None:
+            subscription.put(latest, "state")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription."""
+        subscribers = self._subscribers.get(subscription.topic)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.topic]
+
+    def publish(self, topic: str, message: Dict[str, Any], coalesce: bool = False) -> int:
+        """Fan a message out to every subscriber of a topic.
+
+        Args:
+            coalesce: Whether the message only restates current progress, so
+                a newer one may replace it while still pending.
+
+        Returns:
+            Number of subscribers the message was queued for.
+        """
+        if coalesce or is_terminal(message):
+            self._latest[topic] = message
+            self._latest.move_to_end(topic)
+            while len(self._latest) > self.max_retained:
+                self._latest.popitem(last=False)
+        subscribers = self._subscribers.get(topic, ())
+        key = "state" if coalesce else None
+        for subscription in subscribers:
+            subscription.put(message, key)
+        return len(subscribers)
+
+    def subscriber_count(self, topic: Optional[str] = None) -> int:
+        """Subscribers of one topic, or of all topics."""
+        if topic is not None:
+            return len(self._subscribers.get(topic, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+_hub = ProgressHub()
+
+
+def get_hub() -> ProgressHub:
+    """Process-wide hub."""
+    return _hub
+
+
+def job_topic(job_id: Any) -> str:
+    return f"job:{job_id}"
+
+
+def plan_topic(organization_id: Any, plan_id: Any) -> str:
+    # Plan ids may be chosen by clients, so topics are scoped per organization
+    return f"plan:{organization_id}:{plan_id}"
@@ -0,0 +1,33 @@
+"""
+Relay of broker events into the local hub.
+
+Workers run in other processes and publish progress through the broker;
+every API process runs one relay that forwards those events to its
+WebSocket subscribers.
+"""
+
+import asyncio
+
+import structlog
+
+from ..jobs.broker import JobBroker
+from .hub import ProgressHub
+
+logger = structlog.get_logger()
+
+# Seconds to wait before reconnecting after the broker connection fails
+RELAY_RETRY_SECONDS = 5.0
+
+
+async def relay_events(broker: JobBroker, hub: ProgressHub) -> None:
+    """Forward broker events to the hub until cancelled."""
+    while True:
+        try:
+            async for topic, message, coalesce in broker.events():
+                hub.publish(topic, message, coalesce)
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Event relay disconnected", error=str(e))
+            await asyncio.sleep(RELAY_RETRY_SECONDS)
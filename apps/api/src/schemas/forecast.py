@@ -5,7 +5,7 @@ Defines request/response models for demand forecasting,
 model training, and accuracy analysis.
 """
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 from decimal import Decimal
@@ -16,7 +16,7 @@ class ForecastBase(BaseModel):
     location_id: str
     forecast_period: str = Field(..., regex="^(daily|weekly|monthly)$")
     forecast_horizon: int = Field(..., ge=1, le=365)
-    model_type: str = Field(..., regex="^(random_forest|arima|prophet|ets|neural_network)$")
+    model_type: str = Field(..., regex="^(random_forest|arima|prophet|ets|croston|neural_network)$")
 
 class ForecastCreate(ForecastBase):
     """Forecast creation model."""
@@ -26,7 +26,7 @@ class ForecastUpdate(BaseModel):
     """Forecast update model."""
     forecast_period: Optional[str] = Field(None, regex="^(daily|weekly|monthly)$")
     forecast_horizon: Optional[int] = Field(None, ge=1, le=365)
-    model_type: Optional[str] = Field(None, regex="^(random_forest|arima|prophet|ets|neural_network)$")
+    model_type: Optional[str] = Field(None, regex="^(random_forest|arima|prophet|ets|croston|neural_network)$")
     status: Optional[str] = Field(None, regex="^(pending|processing|completed|failed)$")
 
 class ForecastResponse(ForecastBase):
@@ -39,6 +39,18 @@ class ForecastResponse(ForecastBase):
     created_by: str
     created_at: datetime
 
+class ForecastRunResponse(BaseModel):
+    """Stored forecast run."""
+    run_id: str
+    created_at: datetime
+    created_by: str
+    start: date
+    horizon: int
+    forecast_period: str
+    quantiles: List[float]
+    series: int
+    scope: str
+
 class ForecastModel(BaseModel):
     """Forecast model information."""
     model_id: str
@@ -61,6 +73,6 @@ class ForecastRequest(BaseModel):
     item_id: str
     location_id: str
     forecast_horizon: int = Field(..., ge=1, le=365)
-    model_type: str = Field(default="random_forest", regex="^(random_forest|arima|prophet|ets|neural_network)$")
+    model_type: str = Field(default="random_forest", regex="^(auto|random_forest|arima|prophet|ets|croston|neural_network)$")
     base_demand: Optional[float] = None
     parameters: Optional[Dict[str, Any]] = None
@@ -0,0 +1,42 @@
+"""
+Pydantic schemas for catalog file imports.
+
+Defines request/response models for saved import column mappings.
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+
+class ImportMappingCreate(BaseModel):
+    """Import mapping creation model."""
+    name: str = Field(..., min_length=1, max_length=100)
+    dataset: str = Field(..., regex="^(items|locations)$")
+    columns: Dict[str, str]  # source column -> field
+    defaults: Optional[Dict[str, Any]] = None
+    delimiter: str = Field(",", min_length=1, max_length=1)
+
+class ImportMappingResponse(BaseModel):
+    """Import mapping response model."""
+    id: str
+    name: str
+    dataset: str
+    columns: Dict[str, str]
+    defaults: Optional[Dict[str, Any]] = None
+    delimiter: str
+    organization_id: str
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, mapping):
+        """Create response from SQLAlchemy model."""
+        return cls(
+            id=str(mapping.id),
+            name=mapping.name,
+            dataset=mapping.dataset,
+            columns=mapping.columns,
+            defaults=mapping.defaults,
+            delimiter=mapping.delimiter,
+            organization_id=str(mapping.organization_id),
+            created_at=mapping.created_at
+        )
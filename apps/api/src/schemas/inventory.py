@@ -5,8 +5,8 @@ Defines request/response models for items, locations, inventory,
 and movement tracking.
 """
 
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field, validator
 from decimal import Decimal
 
@@ -51,7 +51,7 @@ class ItemResponse(ItemBase):
     """Item response model."""
     id: str
     organization_id: str
-    created_by: str
+    created_by: Optional[str] = None  # not recorded on the model
     created_at: datetime
     updated_at: datetime
 
@@ -120,7 +120,7 @@ class LocationResponse(LocationBase):
     """Location response model."""
     id: str
     organization_id: str
-    created_by: str
+    created_by: Optional[str] = None  # not recorded on the model
     created_at: datetime
     updated_at: datetime
 
@@ -201,6 +201,16 @@ class InventoryResponse(InventoryBase):
         )
 
 # Movement Schemas
+# Movement and reference types of the API, and the model's types they are recorded as
+MOVEMENT_TYPES = {"in": "receipt", "out": "shipment", "transfer": "transfer_out", "adjustment": "adjustment", "return": "receipt"}
+MOVEMENT_REFERENCE_TYPES = {"po": "po", "so": "so", "transfer": "to", "adjustment": "adjustment", "return": "return"}
+
+# Model movement types as reported by the API
+MODEL_MOVEMENT_TYPES = {
+    "receipt": "in", "transfer_in": "in", "shipment": "out", "transfer_out": "transfer",
+    "adjustment": "adjustment", "cycle_count": "adjustment"
+}
+
 class MovementBase(BaseModel):
     """Base movement model."""
     item_id: str
@@ -214,33 +224,232 @@ class MovementBase(BaseModel):
 
 class MovementCreate(MovementBase):
     """Movement creation model."""
-    pass
+
+    def movement_columns(self) -> Dict[str, Any]:
+        """InventoryMovement column values, in the model's vocabulary."""
+        return {
+            "item_id": self.item_id,
+            "location_id": self.location_id,
+            "type": MOVEMENT_TYPES[self.movement_type],
+            "quantity": int(self.quantity),
+            "reference": self.reference_number or "",
+            "reference_type": MOVEMENT_REFERENCE_TYPES.get(self.reference_type, "manual"),
+            "notes": self.notes,
+            "created_at": self.movement_date,
+        }
 
 class MovementResponse(MovementBase):
     """Movement response model."""
+    quantity: Decimal  # signed change to on-hand stock for adjustments
     id: str
     organization_id: str
     created_by: str
     created_at: datetime
 
     @classmethod
-    def from_model(cls, movement):
-        """Create response from SQLAlchemy model."""
+    def from_model(cls, movement, user):
+        """Create response from SQLAlchemy model, recorded by `user`."""
+        reference_types = {model: api for api, model in MOVEMENT_REFERENCE_TYPES.items()}
         return cls(
             id=str(movement.id),
             item_id=str(movement.item_id),
             location_id=str(movement.location_id),
-            movement_type=movement.movement_type,
+            movement_type=MODEL_MOVEMENT_TYPES[movement.type],
             quantity=movement.quantity,
-            reference_number=movement.reference_number,
-            reference_type=movement.reference_type,
+            reference_number=movement.reference or None,
+            reference_type=reference_types.get(movement.reference_type),
             notes=movement.notes,
-            movement_date=movement.movement_date,
-            organization_id=str(movement.organization_id),
-            created_by=str(movement.created_by),
+            movement_date=movement.created_at,
+            organization_id=str(user.organization_id),
+            created_by=str(user.id),
             created_at=movement.created_at
         )
 
+# Availability Schemas
+class ScheduledReceiptCreate(BaseModel):
+    """Scheduled receipt creation model."""
+    item_id: str
+    location_id: str
+    kind: str = Field(..., regex="^(purchase_order|transfer)$")
+    reference: str = Field(..., min_length=1, max_length=100)
+    quantity: int = Field(..., gt=0)
+    expected_date: date
+    status: str = Field("open", regex="^(open|in_transit)$")
+
+class ScheduledReceiptResponse(ScheduledReceiptCreate):
+    """Scheduled receipt response model."""
+    id: str
+    received_quantity: int
+    status: str
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, receipt):
+        """Create response from SQLAlchemy model."""
+        return cls(
+            id=str(receipt.id),
+            item_id=str(receipt.item_id),
+            location_id=str(receipt.location_id),
+            kind=receipt.kind,
+            reference=receipt.reference,
+            quantity=receipt.quantity,
+            received_quantity=receipt.received_quantity,
+            expected_date=receipt.expected_date,
+            status=receipt.status,
+            created_at=receipt.created_at
+        )
+
+class AvailabilityCheck(BaseModel):
+    """Available-to-promise request: can `quantity` units be promised by `by_date`."""
+    item_id: str
+    quantity: int = Field(..., gt=0)
+    by_date: date
+    location_ids: Optional[List[str]] = Field(None, min_items=1, max_items=1000)  # every location by default
+
+class LocationAllocation(BaseModel):
+    """Units available at a location and allocated to the promise."""
+    location_id: str
+    available: int
+    allocated: int
+
+class AvailabilityResponse(BaseModel):
+    """Available-to-promise answer."""
+    item_id: str
+    quantity: int
+    by_date: date
+    promisable: bool
+    available: int
+    allocations: List[LocationAllocation]
+
+# Reservation Schemas
+class ReservationLineRequest(BaseModel):
+    """Units of an item to hold at a location."""
+    item_id: str
+    location_id: str
+    quantity: int = Field(..., gt=0)
+
+class ReservationCreate(BaseModel):
+    """Reservation request; every line is held or none is."""
+    reference: str = Field(..., min_length=1, max_length=100)
+    lines: List[ReservationLineRequest] = Field(..., min_items=1, max_items=500)
+    ttl_seconds: int = Field(900, ge=10, le=7 * 24 * 3600)  # until an uncommitted hold expires
+
+class ReservationLineResponse(ReservationLineRequest):
+    """Held line with the units fulfilled so far."""
+    fulfilled_quantity: int
+
+class ReservationResponse(BaseModel):
+    """Reservation response model."""
+    id: str
+    reference: str
+    status: str
+    expires_at: Optional[datetime] = None
+    lines: List[ReservationLineResponse]
+    created_at: datetime
+
+    @classmethod
+    def from_model(cls, reservation, lines):
+        """Create response from SQLAlchemy models."""
+        return cls(
+            id=str(reservation.id),
+            reference=reservation.reference,
+            status=reservation.status,
+            expires_at=reservation.expires_at,
+            lines=[
+                ReservationLineResponse(
+                    item_id=str(line.item_id),
+                    location_id=str(line.location_id),
+                    quantity=line.quantity,
+                    fulfilled_quantity=line.fulfilled_quantity or 0
+                )
+                for line in lines
+            ],
+            created_at=reservation.created_at
+        )
+
+# Balance History Schemas
+class BalanceHistoryEntry(BaseModel):
+    """Balances at the close of a day, with the day's movements."""
+    date: date
+    on_hand: int
+    allocated: int
+    in_transit: int
+    transactions: int
+
+class BalanceHistoryResponse(BaseModel):
+    """Daily balance history of an item."""
+    item_id: str
+    location_id: Optional[str] = None  # summed over the item's locations if None
+    history: List[BalanceHistoryEntry]
+
+# Catalog Sync Schemas
+class ItemUpsert(BaseModel):
+    """Item record of a bulk catalog sync, keyed by SKU."""
+    sku: str = Field(..., min_length=1, max_length=100)
+    name: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+    category: str = Field(..., min_length=1, max_length=100)
+    subcategory: Optional[str] = Field(None, max_length=100)
+    brand: Optional[str] = Field(None, max_length=100)
+    unit_of_measure: str = Field("EA", max_length=20)
+    dimensions: Optional[Dict[str, Any]] = None
+    cost: Decimal = Field(0, ge=0)
+    price: Decimal = Field(0, ge=0)
+    attributes: Optional[Dict[str, Any]] = None
+    tags: Optional[List[str]] = None
+    is_active: bool = True
+
+class LocationUpsert(BaseModel):
+    """Location record of a bulk catalog sync, keyed by code."""
+    code: str = Field(..., min_length=1, max_length=50)
+    name: str = Field(..., min_length=1, max_length=255)
+    type: str = Field(..., regex="^(warehouse|store|dc|supplier|customer|transit)$")
+    parent_code: Optional[str] = Field(None, max_length=50)
+    address_street: Optional[str] = Field(None, max_length=255)
+    address_city: Optional[str] = Field(None, max_length=100)
+    address_state: Optional[str] = Field(None, max_length=100)
+    address_zip_code: Optional[str] = Field(None, max_length=20)
+    address_country: Optional[str] = Field(None, max_length=100)
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    contact_person: Optional[str] = Field(None, max_length=100)
+    contact_email: Optional[str] = Field(None, max_length=255)
+    contact_phone: Optional[str] = Field(None, max_length=20)
+    settings: Optional[Dict[str, Any]] = None
+    is_active: bool = True
+
+class UpsertStatus(BaseModel):
+    """Per-record outcome of a bulk upsert."""
+    key: Optional[str] = None
+    status: str  # created, updated, unchanged, invalid, conflict, duplicate
+    error: Optional[str] = None
+
+# Data Cleansing Schemas
+class DemandAnomalyResponse(BaseModel):
+    """Demand anomaly flag response model."""
+    id: str
+    item_id: str
+    location_id: str
+    day: date
+    kind: str
+    value: float
+    score: Optional[float] = None
+    created_at: datetime
+    
+    @classmethod
+    def from_model(cls, anomaly):
+        """Create response from SQLAlchemy model."""
+        return cls(
+            id=str(anomaly.id),
+            item_id=str(anomaly.item_id),
+            location_id=str(anomaly.location_id),
+            day=anomaly.day,
+            kind=anomaly.kind,
+            value=anomaly.value,
+            score=anomaly.score,
+            created_at=anomaly.created_at
+        )
+
 # Analytics Schemas
 class InventorySummary(BaseModel):
     """Inventory summary statistics."""
@@ -259,7 +468,7 @@ class LowStockAlert(BaseModel):
     location_name: str
     current_quantity: Decimal
     reorder_point: Decimal
-    days_of_stock: float
+    days_of_stock: Optional[float] = None
 
 class ExcessStockAlert(BaseModel):
     """Excess stock alert."""
@@ -0,0 +1,54 @@
+"""
+Pydantic schemas for background jobs.
+
+Defines request/response models for submitting, tracking and
+cancelling long-running forecast and planning jobs.
+"""
+
+from datetime import datetime
+from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+
+class JobSubmit(BaseModel):
+    """Job submission model."""
+    type: str = Field(..., regex="^(forecast|forecast_refresh|train_model|replenishment_plan|catalog_import|anomaly_scan|model_tournament|similarity_index|balance_snapshot|lead_times)$")
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class JobResponse(BaseModel):
+    """Job status response model."""
+    id: str
+    type: str
+    status: str
+    progress: float
+    progress_message: Optional[str] = None
+    params: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    cancel_requested: bool
+    organization_id: str
+    created_by: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_model(cls, job):
+        """Create response from SQLAlchemy model."""
+        return cls(
+            id=str(job.id),
+            type=job.type,
+            status=job.status,
+            progress=job.progress,
+            progress_message=job.progress_message,
+            params=job.params,
+            result=job.result,
+            error=job.error,
+            attempts=job.attempts,
+            cancel_requested=job.cancel_requested,
+            organization_id=str(job.organization_id),
+            created_by=str(job.created_by),
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at
+        )
@@ -5,7 +5,7 @@ Defines request/response models for inventory policy optimization.
 """
 
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 from decimal import Decimal
 
@@ -46,6 +46,8 @@ class PolicyOptimization(BaseModel):
     holding_cost_rate: float = Field(..., gt=0)
     ordering_cost: float = Field(..., gt=0)
     service_level: float = Field(..., ge=0.5, le=0.99)
+    demand_distribution: str = Field(default="auto", regex="^(auto|poisson|normal|forecast)$")  # forecast: calibrated forecast errors
+    lead_time_pmf: Optional[List[float]] = None  # Learned P(lead time = d days), see LeadTimeService
 
 class PolicyRecommendation(BaseModel):
     """Policy optimization recommendation."""
@@ -10,6 +10,14 @@ from .forecast_service import ForecastService
 from .policy_service import PolicyService
 from .replenishment_service import ReplenishmentService
 from .analytics_service import AnalyticsService
+from .lead_time_service import LeadTimeService
+from .job_service import JobService
+from .catalog_service import CatalogService
+from .import_service import ImportService
+from .anomaly_service import AnomalyService
+from .availability_service import AvailabilityService
+from .reservation_service import ReservationService
+from .balance_service import BalanceHistoryService
 
 __all__ = [
     "InventoryService",
@@ -17,4 +25,12 @@ __all__ = [
     "PolicyService",
     "ReplenishmentService",
     "AnalyticsService",
+    "LeadTimeService",
+    "JobService",
+    "CatalogService",
+    "ImportService",
+    "AnomalyService",
+    "AvailabilityService",
+    "ReservationService",
+    "BalanceHistoryService",
 ]
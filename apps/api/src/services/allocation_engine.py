@@ -0,0 +1,235 @@
+"""
+Allocation engine for StockSense AI.
+
+Splits scarce source (DC) stock across child locations. Requests are
+expressed in case packs and capped by each location's max stock headroom;
+locations are served by SLA priority tier, with fair-share (proportional)
+or strict-priority allocation within tiers. The greedy strategies are
+vectorized over locations and SKUs at once; an LP mode handles coupled
+constraints such as per-location receiving capacity.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+ALLOCATION_STRATEGIES = ("fair_share", "priority", "lp")
+
+
+def pack_requests(need: np.ndarray, headroom: np.ndarray, case_pack: np.ndarray) -> np.ndarray:
+    """Convert unit needs into whole case packs that fit under max stock.
+
+    Needs are rounded up to full packs, then capped at the number of packs
+    that fit into the remaining headroom (use np.inf for no max stock).
+
+    Args:
+        need: Units requested per (location, sku).
+        headroom: Units that still fit under max stock per (location, sku).
+        case_pack: Units per case pack per sku.
+
+    Returns:
+        Requested packs per (location, sku) as int64.
+    """
+    case_pack = np.maximum(np.asarray(case_pack, dtype=np.int64), 1)
+    wanted = np.ceil(np.maximum(need, 0) / case_pack)
+    fits = np.floor(np.maximum(headroom, 0) / case_pack)
+    return np.minimum(wanted, fits).astype(np.int64)
+
+
+def allocate_fair_share(supply: np.ndarray, requests: np.ndarray, priority: np.ndarray) -> np.ndarray:
+    """Fair-share allocation within SLA priority tiers.
+
+    Tiers are served in ascending priority order. When a tier's requests
+    exceed the remaining supply of a SKU, every location in the tier gets the
+    same fill rate, floored to whole packs; the leftover packs go to the
+    locations with the largest rounding remainders. All arithmetic is done
+    in integers so supply is never exceeded.
+
+    Args:
+        supply: Packs available per sku, shape (skus,).
+        requests: Packs requested per (location, sku).
+        priority: SLA priority per location; lower is served first.
+
+    Returns:
+        Allocated packs per (location, sku).
+    """
+    remaining = np.asarray(supply, dtype=np.int64).copy()
+    allocation = np.zeros_like(requests, dtype=np.int64)
+    for tier in np.unique(priority):
+        rows = np.flatnonzero(priority == tier)
+        tier_requests = requests[rows]
+        total = tier_requests.sum(axis=0)
+        fits = total <= remaining
+        granted = np.where(fits[None, :], tier_requests, 0)
+
+        short = np.flatnonzero(~fits)
+        if short.size:
+            scaled = tier_requests[:, short] * remaining[short]
+            share, remainder = np.divmod(scaled, total[short])
+            leftover = remaining[short] - share.sum(axis=0)
+            # Rank each location by its rounding remainder within the SKU
+            order = np.argsort(-remainder, axis=0, kind="stable")
+            rank = np.empty_like(order)
+            np.put_along_axis(rank, order, np.arange(rows.size)[:, None], axis=0)
+            granted[:, short] = share + (rank < leftover[None, :])
+
+        allocation[rows] = granted
+        remaining -= granted.sum(axis=0)
+    return allocation
+
+
+def allocate_priority(
+    supply: np.ndarray,
+    requests: np.ndarray,
+    priority: np.ndarray,
+    rank: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Strict priority allocation: fill locations one after another.
+
+    Locations are ordered by priority, then by `rank` (e.g. days of cover,
+    lowest first) and filled completely while supply lasts, computed for all
+    SKUs at once with a cumulative sum down the ordered locations.
+    """
+    keys = (priority,) if rank is None else (rank, priority)
+    order = np.lexsort(keys)
+    ordered = requests[order]
+    before = np.cumsum(ordered, axis=0) - ordered
+    granted = np.clip(np.asarray(supply, dtype=np.int64)[None, :] - before, 0, ordered)
+    allocation = np.empty_like(granted)
+    allocation[order] = granted
+    return allocation
+
+
+def allocate_lp(
+    supply: np.ndarray,
+    requests: np.ndarray,
+    priority: np.ndarray,
+    case_pack: np.ndarray,
+    location_capacity: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Priority-weighted allocation by linear programming (HiGHS via scipy).
+
+    Maximizes allocated units weighted by SLA tier subject to SKU supply,
+    request/max-stock bounds and, optionally, a receiving capacity in units
+    per location shared by all SKUs. The relaxed solution is floored to whole
+    packs and the remaining packs are handed out greedily by weight.
+
+    Args:
+        location_capacity: Units each location can receive across all SKUs
+            (np.inf for unconstrained), shape (locations,).
+
+    Returns:
+        Allocated packs per (location, sku).
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix, vstack
+
+    n, k = requests.shape
+    supply = np.asarray(supply, dtype=np.int64)
+    case_pack = np.maximum(np.asarray(case_pack, dtype=np.int64), 1)
+    tiers, tier_index = np.unique(priority, return_inverse=True)
+    weight = (tiers.size - tier_index.reshape(-1)).astype(float)
+
+    # Only cells with a request become variables; without a coupling
+    # capacity, SKUs with enough supply are filled outright
+    coupled = location_capacity is not None and np.isfinite(location_capacity).any()
+    active = requests > 0
+    if coupled:
+        allocation = np.zeros_like(requests)
+    else:
+        short = requests.sum(axis=0) > supply
+        allocation = np.where(short[None, :], 0, requests)
+        active &= short[None, :]
+    rows, cols = np.nonzero(active)
+    if rows.size == 0:
+        return allocation
+
+    variables = np.arange(rows.size)
+    units = case_pack[cols].astype(float)
+    constraints = [coo_matrix((np.ones(rows.size), (cols, variables)), shape=(k, rows.size))]
+    bounds_ub = [supply.astype(float)]
+    if coupled:
+        capacity = np.asarray(location_capacity, dtype=float)
+        limited = np.flatnonzero(np.isfinite(capacity))
+        slot = np.full(n, -1)
+        slot[limited] = np.arange(limited.size)
+        on_limited = slot[rows] >= 0
+        constraints.append(coo_matrix(
+            (units[on_limited], (slot[rows][on_limited], variables[on_limited])),
+            shape=(limited.size, rows.size),
+        ))
+        bounds_ub.append(capacity[limited])
+
+    result = linprog(
+        -weight[rows] * units,
+        A_ub=vstack(constraints).tocsr(),
+        b_ub=np.concatenate(bounds_ub),
+        bounds=np.column_stack([np.zeros(rows.size), requests[rows, cols]]),
+        method="highs-ipm",
+    )
+    if result.status != 0:
+        raise ValueError(f"Allocation LP failed: {result.message}")
+
+    packs = np.floor(result.x + 1e-9).astype(np.int64)
+    allocation[rows, cols] = packs
+
+    # Hand out packs freed by rounding, highest weight and largest fraction first
+    supply_left = supply - np.bincount(cols, weights=packs, minlength=k).astype(np.int64)
+    capacity_left = None
+    if coupled:
+        capacity_left = np.asarray(location_capacity, dtype=float) - np.bincount(
+            rows, weights=packs * units, minlength=n
+        )
+    fractional = np.flatnonzero(result.x - packs > 1e-9)
+    for v in fractional[np.lexsort((-(result.x - packs)[fractional], -weight[rows[fractional]]))]:
+        location, sku = rows[v], cols[v]
+        if supply_left[sku] <= 0 or allocation[location, sku] >= requests[location, sku]:
+            continue
+        if capacity_left is not None and capacity_left[location] < units[v]:
+            continue
+        allocation[location, sku] += 1
+        supply_left[sku] -= 1
+        if capacity_left is not None:
+            capacity_left[location] -= units[v]
+    return allocation
+
+
+def allocate(
+    supply_units: np.ndarray,
+    need: np.ndarray,
+    headroom: np.ndarray,
+    case_pack: np.ndarray,
+    priority: np.ndarray,
+    strategy: str = "fair_share",
+    rank: Optional[np.ndarray] = None,
+    location_capacity: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Allocate source stock to child locations.
+
+    Args:
+        supply_units: Units available at the source per sku, shape (skus,).
+        need: Units requested per (location, sku).
+        headroom: Units that fit under max stock per (location, sku).
+        case_pack: Units per case pack per sku.
+        priority: SLA priority per location; lower is served first.
+        strategy: fair_share, priority or lp.
+        rank: Tie-break within a priority tier for the priority strategy.
+        location_capacity: Receiving capacity in units per location (lp only).
+
+    Returns:
+        Allocated units per (location, sku), always whole case packs.
+    """
+    if strategy not in ALLOCATION_STRATEGIES:
+        raise ValueError(f"Unknown allocation strategy: {strategy}")
+    case_pack = np.maximum(np.asarray(case_pack, dtype=np.int64), 1)
+    requests = pack_requests(need, headroom, case_pack)
+    supply = np.floor(np.maximum(supply_units, 0) / case_pack).astype(np.int64)
+    priority = np.asarray(priority)
+
+    if strategy == "fair_share":
+        packs = allocate_fair_share(supply, requests, priority)
+    elif strategy == "priority":
+        packs = allocate_priority(supply, requests, priority, rank)
+    else:
+        packs = allocate_lp(supply, requests, priority, case_pack, location_capacity)
+    return packs * case_pack[None, :]
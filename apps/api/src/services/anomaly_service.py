@@ -0,0 +1,381 @@
+"""
+Demand anomaly detection service for StockSense AI.
+
+Cleanses the daily shipment history before it reaches forecasting. Two
+checks run vectorized over whole blocks of series:
+
+- Spikes: a day is flagged when it stands out both from the series'
+  weekly pattern (seasonal decomposition residual, scaled by the series'
+  MAD) and from the trailing window (rolling median/MAD robust z-score).
+  The residual test is cheap and runs on every cell; the rolling median
+  and MAD are then computed only for the cells it lets through, which is
+  exact since a flag needs both.
+- Negative balances: stock balances are rebuilt per item-location from
+  the current level and the cumulative sum of signed movements, and days
+  on which the balance went below zero are flagged.
+
+Flags are stored as DemandAnomaly rows; `anomaly_mask` aligns them with a
+DemandHistory so forecasting can mask the flagged days.
+"""
+
+from datetime import date, datetime, timedelta
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select, delete, insert, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import stream_partitions
+from ..models.anomaly import DemandAnomaly
+from ..models.inventory import Item, Inventory, InventoryMovement, INBOUND_TYPES, OUTBOUND_TYPES
+from ..models.user import User
+from ..schemas.inventory import DemandAnomalyResponse
+from .demand_history import DemandHistory, item_blocks, load_daily_demand
+
+logger = structlog.get_logger()
+
+# Trailing days the rolling median and MAD are taken over
+ANOMALY_WINDOW = 28
+
+# Seasonal period of daily demand
+SEASON_PERIOD = 7
+
+# Seasonal residual z-score a day needs to be considered at all
+RESIDUAL_Z = 4.0
+
+# Rolling robust z-score above which a candidate day is a spike
+SPIKE_Z = 5.0
+
+# Smallest scale (in units) used to turn deviations into z-scores, so
+# series that are mostly zeros do not flag every single sale
+MIN_SCALE = 1.0
+
+# MAD to standard deviation for normal data
+MAD_SCALE = 1.4826
+
+ANOMALY_HISTORY_DAYS = 730
+
+# Items whose series are loaded and scanned together
+ANOMALY_BLOCK_ITEMS = 2000
+
+ProgressCallback = Callable[[float, str], Awaitable[None]]
+
+
+def moving_average(values: np.ndarray, period: int) -> np.ndarray:
+    """Centered moving average along days; edges repeat the nearest full average."""
+    n_days = values.shape[1]
+    if n_days < period:
+        return np.repeat(values.mean(axis=1, keepdims=True), n_days, axis=1)
+    totals = np.cumsum(values, axis=1, dtype=np.float64)
+    totals = np.concatenate([np.zeros((values.shape[0], 1)), totals], axis=1)
+    full = (totals[:, period:] - totals[:, :-period]) / period
+    before = (period - 1) // 2
+    after = n_days - full.shape[1] - before
+    return np.concatenate(
+        [np.repeat(full[:, :1], before, axis=1), full, np.repeat(full[:, -1:], after, axis=1)], axis=1
+    ).astype(np.float32)
+
+
+def seasonal_residuals(values: np.ndarray, period: int = SEASON_PERIOD) -> np.ndarray:
+    """Residual of an additive trend + seasonal decomposition, per cell."""
+    n_series, n_days = values.shape
+    detrended = values - moving_average(values, period)
+    cycles = -(-n_days // period)
+    padded = np.full((n_series, cycles * period), np.nan, dtype=np.float32)
+    padded[:, :n_days] = detrended
+    seasonal = np.nanmean(padded.reshape(n_series, cycles, period), axis=1)
+    seasonal -= seasonal.mean(axis=1, keepdims=True)
+    return detrended - np.tile(seasonal, cycles)[:, :n_days]
+
+
+def residual_z(values: np.ndarray, period: int = SEASON_PERIOD) -> np.ndarray:
+    """Seasonal residuals scaled by each series' MAD."""
+    residuals = seasonal_residuals(values, period)
+    center = np.median(residuals, axis=1, keepdims=True)
+    mad = np.median(np.abs(residuals - center), axis=1, keepdims=True)
+    return (residuals - center) / np.maximum(MAD_SCALE * mad, MIN_SCALE)
+
+
+def rolling_robust_z(values: np.ndarray, rows: np.ndarray, cols: np.ndarray, window: int = ANOMALY_WINDOW) -> np.ndarray:
+    """Robust z-score of the given cells against their trailing window.
+
+    The window excludes the cell itself so a spike cannot mask itself;
+    cells with less history use the window that follows them instead.
+    """
+    starts = np.where(cols >= window, cols - window, cols + 1)
+    starts = np.minimum(starts, values.shape[1] - window)
+    windows = values[rows[:, None], starts[:, None] + np.arange(window)]
+    median = np.median(windows, axis=1)
+    mad = np.median(np.abs(windows - median[:, None]), axis=1)
+    # For counts the MAD understates the spread; never go below Poisson noise
+    scale = np.maximum(MAD_SCALE * mad, np.sqrt(np.maximum(median, MIN_SCALE)))
+    return (values[rows, cols] - median) / scale
+
+
+def detect_spikes(
+    values: np.ndarray,
+    window: int = ANOMALY_WINDOW,
+    period: int = SEASON_PERIOD,
+    residual_threshold: float = RESIDUAL_Z,
+    spike_threshold: float = SPIKE_Z,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Upward demand spikes in a (series, days) matrix.
+
+    Returns:
+        (rows, cols, z): the flagged cells and their rolling robust z-score.
+    """
+    if values.shape[1] <= window:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+    rows, cols = np.nonzero(residual_z(values, period) > residual_threshold)
+    z = rolling_robust_z(values, rows, cols, window)
+    spikes = z > spike_threshold
+    return rows[spikes], cols[spikes], z[spikes]
+
+
+def negative_balances(
+    series: np.ndarray,
+    days: np.ndarray,
+    deltas: np.ndarray,
+    opening: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Days on which a running stock balance went below zero.
+
+    Args:
+        series, days, deltas: Movements sorted by series, then time, with
+            their day offset and signed quantity.
+        opening: Balance per series before its first movement.
+
+    Returns:
+        (rows, days, lowest): one entry per series and day with a negative
+        balance, with the lowest balance of that day.
+    """
+    if len(series) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    totals = np.cumsum(deltas, dtype=np.float64)
+    starts = np.flatnonzero(np.r_[True, series[1:] != series[:-1]])
+    before = totals[starts] - deltas[starts]
+    counts = np.diff(np.r_[starts, len(series)])
+    balance = totals - np.repeat(before, counts) + opening[series]
+
+    negative = balance < 0
+    if not negative.any():
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0)
+    width = int(days.max()) + 1
+    keys = series[negative].astype(np.int64) * width + days[negative]
+    # Keys are sorted, as movements are sorted by series and time
+    unique, first = np.unique(keys, return_index=True)
+    lowest = np.minimum.reduceat(balance[negative], first)
+    return unique // width, unique % width, lowest
+
+
+def anomaly_mask(history: DemandHistory, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Boolean (series, days) mask with the given cells set."""
+    mask = np.zeros(history.values.shape, dtype=bool)
+    mask[rows, cols] = True
+    return mask
+
+
+def mask_anomalies(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Copy of a demand matrix with masked days set to NaN."""
+    masked = values.astype(np.float32, copy=True)
+    masked[mask] = np.nan
+    return masked
+
+
+class AnomalyService:
+    """Service for demand anomaly detection and flags."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def scan(
+        self,
+        user: User,
+        days: int = ANOMALY_HISTORY_DAYS,
+        end: Optional[date] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, int]:
+        """Flag spikes and negative balances over the organization's history.
+
+        Items are scanned in blocks; each block's flags for the window are
+        replaced and committed before the next block is loaded.
+
+        Returns:
+            Series scanned and flags written per kind.
+        """
+        end = end or datetime.utcnow().date()
+        summary = {"series": 0, "spike": 0, "negative_balance": 0}
+        try:
+            total = await self.db.scalar(
+                select(func.count(Item.id)).where(Item.organization_id == user.organization_id)
+            ) or 0
+            done = 0
+            async for block in item_blocks(self.db, user.organization_id, ANOMALY_BLOCK_ITEMS):
+                await self._scan_block(block, user, days, end, summary)
+                done += len(block)
+                if progress:
+                    await progress(done / max(total, 1), f"Scanned {done:,} of {total:,} items")
+
+            logger.info("Anomaly scan completed", **summary)
+            return summary
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to scan for anomalies", error=str(e))
+            raise
+
+    async def _scan_block(self, item_ids: List[Any], user: User, days: int, end: date, summary: Dict[str, int]) -> None:
+        history = await load_daily_demand(self.db, item_ids, days, end)
+        rows, cols, z = detect_spikes(history.values)
+        flags = [
+            {"item_id": uuid.UUID(history.keys[row][0]), "location_id": uuid.UUID(history.keys[row][1]),
+             "day": history.start + timedelta(days=int(col)), "kind": "spike",
+             "value": float(history.values[row, col]), "score": float(score)}
+            for row, col, score in zip(rows, cols, z)
+        ]
+        flags.extend(await self._negative_balance_flags(item_ids, history.start, end))
+
+        start = history.start
+        await self.db.execute(
+            delete(DemandAnomaly).where(
+                and_(
+                    DemandAnomaly.organization_id == user.organization_id,
+                    DemandAnomaly.item_id.in_(item_ids),
+                    DemandAnomaly.day >= start,
+                    DemandAnomaly.day < end
+                )
+            )
+        )
+        if flags:
+            for flag in flags:
+                flag["organization_id"] = user.organization_id
+            await self.db.execute(insert(DemandAnomaly), flags)
+        await self.db.commit()
+
+        summary["series"] += len(history.keys)
+        summary["spike"] += len(rows)
+        summary["negative_balance"] += len(flags) - len(rows)
+
+    async def _negative_balance_flags(self, item_ids: List[Any], start: date, end: date) -> List[Dict[str, Any]]:
+        """Negative balance flags for the items' movements in [start, end)."""
+        since = datetime.combine(start, datetime.min.time())
+        until = datetime.combine(end, datetime.min.time())
+        query = (
+            select(
+                InventoryMovement.item_id,
+                InventoryMovement.location_id,
+                InventoryMovement.type,
+                InventoryMovement.quantity,
+                InventoryMovement.created_at,
+            )
+            .where(
+                and_(
+                    InventoryMovement.item_id.in_(item_ids),
+                    InventoryMovement.created_at >= since,
+                    InventoryMovement.created_at < until
+                )
+            )
+            .order_by(InventoryMovement.item_id, InventoryMovement.location_id, InventoryMovement.created_at)
+        )
+        keys: Dict[Tuple[Any, Any], int] = {}
+        series: List[int] = []
+        offsets: List[int] = []
+        deltas: List[float] = []
+        async for partition in stream_partitions(self.db, query):
+            for item_id, location_id, movement_type, quantity, created_at in partition:
+                series.append(keys.setdefault((item_id, location_id), len(keys)))
+                offsets.append((created_at.date() - start).days)
+                if movement_type in INBOUND_TYPES:
+                    deltas.append(abs(quantity))
+                elif movement_type in OUTBOUND_TYPES:
+                    deltas.append(-abs(quantity))
+                else:
+                    deltas.append(quantity)
+        if not keys:
+            return []
+
+        # Balances are rebuilt backwards from the current level
+        current = np.zeros(len(keys))
+        result = await self.db.execute(
+            select(Inventory.item_id, Inventory.location_id, Inventory.quantity)
+            .where(Inventory.item_id.in_(item_ids))
+        )
+        for item_id, location_id, quantity in result:
+            row = keys.get((item_id, location_id))
+            if row is not None:
+                current[row] = quantity
+        series_array = np.asarray(series, dtype=np.int64)
+        delta_array = np.asarray(deltas, dtype=np.float64)
+        opening = current - np.bincount(series_array, weights=delta_array, minlength=len(keys))
+
+        rows, days, lowest = negative_balances(series_array, np.asarray(offsets, dtype=np.int64), delta_array, opening)
+        key_list = list(keys)
+        return [
+            {"item_id": key_list[row][0], "location_id": key_list[row][1],
+             "day": start + timedelta(days=int(day)), "kind": "negative_balance",
+             "value": float(balance), "score": None}
+            for row, day, balance in zip(rows, days, lowest)
+        ]
+
+    async def get_anomalies(
+        self,
+        user: User,
+        item_id: Optional[str] = None,
+        location_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        since: Optional[date] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[DemandAnomalyResponse]:
+        """List stored anomaly flags, newest first."""
+        try:
+            query = select(DemandAnomaly).where(DemandAnomaly.organization_id == user.organization_id)
+            if item_id:
+                query = query.where(DemandAnomaly.item_id == item_id)
+            if location_id:
+                query = query.where(DemandAnomaly.location_id == location_id)
+            if kind:
+                query = query.where(DemandAnomaly.kind == kind)
+            if since:
+                query = query.where(DemandAnomaly.day >= since)
+            query = query.order_by(DemandAnomaly.day.desc()).offset(skip).limit(limit)
+
+            result = await self.db.execute(query)
+            return [DemandAnomalyResponse.from_model(flag) for flag in result.scalars().all()]
+
+        except Exception as e:
+            logger.error("Failed to get anomalies", error=str(e))
+            raise
+
+    async def load_mask(self, history: DemandHistory, user: User, kinds: Tuple[str, ...] = ("spike",)) -> np.ndarray:
+        """Mask of the stored flags falling on a demand history's cells."""
+        try:
+            end = history.start + timedelta(days=history.days)
+            item_ids = list({item_id for item_id, _ in history.keys})
+            query = select(DemandAnomaly.item_id, DemandAnomaly.location_id, DemandAnomaly.day).where(
+                and_(
+                    DemandAnomaly.organization_id == user.organization_id,
+                    DemandAnomaly.item_id.in_(item_ids),
+                    DemandAnomaly.kind.in_(kinds),
+                    DemandAnomaly.day >= history.start,
+                    DemandAnomaly.day < end
+                )
+            )
+            index = history.index()
+            rows, cols = [], []
+            async for partition in stream_partitions(self.db, query):
+                for item_id, location_id, day in partition:
+                    row = index.get((str(item_id), str(location_id)))
+                    if row is not None:
+                        rows.append(row)
+                        cols.append((day - history.start).days)
+            return anomaly_mask(history, np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))
+
+        except Exception as e:
+            logger.error("Failed to load anomaly mask", error=str(e))
+            raise
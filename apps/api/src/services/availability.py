@@ -0,0 +1,203 @@
+"""
+Available-to-promise index for StockSense AI.
+
+Keeps the projected balance of every (item, location) in memory: on hand,
+minus reserved, plus the scheduled receipts (open purchase orders and
+in-transit transfers) that have not arrived yet. Receipts of a series are
+kept sorted by expected day with running totals, so the balance projected
+at any day is one binary search, and a promise across locations is a few
+of them.
+
+Balances are loaded in bulk per organization from the database, updated
+in place as movements and receipts are recorded, and reloaded once they
+are ATP_INDEX_MAX_AGE_SECONDS old, which bounds drift from writes made by
+other processes. Updates are absolute (the new on-hand quantity, the new
+outstanding quantity of a receipt), so those arriving while a load runs
+are simply applied again on top of it. Checks take the same lock as
+updates, so they never see an update half applied. Units are held by
+reservations in the database (see reservation_service); the index only
+answers whether they could be promised.
+"""
+
+from bisect import bisect_right
+from datetime import date
+from itertools import accumulate
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Seconds an organization's balances are served before a reload
+ATP_INDEX_MAX_AGE_SECONDS = 300
+
+
+class Promise(NamedTuple):
+    """Outcome of an available-to-promise check."""
+    promisable: bool
+    quantity: int
+    by: date
+    available: int  # across the locations checked
+    allocations: List[Tuple[str, int, int]]  # (location id, available, allocated), most available first
+
+
+class ProjectedBalance:
+    """Time-phased projected balance of one item at one location."""
+
+    __slots__ = ("on_hand", "reserved", "receipts", "days", "cumulative")
+
+    def __init__(self, on_hand: int = 0, reserved: int = 0):
+        self.on_hand = on_hand
+        self.reserved = reserved
+        self.receipts: Dict[str, Tuple[int, int]] = {}  # receipt id -> (day ordinal, outstanding)
+        self.days: List[int] = []
+        self.cumulative: List[int] = []
+
+    def schedule(self, receipt_id: str, day: date, quantity: int) -> None:
+        """Set the outstanding quantity of a receipt; zero or less drops it."""
+        if quantity > 0:
+            self.receipts[receipt_id] = (day.toordinal(), quantity)
+        elif self.receipts.pop(receipt_id, None) is None:
+            return
+        by_day: Dict[int, int] = {}
+        for ordinal, outstanding in self.receipts.values():
+            by_day[ordinal] = by_day.get(ordinal, 0) + outstanding
+        self.days = sorted(by_day)
+        self.cumulative = list(accumulate(by_day[ordinal] for ordinal in self.days))
+
+    def available(self, by: int) -> int:
+        """Units free to promise by a day ordinal; receipts are never negative, so later days never have less."""
+        at = bisect_right(self.days, by)
+        return self.on_hand - self.reserved + (self.cumulative[at - 1] if at else 0)
+
+
+class AvailabilityIndex:
+    """Projected balances of every item-location, by organization."""
+
+    def __init__(self, max_age: float = ATP_INDEX_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._balances: Dict[str, Dict[str, Dict[str, ProjectedBalance]]] = {}  # organization -> item -> location
+        self._loaded: Dict[str, float] = {}
+        self._pending: Dict[str, List[Tuple[str, tuple]]] = {}  # updates made while a load runs
+
+    def loaded(self, organization_id: Any) -> bool:
+        """Whether an organization's balances are loaded and fresh enough to serve."""
+        loaded = self._loaded.get(str(organization_id))
+        return loaded is not None and time.monotonic() - loaded < self.max_age
+
+    def begin_load(self, organization_id: Any) -> None:
+        """Start recording updates, to be applied again on the balances a load is about to read."""
+        with self._lock:
+            self._pending[str(organization_id)] = []
+
+    def abort_load(self, organization_id: Any) -> None:
+        """Stop recording updates after a failed load."""
+        with self._lock:
+            self._pending.pop(str(organization_id), None)
+
+    def replace(self, organization_id: Any, balances: Dict[str, Dict[str, ProjectedBalance]]) -> None:
+        """Swap in an organization's balances, loaded in bulk since `begin_load`."""
+        organization_id = str(organization_id)
+        with self._lock:
+            self._balances[organization_id] = balances
+            self._loaded[organization_id] = time.monotonic()
+            for update, args in self._pending.pop(organization_id, []):
+                self._apply(update, organization_id, *args)
+
+    def _apply(self, update: str, organization_id: str, item_id: Any, location_id: Any, *args: Any) -> None:
+        pending = self._pending.get(organization_id)
+        if pending is not None:
+            pending.append((update, (item_id, location_id) + args))
+        balance = self._balance(organization_id, item_id, location_id)
+        if balance is None:
+            return  # the next load reads the database
+        if update == "on_hand":
+            on_hand, reserved = args
+            balance.on_hand = int(on_hand)
+            if reserved is not None:
+                balance.reserved = int(reserved)
+        else:
+            balance.schedule(*args)
+
+    def _balance(self, organization_id: str, item_id: Any, location_id: Any) -> Optional[ProjectedBalance]:
+        items = self._balances.get(organization_id)
+        if items is None:
+            return None
+        locations = items.setdefault(str(item_id), {})
+        balance = locations.get(str(location_id))
+        if balance is None:
+            balance = locations[str(location_id)] = ProjectedBalance()
+        return balance
+
+    def set_on_hand(
+        self,
+        organization_id: Any,
+        item_id: Any,
+        location_id: Any,
+        on_hand: int,
+        reserved: Optional[int] = None
+    ) -> None:
+        """Record the on-hand (and reserved) quantity of an item-location after a movement."""
+        with self._lock:
+            self._apply("on_hand", str(organization_id), item_id, location_id, on_hand, reserved)
+
+    def schedule(
+        self,
+        organization_id: Any,
+        item_id: Any,
+        location_id: Any,
+        receipt_id: str,
+        day: date,
+        quantity: int
+    ) -> None:
+        """Record the outstanding quantity of a scheduled receipt (zero once received or cancelled)."""
+        with self._lock:
+            self._apply("receipt", str(organization_id), item_id, location_id, receipt_id, day, int(quantity))
+
+    def check(
+        self,
+        organization_id: Any,
+        item_id: Any,
+        quantity: int,
+        by: date,
+        location_ids: Optional[Sequence[Any]] = None
+    ) -> Promise:
+        """Whether `quantity` units can be promised by `by` from some locations (all of the item's by default).
+
+        Units are allocated from the locations with the most available
+        first, which keeps promises to as few locations as possible.
+        """
+        with self._lock:
+            locations = self._balances.get(str(organization_id), {}).get(str(item_id), {})
+            location_ids = list(locations) if location_ids is None else list(dict.fromkeys(map(str, location_ids)))
+            ordinal = by.toordinal()
+            candidates = []
+            for location_id in location_ids:
+                balance = locations.get(location_id)
+                candidates.append((location_id, max(balance.available(ordinal), 0) if balance else 0))
+        candidates.sort(key=lambda candidate: -candidate[1])  # stable: ties keep the requested order
+
+        remaining = quantity
+        allocations = []
+        for location_id, available in candidates:
+            allocated = min(available, remaining)
+            remaining -= allocated
+            allocations.append((location_id, available, allocated))
+        total = sum(available for _, available in candidates)
+        return Promise(remaining == 0, quantity, by, total, allocations)
+
+
+_index: Optional[AvailabilityIndex] = None
+
+
+def get_availability_index() -> AvailabilityIndex:
+    """Process-wide availability index."""
+    global _index
+    if _index is None:
+        _index = AvailabilityIndex()
+    return _index
+
+
+def set_availability_index(index: Optional[AvailabilityIndex]) -> None:
+    """Swap the process-wide availability index, e.g. in tests."""
+    global _index
+    _index = index
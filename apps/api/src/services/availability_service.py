@@ -0,0 +1,200 @@
+"""
+Available-to-promise service for StockSense AI.
+
+Serves promise checks from the in-memory availability index (see
+availability), loading an organization's balances in bulk on first use
+and again once they go stale: on-hand and reserved quantities from
+inventory, and what is still outstanding on open purchase orders and
+in-transit transfers. Recorded movements and new scheduled receipts
+update the index in place.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import stream_partitions
+from ..models.inventory import Item, Inventory, InventoryMovement, INBOUND_TYPES
+from ..models.supply import ScheduledReceipt
+from ..models.user import User
+from ..schemas.inventory import (
+    AvailabilityCheck, AvailabilityResponse, LocationAllocation,
+    ScheduledReceiptCreate, ScheduledReceiptResponse
+)
+from .availability import AvailabilityIndex, ProjectedBalance, get_availability_index
+
+logger = structlog.get_logger()
+
+# Scheduled receipts still expected to arrive
+OPEN_RECEIPT_STATUSES = ("open", "in_transit")
+
+# Movement reference types that receive against a scheduled receipt
+RECEIPT_REFERENCE_TYPES = {"po": "purchase_order", "to": "transfer"}
+
+# Loads in progress, so concurrent checks wait for one load per organization
+_loading: Dict[str, asyncio.Lock] = {}
+
+
+class AvailabilityService:
+    """Service for available-to-promise checks and scheduled receipts."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def check_availability(self, request: AvailabilityCheck, user: User) -> AvailabilityResponse:
+        """Whether a quantity of an item can be promised by a date from some locations."""
+        try:
+            index = await self.index(user)
+            promise = index.check(user.organization_id, request.item_id, request.quantity, request.by_date,
+                                  request.location_ids)
+            return AvailabilityResponse(
+                item_id=request.item_id,
+                quantity=promise.quantity,
+                by_date=promise.by,
+                promisable=promise.promisable,
+                available=promise.available,
+                allocations=[
+                    LocationAllocation(location_id=location_id, available=available, allocated=allocated)
+                    for location_id, available, allocated in promise.allocations
+                ]
+            )
+
+        except Exception as e:
+            logger.error("Failed to check availability", error=str(e))
+            raise
+
+    async def create_scheduled_receipt(self, receipt_data: ScheduledReceiptCreate, user: User) -> ScheduledReceiptResponse:
+        """Record an open purchase order line or in-transit transfer."""
+        try:
+            receipt = ScheduledReceipt(
+                **receipt_data.dict(),
+                organization_id=user.organization_id,
+                received_quantity=0
+            )
+            self.db.add(receipt)
+            await self.db.commit()
+            await self.db.refresh(receipt)
+            get_availability_index().schedule(
+                user.organization_id, receipt.item_id, receipt.location_id,
+                str(receipt.id), receipt.expected_date, receipt.quantity
+            )
+
+            logger.info("Scheduled receipt created", receipt_id=str(receipt.id), reference=receipt.reference)
+            return ScheduledReceiptResponse.from_model(receipt)
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to create scheduled receipt", error=str(e))
+            raise
+
+    async def receive(self, movement: InventoryMovement, user: User) -> List[ScheduledReceipt]:
+        """Draw down the scheduled receipts an inbound movement arrives against.
+
+        Adds to the session without committing, so the receipt lands with
+        the movement; returns the receipts touched, for `publish_receipts`
+        once committed.
+        """
+        kind = RECEIPT_REFERENCE_TYPES.get(movement.reference_type)
+        if movement.type not in INBOUND_TYPES or kind is None or not movement.reference:
+            return []
+        result = await self.db.execute(
+            select(ScheduledReceipt).where(
+                and_(
+                    ScheduledReceipt.organization_id == user.organization_id,
+                    ScheduledReceipt.reference == movement.reference,
+                    ScheduledReceipt.kind == kind,
+                    ScheduledReceipt.item_id == movement.item_id,
+                    ScheduledReceipt.location_id == movement.location_id,
+                    ScheduledReceipt.status.in_(OPEN_RECEIPT_STATUSES)
+                )
+            ).order_by(ScheduledReceipt.expected_date).with_for_update()
+        )
+        remaining = movement.quantity
+        receipts = []
+        for receipt in result.scalars().all():
+            if remaining <= 0:
+                break
+            received = min(receipt.quantity - receipt.received_quantity, remaining)
+            receipt.received_quantity += received
+            remaining -= received
+            if receipt.received_quantity >= receipt.quantity:
+                receipt.status = 'closed'
+            receipt.updated_at = datetime.utcnow()
+            receipts.append(receipt)
+        return receipts
+
+    @staticmethod
+    def publish_receipts(user: User, receipts: List[ScheduledReceipt]) -> None:
+        """Update the index with the outstanding quantity of committed receipts."""
+        index = get_availability_index()
+        for receipt in receipts:
+            outstanding = receipt.quantity - receipt.received_quantity if receipt.status in OPEN_RECEIPT_STATUSES else 0
+            index.schedule(user.organization_id, receipt.item_id, receipt.location_id,
+                           str(receipt.id), receipt.expected_date, outstanding)
+
+    async def index(self, user: User) -> AvailabilityIndex:
+        """The availability index, with the organization's balances loaded."""
+        index = get_availability_index()
+        if index.loaded(user.organization_id):
+            return index
+        lock = _loading.setdefault(str(user.organization_id), asyncio.Lock())
+        async with lock:
+            if not index.loaded(user.organization_id):
+                await self._load(user, index)
+        return index
+
+    async def _load(self, user: User, index: AvailabilityIndex) -> None:
+        """Read an organization's balances and open receipts into the index."""
+        started = datetime.utcnow()
+        index.begin_load(user.organization_id)
+        balances: Dict[str, Dict[str, ProjectedBalance]] = {}
+
+        def balance(item_id: Any, location_id: Any) -> ProjectedBalance:
+            locations = balances.setdefault(str(item_id), {})
+            if str(location_id) not in locations:
+                locations[str(location_id)] = ProjectedBalance()
+            return locations[str(location_id)]
+
+        try:
+            inventory = select(
+                Inventory.item_id, Inventory.location_id, Inventory.quantity, Inventory.reserved_quantity
+            ).join(Item).where(
+                and_(
+                    Item.organization_id == user.organization_id,
+                    Inventory.is_active == 'Y'
+                )
+            )
+            rows = 0
+            async for partition in stream_partitions(self.db, inventory):
+                for item_id, location_id, quantity, reserved in partition:
+                    entry = balance(item_id, location_id)
+                    entry.on_hand, entry.reserved = int(quantity or 0), int(reserved or 0)
+                rows += len(partition)
+
+            receipts = select(
+                ScheduledReceipt.id, ScheduledReceipt.item_id, ScheduledReceipt.location_id,
+                ScheduledReceipt.expected_date, ScheduledReceipt.quantity, ScheduledReceipt.received_quantity
+            ).where(
+                and_(
+                    ScheduledReceipt.organization_id == user.organization_id,
+                    ScheduledReceipt.status.in_(OPEN_RECEIPT_STATUSES)
+                )
+            )
+            async for partition in stream_partitions(self.db, receipts):
+                for receipt_id, item_id, location_id, expected_date, quantity, received in partition:
+                    balance(item_id, location_id).schedule(str(receipt_id), expected_date, quantity - (received or 0))
+        except Exception:
+            index.abort_load(user.organization_id)
+            raise
+
+        index.replace(user.organization_id, balances)
+        logger.info(
+            "Availability index loaded",
+            organization_id=str(user.organization_id),
+            balances=rows,
+            seconds=(datetime.utcnow() - started).total_seconds()
+        )
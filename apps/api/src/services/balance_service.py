@@ -0,0 +1,336 @@
+"""
+Inventory balance history service for StockSense AI.
+
+Writes the daily balance snapshots of every item-location (see
+balance_snapshots) and reads an item's balance history back from them.
+
+The snapshot job rolls balances forward from the last snapshot by each
+day's signed movements, one month and block of items at a time, and
+rewrites the months it touched. The first run backfills
+BALANCE_BACKFILL_DAYS by rolling backwards from the current inventory.
+Movements dated before the last snapshot mark their month stale, and the
+next run rolls again from there.
+Allocated (reserved) and in-transit quantities have no movements to
+replay: each run records them as of the run, and backfilled days carry
+the values of the first run.
+
+A history read takes the days up to the last snapshot from the stored
+segments and replays only the movements since then, so its cost is
+bounded by the time since the last run, not by the length of history.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import uuid
+
+import numpy as np
+from sqlalchemy import select, and_, case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import stream_partitions
+from ..models.inventory import Item, Inventory, InventoryMovement, INBOUND_TYPES, OUTBOUND_TYPES
+from ..models.supply import ScheduledReceipt
+from ..models.user import User
+from ..schemas.inventory import BalanceHistoryEntry, BalanceHistoryResponse
+from .balance_snapshots import (
+    BalanceSegment, BalanceSnapshotStore, BalanceWindow, build_segment, closing_balances,
+    daily_balances, item_rows, month_records, next_month, segment_parts, series_days, stale_since
+)
+from .demand_history import item_blocks
+from .forecast_state import series_key
+
+logger = structlog.get_logger()
+
+# Days of history the first snapshot run backfills
+BALANCE_BACKFILL_DAYS = 365
+
+# Items whose balances are rolled together
+BALANCE_BLOCK_ITEMS = 1000
+
+# Days of history returned by default, and at most
+BALANCE_HISTORY_DAYS = 30
+BALANCE_HISTORY_MAX_DAYS = 366
+
+ProgressCallback = Callable[[float, str], Awaitable[None]]
+
+
+def _signed_quantity() -> Any:
+    """Movement quantity with the sign of its effect on on-hand stock."""
+    return case(
+        (InventoryMovement.type.in_(INBOUND_TYPES), func.abs(InventoryMovement.quantity)),
+        (InventoryMovement.type.in_(OUTBOUND_TYPES), -func.abs(InventoryMovement.quantity)),
+        else_=InventoryMovement.quantity
+    )
+
+
+class BalanceHistoryService:
+    """Service for inventory balance snapshots and history."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def write_snapshots(
+        self,
+        user: User,
+        end: Optional[date] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """Snapshot the balances of every series on the days before `end` (today by default, at most).
+
+        Each month is saved once all blocks of items are rolled through
+        it, so a failed run resumes from the last month saved. Months that
+        movements recorded since the last run are dated in (see
+        BalanceSnapshotStore.mark_stale) are rebuilt first.
+
+        Returns:
+            Days snapshotted, series in the last segment and its change records.
+        """
+        today = datetime.utcnow().date()
+        end = min(end or today, today)
+        try:
+            store = BalanceSnapshotStore(user.organization_id)
+            marks = store.stale_marks()
+            months = store.months()
+            last = store.segment(months[-1]) if months else None
+            start = last.end if last is not None else end - timedelta(days=BALANCE_BACKFILL_DAYS)
+            stale = stale_since(marks)
+            if last is not None and stale is not None and stale < last.end:
+                # Roll again from the stale month, over every month after it
+                start = max(stale.replace(day=1), months[0])
+                end = max(end, last.end)
+                earlier = [month for month in months if month < start]
+                last = store.segment(earlier[-1]) if earlier else None
+                logger.info("Rebuilding stale balance snapshots", since=start.isoformat())
+            days = (end - start).days
+            if days <= 0:
+                store.clear_stale(marks)
+                return {"days": 0, "series": len(last.keys) if last is not None else 0, "records": 0}
+
+            while start < end:
+                month = start.replace(day=1)
+                window_end = min(next_month(month), end)
+                parts: List[List[np.ndarray]] = [[] for _ in range(5)]
+                if last is not None and last.end > month:
+                    for part, values in zip(parts, segment_parts(last)):
+                        part.append(values)
+                async for item_ids in self._item_blocks(user):
+                    window = await self._roll(user, item_ids, start, window_end, last)
+                    for part, values in zip(parts, month_records(window, month)):
+                        part.append(values)
+                last = build_segment(window_end, *parts)
+                store.save(month, last)
+                start = window_end
+                if progress:
+                    await progress(1 - (end - start).days / days, f"Balances snapshotted up to {start.isoformat()}")
+
+            store.clear_stale(marks)
+            summary = {"days": days, "series": len(last.keys), "records": len(last.days)}
+            logger.info("Balance snapshots written", **summary)
+            return summary
+
+        except Exception as e:
+            logger.error("Failed to write balance snapshots", error=str(e))
+            raise
+
+    async def get_history(
+        self,
+        item_id: str,
+        user: User,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        location_id: Optional[str] = None
+    ) -> Optional[BalanceHistoryResponse]:
+        """Daily balances of an item, summed over its locations (or at one).
+
+        Covers `start_date` to `end_date` inclusive, the last
+        BALANCE_HISTORY_DAYS up to today by default; days before the first
+        snapshot are left out. None if the item does not exist.
+
+        Raises:
+            ValueError: For an empty range or one longer than BALANCE_HISTORY_MAX_DAYS.
+        """
+        today = datetime.utcnow().date()
+        end_date = min(end_date or today, today)
+        start_date = start_date or end_date - timedelta(days=BALANCE_HISTORY_DAYS - 1)
+        days = (end_date - start_date).days + 1
+        if days <= 0:
+            raise ValueError("start_date is after end_date")
+        if days > BALANCE_HISTORY_MAX_DAYS:
+            raise ValueError(f"History is limited to {BALANCE_HISTORY_MAX_DAYS} days")
+        try:
+            if not await self._item_exists(item_id, user):
+                return None
+            store = BalanceSnapshotStore(user.organization_id)
+            history = np.zeros((days, 4), dtype=np.int64)
+            covered = np.zeros(days, dtype=bool)
+
+            months = [month for month in store.months() if month <= end_date]
+            anchor = store.segment(months[-1]) if months else None
+            for month in months:
+                if next_month(month) <= start_date:
+                    continue
+                segment = store.segment(month)
+                first = (month - start_date).days
+                lo, hi = max(first, 0), min((segment.end - start_date).days, days)
+                for row in item_rows(segment, [item_id], location_id):
+                    history[lo:hi] += series_days(segment, month, row)[lo - first:hi - first]
+                covered[lo:hi] = True
+
+            # Days after the last snapshot replay its movements since
+            tail = anchor.end if anchor is not None else start_date
+            if tail <= end_date:
+                window = await self._roll(user, [uuid.UUID(item_id)], tail, end_date + timedelta(days=1), anchor)
+                series = np.ones(len(window.keys), dtype=bool)
+                if location_id is not None:
+                    series = window.keys == np.array(series_key(item_id, location_id), dtype="V32")
+                first = (tail - start_date).days
+                lo = max(first, 0)
+                history[lo:, :3] = window.balances[series].sum(axis=0)[lo - first:]
+                history[lo:, 3] = window.counts[series].sum(axis=0)[lo - first:]
+                covered[lo:] = True
+
+            return BalanceHistoryResponse(
+                item_id=item_id,
+                location_id=location_id,
+                history=[
+                    BalanceHistoryEntry(
+                        date=start_date + timedelta(days=offset),
+                        on_hand=on_hand,
+                        allocated=allocated,
+                        in_transit=in_transit,
+                        transactions=transactions
+                    )
+                    for offset, (on_hand, allocated, in_transit, transactions) in enumerate(history.tolist())
+                    if covered[offset]
+                ]
+            )
+
+        except Exception as e:
+            logger.error("Failed to get balance history", error=str(e), item_id=item_id)
+            raise
+
+    async def _item_exists(self, item_id: str, user: User) -> bool:
+        result = await self.db.execute(
+            select(Item.id).where(
+                and_(
+                    Item.id == item_id,
+                    Item.organization_id == user.organization_id
+                )
+            )
+        )
+        return result.scalar_one_or_none() is not None
+
+    def _item_blocks(self, user: User) -> AsyncIterator[List[Any]]:
+        """The organization's item ids, BALANCE_BLOCK_ITEMS at a time."""
+        return item_blocks(self.db, user.organization_id, BALANCE_BLOCK_ITEMS)
+
+    async def _roll(
+        self,
+        user: User,
+        item_ids: List[Any],
+        start: date,
+        end: date,
+        previous: Optional[BalanceSegment]
+    ) -> BalanceWindow:
+        """Daily balances of the items' series over the days from `start` up to `end`.
+
+        Series start from their balances in `previous` (the last snapshot,
+        which ends at `start`) and close at their current inventory, less
+        the movements made since `end`.
+        """
+        days = (end - start).days
+        since = datetime.combine(start, datetime.min.time())
+        until = datetime.combine(end, datetime.min.time())
+        keys: Dict[bytes, int] = {}
+        rows = item_rows(previous, item_ids) if previous is not None else np.zeros(0, dtype=np.int64)
+        for key in previous.keys[rows].tolist() if previous is not None else []:
+            keys[key] = len(keys)
+
+        movements = select(
+            InventoryMovement.item_id, InventoryMovement.location_id, _signed_quantity(), InventoryMovement.created_at
+        ).where(
+            and_(
+                InventoryMovement.item_id.in_(item_ids),
+                InventoryMovement.created_at >= since,
+                InventoryMovement.created_at < until
+            )
+        )
+        series: List[int] = []
+        offsets: List[int] = []
+        deltas: List[int] = []
+        async for partition in stream_partitions(self.db, movements):
+            for item_id, location_id, quantity, created_at in partition:
+                series.append(keys.setdefault(series_key(item_id, location_id), len(keys)))
+                offsets.append((created_at.date() - start).days)
+                deltas.append(quantity)
+
+        later = await self.db.execute(
+            select(InventoryMovement.item_id, InventoryMovement.location_id, func.sum(_signed_quantity()))
+            .where(
+                and_(
+                    InventoryMovement.item_id.in_(item_ids),
+                    InventoryMovement.created_at >= until
+                )
+            )
+            .group_by(InventoryMovement.item_id, InventoryMovement.location_id)
+        )
+        since_end = {series_key(item_id, location_id): int(total or 0) for item_id, location_id, total in later}
+        transit = await self.db.execute(
+            select(
+                ScheduledReceipt.item_id, ScheduledReceipt.location_id,
+                func.sum(ScheduledReceipt.quantity - ScheduledReceipt.received_quantity)
+            )
+            .where(
+                and_(
+                    ScheduledReceipt.organization_id == user.organization_id,
+                    ScheduledReceipt.item_id.in_(item_ids),
+                    ScheduledReceipt.status == 'in_transit'
+                )
+            )
+            .group_by(ScheduledReceipt.item_id, ScheduledReceipt.location_id)
+        )
+        in_transit = {series_key(item_id, location_id): int(total or 0) for item_id, location_id, total in transit}
+        inventory = await self.db.execute(
+            select(Inventory.item_id, Inventory.location_id, Inventory.quantity, Inventory.reserved_quantity)
+            .where(
+                and_(
+                    Inventory.item_id.in_(item_ids),
+                    Inventory.is_active == 'Y'
+                )
+            )
+        )
+        current = []
+        for item_id, location_id, quantity, reserved in inventory:
+            key = series_key(item_id, location_id)
+            current.append((
+                keys.setdefault(key, len(keys)),
+                (quantity or 0) - since_end.get(key, 0), reserved or 0, in_transit.get(key, 0)
+            ))
+
+        n_series = len(keys)
+        last = np.zeros((n_series, 3), dtype=np.int64)
+        has_last = np.zeros(n_series, dtype=bool)
+        if len(rows):
+            last[:len(rows)] = closing_balances(previous, rows)
+            has_last[:len(rows)] = True
+        closing = np.zeros((n_series, 3), dtype=np.int64)
+        has_closing = np.zeros(n_series, dtype=bool)
+        if current:
+            known = np.array(current, dtype=np.int64)
+            closing[known[:, 0]] = known[:, 1:]
+            has_closing[known[:, 0]] = True
+
+        cells = np.asarray(series, dtype=np.int64) * days + np.asarray(offsets, dtype=np.int64)
+        changes = np.bincount(cells, weights=np.asarray(deltas, dtype=np.float64), minlength=n_series * days)
+        counts = np.bincount(cells, minlength=n_series * days).reshape(n_series, days)
+        opening, balances = daily_balances(
+            last, has_last, closing, has_closing, changes.astype(np.int64).reshape(n_series, days)
+        )
+        return BalanceWindow(
+            start=start,
+            keys=np.array(list(keys), dtype="V32"),
+            opening=opening,
+            balances=balances,
+            counts=counts,
+        )
@@ -0,0 +1,261 @@
+"""
+Inventory balance snapshots for StockSense AI.
+
+Keeps the end-of-day balance of every (item, location): on hand,
+allocated and in transit, with its number of movements that day. The
+balance history of a series is then read from a few small arrays
+instead of replaying its movements.
+
+Snapshots are compacted per calendar month into a segment:
+
+- the series keys, sorted, so the series of an item are one binary
+  search away;
+- the opening balances of each series before the first day of the month;
+- one change record (day of the month, balances at its close, movements
+  on it) per series and day on which anything changed.
+
+A series without movements in a month costs its key and its opening, and
+a year of one item's history is a binary search and a slice in each of
+twelve memory-mapped segments. The month in progress is rewritten on
+every snapshot run; complete months are only written again after a
+movement dated inside them marks them stale.
+"""
+
+from datetime import date, timedelta
+import os
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.storage import DATA_DIR
+from .forecast_state import ArrayStore, series_key
+
+BALANCE_SNAPSHOT_DIR = os.path.join(DATA_DIR, "stocksense-balances")
+
+# Directory of an organization's stale marks, one file per backdated movement
+STALE_MARKS = "stale"
+
+# Memory-mapped segments by directory, with their version
+_segments: Dict[str, Tuple[str, "BalanceSegment"]] = {}
+
+
+class BalanceSegment(NamedTuple):
+    """Snapshots of a calendar month, from its first day up to `end`."""
+    end: date  # first day not covered, the next month's first day once complete
+    keys: np.ndarray  # (series,) V32, sorted
+    opening: np.ndarray  # (series, 3) int32 balances before the first day
+    offsets: np.ndarray  # (series + 1,) int64 first change record of each series
+    days: np.ndarray  # (records,) uint8 day of the month, from 0
+    changes: np.ndarray  # (records, 4) int32 balances at the day's close, then its movements
+
+
+class BalanceWindow(NamedTuple):
+    """Daily balances of some series over consecutive days from `start`."""
+    start: date
+    keys: np.ndarray  # (series,) V32
+    opening: np.ndarray  # (series, 3) balances before the first day
+    balances: np.ndarray  # (series, days, 3) balances at each day's close
+    counts: np.ndarray  # (series, days) movements on each day
+
+
+def next_month(day: date) -> date:
+    """First day of the month after `day`'s."""
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def daily_balances(
+    previous: np.ndarray,
+    has_previous: np.ndarray,
+    closing: np.ndarray,
+    has_closing: np.ndarray,
+    deltas: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Balances before and at the close of each day of a window.
+
+    On hand rolls forward from the previous snapshot by the day's signed
+    movements; a series without one is rolled backwards from its closing
+    balance instead. Allocated and in transit are only known as of the
+    close of the window, so earlier days carry the previous snapshot's
+    values, or the closing ones for series without a snapshot. The last
+    day takes the closing balances where known, which absorbs changes
+    made without a movement (e.g. inventory edits).
+
+    Args:
+        previous, has_previous: (series, 3) last snapshot of each series.
+        closing, has_closing: (series, 3) balances at the window's close.
+        deltas: (series, days) signed movement quantities per day.
+
+    Returns:
+        (opening, balances): (series, 3) and (series, days, 3) int64.
+    """
+    totals = np.cumsum(deltas, axis=1, dtype=np.int64)
+    opening = np.where(has_previous[:, None], previous, np.where(has_closing[:, None], closing, 0)).astype(np.int64)
+    opening[:, 0] = np.where(
+        has_previous, previous[:, 0], np.where(has_closing, closing[:, 0] - totals[:, -1], 0)
+    )
+    balances = np.repeat(opening[:, None, :], deltas.shape[1], axis=1)
+    balances[:, :, 0] += totals
+    balances[has_closing, -1] = closing[has_closing]
+    return opening, balances
+
+
+def month_records(window: BalanceWindow, month: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """The part of a window inside a month, as change records.
+
+    Returns:
+        (keys, opening, record_keys, record_days, changes): the window's
+        series with their balances before the month's first day in the
+        window, and the change records of those days.
+    """
+    first = max((month - window.start).days, 0)
+    stop = min((next_month(month) - window.start).days, window.counts.shape[1])
+    opening = window.opening if first == 0 else window.balances[:, first - 1]
+    balances = window.balances[:, first:stop]
+    counts = window.counts[:, first:stop]
+    before = np.concatenate([opening[:, None], balances[:, :-1]], axis=1)
+    rows, days = np.nonzero((balances != before).any(axis=2) | (counts > 0))
+    changes = np.concatenate([balances[rows, days], counts[rows, days, None]], axis=1).astype(np.int32)
+    day_of_month = days + (window.start + timedelta(days=first) - month).days
+    return window.keys, opening.astype(np.int32), window.keys[rows], day_of_month.astype(np.uint8), changes
+
+
+def build_segment(
+    end: date,
+    keys: Sequence[np.ndarray],
+    opening: Sequence[np.ndarray],
+    record_keys: Sequence[np.ndarray],
+    record_days: Sequence[np.ndarray],
+    changes: Sequence[np.ndarray]
+) -> BalanceSegment:
+    """Segment from parts of series and change records, in any order.
+
+    A series in several parts takes the opening of its first one; its
+    change records must be on distinct days.
+    """
+    all_keys = np.concatenate(keys) if keys else np.zeros(0, dtype="V32")
+    unique, first = np.unique(all_keys, return_index=True)
+    all_opening = np.concatenate(opening) if opening else np.zeros((0, 3), dtype=np.int32)
+    record_rows = np.searchsorted(unique, np.concatenate(record_keys)) if record_keys else np.zeros(0, dtype=np.int64)
+    all_days = np.concatenate(record_days) if record_days else np.zeros(0, dtype=np.uint8)
+    all_changes = np.concatenate(changes) if changes else np.zeros((0, 4), dtype=np.int32)
+    order = np.lexsort((all_days, record_rows))
+    return BalanceSegment(
+        end=end,
+        keys=unique,
+        opening=np.ascontiguousarray(all_opening[first], dtype=np.int32),
+        offsets=np.searchsorted(record_rows[order], np.arange(len(unique) + 1)).astype(np.int64),
+        days=all_days[order],
+        changes=np.ascontiguousarray(all_changes[order]),
+    )
+
+
+def segment_parts(segment: BalanceSegment) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """A stored segment as (keys, opening, record_keys, record_days, changes) for `build_segment`."""
+    counts = np.diff(segment.offsets)
+    return (
+        np.asarray(segment.keys), np.asarray(segment.opening), np.repeat(segment.keys, counts),
+        np.asarray(segment.days), np.asarray(segment.changes)
+    )
+
+
+def closing_balances(segment: BalanceSegment, rows: np.ndarray) -> np.ndarray:
+    """(rows, 3) balances of some series at the segment's end."""
+    starts, stops = segment.offsets[rows], segment.offsets[rows + 1]
+    changed = stops > starts
+    closing = np.array(segment.opening[rows], dtype=np.int64)
+    closing[changed] = segment.changes[stops[changed] - 1, :3]
+    return closing
+
+
+def item_rows(segment: BalanceSegment, item_ids: Sequence[Any], location_id: Optional[Any] = None) -> np.ndarray:
+    """Rows of the series of some items (at one location if given)."""
+    if not len(segment.keys):
+        return np.zeros(0, dtype=np.int64)
+    if location_id is not None:
+        keys = np.array([series_key(item_id, location_id) for item_id in item_ids], dtype="V32")
+        rows = np.minimum(np.searchsorted(segment.keys, keys), len(segment.keys) - 1)
+        return rows[segment.keys[rows] == keys]
+    prefixes = [uuid.UUID(str(item_id)).bytes for item_id in item_ids]
+    lower = np.searchsorted(segment.keys, np.array([prefix + bytes(16) for prefix in prefixes], dtype="V32"))
+    upper = np.searchsorted(segment.keys, np.array([prefix + b"\xff" * 16 for prefix in prefixes], dtype="V32"), side="right")
+    return np.concatenate([np.arange(a, b) for a, b in zip(lower, upper)])
+
+
+def series_days(segment: BalanceSegment, month: date, row: int) -> np.ndarray:
+    """(days, 4) balances and movements of one series on each day of the segment."""
+    start, stop = segment.offsets[row], segment.offsets[row + 1]
+    days = np.asarray(segment.days[start:stop], dtype=np.int64)
+    changes = np.asarray(segment.changes[start:stop], dtype=np.int64)
+    n_days = (segment.end - month).days
+    latest = np.searchsorted(days, np.arange(n_days), side="right") - 1
+    values = np.zeros((n_days, 4), dtype=np.int64)
+    values[:, :3] = segment.opening[row]
+    values[latest >= 0, :3] = changes[latest[latest >= 0], :3]
+    values[days, 3] = changes[:, 3]
+    return values
+
+
+class BalanceSnapshotStore(ArrayStore):
+    """Monthly balance segments of one organization, one versioned directory per month."""
+
+    state_type = BalanceSegment
+    default_root = BALANCE_SNAPSHOT_DIR
+
+    def __init__(self, organization_id: Any, root: Optional[str] = None):
+        super().__init__(os.path.join(root or self.default_root, str(organization_id)))
+
+    def _directory(self, month: date) -> str:
+        return os.path.join(self.root, month.strftime("%Y-%m"))
+
+    def months(self) -> List[date]:
+        """First days of the months with a segment, oldest first."""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            date.fromisoformat(f"{name}-01") for name in names
+            if os.path.exists(os.path.join(self.root, name, "CURRENT"))
+        )
+
+    def segment(self, month: date) -> Optional[BalanceSegment]:
+        """A month's segment, memory-mapped once per version and process; None if there is none."""
+        version = self.version(month)
+        if version is None:
+            return None
+        directory = self._directory(month)
+        cached = _segments.get(directory)
+        if cached is None or cached[0] != version:
+            cached = _segments[directory] = (version, self.load(month, mmap=True))
+        return cached[1]
+
+    def mark_stale(self, day: date) -> None:
+        """Flag the snapshots from `day` on for rebuilding by the next run.
+
+        Every mark is its own file, so concurrent marks are never lost and
+        a run only clears the marks it has seen.
+        """
+        directory = os.path.join(self.root, STALE_MARKS)
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"{day.isoformat()}_{uuid.uuid4().hex}"), "w").close()
+
+    def stale_marks(self) -> List[str]:
+        """Names of the pending stale marks."""
+        try:
+            return os.listdir(os.path.join(self.root, STALE_MARKS))
+        except FileNotFoundError:
+            return []
+
+    def clear_stale(self, marks: Sequence[str]) -> None:
+        """Remove stale marks once their days are rebuilt."""
+        for mark in marks:
+            try:
+                os.remove(os.path.join(self.root, STALE_MARKS, mark))
+            except FileNotFoundError:
+                pass
+
+
+def stale_since(marks: Sequence[str]) -> Optional[date]:
+    """Earliest day flagged by some stale marks, None without any."""
+    return min((date.fromisoformat(mark[:10]) for mark in marks), default=None)
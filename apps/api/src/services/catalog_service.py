@@ -0,0 +1,249 @@
+"""
+Catalog synchronization service for StockSense AI.
+
+Bulk upserts items keyed by SKU and locations keyed by code, as sent by
+the nightly ERP catalog sync. Records are processed in chunks: each
+record's content hash is compared with the stored one so unchanged
+records cost one indexed lookup and no validation or write, and the rest are
+written with a multi-row INSERT ... ON CONFLICT DO UPDATE. A status is
+produced for every record as soon as its chunk is committed.
+"""
+
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Type
+
+from pydantic import BaseModel as Schema, ValidationError
+from sqlalchemy import select, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.cache import get_response_cache
+from ..core.serialization import dumps
+from ..models.inventory import Item, Location
+from ..models.user import User
+from ..schemas.inventory import ItemUpsert, LocationUpsert
+
+logger = structlog.get_logger()
+
+# Records per INSERT ... ON CONFLICT statement and transaction
+BULK_CHUNK_ROWS = 1000
+
+# Synced datasets: model, unique key and the schema records are validated with
+CATALOG_DATASETS = {
+    "items": (Item, "sku", ItemUpsert),
+    "locations": (Location, "code", LocationUpsert),
+}
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Stable hash of a record as received, independent of key order."""
+    return hashlib.blake2b(dumps(record, sort_keys=True), digest_size=16).hexdigest()
+
+
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+
+
+class CatalogService:
+    """Service for bulk catalog synchronization."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def upsert_items(
+        self,
+        records: AsyncIterator[Dict[str, Any]],
+        user: User,
+        chunk_size: int = BULK_CHUNK_ROWS
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Upsert items by SKU, yielding a status per record."""
+        async for status in self._upsert(Item, "sku", ItemUpsert, records, user, chunk_size):
+            yield status
+
+    async def upsert_locations(
+        self,
+        records: AsyncIterator[Dict[str, Any]],
+        user: User,
+        chunk_size: int = BULK_CHUNK_ROWS
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Upsert locations by code, yielding a status per record.
+
+        `parent_code` must name a location that already exists or appears
+        in an earlier chunk.
+        """
+        async for status in self._upsert(Location, "code", LocationUpsert, records, user, chunk_size):
+            yield status
+
+    async def upsert_validated(
+        self,
+        dataset: str,
+        records: AsyncIterator[Dict[str, Any]],
+        user: User,
+        chunk_size: int = BULK_CHUNK_ROWS
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Upsert records that were already validated, yielding a status per record.
+
+        For callers that validate in bulk, such as file imports. Records must
+        carry every field of the dataset's upsert schema, defaults included.
+        """
+        model, key, schema = CATALOG_DATASETS[dataset]
+        async for status in self._upsert(model, key, schema, records, user, chunk_size, validated=True):
+            yield status
+
+    async def _upsert(
+        self,
+        model,
+        key: str,
+        schema: Type[Schema],
+        records: AsyncIterator[Dict[str, Any]],
+        user: User,
+        chunk_size: int,
+        validated: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        written = 0
+        try:
+            chunk: List[Dict[str, Any]] = []
+            async for record in records:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    statuses = await self._upsert_chunk(model, key, schema, chunk, user, validated)
+                    written += sum(status["status"] in ("created", "updated") for status in statuses)
+                    for status in statuses:
+                        yield status
+                    chunk = []
+            if chunk:
+                statuses = await self._upsert_chunk(model, key, schema, chunk, user, validated)
+                written += sum(status["status"] in ("created", "updated") for status in statuses)
+                for status in statuses:
+                    yield status
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to bulk upsert", table=model.__tablename__, error=str(e))
+            raise
+
+        finally:
+            if written:
+                await get_response_cache().invalidate(user.organization_id)
+            logger.info("Bulk upsert finished", table=model.__tablename__, written=written)
+
+    async def _upsert_chunk(
+        self,
+        model,
+        key: str,
+        schema: Type[Schema],
+        chunk: List[Any],
+        user: User,
+        validated: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Diff, validate and write one chunk; returns statuses in input order.
+
+        Records are hashed as received and compared with the stored hash
+        before validation, so an unchanged record is never validated again:
+        it was valid when it was stored.
+        """
+        statuses: List[Dict[str, Any]] = [None] * len(chunk)
+        pending: Dict[Any, int] = {}  # key -> index of the record, last one wins
+        for index, record in enumerate(chunk):
+            if not isinstance(record, dict):
+                statuses[index] = {"key": None, "status": "invalid", "error": "Record must be an object"}
+                continue
+            if "_error" in record:
+                statuses[index] = {"key": None, "status": "invalid", "error": record["_error"]}
+                continue
+            record_key = record.get(key)
+            if not isinstance(record_key, str) or not record_key:
+                statuses[index] = {"key": None, "status": "invalid", "error": f"{key}: field required"}
+                continue
+            if record_key in pending:
+                # The same key twice in one statement is an error for ON CONFLICT
+                statuses[pending[record_key]] = {"key": record_key, "status": "duplicate",
+                                                 "error": "Superseded by a later record"}
+            pending[record_key] = index
+
+        existing = await self._existing(model, key, list(pending)) if pending else {}
+
+        changed: Dict[Any, tuple] = {}  # key -> (index, digest, validated values)
+        for record_key, index in pending.items():
+            digest = content_hash(chunk[index])
+            stored = existing.get(record_key)
+            if stored is not None and str(stored[1]) != str(user.organization_id):
+                statuses[index] = {"key": record_key, "status": "conflict",
+                                   "error": f"{key} belongs to another organization"}
+                continue
+            if stored is not None and stored[0] == digest:
+                statuses[index] = {"key": record_key, "status": "unchanged"}
+                continue
+            try:
+                values = dict(chunk[index]) if validated else schema(**chunk[index]).dict()
+            except ValidationError as e:
+                statuses[index] = {"key": record_key, "status": "invalid", "error": _error_message(e)}
+                continue
+            changed[record_key] = (index, digest, values)
+
+        parents = {}
+        if model is Location:
+            parent_codes = {values["parent_code"] for _, _, values in changed.values() if values["parent_code"]}
+            if parent_codes:
+                parents = await self._parent_ids(parent_codes, user)
+
+        now = datetime.utcnow()
+        rows = []
+        for record_key, (index, digest, values) in changed.items():
+            if model is Location:
+                parent_code = values.pop("parent_code")
+                values["parent_id"] = parents.get(parent_code) if parent_code else None
+                if parent_code and values["parent_id"] is None:
+                    statuses[index] = {"key": record_key, "status": "invalid",
+                                       "error": f"Unknown parent_code: {parent_code}"}
+                    continue
+            statuses[index] = {"key": record_key, "status": "updated" if record_key in existing else "created"}
+            rows.append({
+                **values,
+                "id": uuid.uuid4(),
+                "organization_id": user.organization_id,
+                "content_hash": digest,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        if rows:
+            await self._write(model, key, rows)
+        return statuses
+
+    async def _existing(self, model, key: str, keys: List[str]) -> Dict[str, tuple]:
+        """Stored (content hash, organization id) for the given keys."""
+        key_column = getattr(model, key)
+        result = await self.db.execute(
+            select(key_column, model.content_hash, model.organization_id).where(key_column.in_(keys))
+        )
+        return {row[0]: (row[1], row[2]) for row in result}
+
+    async def _parent_ids(self, codes, user: User) -> Dict[str, Any]:
+        """Ids of the organization's locations with the given codes."""
+        result = await self.db.execute(
+            select(Location.code, Location.id).where(
+                and_(Location.code.in_(codes), Location.organization_id == user.organization_id)
+            )
+        )
+        return dict(result.all())
+
+    async def _write(self, model, key: str, rows: List[Dict[str, Any]]) -> None:
+        """Multi-row INSERT ... ON CONFLICT DO UPDATE for one chunk, committed."""
+        table = model.__table__
+        statement = insert(table)
+        update_columns = [name for name in rows[0] if name not in (key, "id", "organization_id", "created_at")]
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[key]],
+            set_={name: statement.excluded[name] for name in update_columns},
+            # Never touch another organization's rows or rewrite identical ones
+            where=and_(
+                model.organization_id == statement.excluded.organization_id,
+                table.c.content_hash.is_distinct_from(statement.excluded.content_hash)
+            )
+        )
+        await self.db.execute(statement.values(rows))
+        await self.db.commit()
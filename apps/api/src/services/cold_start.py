@@ -0,0 +1,269 @@
+"""
+Cold-start forecasting for StockSense AI.
+
+New items have no shipments, so there is nothing for a per-series model
+to fit. They borrow the demand of similar established items instead:
+
+- Embedding: an item's category, subcategory, brand, attributes and tags
+  become tokens; each token maps to a fixed random unit vector (seeded by
+  a hash of the token) and an item's embedding is the field-weighted sum
+  of its token vectors, normalized. Cosine similarity then approximates
+  the weighted share of tokens two items have in common.
+- Index: an inverted-file index over the embeddings of established
+  items. Spherical k-means on a sample gives the list centroids; items
+  are stored grouped by their nearest centroid (float16), and a query
+  scans the INDEX_PROBES lists whose centroids are closest.
+- Profiles: per established item, its mean daily demand per location
+  (level) and weekday factors over the last PROFILE_WINDOW_DAYS.
+
+A new item's forecast is the similarity-weighted level and weekday shape
+of its COLD_START_NEIGHBOURS nearest items; the interval comes from the
+spread of the neighbours' levels.
+"""
+
+from datetime import date
+import hashlib
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from ..core.storage import DATA_DIR
+from .demand_history import DemandHistory
+from .forecast_state import ArrayStore
+
+SIMILAR_ITEM_INDEX_DIR = os.path.join(DATA_DIR, "stocksense-similar-items")
+
+EMBEDDING_DIM = 64
+
+# Weight of each attribute field in the embedding; attributes and tags
+# share theirs among the item's entries
+FIELD_WEIGHTS = {"category": 3.0, "subcategory": 2.0, "brand": 1.5, "attributes": 1.5, "tags": 1.0}
+
+# Items per index list (square root rule), training sample and k-means
+# iterations for the list centroids
+INDEX_LIST_FACTOR = 1.0
+INDEX_TRAIN_SAMPLE = 100_000
+INDEX_KMEANS_ITERATIONS = 8
+
+# Lists scanned per query
+INDEX_PROBES = 16
+
+# Items embedded or assigned to lists per matrix product
+INDEX_BLOCK_ROWS = 16384
+
+COLD_START_NEIGHBOURS = 10
+
+# Days of demand an item's profile is taken over, and the days with
+# shipments that make it established
+PROFILE_WINDOW_DAYS = 91
+MIN_ACTIVE_DAYS = 14
+
+
+class SimilarItemIndex(NamedTuple):
+    """Embeddings and demand profiles of established items, grouped by index list."""
+    end: date
+    keys: np.ndarray  # V16 item ids
+    centroids: np.ndarray  # (lists, dim) float32, unit length
+    offsets: np.ndarray  # (lists + 1,) int64, rows of each list
+    vectors: np.ndarray  # (items, dim) float16, unit length
+    levels: np.ndarray  # float32 mean daily demand per location
+    shapes: np.ndarray  # (items, 7) float32 weekday factors, Monday first
+
+
+class ItemProfiles(NamedTuple):
+    """Demand profiles of the established items of a demand history."""
+    item_ids: List[str]
+    levels: np.ndarray
+    shapes: np.ndarray
+
+
+def item_tokens(
+    category: Optional[str],
+    subcategory: Optional[str],
+    brand: Optional[str],
+    attributes: Optional[Dict[str, Any]],
+    tags: Optional[Iterable[Any]]
+) -> List[Tuple[str, float]]:
+    """Weighted tokens of an item's descriptive fields."""
+    tokens = []
+    if category:
+        tokens.append((f"c:{category.lower()}", FIELD_WEIGHTS["category"]))
+        if subcategory:
+            tokens.append((f"s:{category.lower()}/{subcategory.lower()}", FIELD_WEIGHTS["subcategory"]))
+    if brand:
+        tokens.append((f"b:{brand.lower()}", FIELD_WEIGHTS["brand"]))
+    scalars = [
+        (name, value) for name, value in (attributes or {}).items()
+        if isinstance(value, (str, int, float, bool)) and value != ""
+    ]
+    for name, value in scalars:
+        tokens.append((f"a:{name.lower()}={str(value).lower()}", FIELD_WEIGHTS["attributes"] / np.sqrt(len(scalars))))
+    tags = [str(tag).lower() for tag in (tags or []) if tag]
+    for tag in tags:
+        tokens.append((f"t:{tag}", FIELD_WEIGHTS["tags"] / np.sqrt(len(tags))))
+    return tokens
+
+
+class ItemEmbedder:
+    """Embeds token lists as the weighted sum of per-token random unit vectors."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self._codes: Dict[str, int] = {}
+        self._vectors: List[np.ndarray] = []
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def embed(self, items: Sequence[List[Tuple[str, float]]]) -> np.ndarray:
+        """(items, dim) float32 unit embeddings; items without tokens are zero."""
+        indptr = np.zeros(len(items) + 1, dtype=np.int64)
+        codes: List[int] = []
+        weights: List[float] = []
+        for row, tokens in enumerate(items):
+            for token, weight in tokens:
+                code = self._codes.get(token)
+                if code is None:
+                    code = self._codes[token] = len(self._codes)
+                    self._vectors.append(self._token_vector(token))
+                codes.append(code)
+                weights.append(weight)
+            indptr[row + 1] = len(codes)
+        counts = sparse.csr_matrix((np.asarray(weights, dtype=np.float32), np.asarray(codes, dtype=np.int64), indptr),
+                                   shape=(len(items), len(self._codes)))
+        table = np.stack(self._vectors) if self._vectors else np.zeros((0, self.dim), dtype=np.float32)
+        return normalize(np.asarray(counts @ table, dtype=np.float32))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def demand_profiles(history: DemandHistory, min_active_days: int = MIN_ACTIVE_DAYS) -> ItemProfiles:
+    """Level and weekday factors of the items of a history with enough days of demand."""
+    item_ids, rows = np.unique([item_id for item_id, _ in history.keys], return_inverse=True)
+    totals = np.zeros((len(item_ids), history.days))
+    np.add.at(totals, rows, np.nan_to_num(history.values))
+    locations = np.bincount(rows, minlength=len(item_ids))
+    established = np.count_nonzero(totals > 0, axis=1) >= min_active_days
+    totals, locations = totals[established], locations[established]
+
+    levels = totals.sum(axis=1) / (locations * history.days)
+    weekday = (history.start.weekday() + np.arange(history.days)) % 7
+    by_weekday = np.stack([totals[:, weekday == day].mean(axis=1) for day in range(7)], axis=1)
+    overall = totals.mean(axis=1, keepdims=True)
+    shapes = np.divide(by_weekday, overall, out=np.ones_like(by_weekday), where=overall > 0)
+    return ItemProfiles(item_ids[established].tolist(), levels.astype(np.float32), shapes.astype(np.float32))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), INDEX_BLOCK_ROWS):
+        block = vectors[start:start + INDEX_BLOCK_ROWS].astype(np.float32)
+        lists[start:start + INDEX_BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return lists
+
+
+def build_index(
+    keys: np.ndarray,
+    vectors: np.ndarray,
+    levels: np.ndarray,
+    shapes: np.ndarray,
+    end: date,
+    seed: int = 0
+) -> SimilarItemIndex:
+    """Inverted-file index of item embeddings (unit rows) and their demand profiles."""
+    rng = np.random.default_rng(seed)
+    n_items = len(vectors)
+    n_lists = max(1, min(int(INDEX_LIST_FACTOR * np.sqrt(n_items)), n_items))
+    sample = vectors[np.sort(rng.choice(n_items, min(INDEX_TRAIN_SAMPLE, n_items), replace=False))].astype(np.float32)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+    for _ in range(INDEX_KMEANS_ITERATIONS):
+        assigned = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assigned, sample)
+        empty = np.bincount(assigned, minlength=n_lists) == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = normalize(sums)
+
+    lists = _assign(vectors, centroids)
+    order = np.argsort(lists, kind="stable")
+    offsets = np.zeros(n_lists + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(lists, minlength=n_lists))
+    return SimilarItemIndex(
+        end=end,
+        keys=np.asarray(keys, dtype="V16")[order],
+        centroids=centroids,
+        offsets=offsets,
+        vectors=vectors[order].astype(np.float16),
+        levels=np.asarray(levels, dtype=np.float32)[order],
+        shapes=np.asarray(shapes, dtype=np.float32)[order],
+    )
+
+
+def search(
+    index: SimilarItemIndex,
+    query: np.ndarray,
+    k: int = COLD_START_NEIGHBOURS,
+    probes: int = INDEX_PROBES,
+    exclude: Optional[bytes] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows and cosine similarities of the `k` nearest indexed items of a query embedding.
+
+    Only the `probes` lists with the closest centroids are scanned, so
+    results are approximate; fewer than `k` rows come back if those lists
+    hold fewer items. `exclude` skips an item id (the query item itself).
+    """
+    nearest = np.argsort(-(index.centroids @ query))[:probes]
+    rows = np.concatenate([np.arange(index.offsets[lst], index.offsets[lst + 1]) for lst in nearest])
+    if exclude is not None:
+        rows = rows[index.keys[rows] != np.void(exclude)]
+    similarities = index.vectors[rows].astype(np.float32) @ query
+    if len(rows) > k:
+        top = np.argpartition(-similarities, k - 1)[:k]
+        rows, similarities = rows[top], similarities[top]
+    order = np.argsort(-similarities, kind="stable")
+    return rows[order], similarities[order]
+
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, q: float) -> float:
+    order = np.argsort(values)
+    cumulative = np.cumsum(weights[order]) - 0.5 * weights[order]
+    return float(np.interp(q * weights.sum(), cumulative, values[order]))
+
+
+def neighbour_forecast(
+    index: SimilarItemIndex,
+    rows: np.ndarray,
+    similarities: np.ndarray,
+    start: date,
+    horizon: int,
+    interval: float
+) -> Dict[str, np.ndarray]:
+    """Point forecast and central interval from the neighbours' profiles, daily from `start`."""
+    weights = np.clip(similarities, 0, None) ** 2
+    if weights.sum() <= 0:
+        weights = np.ones(len(rows))
+    weights = weights / weights.sum()
+    levels = index.levels[rows].astype(np.float64)
+    shape = weights @ index.shapes[rows]
+    weekday = (start.weekday() + np.arange(horizon)) % 7
+    tail = (1 - interval) / 2
+    return {
+        "point": float(weights @ levels) * shape[weekday],
+        "lower": weighted_quantile(levels, weights, tail) * shape[weekday],
+        "median": weighted_quantile(levels, weights, 0.5) * shape[weekday],
+        "upper": weighted_quantile(levels, weights, 1 - tail) * shape[weekday],
+    }
+
+
+class SimilarItemIndexStore(ArrayStore):
+    """Similar-item index of each organization's established items."""
+
+    state_type = SimilarItemIndex
+    default_root = SIMILAR_ITEM_INDEX_DIR
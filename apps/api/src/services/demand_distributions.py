@@ -0,0 +1,85 @@
+"""
+Discrete demand distributions for StockSense AI.
+
+Shared helpers for building per-period demand pmfs and for quantizing
+continuous profile parameters so that similar item-locations share cached
+policy and lead-time computations.
+"""
+
+import math
+
+import numpy as np
+
+# Probability mass ignored in the upper tail of demand distributions
+TAIL_EPSILON = 1e-9
+
+# Significant digits kept when quantizing profiles for memoization
+PROFILE_SIGNIFICANT_DIGITS = 2
+
+_norm_cdf = np.vectorize(lambda x: 0.5 * (1.0 + math.erf(x / math.sqrt(2.0))))
+
+
+def poisson_pmf(mean: float, tail: float = TAIL_EPSILON) -> np.ndarray:
+    """Poisson probability mass function truncated at the upper tail."""
+    upper = int(math.ceil(mean + 10 * math.sqrt(mean) + 10))
+    k = np.arange(upper + 1)
+    log_pmf = -mean + k * math.log(mean) - np.concatenate(([0.0], np.cumsum(np.log(k[1:]))))
+    pmf = np.exp(log_pmf)
+    return truncate_pmf(pmf, tail)
+
+
+def normal_pmf(mean: float, std: float, tail: float = TAIL_EPSILON) -> np.ndarray:
+    """Discretized normal pmf on the non-negative integers.
+
+    Mass below zero is folded into zero so the mean is not shifted upwards.
+    """
+    if std <= 0:
+        pmf = np.zeros(int(round(mean)) + 1)
+        pmf[-1] = 1.0
+        return pmf
+    upper = int(math.ceil(mean + 7 * std)) + 1
+    edges = np.arange(upper + 1) + 0.5
+    cdf = _norm_cdf((edges - mean) / std)
+    pmf = np.diff(np.concatenate(([0.0], cdf)))
+    return truncate_pmf(pmf, tail)
+
+
+def demand_pmf(distribution: str, mean: float, std: float) -> np.ndarray:
+    """Per-period demand pmf, falling back to Poisson when a normal is too slow to discretize."""
+    if distribution == "poisson":
+        return poisson_pmf(mean)
+    pmf = normal_pmf(mean, std)
+    if pmf[0] >= 1.0 - TAIL_EPSILON:
+        return poisson_pmf(mean)
+    return pmf
+
+
+def truncate_pmf(pmf: np.ndarray, tail: float = TAIL_EPSILON) -> np.ndarray:
+    """Drop the negligible upper tail and renormalize."""
+    cumulative = np.cumsum(pmf)
+    last = int(np.searchsorted(cumulative, cumulative[-1] * (1.0 - tail))) + 1
+    pmf = pmf[:last]
+    return pmf / pmf.sum()
+
+
+def choose_distribution(demand_mean: float, demand_std: float) -> str:
+    """Pick Poisson for slow movers and for low volumes whose variance is close to their mean."""
+    if demand_mean < 1:
+        return "poisson"
+    if demand_mean <= 20 and abs(demand_std ** 2 / demand_mean - 1.0) <= 0.25:
+        return "poisson"
+    return "normal"
+
+
+def round_significant(value: float, digits: int = PROFILE_SIGNIFICANT_DIGITS) -> float:
+    """Round to a number of significant digits."""
+    if value == 0 or not math.isfinite(value):
+        return value
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def round_significant_array(values: np.ndarray, digits: int = PROFILE_SIGNIFICANT_DIGITS) -> np.ndarray:
+    """Vectorized counterpart of round_significant."""
+    magnitude = np.floor(np.log10(np.where(values == 0, 1.0, np.abs(values))))
+    scale = 10.0 ** (digits - 1 - magnitude)
+    return np.round(values * scale) / scale
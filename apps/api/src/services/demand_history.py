@@ -0,0 +1,116 @@
+"""
+Daily demand history for StockSense AI.
+
+Loads shipment movements as a dense (series, days) matrix of units per
+day, one row per item-location, which the anomaly detector and the
+forecasting code work on with vectorized array operations.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import stream_partitions
+from ..models.inventory import Item, InventoryMovement
+
+# Movement type whose quantities count as demand
+DEMAND_MOVEMENT_TYPE = "shipment"
+
+
+class DemandHistory(NamedTuple):
+    """Units shipped per day and series, day 0 being `start`."""
+    keys: List[Tuple[str, str]]  # (item_id, location_id) per row
+    start: date
+    values: np.ndarray  # float32, (series, days)
+
+    @property
+    def days(self) -> int:
+        return self.values.shape[1]
+
+    def index(self) -> Dict[Tuple[str, str], int]:
+        """Row of each (item_id, location_id)."""
+        return {key: row for row, key in enumerate(self.keys)}
+
+
+def daily_matrix(series: np.ndarray, days: np.ndarray, units: np.ndarray, n_series: int, n_days: int) -> np.ndarray:
+    """Sum units into a (series, days) float32 matrix; out-of-range days are dropped."""
+    inside = (days >= 0) & (days < n_days)
+    flat = series[inside].astype(np.int64) * n_days + days[inside]
+    totals = np.bincount(flat, weights=units[inside], minlength=n_series * n_days)
+    return totals.astype(np.float32).reshape(n_series, n_days)
+
+
+async def load_daily_demand(
+    db: AsyncSession,
+    item_ids: Sequence[Any],
+    days: int,
+    end: Optional[date] = None
+) -> DemandHistory:
+    """Daily demand of the given items over the `days` days before `end`.
+
+    Every item-location with at least one shipment in the window gets a
+    row; days without shipments are zero.
+
+    Args:
+        item_ids: Items to load, typically one block of an organization's
+            catalog so the matrix stays bounded.
+        end: First day not included, today by default.
+    """
+    end = end or datetime.utcnow().date()
+    start = end - timedelta(days=days)
+    day = func.date(InventoryMovement.created_at)
+    query = (
+        select(
+            InventoryMovement.item_id,
+            InventoryMovement.location_id,
+            day,
+            func.sum(func.abs(InventoryMovement.quantity)),
+        )
+        .where(
+            and_(
+                InventoryMovement.item_id.in_(item_ids),
+                InventoryMovement.type == DEMAND_MOVEMENT_TYPE,
+                InventoryMovement.created_at >= datetime.combine(start, datetime.min.time()),
+                InventoryMovement.created_at < datetime.combine(end, datetime.min.time())
+            )
+        )
+        .group_by(InventoryMovement.item_id, InventoryMovement.location_id, day)
+    )
+
+    keys: Dict[Tuple[str, str], int] = {}
+    series: List[int] = []
+    offsets: List[int] = []
+    units: List[float] = []
+    async for partition in stream_partitions(db, query):
+        for item_id, location_id, shipped_on, quantity in partition:
+            series.append(keys.setdefault((str(item_id), str(location_id)), len(keys)))
+            offsets.append((shipped_on - start).days)
+            units.append(float(quantity))
+
+    values = daily_matrix(
+        np.asarray(series, dtype=np.int64), np.asarray(offsets, dtype=np.int64),
+        np.asarray(units, dtype=np.float64), len(keys), days
+    )
+    return DemandHistory(list(keys), start, values)
+
+
+async def item_blocks(db: AsyncSession, organization_id: Any, block_items: int) -> AsyncIterator[List[Any]]:
+    """Ids of an organization's items in blocks, paged by id.
+
+    Each block is a separate keyset query, so callers may commit between
+    blocks (which would close a server-side cursor).
+    """
+    last = None
+    while True:
+        query = select(Item.id).where(Item.organization_id == organization_id)
+        if last is not None:
+            query = query.where(Item.id > last)
+        result = await db.execute(query.order_by(Item.id).limit(block_items))
+        block = list(result.scalars().all())
+        if not block:
+            return
+        yield block
+        last = block[-1]
@@ -0,0 +1,172 @@
+"""
+Forecast drift monitor for StockSense AI.
+
+Keeps running statistics of each series' forecast errors (actual minus
+forecast) so a degrading model is noticed as soon as the actuals come
+in, without recomputing accuracy over the history:
+
+- Welford running mean and variance of the residuals.
+- Tracking signal: exponentially smoothed error over the mean absolute
+  error; it moves towards +1 or -1 when forecasts turn biased. (A plain
+  cumulative sum would random-walk away even for unbiased forecasts.)
+- Two-sided CUSUM of the residuals standardized by the running standard
+  deviation, which picks up sustained shifts quickly.
+
+Each new actual updates its series in O(1), vectorized across series.
+Statistics are float32 arrays, one row per item-location, stored like
+the smoothing state (see forecast_state.ArrayStore).
+"""
+
+from datetime import date
+import os
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from ..core.storage import DATA_DIR
+from .forecast_state import ArrayStore, key_ids
+
+DRIFT_STATE_DIR = os.path.join(DATA_DIR, "stocksense-drift-monitor")
+
+# Residuals a series needs before it can trip any threshold
+MIN_OBSERVATIONS = 14
+
+# Absolute tracking signal that trips
+TRACKING_SIGNAL_LIMIT = 0.8
+
+# CUSUM slack and decision interval, in standard deviations
+CUSUM_SLACK = 0.5
+CUSUM_LIMIT = 12.0
+
+# Smoothing of the error in the tracking signal
+TRACKING_ALPHA = 0.05
+
+class DriftStats(NamedTuple):
+    """Running error statistics of every series, through the day before `end`."""
+    end: date
+    keys: np.ndarray  # V32, as in the smoothing state
+    count: np.ndarray  # int32
+    mean: np.ndarray
+    m2: np.ndarray  # sum of squared deviations from the mean (Welford)
+    smoothed_error: np.ndarray
+    mae: np.ndarray
+    cusum_high: np.ndarray
+    cusum_low: np.ndarray
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(np.divide(self.m2, self.count - 1, out=np.zeros_like(self.m2), where=self.count > 1))
+
+    @property
+    def tracking_signal(self) -> np.ndarray:
+        return np.divide(self.smoothed_error, self.mae, out=np.zeros_like(self.smoothed_error), where=self.mae > 0)
+
+
+class ForecastDriftError(Exception):
+    """Raised when series' forecast errors trip a drift threshold."""
+
+    def __init__(self, stats: DriftStats, rows: np.ndarray, tests: Dict[str, np.ndarray]):
+        self.rows = rows
+        self.tests = tests
+        self.end = stats.end
+        self.keys = stats.keys[rows]
+        counts = ", ".join(f"{name} {int(tripped.sum())}" for name, tripped in tests.items())
+        super().__init__(f"Forecast drift in {len(rows)} series ({counts})")
+
+    def series(self) -> List[Tuple[str, str]]:
+        """(item_id, location_id) of the drifted series."""
+        return [key_ids(key) for key in self.keys.tolist()]
+
+
+def empty_stats(end: date, keys: np.ndarray) -> DriftStats:
+    """Statistics of series that have not seen any residual yet."""
+    n_series = len(keys)
+    arrays = {name: np.zeros(n_series, dtype=np.float32) for name in DriftStats._fields[3:]}
+    return DriftStats(end=end, keys=np.asarray(keys, dtype="V32"), count=np.zeros(n_series, dtype=np.int32), **arrays)
+
+
+def align_stats(stats: DriftStats, keys: np.ndarray) -> DriftStats:
+    """Statistics for `keys`, which extend the monitored keys at the end.
+
+    The forecast state only ever appends series, so the monitor follows
+    it by appending fresh statistics for the new rows.
+    """
+    n_new = len(keys) - len(stats.keys)
+    if n_new <= 0:
+        return stats
+    fresh = empty_stats(stats.end, keys[len(stats.keys):])
+    return DriftStats(stats.end, *(np.concatenate([a, b]) for a, b in zip(stats[1:], fresh[1:])))
+
+
+def record(stats: DriftStats, rows: np.ndarray, residuals: np.ndarray) -> DriftStats:
+    """Update the statistics with one new residual for each of `rows`.
+
+    Rows must be distinct; each residual costs a constant number of
+    operations. Arrays are updated in place.
+    """
+    if len(rows) == 0:
+        return stats
+    residuals = residuals.astype(np.float32)
+    count = stats.count[rows] + 1
+    mean = stats.mean[rows]
+    std = stats.std[rows]
+
+    # Standardize by the spread seen so far, before this residual; the
+    # CUSUM only starts once that spread rests on enough residuals
+    ready = (std > 0) & (count > MIN_OBSERVATIONS)
+    z = np.divide(residuals, std, out=np.zeros_like(residuals), where=ready)
+    stats.cusum_high[rows] = np.maximum(0, stats.cusum_high[rows] + z - CUSUM_SLACK)
+    stats.cusum_low[rows] = np.maximum(0, stats.cusum_low[rows] - z - CUSUM_SLACK)
+
+    delta = residuals - mean
+    mean = mean + delta / count
+    stats.m2[rows] += delta * (residuals - mean)
+    stats.mean[rows] = mean
+    stats.count[rows] = count
+
+    smoothed = stats.smoothed_error[rows]
+    stats.smoothed_error[rows] = smoothed + TRACKING_ALPHA * (residuals - smoothed)
+    stats.mae[rows] += (np.abs(residuals) - stats.mae[rows]) / count
+    return stats
+
+
+def record_residuals(stats: DriftStats, residuals: np.ndarray) -> DriftStats:
+    """Record a (series, days) matrix of residuals day by day; NaN cells are skipped."""
+    for day in range(residuals.shape[1]):
+        column = residuals[:, day]
+        rows = np.flatnonzero(~np.isnan(column))
+        record(stats, rows, column[rows])
+    return stats._replace(end=date.fromordinal(stats.end.toordinal() + residuals.shape[1]))
+
+
+def tripped_tests(stats: DriftStats) -> Dict[str, np.ndarray]:
+    """Boolean mask per drift test of the series that trip it."""
+    ready = stats.count >= MIN_OBSERVATIONS
+    return {
+        "tracking_signal": ready & (np.abs(stats.tracking_signal) > TRACKING_SIGNAL_LIMIT),
+        "cusum_high": ready & (stats.cusum_high > CUSUM_LIMIT),
+        "cusum_low": ready & (stats.cusum_low > CUSUM_LIMIT),
+    }
+
+
+def check_drift(stats: DriftStats) -> None:
+    """Raise ForecastDriftError if any series trips a drift threshold."""
+    tests = tripped_tests(stats)
+    drifted = np.logical_or.reduce(list(tests.values()))
+    rows = np.flatnonzero(drifted)
+    if len(rows):
+        raise ForecastDriftError(stats, rows, {name: mask[rows] for name, mask in tests.items()})
+
+
+def reset_series(stats: DriftStats, rows: np.ndarray) -> DriftStats:
+    """Start the given series afresh, e.g. after their model was retrained."""
+    for name in DriftStats._fields[2:]:
+        getattr(stats, name)[rows] = 0
+    return stats
+
+
+class DriftMonitorStore(ArrayStore):
+    """Drift statistics of each organization's series."""
+
+    state_type = DriftStats
+    default_root = DRIFT_STATE_DIR
@@ -0,0 +1,195 @@
+"""
+Feature store service for StockSense AI.
+
+Appends the days since the last append to the feature store (see
+feature_store): daily demand with flagged spikes masked, the items' list
+prices and the promotions entered so far. The first append backfills
+FEATURE_BACKFILL_DAYS. Model code reads features back point-in-time
+through `features`.
+
+Items carry only their current list price, so each append records the
+price of the day it runs: price history builds up from the first append
+on, and backfilled days all carry the price of the first append.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import stream_partitions
+from ..models.inventory import Item
+from ..models.promotion import Promotion
+from ..models.user import User
+from .anomaly_service import AnomalyService, mask_anomalies
+from .demand_history import item_blocks, load_daily_demand
+from .feature_store import (
+    FEATURE_LOOKAHEAD_DAYS, FeatureFrame, FeatureStore, PromotionSpan,
+    append_observed, empty_feature_state, next_origin, promotions, with_feature_series, write_lookahead
+)
+from .forecast_state import key_ids, series_key
+
+logger = structlog.get_logger()
+
+# Days of history the first append materializes
+FEATURE_BACKFILL_DAYS = 182
+
+# Items whose demand and prices are loaded together
+FEATURE_BLOCK_ITEMS = 2000
+
+ProgressCallback = Callable[[float, str], Awaitable[None]]
+
+
+class FeatureService:
+    """Service for the shared demand feature store."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def append_features(
+        self,
+        user: User,
+        end: Optional[date] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict[str, Any]:
+        """Materialize the features of every series up to `end` (today by default).
+
+        Days are appended in windows ending at lookahead origins, and the
+        lookahead partitions of each origin are written as known there.
+
+        Returns:
+            Days appended, series in the store and partitions written.
+        """
+        end = end or datetime.utcnow().date()
+        try:
+            store = FeatureStore()
+            state = store.load(user.organization_id) or empty_feature_state(end - timedelta(days=FEATURE_BACKFILL_DAYS))
+            days = (end - state.end).days
+            if days <= 0:
+                return {"days": 0, "series": len(state.keys), "partitions": 0}
+
+            series = [key_ids(key) for key in state.keys.tolist()]
+            spans = await self._promotions(user, state.end, end)
+            prices: Dict[str, float] = {}
+            written = 0
+
+            def write(as_of: Callable[[date], date]) -> Callable[[date, Any], None]:
+                def writer(day: date, table: Any) -> None:
+                    nonlocal written
+                    store.write_partition(user.organization_id, day, as_of(day), table)
+                    written += 1
+                return writer
+
+            while state.end < end:
+                window_end = next_origin(state.end, end)
+                window = (window_end - state.end).days
+                keys: List[bytes] = []
+                blocks: List[np.ndarray] = []
+                anomalies = AnomalyService(self.db)
+                async for item_ids in item_blocks(self.db, user.organization_id, FEATURE_BLOCK_ITEMS):
+                    prices.update(await self._list_prices(item_ids))
+                    history = await load_daily_demand(self.db, item_ids, window, window_end)
+                    if not history.keys:
+                        continue
+                    mask = await anomalies.load_mask(history, user)
+                    blocks.append(mask_anomalies(history.values, mask))
+                    keys.extend(series_key(item_id, location_id) for item_id, location_id in history.keys)
+
+                # Known series without shipments in the window had zero demand
+                state, rows = with_feature_series(state, keys)
+                series.extend(key_ids(key) for key in state.keys[len(series):].tolist())
+                values = np.zeros((len(state.keys), window), dtype=np.float32)
+                if blocks:
+                    values[rows] = np.concatenate(blocks)
+                list_price = np.array([prices.get(item_id, np.nan) for item_id, _ in series], dtype=np.float32)
+                resolved = self._resolve(spans, series)
+
+                window_start = state.end
+                observed = promotions(resolved, list_price, window_start, window)
+                state = append_observed(state, values, observed, write(lambda day: day + timedelta(days=1)))
+                for offset in range(window):
+                    store.thin_lookahead(user.organization_id, window_start + timedelta(days=offset))
+                origin = state.end
+                planned = promotions(resolved, list_price, origin, FEATURE_LOOKAHEAD_DAYS, known_before=origin)
+                write_lookahead(state, planned, write(lambda day: origin))
+                store.save(user.organization_id, state)
+                if progress:
+                    await progress(1 - (end - state.end).days / days, f"Features materialized up to {state.end.isoformat()}")
+
+            summary = {"days": days, "series": len(state.keys), "partitions": written}
+            logger.info("Feature store appended", **summary)
+            return summary
+
+        except Exception as e:
+            logger.error("Failed to append features", error=str(e))
+            raise
+
+    def features(
+        self,
+        user: User,
+        keys: Sequence[bytes],
+        start: date,
+        end: date,
+        as_of: Optional[date] = None,
+        columns: Sequence[str] = ("promo", "discount", "price_index")
+    ) -> Optional[FeatureFrame]:
+        """Features of some series over the days from `start` up to `end`, as known on `as_of`.
+
+        Rows follow `keys`; series missing from the store are NaN. None
+        before the first append.
+        """
+        store = FeatureStore()
+        state = store.load(user.organization_id, mmap=True)
+        if state is None:
+            return None
+        index = {key: row for row, key in enumerate(state.keys.tolist())}
+        rows = np.array([index.get(key, -1) for key in keys], dtype=np.int64)
+        found = rows >= 0
+        stored = store.read(user.organization_id, start, end, as_of, columns, rows[found])
+        frame = {}
+        for name, values in stored.columns.items():
+            frame[name] = np.full((len(keys), values.shape[1]), np.nan, dtype=np.float32)
+            frame[name][found] = values
+        return FeatureFrame(keys=np.array(keys, dtype="V32"), start=start, columns=frame)
+
+    async def _list_prices(self, item_ids: List[Any]) -> Dict[str, float]:
+        result = await self.db.execute(select(Item.id, Item.price).where(Item.id.in_(item_ids)))
+        return {str(item_id): float(price) for item_id, price in result.all() if price is not None}
+
+    async def _promotions(self, user: User, start: date, end: date) -> List[Promotion]:
+        """Active promotions overlapping the days from `start` up to the lookahead of `end`, entered before `end`."""
+        query = select(Promotion).where(
+            and_(
+                Promotion.organization_id == user.organization_id,
+                Promotion.is_active == 'Y',
+                Promotion.end_date >= start,
+                Promotion.start_date < end + timedelta(days=FEATURE_LOOKAHEAD_DAYS),
+                Promotion.created_at < datetime.combine(end, datetime.min.time())
+            )
+        )
+        spans: List[Promotion] = []
+        async for partition in stream_partitions(self.db, query, scalars=True):
+            spans.extend(partition)
+        return spans
+
+    def _resolve(self, spans: List[Promotion], series: List[Tuple[str, str]]) -> List[PromotionSpan]:
+        """Promotions with the state rows they apply to (their item at one or every location)."""
+        rows_by_item: Dict[str, List[Tuple[int, str]]] = {}
+        for row, (item_id, location_id) in enumerate(series):
+            rows_by_item.setdefault(item_id, []).append((row, location_id))
+        resolved = []
+        for promotion in spans:
+            located = rows_by_item.get(str(promotion.item_id), [])
+            location = str(promotion.location_id) if promotion.location_id is not None else None
+            rows = [row for row, location_id in located if location in (None, location_id)]
+            resolved.append(PromotionSpan(
+                rows=np.array(rows, dtype=np.int64),
+                start=promotion.start_date,
+                end=promotion.end_date,
+                discount=float(promotion.discount or 0),
+                entered=promotion.created_at.date(),
+            ))
+        return resolved
@@ -0,0 +1,381 @@
+"""
+Feature store for StockSense AI.
+
+Materializes demand features once per series and day so training,
+backtests and inference read them instead of recomputing them:
+
+- calendar: day of week, day of month, month, week of year;
+- holidays: holiday flag and days to the next / since the last holiday
+  of the US retail calendar;
+- promotions: promo flag and discount off the list price;
+- price: effective price and its ratio to the series' reference price
+  (an exponentially weighted average of past effective prices);
+- demand: lags of FEATURE_LAGS days and trailing means over
+  FEATURE_WINDOWS days, NaN where the series has no (or masked) history.
+
+Each day is a partition of Feather (Arrow IPC) files with zstd-compressed
+columns, one row per series in the order of the stored keys; series are
+only ever appended, so an older partition covers a prefix of the keys.
+A partition file is tagged with the day it was known as of:
+
+- once a day is over it is written as observed (as of the next day),
+  with its demand and features from the days before it only;
+- when the store is appended up to an origin, the next
+  FEATURE_LOOKAHEAD_DAYS are written as lookahead partitions as of the
+  origin: calendar, holidays, the promotions entered before the origin
+  and the list price of the origin, plus the lags that reach back before
+  it. Demand, later lags and trailing means are NaN.
+
+A read as of a day returns, per day, the latest version known by then,
+so a backtest from an origin sees the history and its plans exactly as
+they stood, and inference reads the lookahead of the latest origin.
+Appending is incremental: the state keeps the last max(FEATURE_LAGS)
+days of demand and the reference prices, so a daily append loads one
+day of demand.
+"""
+
+from datetime import date, timedelta
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+from pyarrow import feather
+
+from ..core.storage import DATA_DIR
+from .forecast_state import ArrayStore
+
+FEATURE_STORE_DIR = os.path.join(DATA_DIR, "stocksense-features")
+
+# Demand lags and trailing mean windows (days)
+FEATURE_LAGS = (1, 7, 14, 28)
+FEATURE_WINDOWS = (7, 28)
+
+# Days after an origin written as lookahead partitions
+FEATURE_LOOKAHEAD_DAYS = 28
+
+# During multi-day appends lookahead partitions are written for origins
+# every this many days (and for the last one); older lookahead versions of
+# a day are thinned to the same spacing once the day is observed
+LOOKAHEAD_ORIGIN_SPACING_DAYS = 7
+
+# Rows per compressed record batch
+FEATURE_BLOCK_ROWS = 65536
+
+FEATURE_COMPRESSION = "zstd"
+
+# Holiday distances are capped at this many days
+HOLIDAY_DISTANCE_CAP = 30
+
+# Smoothing of the reference price the price index divides by
+REFERENCE_PRICE_ALPHA = 1 / 28
+
+CALENDAR_COLUMNS = ("day_of_week", "day_of_month", "month", "week_of_year")
+HOLIDAY_COLUMNS = ("holiday", "days_to_holiday", "days_since_holiday")
+PRICE_COLUMNS = ("promo", "discount", "price", "price_index")
+DEMAND_COLUMNS = ("demand",) + tuple(f"lag_{lag}" for lag in FEATURE_LAGS) + tuple(f"mean_{window}" for window in FEATURE_WINDOWS)
+FEATURE_COLUMNS = CALENDAR_COLUMNS + HOLIDAY_COLUMNS + PRICE_COLUMNS + DEMAND_COLUMNS
+
+_HISTORY = max(FEATURE_LAGS + FEATURE_WINDOWS)
+
+
+class FeatureState(NamedTuple):
+    """What an append needs from the days before `end`."""
+    end: date  # first day not observed yet
+    keys: np.ndarray  # V32, row order of every partition
+    recent: np.ndarray  # (series, max lag) float32 demand of the days before `end`, oldest first
+    reference_price: np.ndarray  # float32, NaN until a series has a price
+
+
+class FeatureFrame(NamedTuple):
+    """Features of some series over consecutive days, as of a day."""
+    keys: np.ndarray  # V32
+    start: date
+    columns: Dict[str, np.ndarray]  # name -> (series, days) float32
+
+
+class PriceInputs(NamedTuple):
+    """List prices and promotions of every series of the state."""
+    list_price: np.ndarray  # (series,) float32, NaN where unknown
+    promo: np.ndarray  # (series, days) bool, a promotion runs
+    discount: np.ndarray  # (series, days) float32 discount off the list price
+
+
+class PromotionSpan(NamedTuple):
+    """A promotion resolved to the state rows it applies to."""
+    rows: np.ndarray  # int64
+    start: date
+    end: date  # last promoted day
+    discount: float
+    entered: date  # day the promotion was created
+
+
+def empty_feature_state(end: date) -> FeatureState:
+    return FeatureState(
+        end=end,
+        keys=np.zeros(0, dtype="V32"),
+        recent=np.zeros((0, _HISTORY), dtype=np.float32),
+        reference_price=np.zeros(0, dtype=np.float32),
+    )
+
+
+def with_feature_series(state: FeatureState, keys: Sequence[bytes]) -> Tuple[FeatureState, np.ndarray]:
+    """State with unknown `keys` appended (without history), and the row of each key."""
+    index = {key: row for row, key in enumerate(state.keys.tolist())}
+    new = [key for key in dict.fromkeys(keys) if key not in index]
+    for key in new:
+        index[key] = len(index)
+    rows = np.array([index[key] for key in keys], dtype=np.int64)
+    if not new:
+        return state, rows
+    return FeatureState(
+        end=state.end,
+        keys=np.concatenate([state.keys, np.array(new, dtype="V32")]),
+        recent=np.concatenate([state.recent, np.full((len(new), _HISTORY), np.nan, dtype=np.float32)]),
+        reference_price=np.concatenate([state.reference_price, np.full(len(new), np.nan, dtype=np.float32)]),
+    ), rows
+
+
+def holidays(year: int) -> List[date]:
+    """US retail holidays of a year, including Easter, Black Friday and the Eves."""
+    def nth_weekday(month: int, weekday: int, n: int) -> date:
+        if n > 0:
+            first = date(year, month, 1)
+            return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+        last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+    # Anonymous Gregorian computus
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    easter = date(year, (h + l - 7 * m + 90) // 25, (h + l - 7 * m + 33 * ((h + l - 7 * m + 90) // 25) + 19) % 32)
+
+    thanksgiving = nth_weekday(11, 3, 4)
+    return sorted([
+        date(year, 1, 1),
+        nth_weekday(1, 0, 3),  # Martin Luther King Jr. Day
+        nth_weekday(2, 0, 3),  # Presidents' Day
+        easter,
+        nth_weekday(5, 0, -1),  # Memorial Day
+        date(year, 6, 19),
+        date(year, 7, 4),
+        nth_weekday(9, 0, 1),  # Labor Day
+        nth_weekday(10, 0, 2),  # Columbus Day
+        date(year, 11, 11),
+        thanksgiving,
+        thanksgiving + timedelta(days=1),  # Black Friday
+        date(year, 12, 24),
+        date(year, 12, 25),
+        date(year, 12, 31),
+    ])
+
+
+def calendar_features(day: date) -> Dict[str, int]:
+    """Calendar and holiday features of a day, the same for every series."""
+    ordinals = np.array([
+        holiday.toordinal() for year in (day.year - 1, day.year, day.year + 1) for holiday in holidays(year)
+    ])
+    ordinal = day.toordinal()
+    following = ordinals[ordinals >= ordinal].min() - ordinal
+    preceding = ordinal - ordinals[ordinals <= ordinal].max()
+    return {
+        "day_of_week": day.weekday(),
+        "day_of_month": day.day,
+        "month": day.month,
+        "week_of_year": day.isocalendar()[1],
+        "holiday": int(following == 0),
+        "days_to_holiday": min(int(following), HOLIDAY_DISTANCE_CAP),
+        "days_since_holiday": min(int(preceding), HOLIDAY_DISTANCE_CAP),
+    }
+
+
+def promotions(
+    spans: Sequence[PromotionSpan],
+    list_price: np.ndarray,
+    start: date,
+    days: int,
+    known_before: Optional[date] = None
+) -> PriceInputs:
+    """Prices and promotions of the `days` days from `start`.
+
+    Without `known_before` a promotion counts from the day it was entered
+    (observed days); with it, only promotions entered before that day
+    count (lookahead days).
+    """
+    promo = np.zeros((len(list_price), days), dtype=bool)
+    discount = np.zeros((len(list_price), days), dtype=np.float32)
+    for span in spans:
+        if known_before is not None and span.entered >= known_before:
+            continue
+        first = max(span.start, start) if known_before is not None else max(span.start, span.entered, start)
+        first, last = (first - start).days, min((span.end - start).days + 1, days)
+        if first >= last:
+            continue
+        promo[span.rows, first:last] = True
+        cells = discount[span.rows, first:last]
+        discount[span.rows, first:last] = np.maximum(cells, span.discount)
+    return PriceInputs(list_price, promo, discount)
+
+
+def _rolling_means(history: np.ndarray, window: int) -> np.ndarray:
+    """Mean of the `window` days before each day after the first _HISTORY of `history`, ignoring NaN."""
+    known = ~np.isnan(history)
+    totals = np.zeros((len(history), history.shape[1] + 1))
+    np.cumsum(np.where(known, history, 0), axis=1, out=totals[:, 1:])
+    counts = np.zeros((len(history), history.shape[1] + 1), dtype=np.int32)
+    np.cumsum(known, axis=1, out=counts[:, 1:])
+    stop = np.arange(_HISTORY, history.shape[1])
+    total = totals[:, stop] - totals[:, stop - window]
+    count = counts[:, stop] - counts[:, stop - window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan).astype(np.float32)
+
+
+def _table(day: date, columns: Dict[str, np.ndarray], n_series: int) -> pa.Table:
+    calendar = calendar_features(day)
+    arrays = []
+    for name in FEATURE_COLUMNS:
+        if name in calendar:
+            arrays.append(pa.array(np.full(n_series, calendar[name], dtype=np.int8)))
+        elif name == "promo":
+            arrays.append(pa.array(columns[name].astype(np.int8)))
+        else:
+            arrays.append(pa.array(columns.get(name, np.full(n_series, np.nan, dtype=np.float32)).astype(np.float32)))
+    return pa.Table.from_arrays(arrays, names=list(FEATURE_COLUMNS))
+
+
+def _price_columns(prices: PriceInputs, offset: int, reference: np.ndarray) -> Dict[str, np.ndarray]:
+    discount = prices.discount[:, offset]
+    price = prices.list_price * (1 - discount)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        index = np.where(reference > 0, price / reference, np.nan)
+    return {"promo": prices.promo[:, offset], "discount": discount, "price": price, "price_index": index}
+
+
+def append_observed(
+    state: FeatureState,
+    values: np.ndarray,
+    prices: PriceInputs,
+    write: Callable[[date, pa.Table], None]
+) -> FeatureState:
+    """Write the observed partitions of the days of `values` (series, days) from `state.end`.
+
+    Features of a day only use demand of the days before it; NaN cells
+    are masked days. Returns the state advanced past the window.
+    """
+    n_series, days = values.shape
+    history = np.concatenate([state.recent, values], axis=1)
+    means = {window: _rolling_means(history, window) for window in FEATURE_WINDOWS}
+    reference = state.reference_price.copy()
+    for offset in range(days):
+        column = _HISTORY + offset
+        columns = _price_columns(prices, offset, reference)
+        columns["demand"] = values[:, offset]
+        for lag in FEATURE_LAGS:
+            columns[f"lag_{lag}"] = history[:, column - lag]
+        for window in FEATURE_WINDOWS:
+            columns[f"mean_{window}"] = means[window][:, offset]
+        day = state.end + timedelta(days=offset)
+        write(day, _table(day, columns, n_series))
+
+        price = columns["price"]
+        updated = np.where(np.isnan(reference), price, reference + REFERENCE_PRICE_ALPHA * (price - reference))
+        reference = np.where(np.isnan(price), reference, updated)
+    return FeatureState(
+        end=state.end + timedelta(days=days),
+        keys=state.keys,
+        recent=np.ascontiguousarray(history[:, -_HISTORY:]),
+        reference_price=reference.astype(np.float32),
+    )
+
+
+def write_lookahead(state: FeatureState, prices: PriceInputs, write: Callable[[date, pa.Table], None]) -> None:
+    """Write the lookahead partitions of the FEATURE_LOOKAHEAD_DAYS from `state.end`, as known at `state.end`."""
+    for step in range(FEATURE_LOOKAHEAD_DAYS):
+        columns = _price_columns(prices, step, state.reference_price)
+        for lag in FEATURE_LAGS:
+            if lag > step:
+                columns[f"lag_{lag}"] = state.recent[:, _HISTORY - lag + step]
+        day = state.end + timedelta(days=step)
+        write(day, _table(day, columns, len(state.keys)))
+
+
+def next_origin(day: date, end: date) -> date:
+    """First lookahead origin after `day`, at most `end`: appends stop there to write the lookahead."""
+    spacing = LOOKAHEAD_ORIGIN_SPACING_DAYS
+    return min(date.fromordinal((day.toordinal() // spacing + 1) * spacing), end)
+
+
+class FeatureStore(ArrayStore):
+    """Per-day feature partitions of each organization's series, with the append state."""
+
+    state_type = FeatureState
+    default_root = FEATURE_STORE_DIR
+
+    def _day_directory(self, organization_id: Any, day: date) -> str:
+        return os.path.join(self._directory(organization_id), "days", day.isoformat())
+
+    def write_partition(self, organization_id: Any, day: date, as_of: date, table: pa.Table) -> None:
+        """Write the version of a day's partition known as of `as_of` (atomically)."""
+        directory = self._day_directory(organization_id, day)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{as_of.isoformat()}.feather")
+        feather.write_feather(table, path + ".tmp", compression=FEATURE_COMPRESSION, chunksize=FEATURE_BLOCK_ROWS)
+        os.replace(path + ".tmp", path)
+
+    def thin_lookahead(self, organization_id: Any, day: date) -> int:
+        """Drop the lookahead versions of an observed day except those of spaced origins; returns how many."""
+        directory = self._day_directory(organization_id, day)
+        dropped = 0
+        for name in os.listdir(directory):
+            as_of = date.fromisoformat(name.split(".")[0])
+            if as_of <= day and as_of.toordinal() % LOOKAHEAD_ORIGIN_SPACING_DAYS:
+                os.remove(os.path.join(directory, name))
+                dropped += 1
+        return dropped
+
+    def versions(self, organization_id: Any, day: date) -> List[date]:
+        """Days the stored versions of a day's partition were known as of, oldest first."""
+        try:
+            names = os.listdir(self._day_directory(organization_id, day))
+        except FileNotFoundError:
+            return []
+        return sorted(date.fromisoformat(name.split(".")[0]) for name in names if name.endswith(".feather"))
+
+    def read(
+        self,
+        organization_id: Any,
+        start: date,
+        end: date,
+        as_of: Optional[date] = None,
+        columns: Sequence[str] = FEATURE_COLUMNS,
+        rows: Optional[np.ndarray] = None
+    ) -> FeatureFrame:
+        """Features of the days from `start` up to `end` as known on `as_of` (latest by default).
+
+        Args:
+            columns: Features to read; only their columns are decompressed.
+            rows: Series rows to return (state order), all by default.
+        """
+        state = self.load(organization_id, mmap=True)
+        keys = state.keys if state is not None else np.zeros(0, dtype="V32")
+        rows = np.arange(len(keys)) if rows is None else np.asarray(rows, dtype=np.int64)
+        days = (end - start).days
+        frame = {name: np.full((len(rows), days), np.nan, dtype=np.float32) for name in columns}
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            known = [version for version in self.versions(organization_id, day) if as_of is None or version <= as_of]
+            if not known:
+                continue
+            path = os.path.join(self._day_directory(organization_id, day), f"{known[-1].isoformat()}.feather")
+            table = feather.read_table(path, columns=list(columns), memory_map=True)
+            inside = rows < table.num_rows
+            for name in columns:
+                values = table.column(name).to_numpy()
+                frame[name][inside, offset] = values[rows[inside]]
+        return FeatureFrame(keys=keys[rows], start=start, columns=frame)
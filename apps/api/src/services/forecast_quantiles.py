@@ -0,0 +1,213 @@
+"""
+Calibrated quantile forecasts for StockSense AI.
+
+Forecast intervals come from the errors the smoothing models actually
+made rather than from an assumed normal spread. A backtest runs the
+ETS/Croston state over recent demand, forecasts from a forecast origin
+every week and standardizes each error by the series' smoothed absolute
+error (its MAE) at that origin. Quantiles of these standardized errors,
+per model and per step ahead, form the calibration tables (split
+conformal intervals, normalized by each series' own error scale):
+
+- daily: error of the forecast for the day h steps ahead;
+- lead_time: error of total demand over the next h days, which sizes
+  safety stock for a lead time of h days.
+
+A quantile forecast is then point + MAE x table[model, quantile, step],
+so all quantiles of all series are one gather and one multiply-add.
+Until a model has enough backtest errors its tables are the normal ones.
+"""
+
+from datetime import date
+import os
+from statistics import NormalDist
+from typing import Dict, List, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..core.storage import DATA_DIR
+from .forecast_state import INTERMITTENT_INTERVAL, ArrayStore, SmoothingState, absorb, empty_state, forecast
+
+QUANTILE_CALIBRATION_DIR = os.path.join(DATA_DIR, "stocksense-quantile-calibration")
+
+# Models with their own tables, in table row order
+CALIBRATED_MODELS = ("ets", "croston")
+
+# Probability levels of the tables; other quantiles are interpolated
+CALIBRATION_LEVELS = np.linspace(0.005, 0.995, 199)
+
+# Steps ahead (days) in the tables; longer horizons reuse the last step
+# and longer lead times scale it by the square root of time
+CALIBRATION_STEPS = 28
+
+# Days of demand a backtest warms the state up on, and days between its
+# forecast origins
+CALIBRATION_WARMUP_DAYS = 56
+ORIGIN_SPACING_DAYS = 7
+
+# Backtest errors a model needs before its tables replace the normal ones
+MIN_CALIBRATION_ERRORS = 500
+
+# Floor on the error scale, so series that have not missed yet do not
+# get unbounded standardized errors
+MIN_ERROR_SCALE = 0.1
+
+# MAE to standard deviation for normal errors
+MAE_SCALE = 1.25
+
+class QuantileCalibration(NamedTuple):
+    """Standardized error quantiles per model, from a backtest ending before `end`."""
+    end: date
+    keys: np.ndarray  # model names, CALIBRATED_MODELS
+    levels: np.ndarray  # (levels,) probability levels
+    daily: np.ndarray  # (models, levels, steps)
+    lead_time: np.ndarray  # (models, levels, steps), total over 1..steps days
+    errors: np.ndarray  # (models,) backtest errors behind each model's tables, 0 if normal
+
+
+def model_codes(state: SmoothingState) -> np.ndarray:
+    """Table row of each series' model: Croston for intermittent series, else ETS."""
+    return (state.interval > INTERMITTENT_INTERVAL).astype(np.int8)
+
+
+def error_scale(mae: np.ndarray) -> np.ndarray:
+    """Scale that standardizes a series' errors."""
+    return np.maximum(np.asarray(mae, dtype=np.float32), MIN_ERROR_SCALE)
+
+
+def normal_calibration(end: date, levels: np.ndarray = CALIBRATION_LEVELS) -> QuantileCalibration:
+    """Tables for normal errors with standard deviation MAE_SCALE x MAE."""
+    z = np.array([NormalDist().inv_cdf(level) for level in levels], dtype=np.float32)
+    steps = np.arange(1, CALIBRATION_STEPS + 1, dtype=np.float32)
+    daily = np.broadcast_to(MAE_SCALE * z[:, None], (len(CALIBRATED_MODELS), len(levels), CALIBRATION_STEPS))
+    return QuantileCalibration(
+        end=end,
+        keys=np.array(CALIBRATED_MODELS, dtype="S8"),
+        levels=np.asarray(levels, dtype=np.float64),
+        daily=daily.astype(np.float32),
+        lead_time=(daily * np.sqrt(steps)).astype(np.float32),
+        errors=np.zeros(len(CALIBRATED_MODELS), dtype=np.int64),
+    )
+
+
+def column_quantiles(values: np.ndarray, levels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantiles (levels, columns) of each column ignoring NaN, and each column's count.
+
+    Linear interpolation as in np.quantile, but one sort for all columns
+    instead of np.nanquantile's per-column loop.
+    """
+    ordered = np.sort(values, axis=0)  # NaN sort last
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    position = levels[:, None] * np.maximum(counts - 1, 0)[None, :]
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, np.maximum(counts - 1, 0)[None, :])
+    weight = (position - low).astype(np.float32)
+    below = np.take_along_axis(ordered, low, axis=0)
+    above = np.take_along_axis(ordered, high, axis=0)
+    return below + weight * (above - below), counts
+
+
+def calibrate(values: np.ndarray, end: date, warmup: int = CALIBRATION_WARMUP_DAYS) -> QuantileCalibration:
+    """Backtest the smoothing models on `values` (series, days) up to `end`.
+
+    The state is warmed up on the first `warmup` days, then forecasts
+    CALIBRATION_STEPS days ahead from an origin every ORIGIN_SPACING_DAYS
+    while it absorbs the days in between. NaN cells (masked anomalies)
+    are skipped; they void the lead-time totals they fall in.
+    """
+    n_series, n_days = values.shape
+    state = absorb(empty_state(date.fromordinal(end.toordinal() - n_days), n_series), values[:, :warmup])
+    daily: List[List[np.ndarray]] = [[] for _ in CALIBRATED_MODELS]
+    totals: List[List[np.ndarray]] = [[] for _ in CALIBRATED_MODELS]
+    for origin in range(warmup, n_days - CALIBRATION_STEPS + 1, ORIGIN_SPACING_DAYS):
+        actual = values[:, origin:origin + CALIBRATION_STEPS]
+        predicted = forecast(state, CALIBRATION_STEPS)
+        scale = error_scale(state.abs_error)[:, None]
+        errors = (actual - predicted) / scale
+        total_errors = (np.cumsum(actual, axis=1) - np.cumsum(predicted, axis=1)) / scale
+        codes = model_codes(state)
+        for code in range(len(CALIBRATED_MODELS)):
+            rows = (state.observed > 0) & (codes == code)
+            daily[code].append(errors[rows])
+            totals[code].append(total_errors[rows])
+        state = absorb(state, values[:, origin:origin + ORIGIN_SPACING_DAYS])
+
+    calibration = normal_calibration(end)
+    for code in range(len(CALIBRATED_MODELS)):
+        if not daily[code]:
+            continue
+        table, counts = column_quantiles(np.concatenate(daily[code]), calibration.levels)
+        if counts.min() < MIN_CALIBRATION_ERRORS:
+            continue
+        calibration.daily[code] = table
+        calibration.lead_time[code] = column_quantiles(np.concatenate(totals[code]), calibration.levels)[0]
+        calibration.errors[code] = counts.sum()
+    return calibration
+
+
+def _level_weights(levels: np.ndarray, probabilities: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Table levels bracketing each probability and the weight of the upper one."""
+    high = np.clip(np.searchsorted(levels, probabilities), 1, len(levels) - 1)
+    low = high - 1
+    weight = np.clip((probabilities - levels[low]) / (levels[high] - levels[low]), 0, 1).astype(np.float32)
+    return low, high, weight
+
+
+def quantile_forecasts(
+    point: np.ndarray,
+    mae: np.ndarray,
+    models: np.ndarray,
+    calibration: QuantileCalibration,
+    quantiles: Sequence[float]
+) -> np.ndarray:
+    """Quantile forecasts (series, quantiles, horizon), never negative.
+
+    Args:
+        point: (series, horizon) point forecasts.
+        mae: Each series' smoothed absolute one-step error.
+        models: Each series' table row, see model_codes.
+    """
+    low, high, weight = _level_weights(calibration.levels, np.asarray(quantiles, dtype=np.float64))
+    steps = np.minimum(np.arange(point.shape[1]), calibration.daily.shape[2] - 1)
+    table = calibration.daily[:, low] + weight[None, :, None] * (calibration.daily[:, high] - calibration.daily[:, low])
+    values = table[:, :, steps][models]
+    values *= error_scale(mae)[:, None, None]
+    values += point[:, None, :]
+    return np.maximum(values, 0, out=values)
+
+
+def quantile_columns(values: np.ndarray, quantiles: Sequence[float]) -> Dict[float, np.ndarray]:
+    """Quantile forecasts as (series, horizon) arrays keyed by quantile, as runs store them."""
+    return {q: values[:, i] for i, q in enumerate(quantiles)}
+
+
+def quantile_safety_stock(
+    mae: np.ndarray,
+    models: np.ndarray,
+    calibration: QuantileCalibration,
+    lead_time_days: Union[int, np.ndarray],
+    service_level: Union[float, np.ndarray]
+) -> np.ndarray:
+    """Safety stock per series: the service-level quantile of lead-time demand less its forecast.
+
+    Lead-time demand errors come from the lead_time tables, so skewed or
+    heavy-tailed errors (intermittent demand especially) get the buffer
+    they need instead of a normal z x sigma x sqrt(L).
+    """
+    mae = np.asarray(mae, dtype=np.float32)
+    lead_time = np.broadcast_to(np.maximum(np.asarray(lead_time_days, dtype=np.int64), 1), mae.shape)
+    service_level = np.broadcast_to(np.asarray(service_level, dtype=np.float64), mae.shape)
+    low, high, weight = _level_weights(calibration.levels, service_level)
+    steps = calibration.lead_time.shape[2]
+    step = np.minimum(lead_time, steps) - 1
+    below = calibration.lead_time[models, low, step]
+    above = calibration.lead_time[models, high, step]
+    beyond = np.sqrt(np.maximum(lead_time, steps) / steps).astype(np.float32)
+    return np.maximum(error_scale(mae) * (below + weight * (above - below)) * beyond, 0)
+
+
+class QuantileCalibrationStore(ArrayStore):
+    """Quantile calibration tables of each organization."""
+
+    state_type = QuantileCalibration
+    default_root = QUANTILE_CALIBRATION_DIR
@@ -0,0 +1,289 @@
+"""
+Incremental forecast state for StockSense AI.
+
+Exponential smoothing models carry everything they know about a series
+in a handful of numbers, so a refresh only has to run the new days
+through the smoothing equations instead of refitting on the whole
+history. Per series the state holds:
+
+- Holt-Winters additive ETS with damped trend: level, trend and one
+  seasonal index per day of the week.
+- Croston (SBA) for intermittent demand: smoothed demand size, smoothed
+  interval between demands and days since the last demand.
+- Smoothed one-step error and absolute error, which size the forecast
+  intervals.
+
+Arrays are float32 and one row per item-location; the store keeps each
+array as a .npy file in a versioned directory per organization.
+"""
+
+from datetime import date
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from ..core.storage import DATA_DIR
+
+FORECAST_STATE_DIR = os.path.join(DATA_DIR, "stocksense-forecast-state")
+
+# Seasonal period (days); season index of a day is its ordinal modulo this
+STATE_PERIOD = 7
+
+# Holt-Winters smoothing of level, trend and season, and trend damping
+ETS_ALPHA = 0.2
+ETS_BETA = 0.05
+ETS_GAMMA = 0.1
+ETS_PHI = 0.98
+
+# Croston smoothing of demand size and interval
+CROSTON_ALPHA = 0.1
+
+# Mean interval between demands (days) above which a series is forecast
+# with Croston rather than ETS (Syntetos-Boylan cut-off)
+INTERMITTENT_INTERVAL = 1.32
+
+# Smoothing of the one-step errors
+ERROR_ALPHA = 0.1
+
+STATE_ARRAYS = ("keys", "level", "trend", "season", "size", "interval", "since", "error", "abs_error", "observed")
+
+
+class SmoothingState(NamedTuple):
+    """Smoothing state of every series, updated through the day before `end`."""
+    end: date
+    keys: np.ndarray  # V32, item id bytes + location id bytes
+    level: np.ndarray
+    trend: np.ndarray
+    season: np.ndarray  # (series, STATE_PERIOD), indexed by day ordinal
+    size: np.ndarray
+    interval: np.ndarray
+    since: np.ndarray
+    error: np.ndarray
+    abs_error: np.ndarray
+    observed: np.ndarray  # int32, days absorbed
+
+    @property
+    def n_series(self) -> int:
+        return len(self.keys)
+
+    def index(self) -> Dict[bytes, int]:
+        """Row of each series key."""
+        return {key: row for row, key in enumerate(self.keys.tolist())}
+
+
+def series_key(item_id: Any, location_id: Any) -> bytes:
+    """Key of an item-location in the state."""
+    return uuid.UUID(str(item_id)).bytes + uuid.UUID(str(location_id)).bytes
+
+
+def key_ids(key: bytes) -> Tuple[str, str]:
+    """(item_id, location_id) of a series key."""
+    return str(uuid.UUID(bytes=key[:16])), str(uuid.UUID(bytes=key[16:]))
+
+
+def find_series(state: SmoothingState, key: bytes) -> Optional[int]:
+    """Row of one series, without building the whole index."""
+    rows = np.flatnonzero(state.keys == np.array(key, dtype="V32"))
+    return int(rows[0]) if len(rows) else None
+
+
+def empty_state(end: date, n_series: int = 0) -> SmoothingState:
+    """State of `n_series` series that have not seen any demand yet."""
+    return SmoothingState(
+        end=end,
+        keys=np.zeros(n_series, dtype="V32"),
+        level=np.zeros(n_series, dtype=np.float32),
+        trend=np.zeros(n_series, dtype=np.float32),
+        season=np.zeros((n_series, STATE_PERIOD), dtype=np.float32),
+        size=np.zeros(n_series, dtype=np.float32),
+        interval=np.ones(n_series, dtype=np.float32),
+        since=np.ones(n_series, dtype=np.float32),
+        error=np.zeros(n_series, dtype=np.float32),
+        abs_error=np.zeros(n_series, dtype=np.float32),
+        observed=np.zeros(n_series, dtype=np.int32),
+    )
+
+
+def with_series(state: SmoothingState, keys: Sequence[bytes]) -> Tuple[SmoothingState, np.ndarray]:
+    """Rows of the given series, appending fresh state for unknown ones."""
+    index = state.index()
+    rows = np.empty(len(keys), dtype=np.int64)
+    added: List[bytes] = []
+    for i, key in enumerate(keys):
+        row = index.get(key)
+        if row is None:
+            row = index[key] = state.n_series + len(added)
+            added.append(key)
+        rows[i] = row
+    if not added:
+        return state, rows
+
+    fresh = empty_state(state.end, len(added))
+    fresh = fresh._replace(keys=np.array(added, dtype="V32"))
+    grown = state._replace(**{
+        name: np.concatenate([getattr(state, name), getattr(fresh, name)]) for name in STATE_ARRAYS
+    })
+    return grown, rows
+
+
+def absorb(state: SmoothingState, values: np.ndarray, residuals: Optional[np.ndarray] = None) -> SmoothingState:
+    """Run the days in `values` (series, days) through the smoothing equations.
+
+    Rows align with the state's series and day 0 is `state.end`. NaN
+    cells (masked anomalies) carry the state forward without learning
+    from the day. Cost is linear in series x new days and independent of
+    how much history the state already absorbed.
+
+    Args:
+        residuals: Optional array shaped like `values` that receives the
+            one-step errors (actual minus forecast); NaN where the series
+            had nothing to forecast from or the day was masked.
+    """
+    level, trend, season = state.level, state.trend, state.season.copy()
+    size, interval, since = state.size, state.interval, state.since
+    error, abs_error, observed = state.error, state.abs_error, state.observed
+    first_phase = state.end.toordinal()
+    for day in range(values.shape[1]):
+        phase = (first_phase + day) % STATE_PERIOD
+        y = values[:, day]
+        seen = ~np.isnan(y)
+        fresh = seen & (observed == 0)
+        learned = seen & ~fresh
+
+        index = season[:, phase]
+        damped = ETS_PHI * trend
+        croston = (1 - CROSTON_ALPHA / 2) * size / interval
+        residual = y - np.where(interval > INTERMITTENT_INTERVAL, croston, level + damped + index)
+        error = np.where(learned, error + ERROR_ALPHA * (residual - error), error)
+        abs_error = np.where(learned, abs_error + ERROR_ALPHA * (np.abs(residual) - abs_error), abs_error)
+        if residuals is not None:
+            residuals[:, day] = np.where(learned, residual, np.nan)
+
+        smoothed = ETS_ALPHA * (y - index) + (1 - ETS_ALPHA) * (level + damped)
+        new_level = np.where(fresh, y, np.where(learned, smoothed, level + damped))
+        trend = np.where(learned, ETS_BETA * (new_level - level) + (1 - ETS_BETA) * damped, np.where(fresh, 0, damped))
+        season[:, phase] = np.where(learned, ETS_GAMMA * (y - new_level) + (1 - ETS_GAMMA) * index, index)
+        level = new_level.astype(np.float32)
+
+        demand = seen & (y > 0)
+        first = demand & (size == 0)
+        size = np.where(first, y, np.where(demand, size + CROSTON_ALPHA * (y - size), size))
+        interval = np.where(demand & ~first, interval + CROSTON_ALPHA * (since - interval), interval)
+        since = np.where(demand, 1, since + seen)
+        observed = observed + seen
+
+    return state._replace(
+        end=date.fromordinal(state.end.toordinal() + values.shape[1]),
+        level=level, trend=trend.astype(np.float32), season=season,
+        size=size.astype(np.float32), interval=interval.astype(np.float32), since=since.astype(np.float32),
+        error=error.astype(np.float32), abs_error=abs_error.astype(np.float32),
+        observed=observed.astype(np.int32),
+    )
+
+
+def forecast(
+    state: SmoothingState, horizon: int, rows: Optional[np.ndarray] = None, model: Optional[str] = None
+) -> np.ndarray:
+    """Daily forecasts (series, horizon) from `state.end` on, never negative.
+
+    Each series gets Croston if its demand is intermittent and ETS
+    otherwise, unless `model` ("ets" or "croston") forces one for all.
+    """
+    if rows is not None:
+        state = state._replace(**{name: getattr(state, name)[rows] for name in STATE_ARRAYS})
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(ETS_PHI ** steps)
+    phases = (state.end.toordinal() + steps - 1) % STATE_PERIOD
+    ets = state.level[:, None] + state.trend[:, None] * damping[None, :] + state.season[:, phases]
+    croston = (1 - CROSTON_ALPHA / 2) * state.size / state.interval
+    intermittent = state.interval > INTERMITTENT_INTERVAL if model is None else np.full(state.n_series, model == "croston")
+    values = np.where(intermittent[:, None], croston[:, None], ets)
+    values[state.observed == 0] = 0
+    return np.maximum(values, 0).astype(np.float32)
+
+
+class ArrayStore:
+    """NamedTuples of an `end` date and arrays on disk, one versioned
+    directory per organization with a .npy file per array.
+
+    A save writes a new version directory and then swaps the CURRENT
+    pointer, so readers never see a partially written state. The version
+    it replaces is kept until the next save, for readers that had just
+    read the old pointer; older ones are removed.
+    """
+
+    state_type: Type[Any] = SmoothingState
+    default_root = FORECAST_STATE_DIR
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or self.default_root
+
+    def _directory(self, organization_id: Any) -> str:
+        return os.path.join(self.root, str(organization_id))
+
+    def version(self, organization_id: Any) -> Optional[str]:
+        """Name of an organization's current version, None before the first save."""
+        try:
+            with open(os.path.join(self._directory(organization_id), "CURRENT")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def load(self, organization_id: Any, mmap: bool = False) -> Optional[Any]:
+        """Current state of an organization, None before the first save.
+
+        With `mmap` the arrays are read-only memory maps, for reading a
+        few series without loading the whole state.
+        """
+        try:
+            return self._load(organization_id, mmap)
+        except FileNotFoundError:
+            # Saves in quick succession removed the version read; the
+            # pointer now names a complete one
+            return self._load(organization_id, mmap)
+
+    def _load(self, organization_id: Any, mmap: bool) -> Optional[Any]:
+        current = self.version(organization_id)
+        if current is None:
+            return None
+        version = os.path.join(self._directory(organization_id), current)
+        with open(os.path.join(version, "state.json")) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(version, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in self.state_type._fields if name != "end"
+        }
+        return self.state_type(end=date.fromisoformat(meta["end"]), **arrays)
+
+    def save(self, organization_id: Any, state: Any) -> None:
+        directory = self._directory(organization_id)
+        os.makedirs(directory, exist_ok=True)
+        version = f"v{state.end.isoformat()}-{uuid.uuid4().hex[:8]}"
+        path = os.path.join(directory, version)
+        os.makedirs(path)
+        for name in self.state_type._fields:
+            if name != "end":
+                np.save(os.path.join(path, f"{name}.npy"), getattr(state, name))
+        with open(os.path.join(path, "state.json"), "w") as f:
+            json.dump({"end": state.end.isoformat(), "series": len(state.keys)}, f)
+
+        previous = self.version(organization_id)
+        pointer = os.path.join(directory, "CURRENT")
+        with open(pointer + ".tmp", "w") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)
+
+        for name in os.listdir(directory):
+            if name.startswith("v") and name not in (version, previous):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+class ForecastStateStore(ArrayStore):
+    """Smoothing states of each organization's series."""
+
+    state_type = SmoothingState
+    default_root = FORECAST_STATE_DIR
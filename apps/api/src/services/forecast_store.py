@@ -0,0 +1,329 @@
+"""
+Forecast store for StockSense AI.
+
+Keeps the point and quantile forecasts of each forecast run as float32
+arrays in an Arrow IPC file of zstd-compressed record batches (blocks of
+FORECAST_BLOCK_ROWS series) rather than as JSON lists per database row.
+Series are sorted by category, item and location. Next to the file sit
+the sorted keys, an item-ordered index for binary search and the
+category boundaries, so reads only decompress the blocks they touch: one
+block for an item-location, a contiguous run of blocks for a category or
+a page.
+"""
+
+from datetime import date, datetime
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from ..core.storage import DATA_DIR
+
+FORECAST_STORE_DIR = os.path.join(DATA_DIR, "stocksense-forecasts")
+
+# Series per compressed record batch
+FORECAST_BLOCK_ROWS = 4096
+
+FORECAST_COMPRESSION = "zstd"
+
+# Pointer file naming an organization's latest organization-wide run
+LATEST_RUN = "LATEST"
+
+
+class ForecastRun(NamedTuple):
+    """Metadata of a stored forecast run."""
+    run_id: str
+    created_at: datetime
+    created_by: str
+    start: date  # first forecast day
+    horizon: int
+    forecast_period: str
+    quantiles: List[float]
+    series: int
+    scope: str  # organization (all series) or series (on demand)
+
+
+def quantile_column(quantile: float) -> str:
+    """Column holding a quantile's forecasts, e.g. p95 for 0.95."""
+    return f"p{quantile * 100:g}"
+
+
+def id_bytes(ids: Sequence[Any]) -> np.ndarray:
+    """UUIDs (or their strings) as a V16 array."""
+    return np.array([uuid.UUID(str(value)).bytes for value in ids], dtype="V16")
+
+
+def _sort_keys(ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Two uint64 sort keys (high, low) of a V16 id array."""
+    words = np.frombuffer(np.ascontiguousarray(ids).tobytes(), dtype=">u8").reshape(-1, 2)
+    return words[:, 0], words[:, 1]
+
+
+def _binary_ids(ids: np.ndarray) -> pa.FixedSizeBinaryArray:
+    return pa.FixedSizeBinaryArray.from_buffers(pa.binary(16), len(ids), [None, pa.py_buffer(ids.tobytes())])
+
+
+def _float_lists(values: np.ndarray) -> pa.FixedSizeListArray:
+    values = np.ascontiguousarray(values, dtype=np.float32)
+    return pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), values.shape[1])
+
+
+class StoredForecasts(NamedTuple):
+    """Forecasts of some series of a run, as arrays aligned by row."""
+    item_ids: List[str]
+    location_ids: List[str]
+    categories: List[Optional[str]]
+    model_types: List[str]
+    mae: np.ndarray  # (series,)
+    point: np.ndarray  # (series, horizon)
+    quantiles: Dict[float, np.ndarray]  # each (series, horizon)
+
+
+class ForecastRunReader:
+    """Random access to one stored run; the forecast file is memory-mapped."""
+
+    def __init__(self, path: str, run: ForecastRun):
+        self.run = run
+        self.items = np.load(os.path.join(path, "items.npy"), mmap_mode="r")
+        self.locations = np.load(os.path.join(path, "locations.npy"), mmap_mode="r")
+        # Rows ordered by item id, and the leading 8 bytes of those ids
+        self._item_keys = np.load(os.path.join(path, "item_keys.npy"), mmap_mode="r")
+        self._item_rows = np.load(os.path.join(path, "item_rows.npy"), mmap_mode="r")
+        with open(os.path.join(path, "categories.json")) as f:
+            categories = json.load(f)
+        self.category_names: List[Optional[str]] = categories["names"]
+        self.category_starts = np.asarray(categories["starts"] + [run.series], dtype=np.int64)
+        self._source = pa.memory_map(os.path.join(path, "forecasts.arrow"))
+        self._reader = pa.ipc.open_file(self._source)
+
+    def close(self) -> None:
+        self._source.close()
+
+    def find(self, item_id: Any, location_id: Any) -> np.ndarray:
+        """Row of an item-location (empty if the run does not have it)."""
+        rows = self.item_rows(item_id)
+        return rows[self.locations[rows] == id_bytes([location_id])[0]]
+
+    def item_rows(self, item_id: Any) -> np.ndarray:
+        """Rows of an item, by binary search on the item-ordered index."""
+        key = uuid.UUID(str(item_id)).bytes
+        prefix = np.uint64(int.from_bytes(key[:8], "big"))
+        first = np.searchsorted(self._item_keys, prefix, side="left")
+        last = np.searchsorted(self._item_keys, prefix, side="right")
+        rows = np.sort(self._item_rows[first:last])
+        return rows[self.items[rows] == np.array(key, dtype="V16")]
+
+    def location_rows(self, location_id: Any) -> np.ndarray:
+        return np.flatnonzero(self.locations == id_bytes([location_id])[0])
+
+    def category_rows(self, category: Optional[str]) -> Tuple[int, int]:
+        """[start, stop) rows of a category; series of a category are contiguous."""
+        try:
+            code = self.category_names.index(category)
+        except ValueError:
+            return 0, 0
+        return int(self.category_starts[code]), int(self.category_starts[code + 1])
+
+    def read_range(self, start: int, stop: int) -> StoredForecasts:
+        """Forecasts of rows [start, stop), decompressing only their blocks."""
+        first, last = start // FORECAST_BLOCK_ROWS, (max(stop, start + 1) - 1) // FORECAST_BLOCK_ROWS
+        if stop <= start:
+            return self._arrays(self._reader.schema.empty_table())
+        table = pa.Table.from_batches([self._reader.get_batch(i) for i in range(first, last + 1)])
+        offset = start - first * FORECAST_BLOCK_ROWS
+        return self._arrays(table.slice(offset, stop - start))
+
+    def read_rows(self, rows: np.ndarray) -> StoredForecasts:
+        """Forecasts of the given rows (ascending), one block read per touched block."""
+        tables = []
+        blocks = rows // FORECAST_BLOCK_ROWS
+        for block in np.unique(blocks):
+            batch = self._reader.get_batch(int(block))
+            tables.append(pa.Table.from_batches([batch]).take(rows[blocks == block] - block * FORECAST_BLOCK_ROWS))
+        if not tables:
+            return self._arrays(self._reader.schema.empty_table())
+        return self._arrays(pa.concat_tables(tables))
+
+    def _arrays(self, table: pa.Table) -> StoredForecasts:
+        horizon = self.run.horizon
+
+        def matrix(name: str) -> np.ndarray:
+            column = table.column(name).combine_chunks()
+            return column.flatten().to_numpy(zero_copy_only=False).reshape(-1, horizon)
+
+        return StoredForecasts(
+            item_ids=[str(uuid.UUID(bytes=value)) for value in table.column("item_id").to_pylist()],
+            location_ids=[str(uuid.UUID(bytes=value)) for value in table.column("location_id").to_pylist()],
+            categories=table.column("category").to_pylist(),
+            model_types=table.column("model_type").to_pylist(),
+            mae=table.column("mae").to_numpy(),
+            point=matrix("point"),
+            quantiles={q: matrix(quantile_column(q)) for q in self.run.quantiles},
+        )
+
+
+class ForecastStore:
+    """Forecast runs on disk, one directory per organization and run."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or FORECAST_STORE_DIR
+
+    def _directory(self, organization_id: Any) -> str:
+        return os.path.join(self.root, str(organization_id))
+
+    def write_run(
+        self,
+        organization_id: Any,
+        run: ForecastRun,
+        item_ids: np.ndarray,
+        location_ids: np.ndarray,
+        categories: Sequence[Optional[str]],
+        model_types: Sequence[str],
+        mae: np.ndarray,
+        point: np.ndarray,
+        quantiles: Dict[float, np.ndarray]
+    ) -> None:
+        """Store a run's forecasts; rows of all arrays align.
+
+        Args:
+            item_ids, location_ids: V16 arrays (see id_bytes).
+            point: (series, horizon) point forecasts.
+            quantiles: (series, horizon) forecasts per quantile in run.quantiles.
+        """
+        names = sorted({category for category in categories if category is not None})
+        lookup = {name: code for code, name in enumerate(names)}
+        codes = np.array([lookup.get(category, len(names)) for category in categories], dtype=np.int64)
+        if any(category is None for category in categories):
+            names.append(None)
+
+        item_high, item_low = _sort_keys(item_ids)
+        location_high, location_low = _sort_keys(location_ids)
+        order = np.lexsort((location_low, location_high, item_low, item_high, codes))
+        starts = np.searchsorted(codes[order], np.arange(len(names))).tolist()
+
+        directory = self._directory(organization_id)
+        path = os.path.join(directory, run.run_id)
+        staging = os.path.join(directory, f".{run.run_id}.tmp")
+        os.makedirs(staging)
+        try:
+            fields = [
+                pa.field("item_id", pa.binary(16)),
+                pa.field("location_id", pa.binary(16)),
+                pa.field("category", pa.dictionary(pa.int32(), pa.string())),
+                pa.field("model_type", pa.dictionary(pa.int8(), pa.string())),
+                pa.field("mae", pa.float32()),
+                pa.field("point", pa.list_(pa.float32(), run.horizon)),
+            ] + [pa.field(quantile_column(q), pa.list_(pa.float32(), run.horizon)) for q in run.quantiles]
+            schema = pa.schema(fields)
+            category_dictionary = pa.array(names, type=pa.string())
+            model_dictionary = pa.array(sorted(set(model_types)), type=pa.string())
+            model_codes = {name: code for code, name in enumerate(model_dictionary.to_pylist())}
+            model_array = np.array([model_codes[name] for name in model_types], dtype=np.int8)
+
+            options = pa.ipc.IpcWriteOptions(compression=FORECAST_COMPRESSION)
+            with pa.OSFile(os.path.join(staging, "forecasts.arrow"), "wb") as sink:
+                with pa.ipc.new_file(sink, schema, options=options) as writer:
+                    for start in range(0, len(order), FORECAST_BLOCK_ROWS):
+                        rows = order[start:start + FORECAST_BLOCK_ROWS]
+                        columns = [
+                            _binary_ids(item_ids[rows]),
+                            _binary_ids(location_ids[rows]),
+                            pa.DictionaryArray.from_arrays(pa.array(codes[rows].astype(np.int32)), category_dictionary),
+                            pa.DictionaryArray.from_arrays(pa.array(model_array[rows]), model_dictionary),
+                            pa.array(np.asarray(mae, dtype=np.float32)[rows]),
+                            _float_lists(point[rows]),
+                        ] + [_float_lists(quantiles[q][rows]) for q in run.quantiles]
+                        writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+
+            np.save(os.path.join(staging, "items.npy"), item_ids[order])
+            np.save(os.path.join(staging, "locations.npy"), location_ids[order])
+            by_item = np.lexsort((item_low[order], item_high[order]))
+            np.save(os.path.join(staging, "item_keys.npy"), item_high[order][by_item])
+            np.save(os.path.join(staging, "item_rows.npy"), by_item.astype(np.int64))
+            with open(os.path.join(staging, "categories.json"), "w") as f:
+                json.dump({"names": names, "starts": starts}, f)
+            with open(os.path.join(staging, "run.json"), "w") as f:
+                json.dump({
+                    **run._asdict(),
+                    "created_at": run.created_at.isoformat(),
+                    "start": run.start.isoformat(),
+                }, f)
+            os.replace(staging, path)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if run.scope == "organization":
+            pointer = os.path.join(directory, LATEST_RUN)
+            with open(pointer + ".tmp", "w") as f:
+                f.write(run.run_id)
+            os.replace(pointer + ".tmp", pointer)
+
+    def _read_run(self, path: str) -> ForecastRun:
+        with open(os.path.join(path, "run.json")) as f:
+            meta = json.load(f)
+        meta["created_at"] = datetime.fromisoformat(meta["created_at"])
+        meta["start"] = date.fromisoformat(meta["start"])
+        return ForecastRun(**meta)
+
+    def list_runs(self, organization_id: Any, scope: Optional[str] = None) -> List[ForecastRun]:
+        """Stored runs of an organization, newest first."""
+        directory = self._directory(organization_id)
+        if not os.path.isdir(directory):
+            return []
+        runs = [
+            self._read_run(os.path.join(directory, name))
+            for name in self._run_names(directory)
+        ]
+        runs = [run for run in runs if scope is None or run.scope == scope]
+        return sorted(runs, key=lambda run: run.created_at, reverse=True)
+
+    def run_count(self, organization_id: Any) -> int:
+        """Number of stored runs of an organization, without reading them."""
+        directory = self._directory(organization_id)
+        return len(self._run_names(directory)) if os.path.isdir(directory) else 0
+
+    def prune_runs(self, organization_id: Any, scope: str, keep: int) -> int:
+        """Delete all but the newest `keep` runs of a scope; returns how many went."""
+        old = self.list_runs(organization_id, scope=scope)[keep:]
+        for run in old:
+            self.delete_run(organization_id, run.run_id)
+        return len(old)
+
+    def open(self, organization_id: Any, run_id: Optional[str] = None) -> Optional[ForecastRunReader]:
+        """Reader of a run, by default the latest organization-wide run."""
+        if run_id is None:
+            run_id = self._latest_run(organization_id)
+            if run_id is None:
+                return None
+        path = os.path.join(self._directory(organization_id), os.path.basename(run_id))
+        if not os.path.isdir(path):
+            return None
+        return ForecastRunReader(path, self._read_run(path))
+
+    def _run_names(self, directory: str) -> List[str]:
+        return [name for name in os.listdir(directory) if not name.startswith(".") and name != LATEST_RUN]
+
+    def _latest_run(self, organization_id: Any) -> Optional[str]:
+        """Id of the latest organization-wide run, from its pointer.
+
+        Stores written before the pointer existed fall back to reading
+        every run.
+        """
+        try:
+            with open(os.path.join(self._directory(organization_id), LATEST_RUN)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            runs = self.list_runs(organization_id, scope="organization")
+            return runs[0].run_id if runs else None
+
+    def delete_run(self, organization_id: Any, run_id: str) -> bool:
+        path = os.path.join(self._directory(organization_id), os.path.basename(run_id))
+        if not os.path.isdir(path):
+            return False
+        shutil.rmtree(path)
+        return True
@@ -0,0 +1,576 @@
+"""
+Catalog file import service for StockSense AI.
+
+Imports item and location catalogs from uploaded CSV or Excel files.
+Files are read as blocks of rows into Arrow tables of strings, so memory
+stays bounded by the block size whatever the file size. Each block is
+renamed through a saved ImportMapping and validated with vectorized
+column checks (pyarrow.compute) instead of one Pydantic model per row;
+valid rows are bulk-loaded through CatalogService and rejected rows are
+appended, with their errors, to a reject CSV kept next to the upload.
+"""
+
+import csv
+import json
+import os
+import re
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.storage import DATA_DIR
+from ..models.import_mapping import ImportMapping
+from ..models.user import User
+from ..schemas.imports import ImportMappingCreate, ImportMappingResponse
+from .catalog_service import CatalogService
+
+logger = structlog.get_logger()
+
+# Uploads and reject files; must be shared by the API and the job workers
+IMPORT_DIR = os.path.join(DATA_DIR, "stocksense-imports")
+
+# CSV bytes parsed per block, and worksheet rows per block for Excel
+IMPORT_BLOCK_BYTES = 4 * 1024 * 1024
+XLSX_BLOCK_ROWS = 20_000
+
+IMPORT_FORMATS = ("csv", "xlsx")
+
+# Separator of list cells such as item tags
+LIST_SEPARATOR = "|"
+
+TRUE_VALUES = ["true", "t", "yes", "y", "1"]
+FALSE_VALUES = ["false", "f", "no", "n", "0"]
+NUMBER_PATTERN = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+ProgressCallback = Callable[[float, str, Dict[str, Any]], Awaitable[None]]
+
+
+class ColumnRule(NamedTuple):
+    """Checks and conversion for one imported field."""
+    kind: str = "text"  # text, number, bool, json, list
+    required: bool = False
+    max_length: Optional[int] = None
+    minimum: Optional[float] = None
+    choices: Optional[Tuple[str, ...]] = None
+    default: Any = None
+
+
+# Mirrors ItemUpsert and LocationUpsert, which CatalogService expects
+IMPORT_RULES: Dict[str, Dict[str, ColumnRule]] = {
+    "items": {
+        "sku": ColumnRule(required=True, max_length=100),
+        "name": ColumnRule(required=True, max_length=255),
+        "description": ColumnRule(),
+        "category": ColumnRule(required=True, max_length=100),
+        "subcategory": ColumnRule(max_length=100),
+        "brand": ColumnRule(max_length=100),
+        "unit_of_measure": ColumnRule(max_length=20, default="EA"),
+        "dimensions": ColumnRule("json"),
+        "cost": ColumnRule("number", minimum=0, default=0.0),
+        "price": ColumnRule("number", minimum=0, default=0.0),
+        "attributes": ColumnRule("json"),
+        "tags": ColumnRule("list"),
+        "is_active": ColumnRule("bool", default=True),
+    },
+    "locations": {
+        "code": ColumnRule(required=True, max_length=50),
+        "name": ColumnRule(required=True, max_length=255),
+        "type": ColumnRule(required=True, choices=("warehouse", "store", "dc", "supplier", "customer", "transit")),
+        "parent_code": ColumnRule(max_length=50),
+        "address_street": ColumnRule(max_length=255),
+        "address_city": ColumnRule(max_length=100),
+        "address_state": ColumnRule(max_length=100),
+        "address_zip_code": ColumnRule(max_length=20),
+        "address_country": ColumnRule(max_length=100),
+        "latitude": ColumnRule("number"),
+        "longitude": ColumnRule("number"),
+        "contact_person": ColumnRule(max_length=100),
+        "contact_email": ColumnRule(max_length=255),
+        "contact_phone": ColumnRule(max_length=20),
+        "settings": ColumnRule("json"),
+        "is_active": ColumnRule("bool", default=True),
+    },
+}
+
+# Load outcomes that send a valid row to the reject file
+REJECTED_STATUSES = ("invalid", "conflict")
+
+
+def normalize_header(name: str) -> str:
+    """Field name a source column maps to without a saved mapping."""
+    return re.sub(r"[^0-9a-z]+", "_", name.strip().lower()).strip("_")
+
+
+def resolve_columns(header: List[str], dataset: str, columns: Optional[Dict[str, str]] = None,
+                    defaults: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """Source column -> field for a file header.
+
+    Without an explicit mapping, columns whose normalized name is a field
+    are used. Raises ValueError for unknown fields or when a required field
+    has neither a column nor a default.
+    """
+    rules = IMPORT_RULES[dataset]
+    if columns:
+        unknown = sorted(set(columns.values()) - set(rules))
+        if unknown:
+            raise ValueError(f"Unknown {dataset} fields: {', '.join(unknown)}")
+        resolved = {source: field for source, field in columns.items() if source in header}
+    else:
+        resolved = {source: normalize_header(source) for source in header if normalize_header(source) in rules}
+    missing = [field for field, rule in rules.items()
+               if rule.required and field not in resolved.values() and field not in (defaults or {})]
+    if missing:
+        raise ValueError(f"No column for required fields: {', '.join(missing)}")
+    return resolved
+
+
+def _cells(column) -> pa.ChunkedArray:
+    """Trimmed string cells with empty ones as nulls."""
+    text = pc.utf8_trim_whitespace(column)
+    return pc.if_else(pc.equal(text, ""), pa.scalar(None, pa.string()), text)
+
+
+def validate_block(
+    table: pa.Table,
+    dataset: str,
+    columns: Dict[str, str],
+    defaults: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]:
+    """Validate and convert one block of string cells, column by column.
+
+    Args:
+        table: Source columns as strings.
+        columns: Source column -> field, from resolve_columns.
+        defaults: Field values used for missing or empty cells, validated
+            like cell values.
+
+    Returns:
+        (records, valid_rows, errors): one record per valid row with every
+        field of the dataset, the indices of the valid rows, and an error
+        message per row ("" for valid rows).
+    """
+    rules = IMPORT_RULES[dataset]
+    n_rows = table.num_rows
+    sources = {field: source for source, field in columns.items()}
+    defaults = defaults or {}
+    values: Dict[str, Any] = {}
+    messages = []
+
+    def check(field: str, mask, message: str) -> None:
+        messages.append(pc.if_else(pc.fill_null(mask, False), f"{field}: {message}; ", ""))
+
+    for field, rule in rules.items():
+        if field in sources:
+            text = _cells(table[sources[field]])
+        else:
+            text = pa.nulls(n_rows, pa.string())
+        if defaults.get(field) is not None:
+            default = defaults[field]
+            text = pc.fill_null(text, json.dumps(default) if rule.kind == "json" else str(default))
+        present = pc.is_valid(text)
+        if rule.required:
+            check(field, pc.invert(present), "field required")
+
+        if rule.kind == "number":
+            is_number = pc.match_substring_regex(text, NUMBER_PATTERN)
+            check(field, pc.invert(is_number), "not a number")
+            value = pc.cast(pc.if_else(is_number, text, pa.scalar(None, pa.string())), pa.float64())
+            if rule.minimum is not None:
+                check(field, pc.less(value, rule.minimum), f"must be at least {rule.minimum:g}")
+        elif rule.kind == "bool":
+            lowered = pc.utf8_lower(text)
+            is_true = pc.is_in(lowered, value_set=pa.array(TRUE_VALUES))
+            check(field, pc.and_(present, pc.invert(pc.or_(is_true, pc.is_in(lowered, value_set=pa.array(FALSE_VALUES))))),
+                  "not a boolean")
+            value = pc.if_else(present, is_true, pa.scalar(None, pa.bool_()))
+        elif rule.kind == "list":
+            value = pc.split_pattern(text, LIST_SEPARATOR)
+        elif rule.kind == "json":
+            # Only non-empty cells are parsed, one at a time
+            parsed: List[Any] = [None] * n_rows
+            bad = np.zeros(n_rows, dtype=bool)
+            filled = np.flatnonzero(present.to_numpy(zero_copy_only=False))
+            for i, cell in zip(filled, pc.take(text, pa.array(filled, type=pa.int64())).to_pylist()):
+                try:
+                    parsed[i] = json.loads(cell)
+                except ValueError:
+                    pass
+                if not isinstance(parsed[i], dict):
+                    parsed[i] = None
+                    bad[i] = True
+            check(field, pa.array(bad), "not a JSON object")
+            value = parsed
+        else:
+            value = text
+            if rule.max_length is not None:
+                check(field, pc.greater(pc.utf8_length(text), rule.max_length),
+                      f"at most {rule.max_length} characters")
+            if rule.choices:
+                check(field, pc.and_(present, pc.invert(pc.is_in(text, value_set=pa.array(rule.choices)))),
+                      f"must be one of {', '.join(rule.choices)}")
+
+        if rule.default is not None:
+            value = pc.fill_null(value, rule.default)
+        values[field] = value
+
+    if messages:
+        errors = pc.utf8_rtrim(pc.binary_join_element_wise(*messages, ""), characters="; ")
+        errors = errors.to_numpy(zero_copy_only=False).astype(object)
+    else:
+        errors = np.full(n_rows, "", dtype=object)
+    valid_rows = np.flatnonzero(errors == "")
+
+    # Convert the valid rows only, all Arrow columns in one pass
+    arrow_fields = [field for field, value in values.items() if not isinstance(value, list)]
+    take = pa.array(valid_rows, type=pa.int64())
+    records = pa.table({field: pc.take(values[field], take) for field in arrow_fields}).to_pylist()
+    for field, value in values.items():
+        if isinstance(value, list):
+            for record, i in zip(records, valid_rows):
+                record[field] = value[i]
+    return records, valid_rows, errors
+
+
+def _csv_header(path: str, delimiter: str) -> List[str]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f, delimiter=delimiter), [])
+
+
+def _record_chunks(source, block_bytes: int) -> Iterator[bytes]:
+    """Split a CSV byte stream into chunks of whole records.
+
+    A chunk ends at the last newline that is not inside a quoted value,
+    which is one where the chunk holds an even number of quote characters.
+    """
+    carry = b""
+    while True:
+        data = source.read(block_bytes)
+        if not data:
+            if carry.strip():
+                yield carry
+            return
+        data = carry + data
+        end = data.rfind(b"\n") + 1
+        while end and data.count(b'"', 0, end) % 2:
+            end = data.rfind(b"\n", 0, end - 1) + 1
+        if end:
+            yield data[:end]
+        carry = data[end:]
+
+
+def read_csv_blocks(path: str, delimiter: str = ",", block_bytes: int = IMPORT_BLOCK_BYTES) -> Iterator[Tuple[pa.Table, float]]:
+    """Yield (block of string columns, fraction of the file read).
+
+    Each block is parsed on its own, as Arrow's streaming CSV reader reads
+    the whole file ahead of the consumer.
+    """
+    header = _csv_header(path, delimiter)
+    if not header:
+        return
+    if len(set(header)) != len(header):
+        raise ValueError("Duplicate column names in header")
+    size = os.path.getsize(path) or 1
+    parse_options = pacsv.ParseOptions(delimiter=delimiter, newlines_in_values=True)
+    convert_options = pacsv.ConvertOptions(column_types={name: pa.string() for name in header}, strings_can_be_null=False)
+    with open(path, "rb") as source:
+        for i, chunk in enumerate(_record_chunks(source, block_bytes)):
+            table = pacsv.read_csv(
+                pa.py_buffer(chunk),
+                read_options=pacsv.ReadOptions(column_names=header, skip_rows=0 if i else 1),
+                parse_options=parse_options,
+                convert_options=convert_options,
+            )
+            if table.num_rows:
+                yield table, min(source.tell() / size, 1.0)
+
+
+def _xlsx_cell(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def read_xlsx_blocks(path: str, block_rows: int = XLSX_BLOCK_ROWS) -> Iterator[Tuple[pa.Table, float]]:
+    """Yield (block of string columns, fraction read) from the first worksheet."""
+    from openpyxl import load_workbook  # only needed for Excel imports
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [_xlsx_cell(value) or f"column_{i + 1}" for i, value in enumerate(next(rows, ()))]
+        if len(set(header)) != len(header):
+            raise ValueError("Duplicate column names in header")
+        total = max((sheet.max_row or 1) - 1, 1)
+        read = 0
+        block: List[Tuple] = []
+        for row in rows:
+            block.append(row)
+            if len(block) >= block_rows:
+                read += len(block)
+                yield _strings_table(header, block), min(read / total, 1.0)
+                block = []
+        if block:
+            yield _strings_table(header, block), 1.0
+    finally:
+        workbook.close()
+
+
+def _strings_table(header: List[str], rows: List[Tuple]) -> pa.Table:
+    width = len(header)
+    cells = [[_xlsx_cell(value) for value in row[:width]] + [None] * (width - len(row)) for row in rows]
+    return pa.table({name: pa.array(column, type=pa.string()) for name, column in zip(header, zip(*cells))})
+
+
+def read_header(path: str, format: str, delimiter: str = ",") -> List[str]:
+    """Column names of an uploaded file."""
+    if format == "xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            row = next(workbook.worksheets[0].iter_rows(values_only=True), ())
+            return [_xlsx_cell(value) or f"column_{i + 1}" for i, value in enumerate(row)]
+        finally:
+            workbook.close()
+    return _csv_header(path, delimiter)
+
+
+def read_blocks(path: str, format: str, delimiter: str = ",") -> Iterator[Tuple[pa.Table, float]]:
+    """Blocks of string cells from an uploaded file."""
+    if format == "xlsx":
+        return read_xlsx_blocks(path)
+    return read_csv_blocks(path, delimiter)
+
+
+class ImportService:
+    """Service for catalog file imports and their saved column mappings."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_mapping(self, mapping_data: ImportMappingCreate, user: User) -> ImportMappingResponse:
+        """Save a column mapping.
+
+        Raises:
+            ValueError: For fields the dataset does not have.
+        """
+        rules = IMPORT_RULES[mapping_data.dataset]
+        unknown = sorted((set(mapping_data.columns.values()) | set(mapping_data.defaults or {})) - set(rules))
+        if unknown:
+            raise ValueError(f"Unknown {mapping_data.dataset} fields: {', '.join(unknown)}")
+        try:
+            mapping = ImportMapping(
+                **mapping_data.dict(),
+                organization_id=user.organization_id,
+                created_by=user.id
+            )
+            self.db.add(mapping)
+            await self.db.commit()
+            await self.db.refresh(mapping)
+
+            logger.info("Import mapping created", mapping_id=str(mapping.id), name=mapping.name)
+            return ImportMappingResponse.from_model(mapping)
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to create import mapping", error=str(e))
+            raise
+
+    async def list_mappings(self, user: User, dataset: Optional[str] = None) -> List[ImportMappingResponse]:
+        """List the organization's import mappings."""
+        try:
+            query = select(ImportMapping).where(ImportMapping.organization_id == user.organization_id)
+            if dataset:
+                query = query.where(ImportMapping.dataset == dataset)
+            result = await self.db.execute(query.order_by(ImportMapping.name))
+            return [ImportMappingResponse.from_model(mapping) for mapping in result.scalars().all()]
+
+        except Exception as e:
+            logger.error("Failed to list import mappings", error=str(e))
+            raise
+
+    async def delete_mapping(self, mapping_id: str, user: User) -> bool:
+        """Delete an import mapping; False if it does not exist."""
+        try:
+            mapping = await self._get_mapping(mapping_id, user)
+            if not mapping:
+                return False
+            await self.db.delete(mapping)
+            await self.db.commit()
+            return True
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to delete import mapping", mapping_id=mapping_id, error=str(e))
+            raise
+
+    async def _get_mapping(self, mapping_id: str, user: User) -> Optional[ImportMapping]:
+        result = await self.db.execute(
+            select(ImportMapping).where(
+                and_(ImportMapping.id == mapping_id, ImportMapping.organization_id == user.organization_id)
+            )
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    def upload_path(user: User, upload_id: str, suffix: str) -> str:
+        """Path of an upload's file in the organization's import directory."""
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise ValueError("Invalid upload id")
+        return os.path.join(IMPORT_DIR, str(user.organization_id), f"{upload_id}.{suffix}")
+
+    async def save_upload(self, chunks: AsyncIterator[bytes], format: str, user: User) -> str:
+        """Write an uploaded file to the import directory; returns its upload id."""
+        if format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format: {format}")
+        upload_id = uuid.uuid4().hex
+        path = self.upload_path(user, upload_id, format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = 0
+        with open(path, "wb") as f:
+            async for data in chunks:
+                f.write(data)
+                size += len(data)
+        logger.info("Import uploaded", upload_id=upload_id, format=format, bytes=size)
+        return upload_id
+
+    async def _mapping_settings(self, dataset: str, mapping_id: Optional[str], user: User):
+        """(columns, defaults, delimiter) of a saved mapping, or of none."""
+        if not mapping_id:
+            return None, None, ","
+        mapping = await self._get_mapping(mapping_id, user)
+        if not mapping or mapping.dataset != dataset:
+            raise ValueError("Import mapping not found")
+        return mapping.columns, mapping.defaults, mapping.delimiter
+
+    async def check_upload(self, dataset: str, upload_id: str, format: str, user: User,
+                           mapping_id: Optional[str] = None) -> Dict[str, str]:
+        """Resolve an upload's header before queueing its import.
+
+        Returns:
+            Source column -> field.
+
+        Raises:
+            ValueError: For an unknown mapping or missing required columns.
+        """
+        columns, defaults, delimiter = await self._mapping_settings(dataset, mapping_id, user)
+        header = read_header(self.upload_path(user, upload_id, format), format, delimiter)
+        return resolve_columns(header, dataset, columns, defaults)
+
+    async def import_file(
+        self,
+        dataset: str,
+        upload_id: str,
+        format: str,
+        user: User,
+        mapping_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        checkpoint: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Validate and load an uploaded file block by block.
+
+        Args:
+            progress: Called after every block with the fraction read, a
+                message and a checkpoint to resume from.
+            checkpoint: Checkpoint of an interrupted run; its blocks are
+                skipped.
+
+        Returns:
+            Row counts per outcome and whether a reject file was written.
+        """
+        if dataset not in IMPORT_RULES:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        if format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format: {format}")
+        path = self.upload_path(user, upload_id, format)
+        rejects_path = self.upload_path(user, upload_id, "rejects.csv")
+        columns, defaults, delimiter = await self._mapping_settings(dataset, mapping_id, user)
+
+        checkpoint = checkpoint or {}
+        skip_rows = checkpoint.get("rows", 0)
+        counts: Dict[str, int] = dict(checkpoint.get("counts", {}))
+        rows_read = 0
+        writer, sink = None, None
+        catalog = CatalogService(self.db)
+        try:
+            resolved = None
+            for table, fraction in read_blocks(path, format, delimiter):
+                if resolved is None:
+                    resolved = resolve_columns(table.column_names, dataset, columns, defaults)
+                first_row = rows_read
+                rows_read += table.num_rows
+                if rows_read <= skip_rows:
+                    continue
+
+                records, valid_rows, errors = validate_block(table, dataset, resolved, defaults)
+                counts["rejected"] = counts.get("rejected", 0) + table.num_rows - len(valid_rows)
+
+                async def source():
+                    for record in records:
+                        yield record
+
+                position = 0
+                async for status in catalog.upsert_validated(dataset, source(), user):
+                    counts[status["status"]] = counts.get(status["status"], 0) + 1
+                    if status["status"] in REJECTED_STATUSES:
+                        errors[valid_rows[position]] = status["error"]
+                        counts["rejected"] += 1
+                    position += 1
+
+                rejected = np.flatnonzero(errors != "")
+                if len(rejected):
+                    if writer is None:
+                        writer, sink = self._reject_writer(rejects_path, table.schema, append=skip_rows > 0)
+                    rejects = table.take(pa.array(rejected, type=pa.int64()))
+                    rejects = rejects.append_column("_row", pa.array(rejected + first_row + 1, type=pa.int64()))
+                    rejects = rejects.append_column("_errors", pa.array(errors[rejected], type=pa.string()))
+                    writer.write_table(rejects)
+
+                if progress:
+                    await progress(fraction, f"Imported {rows_read:,} rows", {"rows": rows_read, "counts": counts})
+
+            summary = {"dataset": dataset, "rows": rows_read, **counts,
+                       "rejects": bool(counts.get("rejected")) and os.path.exists(rejects_path)}
+            logger.info("Import completed", upload_id=upload_id, **summary)
+            return summary
+
+        except Exception as e:
+            logger.error("Failed to import file", upload_id=upload_id, dataset=dataset, error=str(e))
+            raise
+
+        finally:
+            if writer is not None:
+                writer.close()
+                sink.close()
+
+    @staticmethod
+    def _reject_writer(path: str, schema: pa.Schema, append: bool) -> Tuple[pacsv.CSVWriter, pa.NativeFile]:
+        """CSV writer for rejected rows and its file; a resumed import appends."""
+        schema = schema.append(pa.field("_row", pa.int64())).append(pa.field("_errors", pa.string()))
+        resumed = append and os.path.exists(path)
+        sink = pa.OSFile(path, "ab" if resumed else "wb")
+        return pacsv.CSVWriter(sink, schema, write_options=pacsv.WriteOptions(include_header=not resumed)), sink
+
+    def rejects_path(self, user: User, upload_id: str) -> Optional[str]:
+        """Reject file of an import, if one was written."""
+        path = self.upload_path(user, upload_id, "rejects.csv")
+        return path if os.path.exists(path) else None
+
+    def remove_upload(self, user: User, upload_id: str, format: str) -> None:
+        """Delete an uploaded file once it has been imported."""
+        path = self.upload_path(user, upload_id, format)
+        if os.path.exists(path):
+            os.remove(path)
@@ -8,22 +8,59 @@ CRUD operations, movement tracking, and inventory analytics.
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, and_, or_, case, cast, null, Float
 from sqlalchemy.orm import selectinload
 import structlog
 
-from ..models.inventory import Item, Location, Inventory, InventoryMovement
+from ..core.cache import get_response_cache
+from ..core.database import stream_partitions
+from ..core.serialization import rows_to_dicts
+from ..models.inventory import Item, Location, Inventory, InventoryMovement, INBOUND_TYPES, OUTBOUND_TYPES
 from ..models.user import User
 from ..schemas.inventory import (
     ItemCreate, ItemUpdate, ItemResponse,
     LocationCreate, LocationUpdate, LocationResponse,
     InventoryCreate, InventoryUpdate, InventoryResponse,
     MovementCreate, MovementResponse,
-    InventorySummary, LowStockAlert, ExcessStockAlert
+    InventorySummary, ExcessStockAlert
 )
 
+from .availability import get_availability_index
+from .availability_service import AvailabilityService
+from .balance_snapshots import BalanceSnapshotStore
+from .prediction_cache import get_prediction_cache
+from .reservation_service import ReservationService
+
 logger = structlog.get_logger()
 
+# Days of shipments averaged for the days of stock of low stock alerts
+DEMAND_LOOKBACK_DAYS = 28
+
+# Response fields whose model column has a different name
+RESPONSE_COLUMN_ALIASES = {
+    "location_type": "type",
+    "contact_name": "contact_person",
+    "unit_cost": "cost",
+    "unit_price": "price",
+}
+
+def response_columns(model, schema) -> list:
+    """Model columns labelled as the schema's response fields.
+    
+    Used by the list endpoints to fetch exactly the response fields as
+    tuples; fields the model does not have come back as null, so they
+    must be optional in the schema.
+    """
+    columns = []
+    for field in schema.__fields__:
+        name = RESPONSE_COLUMN_ALIASES.get(field, field)
+        column = getattr(model, name, None)
+        columns.append((column if column is not None else null()).label(field))
+    return columns
+
+ITEM_RESPONSE_COLUMNS = response_columns(Item, ItemResponse)
+LOCATION_RESPONSE_COLUMNS = response_columns(Location, LocationResponse)
+
 class InventoryService:
     """Service for inventory management operations."""
     
@@ -41,6 +78,7 @@ class InventoryService:
             self.db.add(item)
             await self.db.commit()
             await self.db.refresh(item)
+            await get_response_cache().invalidate(user.organization_id)
             
             logger.info("Item created", item_id=str(item.id), name=item.name)
             return ItemResponse.from_model(item)
@@ -50,40 +88,49 @@ class InventoryService:
             logger.error("Failed to create item", error=str(e))
             raise
     
-    async def get_items(
-        self, 
+    async def get_item_rows(
+        self,
         user: User,
         skip: int = 0,
         limit: int = 100,
         category_id: Optional[str] = None,
         search: Optional[str] = None
-    ) -> List[ItemResponse]:
-        """Get inventory items with filtering and pagination."""
+    ) -> List[Dict[str, Any]]:
+        """Get items as plain dicts of response fields, for fast serialization."""
         try:
-            query = select(Item).where(Item.organization_id == user.organization_id)
-            
-            if category_id:
-                query = query.where(Item.category_id == category_id)
-            
-            if search:
-                query = query.where(
-                    or_(
-                        Item.name.ilike(f"%{search}%"),
-                        Item.sku.ilike(f"%{search}%"),
-                        Item.description.ilike(f"%{search}%")
-                    )
-                )
-            
-            query = query.offset(skip).limit(limit)
-            result = await self.db.execute(query)
-            items = result.scalars().all()
-            
-            return [ItemResponse.from_model(item) for item in items]
+            query = self._items_query(select(*ITEM_RESPONSE_COLUMNS), user, category_id, search)
+            result = await self.db.execute(query.offset(skip).limit(limit))
+            return rows_to_dicts(result.keys(), result.all())
             
         except Exception as e:
-            logger.error("Failed to get items", error=str(e))
+            logger.error("Failed to get item rows", error=str(e))
             raise
     
+    async def _stream_dicts(self, query) -> List[Dict[str, Any]]:
+        """Fetch a column query from a server-side cursor as dicts, batch by batch."""
+        keys = list(query.selected_columns.keys())
+        rows = []
+        async for partition in stream_partitions(self.db, query):
+            rows.extend(rows_to_dicts(keys, partition))
+        return rows
+    
+    def _items_query(self, query, user: User, category_id: Optional[str], search: Optional[str]):
+        """Apply the organization scope and item list filters to a query."""
+        query = query.where(Item.organization_id == user.organization_id)
+        
+        if category_id:
+            query = query.where(Item.category_id == category_id)
+        
+        if search:
+            query = query.where(
+                or_(
+                    Item.name.ilike(f"%{search}%"),
+                    Item.sku.ilike(f"%{search}%"),
+                    Item.description.ilike(f"%{search}%")
+                )
+            )
+        return query
+    
     async def get_item(self, item_id: str, user: User) -> Optional[ItemResponse]:
         """Get a specific inventory item."""
         try:
@@ -125,6 +172,7 @@ class InventoryService:
             item.updated_at = datetime.utcnow()
             await self.db.commit()
             await self.db.refresh(item)
+            await get_response_cache().invalidate(user.organization_id)
             
             logger.info("Item updated", item_id=str(item.id))
             return ItemResponse.from_model(item)
@@ -145,6 +193,7 @@ class InventoryService:
             self.db.add(location)
             await self.db.commit()
             await self.db.refresh(location)
+            await get_response_cache().invalidate(user.organization_id)
             
             logger.info("Location created", location_id=str(location.id), name=location.name)
             return LocationResponse.from_model(location)
@@ -154,18 +203,14 @@ class InventoryService:
             logger.error("Failed to create location", error=str(e))
             raise
     
-    async def get_locations(self, user: User) -> List[LocationResponse]:
-        """Get all locations for the organization."""
+    async def get_location_rows(self, user: User) -> List[Dict[str, Any]]:
+        """Get locations as plain dicts of response fields, for fast serialization."""
         try:
-            result = await self.db.execute(
-                select(Location).where(Location.organization_id == user.organization_id)
-            )
-            locations = result.scalars().all()
-            
-            return [LocationResponse.from_model(location) for location in locations]
+            query = select(*LOCATION_RESPONSE_COLUMNS).where(Location.organization_id == user.organization_id)
+            return await self._stream_dicts(query)
             
         except Exception as e:
-            logger.error("Failed to get locations", error=str(e))
+            logger.error("Failed to get location rows", error=str(e))
             raise
     
     async def get_inventory_summary(self, user: User) -> InventorySummary:
@@ -225,13 +270,57 @@ class InventoryService:
             logger.error("Failed to get inventory summary", error=str(e))
             raise
     
-    async def get_low_stock_alerts(self, user: User) -> List[LowStockAlert]:
-        """Get low stock alerts."""
+    async def get_low_stock_alert_rows(self, user: User) -> List[Dict[str, Any]]:
+        """Get low stock alerts as plain dicts, computing days of stock in SQL.
+        
+        Days of stock divide the quantity on hand by the average daily
+        shipments of the last DEMAND_LOOKBACK_DAYS; they are null for
+        series without recent shipments.
+        """
         try:
-            result = await self.db.execute(
-                select(Inventory, Item, Location)
-                .join(Item)
-                .join(Location)
+            since = datetime.utcnow() - timedelta(days=DEMAND_LOOKBACK_DAYS)
+            shipped = (
+                select(
+                    InventoryMovement.item_id,
+                    InventoryMovement.location_id,
+                    func.sum(func.abs(InventoryMovement.quantity)).label("units")
+                )
+                .join(Item, InventoryMovement.item_id == Item.id)
+                .where(
+                    and_(
+                        Item.organization_id == user.organization_id,
+                        InventoryMovement.type == "shipment",
+                        InventoryMovement.created_at >= since
+                    )
+                )
+                .group_by(InventoryMovement.item_id, InventoryMovement.location_id)
+                .subquery()
+            )
+            days_of_stock = case(
+                (shipped.c.units > 0, cast(Inventory.quantity, Float) * DEMAND_LOOKBACK_DAYS / shipped.c.units),
+                else_=null()
+            )
+            query = (
+                select(
+                    Item.id.label("item_id"),
+                    Item.name.label("item_name"),
+                    Item.sku.label("item_sku"),
+                    Location.id.label("location_id"),
+                    Location.name.label("location_name"),
+                    Inventory.quantity.label("current_quantity"),
+                    Inventory.reorder_point.label("reorder_point"),
+                    days_of_stock.label("days_of_stock")
+                )
+                .select_from(Inventory)
+                .join(Item, Inventory.item_id == Item.id)
+                .join(Location, Inventory.location_id == Location.id)
+                .outerjoin(
+                    shipped,
+                    and_(
+                        shipped.c.item_id == Inventory.item_id,
+                        shipped.c.location_id == Inventory.location_id
+                    )
+                )
                 .where(
                     and_(
                         Item.organization_id == user.organization_id,
@@ -239,24 +328,10 @@ class InventoryService:
                     )
                 )
             )
-            
-            alerts = []
-            for inventory, item, location in result:
-                alerts.append(LowStockAlert(
-                    item_id=str(item.id),
-                    item_name=item.name,
-                    item_sku=item.sku,
-                    location_id=str(location.id),
-                    location_name=location.name,
-                    current_quantity=inventory.quantity,
-                    reorder_point=inventory.reorder_point,
-                    days_of_stock=inventory.quantity / (item.daily_demand or 1) if item.daily_demand else 0
-                ))
-            
-            return alerts
+            return await self._stream_dicts(query)
             
         except Exception as e:
-            logger.error("Failed to get low stock alerts", error=str(e))
+            logger.error("Failed to get low stock alert rows", error=str(e))
             raise
     
     async def record_movement(
@@ -267,11 +342,7 @@ class InventoryService:
         """Record inventory movement."""
         try:
             # Create movement record
-            movement = InventoryMovement(
-                **movement_data.dict(),
-                organization_id=user.organization_id,
-                created_by=user.id
-            )
+            movement = InventoryMovement(**movement_data.movement_columns())
             self.db.add(movement)
             
             # Update inventory levels
@@ -281,43 +352,61 @@ class InventoryService:
                         Inventory.item_id == movement_data.item_id,
                         Inventory.location_id == movement_data.location_id
                     )
-                )
+                ).with_for_update()
             )
             inventory = inventory_result.scalar_one_or_none()
             
             if not inventory:
                 # Create new inventory record
                 inventory = Inventory(
-                    item_id=movement_data.item_id,
-                    location_id=movement_data.location_id,
-                    organization_id=user.organization_id,
-                    quantity=movement_data.quantity,
-                    created_by=user.id
+                    item_id=movement.item_id,
+                    location_id=movement.location_id,
+                    quantity=0,
+                    reserved_quantity=0
                 )
                 self.db.add(inventory)
-            else:
-                # Update existing inventory
-                if movement_data.movement_type == "in":
-                    inventory.quantity += movement_data.quantity
-                elif movement_data.movement_type == "out":
-                    inventory.quantity -= movement_data.quantity
-                elif movement_data.movement_type == "adjustment":
-                    inventory.quantity = movement_data.quantity
-                
-                inventory.updated_at = datetime.utcnow()
+            
+            # Inbound and outbound types move stock by their quantity; an
+            # adjustment sets the level and is recorded as its change, the
+            # signed delta balance history and anomaly scans replay
+            if movement.type in INBOUND_TYPES:
+                inventory.quantity += movement.quantity
+            elif movement.type in OUTBOUND_TYPES:
+                inventory.quantity -= movement.quantity
+            elif movement.type == "adjustment":
+                movement.quantity -= inventory.quantity
+                inventory.quantity += movement.quantity
+            
+            # Shipments against an order use up its reservation
+            inventory.reserved_quantity -= await ReservationService(self.db).fulfil(movement, user)
+            inventory.available_quantity = inventory.quantity - inventory.reserved_quantity
+            inventory.updated_at = datetime.utcnow()
+            
+            # Receive against open purchase orders and transfers
+            availability = AvailabilityService(self.db)
+            receipts = await availability.receive(movement, user)
             
             await self.db.commit()
             await self.db.refresh(movement)
+            await get_response_cache().invalidate(user.organization_id)
+            get_prediction_cache().invalidate_series(user.organization_id, movement.item_id, movement.location_id)
+            get_availability_index().set_on_hand(
+                user.organization_id, movement.item_id, movement.location_id,
+                inventory.quantity, inventory.reserved_quantity
+            )
+            availability.publish_receipts(user, receipts)
+            if movement.created_at.date() < datetime.utcnow().date():
+                BalanceSnapshotStore(user.organization_id).mark_stale(movement.created_at.date())
             
             logger.info(
                 "Movement recorded", 
                 movement_id=str(movement.id),
                 item_id=str(movement.item_id),
                 quantity=movement.quantity,
-                type=movement.movement_type
+                type=movement.type
             )
             
-            return MovementResponse.from_model(movement)
+            return MovementResponse.from_model(movement, user)
             
         except Exception as e:
             await self.db.rollback()
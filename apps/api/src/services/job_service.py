@@ -0,0 +1,179 @@
+"""
+Job service for StockSense AI.
+
+Provides business logic for submitting, tracking and cancelling
+background jobs.
+"""
+
+from typing import List, Optional
+from datetime import datetime, timedelta
+import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_
+import structlog
+
+from ..models.job import Job
+from ..models.user import User, Organization
+from ..schemas.job import JobSubmit, JobResponse
+from ..jobs.broker import JobBroker, DEFAULT_ORG_CONCURRENCY, get_broker
+from ..jobs.runner import publish_status
+
+logger = structlog.get_logger()
+
+# Running jobs whose worker has not sent a heartbeat for this long are
+# considered orphaned and queued again
+STALE_JOB_AFTER = timedelta(minutes=5)
+
+class JobService:
+    """Service for background job management."""
+    
+    def __init__(self, db: AsyncSession, broker: Optional[JobBroker] = None):
+        self.db = db
+        self.broker = broker or get_broker()
+    
+    async def submit_job(self, job_data: JobSubmit, user: User) -> JobResponse:
+        """Persist a new job and queue it for the workers."""
+        try:
+            job = Job(
+                organization_id=user.organization_id,
+                created_by=user.id,
+                type=job_data.type,
+                status="queued",
+                params=job_data.params,
+                progress=0.0,
+                attempts=0,
+                cancel_requested=False
+            )
+            self.db.add(job)
+            await self.db.commit()
+            await self.db.refresh(job)
+            
+            limit = await self._concurrency_limit(user.organization_id)
+            await self.broker.enqueue(str(user.organization_id), str(job.id), limit)
+            
+            logger.info("Job submitted", job_id=str(job.id), type=job.type)
+            return JobResponse.from_model(job)
+            
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to submit job", error=str(e))
+            raise
+    
+    async def get_job(self, job_id: str, user: User) -> Optional[JobResponse]:
+        """Get a job of the user's organization."""
+        try:
+            job = await self._get_job(job_id, user)
+            return JobResponse.from_model(job) if job else None
+            
+        except Exception as e:
+            logger.error("Failed to get job", job_id=job_id, error=str(e))
+            raise
+    
+    async def list_jobs(
+        self,
+        user: User,
+        status: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[JobResponse]:
+        """List the organization's jobs, newest first."""
+        try:
+            query = select(Job).where(Job.organization_id == user.organization_id)
+            if status:
+                query = query.where(Job.status == status)
+            query = query.order_by(Job.created_at.desc()).offset(skip).limit(limit)
+            
+            result = await self.db.execute(query)
+            return [JobResponse.from_model(job) for job in result.scalars().all()]
+            
+        except Exception as e:
+            logger.error("Failed to list jobs", error=str(e))
+            raise
+    
+    async def cancel_job(self, job_id: str, user: User) -> Optional[JobResponse]:
+        """Cancel a job.
+        
+        Queued jobs are cancelled immediately; running jobs are flagged and
+        stop at their next progress report. Finished jobs are returned as is.
+        """
+        try:
+            job = await self._get_job(job_id, user)
+            if job is None:
+                return None
+            
+            # Conditional updates, so a worker claiming the job meanwhile
+            # either sees it cancelled or gets the flag
+            await self.db.execute(
+                update(Job)
+                .where(and_(Job.id == job.id, Job.status.in_(("queued", "running"))))
+                .values(cancel_requested=True)
+            )
+            await self.db.execute(
+                update(Job)
+                .where(and_(Job.id == job.id, Job.status == "queued"))
+                .values(status="cancelled", finished_at=datetime.utcnow())
+            )
+            await self.db.commit()
+            await self.db.refresh(job)
+            if job.status == "cancelled":
+                await publish_status(self.broker, job, "cancelled")
+            
+            logger.info("Job cancellation requested", job_id=job_id, status=job.status)
+            return JobResponse.from_model(job)
+            
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to cancel job", job_id=job_id, error=str(e))
+            raise
+    
+    async def requeue_stale_jobs(self, stale_after: timedelta = STALE_JOB_AFTER) -> int:
+        """Queue running jobs again whose worker stopped sending heartbeats.
+        
+        The job resumes from its last checkpoint; the organization slot held
+        by the lost worker is released.
+        """
+        try:
+            cutoff = datetime.utcnow() - stale_after
+            result = await self.db.execute(
+                update(Job)
+                .where(and_(Job.status == "running", Job.heartbeat_at < cutoff))
+                .values(status="queued")
+                .returning(Job.id, Job.organization_id)
+            )
+            stale = result.all()
+            await self.db.commit()
+            
+            for job_id, organization_id in stale:
+                await self.broker.release(str(organization_id))
+                limit = await self._concurrency_limit(organization_id)
+                await self.broker.enqueue(str(organization_id), str(job_id), limit)
+            
+            if stale:
+                logger.warning("Stale jobs requeued", count=len(stale))
+            return len(stale)
+            
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to requeue stale jobs", error=str(e))
+            raise
+    
+    async def _get_job(self, job_id: str, user: User) -> Optional[Job]:
+        """Load a job scoped to the user's organization."""
+        result = await self.db.execute(
+            select(Job).where(
+                and_(
+                    Job.id == job_id,
+                    Job.organization_id == user.organization_id
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+    
+    async def _concurrency_limit(self, organization_id) -> int:
+        """Concurrent job limit from the organization's settings."""
+        result = await self.db.execute(select(Organization.settings).where(Organization.id == organization_id))
+        settings = result.scalar_one_or_none()
+        try:
+            return int(json.loads(settings or "{}").get("max_concurrent_jobs", DEFAULT_ORG_CONCURRENCY))
+        except (ValueError, TypeError, AttributeError):
+            return DEFAULT_ORG_CONCURRENCY
@@ -0,0 +1,346 @@
+"""
+Lead-time intelligence service for StockSense AI.
+
+Learns empirical lead-time distributions per supplier route from purchase
+order receipts and computes lead-time demand distributions by vectorized
+FFT convolution. Results are cached by (demand profile, lead-time profile)
+so item-locations sharing both are convolved only once.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+import math
+
+import numpy as np
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from ..core.database import stream_rows
+from ..models.inventory import Item, InventoryMovement
+from ..models.user import User
+from .demand_distributions import demand_pmf, truncate_pmf, round_significant
+
+logger = structlog.get_logger()
+
+# Longest lead time tracked; later receipts are clipped into the last day
+MAX_LEAD_TIME_DAYS = 120
+
+# Pseudo-observations of the pooled distribution added to every route, so
+# routes with few receipts are shrunk towards the organization-wide shape
+PRIOR_WEIGHT = 5.0
+
+# Decimals kept in lead-time pmfs used as cache keys
+LEAD_TIME_PRECISION = 3
+
+# Largest lead-time demand support (in buckets) convolved exactly
+MAX_SUPPORT_BUCKETS = 4096
+
+# Upper bound on complex FFT cells held in memory per convolution chunk
+MAX_FFT_CELLS = 1 << 23
+
+LEAD_TIME_DEMAND_CACHE_SIZE = 100_000
+
+_lead_time_demand_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+
+
+class DemandProfile(NamedTuple):
+    """Per-period demand, expressed in buckets of `bucket` units."""
+    distribution: str  # poisson | normal
+    mean: float
+    std: float
+    bucket: int = 1
+
+
+class LeadTimeProfile(NamedTuple):
+    """Learned lead-time distribution for one supplier route."""
+    pmf: Tuple[float, ...]  # probability by lead time in days
+    mean: float
+    std: float
+    observations: int
+
+
+def fixed_lead_time(days: int) -> Tuple[float, ...]:
+    """Degenerate lead-time pmf for a known, constant lead time."""
+    return (0.0,) * days + (1.0,)
+
+
+def lead_time_key(pmf: Sequence[float]) -> Tuple[float, ...]:
+    """Quantize a lead-time pmf into a hashable cache key."""
+    values = np.round(np.asarray(pmf, dtype=float), LEAD_TIME_PRECISION)
+    nonzero = np.flatnonzero(values)
+    if nonzero.size == 0:
+        raise ValueError("Lead-time distribution has no mass")
+    return tuple(float(v) for v in values[: nonzero[-1] + 1])
+
+
+def lead_time_moments(pmf: Sequence[float]) -> Tuple[float, float]:
+    """Mean and standard deviation of a lead-time pmf."""
+    values = np.asarray(pmf, dtype=float)
+    values = values / values.sum()
+    days = np.arange(values.size)
+    mean = float(np.dot(days, values))
+    return mean, math.sqrt(max(float(np.dot(days ** 2, values)) - mean ** 2, 0.0))
+
+
+def fit_lead_time_distributions(
+    route_index: np.ndarray,
+    lead_times: np.ndarray,
+    n_routes: int,
+    max_lead_time: int = MAX_LEAD_TIME_DAYS,
+    prior_weight: float = PRIOR_WEIGHT,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fit empirical lead-time pmfs for many routes in one pass.
+
+    Args:
+        route_index: Integer route id per observed receipt.
+        lead_times: Observed lead time in days per receipt.
+        n_routes: Number of distinct routes.
+
+    Returns:
+        Tuple of (pmf matrix of shape (n_routes, max_lead_time + 1),
+        observation count per route).
+    """
+    width = max_lead_time + 1
+    lead_times = np.clip(np.asarray(lead_times, dtype=np.int64), 0, max_lead_time)
+    cells = np.asarray(route_index, dtype=np.int64) * width + lead_times
+    counts = np.bincount(cells, minlength=n_routes * width).reshape(n_routes, width).astype(float)
+    observations = counts.sum(axis=1)
+    pooled = counts.sum(axis=0) / max(observations.sum(), 1.0)
+    smoothed = counts + prior_weight * pooled
+    return smoothed / smoothed.sum(axis=1, keepdims=True), observations.astype(np.int64)
+
+
+def demand_bucket(
+    demand_mean: float,
+    demand_std: float,
+    lead_time: Sequence[float],
+    review_periods: int = 0,
+    max_buckets: int = MAX_SUPPORT_BUCKETS,
+) -> int:
+    """Bucket size that keeps the lead-time demand support within max_buckets."""
+    periods = len(lead_time) - 1 + review_periods
+    upper = (demand_mean + 7 * demand_std) * max(periods, 1)
+    return max(1, int(math.ceil(upper / max_buckets)))
+
+
+def _convolve_group(
+    period_pmfs: List[np.ndarray],
+    lead_time_pmfs: List[np.ndarray],
+    review_periods: int,
+    nfft: int,
+) -> np.ndarray:
+    """Compound demand over a random number of periods for a batch of profiles.
+
+    Evaluates sum_l P(L=l) * FFT(p)^(l + review) for every profile at once
+    with Horner's scheme on the frequency grid.
+    """
+    batch = len(period_pmfs)
+    width = max(pmf.size for pmf in lead_time_pmfs)
+    periods = np.zeros((batch, nfft))
+    weights = np.zeros((batch, width))
+    for i, (pmf, lt) in enumerate(zip(period_pmfs, lead_time_pmfs)):
+        periods[i, : pmf.size] = pmf
+        weights[i, : lt.size] = lt
+
+    spectrum = np.fft.rfft(periods, axis=1)
+    acc = np.repeat(weights[:, -1:], spectrum.shape[1], axis=1).astype(complex)
+    for l in range(width - 2, -1, -1):
+        acc *= spectrum
+        acc += weights[:, l : l + 1]
+    if review_periods:
+        acc *= spectrum ** review_periods
+    return np.fft.irfft(acc, nfft, axis=1)
+
+
+def lead_time_demand_batch(
+    demands: Sequence[DemandProfile],
+    lead_times: Sequence[Tuple[float, ...]],
+    review_periods: int = 0,
+) -> List[np.ndarray]:
+    """Lead-time demand pmfs (in buckets) for many (demand, lead-time) pairs.
+
+    Pairs are de-duplicated and looked up in the shared cache first; the
+    misses are convolved together in FFT batches of equal shape.
+    """
+    keys = [(demand, lead_time, review_periods) for demand, lead_time in zip(demands, lead_times)]
+    found: Dict[Tuple, np.ndarray] = {}
+    groups: Dict[int, List[Tuple]] = {}
+    prepared: Dict[Tuple, Tuple[np.ndarray, np.ndarray, int]] = {}
+    for key in dict.fromkeys(keys):
+        cached = _lead_time_demand_cache.get(key)
+        if cached is not None:
+            _lead_time_demand_cache.move_to_end(key)
+            found[key] = cached
+            continue
+        demand, lead_time, review = key
+        period = demand_pmf(demand.distribution, demand.mean, demand.std)
+        weights = np.asarray(lead_time, dtype=float)
+        weights = weights / weights.sum()
+        support = (period.size - 1) * (weights.size - 1 + review) + 1
+        # The period pmf itself is transformed, so it must fit even when
+        # there is no lead time to convolve over
+        nfft = 1 << max(max(support, period.size) - 1, 1).bit_length()
+        prepared[key] = (period, weights, support)
+        groups.setdefault((nfft, weights.size), []).append(key)
+
+    # Batches share both FFT length and lead-time width, so no profile pays
+    # for Horner steps beyond its own longest lead time
+    for (nfft, _), group in groups.items():
+        chunk = max(1, MAX_FFT_CELLS // nfft)
+        for start in range(0, len(group), chunk):
+            part = group[start : start + chunk]
+            convolved = _convolve_group(
+                [prepared[key][0] for key in part],
+                [prepared[key][1] for key in part],
+                review_periods,
+                nfft,
+            )
+            for key, row in zip(part, convolved):
+                pmf = truncate_pmf(np.clip(row[: prepared[key][2]], 0.0, None))
+                pmf.flags.writeable = False
+                found[key] = pmf
+                _lead_time_demand_cache[key] = pmf
+
+    while len(_lead_time_demand_cache) > LEAD_TIME_DEMAND_CACHE_SIZE:
+        _lead_time_demand_cache.popitem(last=False)
+
+    return [found[key] for key in keys]
+
+
+def lead_time_demand(
+    demand: DemandProfile,
+    lead_time: Tuple[float, ...],
+    review_periods: int = 0,
+) -> np.ndarray:
+    """Lead-time demand pmf (in buckets) for a single pair, through the shared cache."""
+    return lead_time_demand_batch([demand], [lead_time], review_periods)[0]
+
+
+def demand_profile(
+    distribution: str,
+    demand_mean: float,
+    demand_std: float,
+    lead_time: Tuple[float, ...],
+    review_periods: int = 0,
+) -> DemandProfile:
+    """Quantized, bucketed demand profile suitable as a cache key."""
+    bucket = demand_bucket(demand_mean, demand_std, lead_time, review_periods)
+    if distribution == "poisson" and bucket > 1:
+        # Bucketed Poisson demand would have the variance of its bucketed
+        # mean, `bucket` times too small in units; use the normal instead
+        distribution, demand_std = "normal", math.sqrt(demand_mean)
+    return DemandProfile(
+        distribution,
+        round_significant(demand_mean / bucket),
+        round_significant(demand_std / bucket),
+        bucket,
+    )
+
+
+def safety_stock_batch(
+    distribution: Sequence[str],
+    demand_mean: np.ndarray,
+    demand_std: np.ndarray,
+    lead_times: Sequence[Tuple[float, ...]],
+    service_level: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Safety stock and expected lead-time demand for many item-locations.
+
+    Safety stock is the service-level quantile of lead-time demand less its
+    mean, so lead-time variability is priced in alongside demand variability.
+    """
+    demands = [
+        demand_profile(dist, float(mean), float(std), lead_time)
+        for dist, mean, std, lead_time in zip(distribution, demand_mean, demand_std, lead_times)
+    ]
+    pmfs = lead_time_demand_batch(demands, lead_times)
+    safety_stock = np.empty(len(pmfs))
+    expected = np.empty(len(pmfs))
+    for i, (demand, pmf) in enumerate(zip(demands, pmfs)):
+        support = np.arange(pmf.size)
+        expected[i] = float(np.dot(support, pmf)) * demand.bucket
+        quantile = int(np.searchsorted(np.cumsum(pmf), service_level[i])) * demand.bucket
+        safety_stock[i] = max(quantile - expected[i], 0.0)
+    return safety_stock, expected
+
+
+class LeadTimeService:
+    """Service for learning supplier lead-time distributions."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def learn_lead_times(
+        self,
+        user: User,
+        order_dates: Dict[str, datetime],
+        days: int = 365
+    ) -> Dict[str, LeadTimeProfile]:
+        """Learn lead-time distributions per supplier route from PO receipts.
+
+        Receipts are `InventoryMovement` rows with reference_type "po"; the
+        route is (supplier, receiving location), where the supplier is taken
+        from the item's `attributes["supplier_id"]`. Order dates are not
+        stored on movements, so they are supplied per PO reference by the
+        caller (typically from the ERP purchase order feed, through the
+        "lead_times" job).
+
+        Args:
+            user: Current user, for organization scoping.
+            order_dates: Order timestamp per PO reference.
+            days: Receipt history window.
+
+        Returns:
+            Mapping of "supplier_id:location_id" route keys to profiles.
+        """
+        try:
+            since = datetime.utcnow() - timedelta(days=days)
+            query = (
+                select(
+                    InventoryMovement.reference,
+                    InventoryMovement.location_id,
+                    InventoryMovement.created_at,
+                    Item.attributes["supplier_id"].astext,
+                )
+                .join(Item, Item.id == InventoryMovement.item_id)
+                .where(
+                    and_(
+                        Item.organization_id == user.organization_id,
+                        InventoryMovement.reference_type == "po",
+                        InventoryMovement.created_at >= since
+                    )
+                )
+            )
+
+            routes: Dict[str, int] = {}
+            route_index = []
+            lead_times = []
+            async for reference, location_id, received_at, supplier_id in stream_rows(self.db, query):
+                ordered_at = order_dates.get(reference)
+                if ordered_at is None or received_at < ordered_at:
+                    continue
+                route = f"{supplier_id or 'unknown'}:{location_id}"
+                route_index.append(routes.setdefault(route, len(routes)))
+                lead_times.append((received_at - ordered_at).days)
+
+            if not routes:
+                return {}
+
+            pmfs, observations = fit_lead_time_distributions(
+                np.asarray(route_index), np.asarray(lead_times), len(routes)
+            )
+
+            profiles = {}
+            for route, index in routes.items():
+                key = lead_time_key(pmfs[index])
+                mean, std = lead_time_moments(key)
+                profiles[route] = LeadTimeProfile(key, mean, std, int(observations[index]))
+
+            logger.info("Lead times learned", routes=len(routes), receipts=len(lead_times))
+            return profiles
+
+        except Exception as e:
+            logger.error("Failed to learn lead times", error=str(e))
+            raise
@@ -0,0 +1,343 @@
+"""
+Order rounding and load building for StockSense AI.
+
+Turns planned replenishment quantities into orderable ones: vendor MOQs,
+case-pack and pallet rounding and price breaks are applied vectorized over
+all order lines, then lines are bin-packed into trucks by volume and weight
+per shipping lane with first-fit decreasing and an optional local search
+that tries to empty the least-filled truck of each lane.
+
+Item packing data is read from `Item.dimensions` ({length, width, height}
+in cm, weight in kg per unit, plus case_pack and pallet_qty) and vendor
+terms from `Item.attributes` (moq and price_tiers as [[min_qty, unit_price], ...]).
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Round a line up to a full pallet once it covers this share of one
+PALLET_ROUND_UP = 0.8
+
+# Largest quantity increase accepted to reach a cheaper price break
+MAX_OVERBUY = 0.1
+
+# Passes of the empty-a-truck local search per lane
+LOCAL_SEARCH_ROUNDS = 20
+
+
+class TruckProfile(NamedTuple):
+    """Usable capacity of one truck."""
+    volume_m3: float = 86.0
+    weight_kg: float = 24000.0
+
+
+def packing_arrays(items: Sequence[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> Dict[str, np.ndarray]:
+    """Packing data and vendor terms for many items as aligned arrays.
+
+    Args:
+        items: (dimensions, attributes) JSON per item.
+
+    Returns:
+        Dict with unit_volume (m3), unit_weight (kg), case_pack, pallet_qty
+        and moq per item, plus tier_quantity/tier_price of shape
+        (items, tiers) padded with inf/nan.
+    """
+    n = len(items)
+    unit_volume = np.zeros(n)
+    unit_weight = np.zeros(n)
+    case_pack = np.ones(n, dtype=np.int64)
+    pallet_qty = np.zeros(n, dtype=np.int64)
+    moq = np.zeros(n, dtype=np.int64)
+    tiers: List[List[Tuple[float, float]]] = []
+    for i, (dimensions, attributes) in enumerate(items):
+        dimensions = dimensions or {}
+        attributes = attributes or {}
+        unit_volume[i] = (
+            float(dimensions.get("length", 0) or 0)
+            * float(dimensions.get("width", 0) or 0)
+            * float(dimensions.get("height", 0) or 0)
+            / 1e6
+        )
+        unit_weight[i] = float(dimensions.get("weight", 0) or 0)
+        case_pack[i] = max(int(dimensions.get("case_pack", 1) or 1), 1)
+        pallet_qty[i] = int(dimensions.get("pallet_qty", 0) or 0)
+        moq[i] = int(attributes.get("moq", 0) or 0)
+        tiers.append(sorted((float(q), float(p)) for q, p in attributes.get("price_tiers") or []))
+
+    width = max((len(t) for t in tiers), default=0)
+    tier_quantity = np.full((n, width), np.inf)
+    tier_price = np.full((n, width), np.nan)
+    for i, item_tiers in enumerate(tiers):
+        for j, (quantity, price) in enumerate(item_tiers):
+            tier_quantity[i, j] = quantity
+            tier_price[i, j] = price
+
+    return {
+        "unit_volume": unit_volume,
+        "unit_weight": unit_weight,
+        "case_pack": case_pack,
+        "pallet_qty": pallet_qty,
+        "moq": moq,
+        "tier_quantity": tier_quantity,
+        "tier_price": tier_price,
+    }
+
+
+def round_order_quantities(
+    quantity: np.ndarray,
+    case_pack: np.ndarray,
+    moq: Optional[np.ndarray] = None,
+    pallet_qty: Optional[np.ndarray] = None,
+    pallet_round_up: float = PALLET_ROUND_UP,
+) -> np.ndarray:
+    """Round planned quantities to orderable ones.
+
+    Positive quantities are raised to the MOQ, rounded up to whole case
+    packs and, where a pallet quantity is known, rounded up to full pallets
+    once the partial pallet reaches `pallet_round_up` of one. A pallet that
+    is not a whole number of case packs is rounded up to the next case pack,
+    so every result is orderable in cases. Zero stays zero.
+    """
+    quantity = np.maximum(np.asarray(quantity, dtype=float), 0.0)
+    case_pack = np.maximum(np.asarray(case_pack, dtype=np.int64), 1)
+    ordered = quantity > 0
+    if moq is not None:
+        quantity = np.where(ordered, np.maximum(quantity, moq), quantity)
+    rounded = np.ceil(quantity / case_pack) * case_pack
+
+    if pallet_qty is not None:
+        pallet = np.asarray(pallet_qty, dtype=np.int64)
+        pallet = np.broadcast_to(pallet, rounded.shape)
+        has_pallet = pallet > 0
+        safe = np.where(has_pallet, pallet, 1)
+        partial = rounded % safe
+        full = np.ceil((rounded - partial + safe) / case_pack) * case_pack
+        rounded = np.where(has_pallet & (partial >= pallet_round_up * safe), full, rounded)
+    return rounded.astype(np.int64)
+
+
+def apply_price_breaks(
+    quantity: np.ndarray,
+    unit_cost: np.ndarray,
+    case_pack: np.ndarray,
+    tier_quantity: np.ndarray,
+    tier_price: np.ndarray,
+    max_overbuy: float = MAX_OVERBUY,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Move lines up to a price break when it lowers their total spend.
+
+    A line is raised to a tier's minimum quantity (in whole case packs) only
+    if that adds at most `max_overbuy` of the line and costs no more than
+    ordering the original quantity at its own price.
+
+    Args:
+        quantity: Rounded order quantity per line.
+        unit_cost: List price per unit per line, used below the first tier.
+        tier_quantity/tier_price: Price breaks per line, shape (lines, tiers).
+
+    Returns:
+        Tuple of (quantity, unit price) per line.
+    """
+    quantity = np.asarray(quantity, dtype=np.int64)
+    case_pack = np.maximum(np.asarray(case_pack, dtype=np.int64), 1)
+    if tier_quantity.shape[1] == 0:
+        return quantity, np.asarray(unit_cost, dtype=float)
+
+    def price_at(q: np.ndarray) -> np.ndarray:
+        reached = tier_quantity <= q[:, None]
+        last = reached.sum(axis=1) - 1
+        picked = tier_price[np.arange(q.size), np.maximum(last, 0)]
+        return np.where(last >= 0, picked, unit_cost)
+
+    price = price_at(quantity)
+    best_quantity = quantity.copy()
+    best_spend = quantity * price
+    for t in range(tier_quantity.shape[1]):
+        target = np.ceil(tier_quantity[:, t] / case_pack) * case_pack
+        candidate = np.where(np.isfinite(target), np.maximum(target, quantity), quantity).astype(np.int64)
+        spend = candidate * np.where(np.isnan(tier_price[:, t]), np.inf, tier_price[:, t])
+        better = (
+            (quantity > 0)
+            & (candidate > quantity)
+            & (candidate <= quantity * (1 + max_overbuy))
+            & (spend <= best_spend)
+        )
+        best_quantity = np.where(better, candidate, best_quantity)
+        best_spend = np.where(better, spend, best_spend)
+    return best_quantity, price_at(best_quantity)
+
+
+def first_fit_decreasing(
+    volume: np.ndarray,
+    weight: np.ndarray,
+    truck: TruckProfile,
+) -> Tuple[np.ndarray, int]:
+    """Pack items into trucks with first-fit decreasing.
+
+    Items are sorted by their larger share of truck volume or weight; each
+    goes into the first open truck with room in both dimensions. Trucks too
+    full for any remaining item are closed so the scan stays short.
+
+    Returns:
+        Tuple of (truck index per item, number of trucks).
+    """
+    size = np.maximum(volume / truck.volume_m3, weight / truck.weight_kg)
+    order = np.argsort(-size, kind="stable")
+    volumes = volume[order].tolist()
+    weights = weight[order].tolist()
+    # Smallest volume and weight still to come, for closing trucks
+    min_volume = np.minimum.accumulate(volume[order][::-1])[::-1].tolist()
+    min_weight = np.minimum.accumulate(weight[order][::-1])[::-1].tolist()
+
+    assignment = np.empty(len(volumes), dtype=np.int64)
+    open_trucks: List[int] = []
+    room_volume: List[float] = []
+    room_weight: List[float] = []
+    for i, (v, w) in enumerate(zip(volumes, weights)):
+        for truck_index in open_trucks:
+            if room_volume[truck_index] >= v and room_weight[truck_index] >= w:
+                break
+        else:
+            truck_index = len(room_volume)
+            room_volume.append(truck.volume_m3)
+            room_weight.append(truck.weight_kg)
+            open_trucks.append(truck_index)
+        room_volume[truck_index] -= v
+        room_weight[truck_index] -= w
+        assignment[order[i]] = truck_index
+
+        if i + 1 < len(volumes) and (
+            room_volume[truck_index] < min_volume[i + 1] or room_weight[truck_index] < min_weight[i + 1]
+        ):
+            open_trucks.remove(truck_index)
+    return assignment, len(room_volume)
+
+
+def improve_loads(
+    volume: np.ndarray,
+    weight: np.ndarray,
+    assignment: np.ndarray,
+    truck: TruckProfile,
+    rounds: int = LOCAL_SEARCH_ROUNDS,
+) -> Tuple[np.ndarray, int]:
+    """Local search that tries to empty the least-filled truck.
+
+    The items of the emptiest truck are moved, largest first, into the
+    remaining room of the other trucks; if they all fit the truck is dropped
+    and the search repeats, otherwise it stops.
+
+    Returns:
+        Tuple of (truck index per item, renumbered 0..k-1, number of trucks).
+    """
+    assignment = assignment.copy()
+    trucks = int(assignment.max()) + 1 if assignment.size else 0
+    used_volume = np.bincount(assignment, weights=volume, minlength=trucks)
+    used_weight = np.bincount(assignment, weights=weight, minlength=trucks)
+    alive = np.ones(trucks, dtype=bool)
+
+    for _ in range(rounds):
+        if alive.sum() <= 1:
+            break
+        fill = np.maximum(used_volume / truck.volume_m3, used_weight / truck.weight_kg)
+        emptiest = int(np.argmin(np.where(alive, fill, np.inf)))
+        members = np.flatnonzero(assignment == emptiest)
+        members = members[np.argsort(-np.maximum(volume[members] / truck.volume_m3, weight[members] / truck.weight_kg))]
+
+        room_volume = np.where(alive, truck.volume_m3 - used_volume, -np.inf)
+        room_weight = np.where(alive, truck.weight_kg - used_weight, -np.inf)
+        room_volume[emptiest] = room_weight[emptiest] = -np.inf
+        moves = []
+        for item in members:
+            fits = np.flatnonzero((room_volume >= volume[item]) & (room_weight >= weight[item]))
+            if fits.size == 0:
+                break
+            target = int(fits[0])
+            room_volume[target] -= volume[item]
+            room_weight[target] -= weight[item]
+            moves.append((item, target))
+        else:
+            for item, target in moves:
+                assignment[item] = target
+                used_volume[target] += volume[item]
+                used_weight[target] += weight[item]
+            alive[emptiest] = False
+            used_volume[emptiest] = used_weight[emptiest] = 0.0
+            continue
+        break
+
+    renumber = np.cumsum(alive) - 1
+    return renumber[assignment], int(alive.sum())
+
+
+def build_loads(
+    lane: np.ndarray,
+    packs: np.ndarray,
+    pack_volume: np.ndarray,
+    pack_weight: np.ndarray,
+    truck: TruckProfile = TruckProfile(),
+    local_search: bool = True,
+) -> Dict[str, np.ndarray]:
+    """Bin-pack order lines into trucks, lane by lane.
+
+    Lines larger than a truck are first split into full-truck loads; the
+    remainders are packed with first-fit decreasing and, optionally,
+    improved with local search.
+
+    Args:
+        lane: Integer shipping lane per line (e.g. source/destination pair).
+        packs: Case packs ordered per line.
+        pack_volume/pack_weight: Volume (m3) and weight (kg) of one pack.
+
+    Returns:
+        Dict of aligned arrays describing the load pieces: line, load and
+        packs (a line split over several trucks appears once per truck),
+        plus per-load lane, volume_m3 and weight_kg.
+    """
+    lane = np.asarray(lane, dtype=np.int64)
+    packs = np.asarray(packs, dtype=np.int64)
+    # Packs that fit one truck; items without dimensions never fill a truck
+    per_truck = np.floor(np.fmin(
+        truck.volume_m3 / np.where(pack_volume > 0, pack_volume, np.nan),
+        truck.weight_kg / np.where(pack_weight > 0, pack_weight, np.nan),
+    ))
+    per_truck = np.where(np.isnan(per_truck), packs.max(initial=0) + 1, np.maximum(per_truck, 1)).astype(np.int64)
+    full_loads, remainder = np.divmod(packs, per_truck)
+
+    # Full-truck pieces, one load each
+    full_lines = np.repeat(np.arange(packs.size), full_loads)
+    piece_line = [full_lines]
+    piece_packs = [per_truck[full_lines]]
+    piece_load = [np.arange(full_lines.size)]
+    load_lane = [lane[full_lines]]
+    next_load = full_lines.size
+
+    # Remainders, packed per lane
+    rest = np.flatnonzero(remainder > 0)
+    rest = rest[np.argsort(lane[rest], kind="stable")]
+    volume = remainder[rest] * pack_volume[rest]
+    weight = remainder[rest] * pack_weight[rest]
+    boundaries = np.flatnonzero(np.diff(lane[rest])) + 1
+    for segment in np.split(np.arange(rest.size), boundaries):
+        if segment.size == 0:
+            continue
+        assignment, trucks = first_fit_decreasing(volume[segment], weight[segment], truck)
+        if local_search and trucks > 1:
+            assignment, trucks = improve_loads(volume[segment], weight[segment], assignment, truck)
+        piece_line.append(rest[segment])
+        piece_packs.append(remainder[rest[segment]])
+        piece_load.append(assignment + next_load)
+        load_lane.append(np.full(trucks, lane[rest[segment[0]]]))
+        next_load += trucks
+
+    line = np.concatenate(piece_line)
+    load = np.concatenate(piece_load)
+    pieces = np.concatenate(piece_packs)
+    return {
+        "line": line,
+        "load": load,
+        "packs": pieces,
+        "load_lane": np.concatenate(load_lane),
+        "load_volume_m3": np.bincount(load, weights=pieces * pack_volume[line], minlength=next_load),
+        "load_weight_kg": np.bincount(load, weights=pieces * pack_weight[line], minlength=next_load),
+    }
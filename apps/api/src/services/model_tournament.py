@@ -0,0 +1,300 @@
+"""
+Per-series model selection for StockSense AI.
+
+For model_type "auto" each series gets the model that forecast its own
+recent demand best. A tournament holds out the last
+TOURNAMENT_HOLDOUT_DAYS of each series, fits every candidate on the
+days before and scores the holdout by mean absolute error:
+
+- ets, croston: the incremental smoothing models, vectorized over series;
+- random_forest: one forest per chunk of series on scaled lag and
+  weekday features, plus the promotion, price and holiday features of
+  the feature store when given, forecasting recursively;
+- arima: a seasonal ARIMA per series (statsmodels).
+
+Candidates run cheapest first, and a series whose leader beats the
+runner-up by a wide margin (DOMINANCE_RATIO) is settled, so the
+expensive models only run for contested series. Each model gets a time
+budget per chunk; series it has not reached when the budget runs out
+simply miss that candidate. Chunks of series are spread over a process
+pool.
+
+Winners are stored per series (ModelSelectionStore) and kept until the
+drift monitor flags the series.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import os
+import time
+import warnings
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from ..core.storage import DATA_DIR
+from .feature_store import HOLIDAY_DISTANCE_CAP
+from .forecast_state import ArrayStore, absorb, empty_state, forecast
+
+MODEL_SELECTION_DIR = os.path.join(DATA_DIR, "stocksense-model-selection")
+
+# Candidates in the order they run; stored winners index this tuple
+TOURNAMENT_MODELS = ("ets", "croston", "random_forest", "arima")
+
+# Days of demand a tournament loads, of which the last are held out
+TOURNAMENT_HISTORY_DAYS = 182
+TOURNAMENT_HOLDOUT_DAYS = 28
+
+# Series per tournament chunk (one process pool task)
+TOURNAMENT_CHUNK_SERIES = 1000
+
+# Time budget per model, in milliseconds per series of a chunk
+MODEL_BUDGET_MS = {"ets": 5.0, "croston": 5.0, "random_forest": 30.0, "arima": 150.0}
+
+# A leader whose holdout MAE is at most this fraction of the runner-up's
+# settles its series
+DOMINANCE_RATIO = 0.8
+
+# Random forest lags (days), trees (grown in batches until the budget
+# runs out) and training rows per chunk
+FOREST_LAGS = (1, 2, 3, 4, 5, 6, 7, 14, 21, 28)
+FOREST_TREES = 60
+FOREST_TREE_BATCH = 10
+FOREST_SAMPLES = 30000
+
+# Feature store columns the forest uses, and the value standing in for
+# days the store does not cover
+FOREST_COVARIATES = {"promo": 0.0, "discount": 0.0, "price_index": 1.0, "days_to_holiday": float(HOLIDAY_DISTANCE_CAP)}
+
+# Seasonal ARIMA order and weekly seasonal order
+ARIMA_ORDER = (1, 0, 1)
+ARIMA_SEASONAL_ORDER = (1, 0, 0, 7)
+
+
+class TournamentResult(NamedTuple):
+    """Winner and holdout MAE per series, and the time each model took."""
+    winners: np.ndarray  # int8, index into TOURNAMENT_MODELS
+    errors: np.ndarray  # (series, models) holdout MAE, NaN where a model did not run
+    seconds: np.ndarray  # (models,) time spent per model
+    evaluated: np.ndarray  # (models,) series each model ran for
+
+
+class ModelSelection(NamedTuple):
+    """Stored tournament winners, for series keyed as in the smoothing state."""
+    end: date
+    keys: np.ndarray  # V32
+    winners: np.ndarray  # int8, -1 until the series plays a tournament
+    errors: np.ndarray  # (series, models) holdout MAE
+
+
+Forecaster = Callable[[np.ndarray, int, float, Optional[np.ndarray]], np.ndarray]
+
+
+def _smoothing(model: str) -> Forecaster:
+    def forecaster(train: np.ndarray, horizon: int, deadline: float, covariates: Optional[np.ndarray]) -> np.ndarray:
+        state = absorb(empty_state(date.fromordinal(1), len(train)), train)
+        return forecast(state, horizon, model=model)
+    return forecaster
+
+
+def _forest_features(history: np.ndarray, phase: np.ndarray, covariates: Optional[np.ndarray]) -> np.ndarray:
+    """Lag and weekday features (and covariates) of the day after the end of `history` (series, days)."""
+    lags = history[:, [-lag for lag in FOREST_LAGS]]
+    features = [lags, history[:, -7:].mean(axis=1), phase % 7]
+    return np.column_stack(features if covariates is None else features + [covariates])
+
+
+def _forest(train: np.ndarray, horizon: int, deadline: float, covariates: Optional[np.ndarray]) -> np.ndarray:
+    """Pooled random forest on series scaled by their mean, forecast recursively.
+
+    `covariates` (series, days + horizon, k) are feature store columns
+    of the training and forecast days, as known at the forecast origin.
+    """
+    n_series, n_days = train.shape
+    scale = np.nanmean(train, axis=1, keepdims=True)
+    scale = np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+    scaled = np.where(np.isnan(train), 1.0, train / scale)
+
+    first = max(FOREST_LAGS)
+    days = np.arange(first, n_days)
+    rng = np.random.default_rng(0)
+    picks = rng.choice(n_series * len(days), min(FOREST_SAMPLES, n_series * len(days)), replace=False)
+    series, day = np.divmod(picks, len(days))
+    day = days[day]
+    offsets = np.arange(-first, 0)
+    windows = scaled[series[:, None], day[:, None] + offsets[None, :]]
+    features = _forest_features(windows, day, None if covariates is None else covariates[series, day])
+    target = scaled[series, day]
+
+    forest = RandomForestRegressor(n_estimators=0, min_samples_leaf=5, max_features=0.5, warm_start=True, random_state=0)
+    while forest.n_estimators < FOREST_TREES and (forest.n_estimators == 0 or time.perf_counter() < deadline):
+        forest.n_estimators += FOREST_TREE_BATCH
+        forest.fit(features, target)
+
+    history = scaled[:, -first:]
+    predicted = np.empty((n_series, horizon), dtype=np.float32)
+    for step in range(horizon):
+        known = None if covariates is None else covariates[:, n_days + step]
+        value = np.maximum(forest.predict(_forest_features(history, np.full(n_series, n_days + step), known)), 0)
+        predicted[:, step] = value
+        history = np.column_stack([history[:, 1:], value])
+    return predicted * scale
+
+
+def _arima(train: np.ndarray, horizon: int, deadline: float, covariates: Optional[np.ndarray]) -> np.ndarray:
+    """Seasonal ARIMA per series until the deadline; NaN for series not reached or not converged."""
+    # statsmodels is slow to import and only tournaments need it
+    from statsmodels.tsa.arima.model import ARIMA
+
+    predicted = np.full((len(train), horizon), np.nan, dtype=np.float32)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for row, series in enumerate(train):
+            if time.perf_counter() >= deadline:
+                break
+            if np.nanmax(series, initial=0) == np.nanmin(series, initial=0):
+                predicted[row] = np.nan_to_num(series[-1])
+                continue
+            try:
+                fitted = ARIMA(series, order=ARIMA_ORDER, seasonal_order=ARIMA_SEASONAL_ORDER).fit()
+                predicted[row] = np.maximum(fitted.forecast(horizon), 0)
+            except (ValueError, np.linalg.LinAlgError):
+                continue
+    return predicted
+
+
+FORECASTERS: Dict[str, Forecaster] = {
+    "ets": _smoothing("ets"),
+    "croston": _smoothing("croston"),
+    "random_forest": _forest,
+    "arima": _arima,
+}
+
+
+def forest_covariates(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """(series, days, k) FOREST_COVARIATES from feature store columns, gaps filled."""
+    return np.stack([
+        np.where(np.isnan(columns[name]), fill, columns[name]) for name, fill in FOREST_COVARIATES.items()
+    ], axis=2).astype(np.float32)
+
+
+def dominated(errors: np.ndarray, ratio: float = DOMINANCE_RATIO) -> np.ndarray:
+    """Series whose best model beats every other model that ran by `ratio`."""
+    ordered = np.sort(errors, axis=1)  # NaN sort last
+    ran = np.count_nonzero(~np.isnan(errors), axis=1)
+    return (ran >= 2) & (ordered[:, 0] <= ratio * ordered[:, 1])
+
+
+def play_chunk(
+    values: np.ndarray,
+    models: Sequence[str] = TOURNAMENT_MODELS,
+    dominance: float = DOMINANCE_RATIO,
+    covariates: Optional[np.ndarray] = None
+) -> TournamentResult:
+    """Tournament for a (series, days) chunk; NaN cells are masked days.
+
+    A dominance ratio of 0 plays every model for every series.
+    `covariates` (series, days, k) are the FOREST_COVARIATES of the same
+    days, those of the holdout as known at its start.
+    """
+    train, test = values[:, :-TOURNAMENT_HOLDOUT_DAYS], values[:, -TOURNAMENT_HOLDOUT_DAYS:]
+    errors = np.full((len(values), len(TOURNAMENT_MODELS)), np.nan, dtype=np.float32)
+    seconds = np.zeros(len(TOURNAMENT_MODELS))
+    evaluated = np.zeros(len(TOURNAMENT_MODELS), dtype=np.int64)
+    settled = np.zeros(len(values), dtype=bool)
+    for model in models:
+        rows = np.flatnonzero(~settled)
+        if len(rows) == 0:
+            break
+        code = TOURNAMENT_MODELS.index(model)
+        began = time.perf_counter()
+        deadline = began + MODEL_BUDGET_MS[model] / 1000 * len(rows)
+        known = None if covariates is None else covariates[rows]
+        predicted = FORECASTERS[model](train[rows], TOURNAMENT_HOLDOUT_DAYS, deadline, known)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # series with every holdout day masked
+            errors[rows, code] = np.nanmean(np.abs(test[rows] - predicted), axis=1)
+        seconds[code] = time.perf_counter() - began
+        evaluated[code] = np.count_nonzero(~np.isnan(errors[rows, code]))
+        settled = dominated(errors, dominance)
+
+    scored = np.where(np.isnan(errors), np.inf, errors)
+    return TournamentResult(np.argmin(scored, axis=1).astype(np.int8), errors, seconds, evaluated)
+
+
+def run_tournament(
+    values: np.ndarray,
+    workers: int = 1,
+    models: Sequence[str] = TOURNAMENT_MODELS,
+    dominance: float = DOMINANCE_RATIO,
+    covariates: Optional[np.ndarray] = None
+) -> TournamentResult:
+    """Tournament for every series of `values` (series, days), chunked over a process pool.
+
+    The last TOURNAMENT_HOLDOUT_DAYS days are the holdout.
+    """
+    starts = range(0, len(values), TOURNAMENT_CHUNK_SERIES)
+    chunks = [values[start:start + TOURNAMENT_CHUNK_SERIES] for start in starts]
+    known = [None if covariates is None else covariates[start:start + TOURNAMENT_CHUNK_SERIES] for start in starts]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(play_chunk, chunks, [models] * len(chunks), [dominance] * len(chunks), known))
+    else:
+        results = [play_chunk(chunk, models, dominance, chunk_covariates) for chunk, chunk_covariates in zip(chunks, known)]
+    if not results:
+        return play_chunk(values, models, dominance, covariates)
+    return TournamentResult(
+        winners=np.concatenate([r.winners for r in results]),
+        errors=np.concatenate([r.errors for r in results]),
+        seconds=np.sum([r.seconds for r in results], axis=0),
+        evaluated=np.sum([r.evaluated for r in results], axis=0),
+    )
+
+
+def empty_selection(end: date) -> ModelSelection:
+    return ModelSelection(
+        end=end,
+        keys=np.zeros(0, dtype="V32"),
+        winners=np.zeros(0, dtype=np.int8),
+        errors=np.zeros((0, len(TOURNAMENT_MODELS)), dtype=np.float32),
+    )
+
+
+def record_winners(selection: ModelSelection, keys: np.ndarray, result: TournamentResult, end: date) -> ModelSelection:
+    """Selection with the tournament winners of `keys` recorded, appending unknown series."""
+    keys = np.asarray(keys, dtype="V32")
+    rows = selected_rows(selection, keys.tolist())
+    known = rows >= 0
+    winners, errors = selection.winners.copy(), selection.errors.copy()
+    winners[rows[known]] = result.winners[known]
+    errors[rows[known]] = result.errors[known]
+    return ModelSelection(
+        end=end,
+        keys=np.concatenate([selection.keys, keys[~known]]),
+        winners=np.concatenate([winners, result.winners[~known]]),
+        errors=np.concatenate([errors, result.errors[~known]]),
+    )
+
+
+def selected_rows(selection: ModelSelection, keys: Sequence[bytes]) -> np.ndarray:
+    """Row of each key in the selection, -1 where it has none."""
+    index = {key: row for row, key in enumerate(selection.keys.tolist())}
+    return np.array([index.get(key, -1) for key in keys], dtype=np.int64)
+
+
+def clear_winners(selection: ModelSelection, keys: Sequence[bytes]) -> Tuple[ModelSelection, int]:
+    """Forget the winners of `keys` so their next tournament picks again; returns how many were set."""
+    rows = selected_rows(selection, keys)
+    rows = rows[rows >= 0]
+    cleared = int(np.count_nonzero(selection.winners[rows] >= 0))
+    winners = selection.winners.copy()
+    winners[rows] = -1
+    return selection._replace(winners=winners), cleared
+
+
+class ModelSelectionStore(ArrayStore):
+    """Tournament winners of each organization's series."""
+
+    state_type = ModelSelection
+    default_root = MODEL_SELECTION_DIR
@@ -0,0 +1,272 @@
+"""
+Multi-echelon network planning engine for StockSense AI.
+
+Compiles the `Location.parent_id` hierarchy into compact integer-indexed
+arrays once per organization, then propagates net requirements bottom-up
+level by level and places safety stock with the guaranteed-service model.
+All calculations are vectorized over locations and SKUs.
+"""
+
+from statistics import NormalDist
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Default replenishment lead time (days) by location type when a location's
+# settings do not specify one
+DEFAULT_LEAD_TIME_DAYS = {"dc": 7, "warehouse": 7, "store": 2}
+
+_inv_norm_cdf = np.vectorize(NormalDist().inv_cdf)
+
+
+class NetworkGraph:
+    """Location hierarchy as integer-indexed arrays.
+
+    Nodes are numbered 0..n-1; `parent[i]` is the parent index or -1 for
+    roots. `levels[d]` lists the nodes at depth d, and for every level the
+    nodes are also kept sorted by parent so child values can be summed into
+    parents with a single `np.add.reduceat`.
+    """
+
+    def __init__(self, location_ids: Sequence[str], parent: np.ndarray):
+        self.location_ids = list(location_ids)
+        self.index = {location_id: i for i, location_id in enumerate(self.location_ids)}
+        self.parent = np.asarray(parent, dtype=np.int32)
+        self.n = len(self.location_ids)
+
+        self.depth = np.zeros(self.n, dtype=np.int32)
+        frontier = np.flatnonzero(self.parent < 0)
+        seen = np.zeros(self.n, dtype=bool)
+        seen[frontier] = True
+        levels = []
+        while frontier.size:
+            levels.append(frontier)
+            children = np.flatnonzero(np.isin(self.parent, frontier) & ~seen)
+            seen[children] = True
+            self.depth[children] = len(levels)
+            frontier = children
+        if not seen.all():
+            raise ValueError("Location hierarchy contains a cycle")
+        self.levels: List[np.ndarray] = levels
+
+        self.is_leaf = np.ones(self.n, dtype=bool)
+        self.is_leaf[self.parent[self.parent >= 0]] = False
+
+        # Per level: children sorted by parent, segment starts and parent ids
+        self._groups: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for nodes in levels:
+            nodes = nodes[self.parent[nodes] >= 0]
+            order = nodes[np.argsort(self.parent[nodes], kind="stable")]
+            parents, starts = np.unique(self.parent[order], return_index=True)
+            self._groups.append((order, starts, parents))
+
+    @classmethod
+    def from_locations(cls, locations: Iterable[Tuple[Any, Optional[Any]]]) -> "NetworkGraph":
+        """Build from (location_id, parent_id) pairs; parents outside the set become roots."""
+        pairs = [(str(location_id), str(parent_id) if parent_id else None) for location_id, parent_id in locations]
+        index = {location_id: i for i, (location_id, _) in enumerate(pairs)}
+        parent = np.array([index.get(parent_id, -1) if parent_id else -1 for _, parent_id in pairs], dtype=np.int32)
+        return cls([location_id for location_id, _ in pairs], parent)
+
+    def sum_to_parents(self, values: np.ndarray, depth: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sum the rows of `values` for nodes at `depth` into their parents.
+
+        Returns:
+            Tuple of (parent indices, summed rows aligned with them).
+        """
+        order, starts, parents = self._groups[depth]
+        if order.size == 0:
+            return parents, np.zeros((0,) + values.shape[1:], dtype=values.dtype)
+        return parents, np.add.reduceat(values[order], starts, axis=0)
+
+    def cumulative_lead_time(self, lead_time: np.ndarray) -> np.ndarray:
+        """Total lead time from the external supplier down to each node."""
+        total = np.asarray(lead_time, dtype=np.int64).copy()
+        for nodes in self.levels[1:]:
+            total[nodes] += total[self.parent[nodes]]
+        return total
+
+
+def segment_sum(values: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum rows of `values` sharing the same integer key."""
+    order = np.argsort(keys, kind="stable")
+    unique, starts = np.unique(keys[order], return_index=True)
+    return unique, np.add.reduceat(values[order], starts, axis=0)
+
+
+def guaranteed_service_safety_stock(
+    graph: NetworkGraph,
+    demand_std: np.ndarray,
+    lead_time: np.ndarray,
+    holding_cost: np.ndarray,
+    service_level: float,
+    customer_service_time: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """Place safety stock across the network with the guaranteed-service model.
+
+    Each node quotes an outbound service time S to its children and receives
+    its parent's S as inbound service time SI. Safety stock covers demand
+    over the net replenishment time SI + T - S. Outbound service times are
+    chosen by dynamic programming over the tree to minimize total holding
+    cost, with leaves bound by their customer-facing service time.
+
+    Args:
+        demand_std: Daily demand std per (node, sku); internal nodes pool
+            their children's variance on top of their own.
+        lead_time: Processing/replenishment time T per node in days.
+        holding_cost: Holding cost per unit per day, per node or per (node, sku).
+        service_level: Cycle service level used for the safety factor.
+        customer_service_time: Service time promised to customers at each
+            leaf (default 0).
+
+    Returns:
+        Dict with safety_stock, service_time and net_replenishment_time
+        arrays of shape (nodes, skus), plus the pooled demand_std.
+    """
+    n, k = demand_std.shape
+    z = float(_inv_norm_cdf(service_level))
+    lead_time = np.asarray(lead_time, dtype=np.int64)
+    if customer_service_time is None:
+        customer_service_time = np.zeros(n, dtype=np.int64)
+    holding_cost = np.broadcast_to(np.asarray(holding_cost, dtype=float).reshape(n, -1), (n, k))
+
+    # Pool demand variance bottom-up
+    variance = demand_std.astype(float) ** 2
+    for depth in range(len(graph.levels) - 1, 0, -1):
+        parents, pooled = graph.sum_to_parents(variance, depth)
+        variance[parents] += pooled
+    sigma = np.sqrt(variance)
+    coefficient = z * holding_cost * sigma
+
+    max_service = int(graph.cumulative_lead_time(lead_time).max())
+    grid = np.arange(max_service + 1)
+
+    # g[j] holds, for internal node j, the children's total cost as a
+    # function of the outbound service time j quotes them
+    internal = np.flatnonzero(~graph.is_leaf)
+    slot = np.full(n, -1)
+    slot[internal] = np.arange(internal.size)
+    g = np.zeros((internal.size, k, grid.size))
+    choice = np.zeros((internal.size, k, grid.size), dtype=np.int32)
+
+    # Leaves contribute c * sqrt(max(SI + T - cs, 0)); sum their coefficients
+    # per (parent, offset) so the leaf level never materializes SI grids
+    leaves = np.flatnonzero(graph.is_leaf & (graph.parent >= 0))
+    if leaves.size:
+        offset = lead_time[leaves] - customer_service_time[leaves]
+        offsets = np.unique(offset)
+        keys = graph.parent[leaves].astype(np.int64) * offsets.size + np.searchsorted(offsets, offset)
+        groups, summed = segment_sum(coefficient[leaves], keys)
+        parent_of, offset_of = np.divmod(groups, offsets.size)
+        curves = np.sqrt(np.maximum(grid[None, :] + offsets[offset_of][:, None], 0))
+        np.add.at(g, slot[parent_of], summed[:, :, None] * curves[:, None, :])
+
+    for depth in range(len(graph.levels) - 1, -1, -1):
+        nodes = graph.levels[depth]
+        nodes = nodes[~graph.is_leaf[nodes]]
+        if nodes.size == 0:
+            continue
+        rows = slot[nodes]
+        # f(SI) = min over feasible S of c * sqrt(SI + T - S) + g(S)
+        best = np.full((nodes.size, k, grid.size), np.inf)
+        best_s = np.zeros((nodes.size, k, grid.size), dtype=np.int32)
+        reach = grid[None, :] + lead_time[nodes][:, None]  # SI + T per node
+        for s in range(grid.size):
+            feasible = reach >= s
+            cost = coefficient[nodes][:, :, None] * np.sqrt(np.maximum(reach - s, 0))[:, None, :] + g[rows, :, s][:, :, None]
+            cost = np.where(feasible[:, None, :], cost, np.inf)
+            better = cost < best
+            best = np.where(better, cost, best)
+            best_s = np.where(better, s, best_s)
+        choice[rows] = best_s
+        if depth > 0:
+            parents = graph.parent[nodes]
+            np.add.at(g, slot[parents], best)
+
+    # Recover service times top-down; roots are fed with zero inbound service time
+    service_time = np.zeros((n, k), dtype=np.int64)
+    inbound = np.zeros((n, k), dtype=np.int64)
+    for depth, nodes in enumerate(graph.levels):
+        if depth > 0:
+            inbound[nodes] = service_time[graph.parent[nodes]]
+        internal_nodes = nodes[~graph.is_leaf[nodes]]
+        if internal_nodes.size:
+            picked = np.take_along_axis(choice[slot[internal_nodes]], inbound[internal_nodes][:, :, None], axis=2)
+            service_time[internal_nodes] = picked[:, :, 0]
+        leaf_nodes = nodes[graph.is_leaf[nodes]]
+        if leaf_nodes.size:
+            service_time[leaf_nodes] = np.minimum(
+                customer_service_time[leaf_nodes][:, None],
+                inbound[leaf_nodes] + lead_time[leaf_nodes][:, None],
+            )
+
+    net_time = inbound + lead_time[:, None] - service_time
+    return {
+        "safety_stock": z * sigma * np.sqrt(net_time),
+        "service_time": service_time,
+        "net_replenishment_time": net_time,
+        "demand_std": sigma,
+    }
+
+
+def propagate_requirements(
+    graph: NetworkGraph,
+    gross_requirements: np.ndarray,
+    on_hand: np.ndarray,
+    on_order: np.ndarray,
+    safety_stock: np.ndarray,
+    round_orders: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """Net requirements bottom-up, one level at a time.
+
+    A node's planned order covers its gross requirement plus safety stock
+    less on-hand and on-order stock; planned orders of children become gross
+    requirements of their parent before the parent's level is netted.
+    `round_orders(nodes, planned)` may round a level's orders (packs, MOQs)
+    before they are passed up.
+    """
+    gross = gross_requirements.astype(float).copy()
+    planned = np.zeros_like(gross)
+    for depth in range(len(graph.levels) - 1, -1, -1):
+        nodes = graph.levels[depth]
+        planned[nodes] = np.maximum(gross[nodes] + safety_stock[nodes] - on_hand[nodes] - on_order[nodes], 0.0)
+        if round_orders is not None:
+            planned[nodes] = round_orders(nodes, planned[nodes])
+        if depth > 0:
+            parents, summed = graph.sum_to_parents(planned, depth)
+            gross[parents] += summed
+    return {"planned_orders": planned, "gross_requirements": gross}
+
+
+def plan_network(
+    graph: NetworkGraph,
+    demand_mean: np.ndarray,
+    demand_std: np.ndarray,
+    on_hand: np.ndarray,
+    on_order: np.ndarray,
+    lead_time: np.ndarray,
+    holding_cost: np.ndarray,
+    service_level: float = 0.95,
+    review_period: int = 7,
+    customer_service_time: Optional[np.ndarray] = None,
+    round_orders: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """Plan one chunk of SKUs across the whole network.
+
+    Arrays are shaped (nodes, skus) except lead_time/customer_service_time
+    (nodes,) and holding_cost ((nodes,) or (nodes, skus)). See
+    propagate_requirements for round_orders.
+    """
+    placement = guaranteed_service_safety_stock(
+        graph, demand_std, lead_time, holding_cost, service_level, customer_service_time
+    )
+    cover_days = np.asarray(lead_time, dtype=float)[:, None] + review_period
+    requirements = propagate_requirements(
+        graph,
+        demand_mean * cover_days,
+        on_hand,
+        on_order,
+        placement["safety_stock"],
+        round_orders,
+    )
+    return {**placement, **requirements}
@@ -0,0 +1,290 @@
+"""
+(s,S) policy search for StockSense AI.
+
+Implements the Zheng-Federgruen algorithm for periodic-review (s,S) policies
+with discrete demand, plus a memoized batch solver so that item-locations
+sharing the same demand/lead-time/cost profile are optimized only once.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+from .demand_distributions import (
+    choose_distribution, demand_pmf, round_significant, round_significant_array
+)
+from .lead_time_service import DemandProfile, fixed_lead_time, lead_time_demand, lead_time_moments
+
+# Largest lead-time demand support (in buckets) searched exactly. High-volume
+# items are solved in buckets of several units and scaled back afterwards.
+MAX_SUPPORT_BUCKETS = 400
+
+PROFILE_CACHE_SIZE = 262144
+
+
+class SSProfile(NamedTuple):
+    """Hashable demand/lead-time/cost profile for a single (s,S) problem."""
+    distribution: str  # poisson | normal
+    demand_mean: float  # per period
+    demand_std: float  # per period
+    lead_time: int  # periods
+    holding_cost: float  # per unit per period
+    shortage_cost: float  # per unit short per period
+    ordering_cost: float  # per order
+    lead_time_pmf: Optional[Tuple[float, ...]] = None  # overrides lead_time when learned
+
+
+class SSSolution(NamedTuple):
+    """Optimal (s,S) parameters and their long-run costs."""
+    reorder_point: int
+    order_up_to: int
+    cost_per_period: float
+    cycle_length: float  # expected periods between orders
+    bucket_size: int
+
+
+def renewal_mass(period_pmf: np.ndarray, length: int) -> np.ndarray:
+    """Renewal mass function m(j) of the per-period demand process.
+
+    m(j) is the expected number of periods in which cumulative demand since
+    the last order equals exactly j.
+    """
+    p0 = period_pmf[0]
+    if p0 >= 1.0:
+        raise ValueError("Per-period demand must have positive mass above zero")
+    m = np.zeros(length)
+    m[0] = 1.0 / (1.0 - p0)
+    tail = period_pmf[1:]
+    for j in range(1, length):
+        width = min(j, tail.size)
+        m[j] = np.dot(tail[:width], m[j - width : j][::-1]) / (1.0 - p0)
+    return m
+
+
+def zheng_federgruen(
+    period_pmf: np.ndarray,
+    lead_time_pmf: np.ndarray,
+    holding_cost: float,
+    shortage_cost: float,
+    ordering_cost: float,
+) -> Tuple[int, int, float, float]:
+    """Find the optimal (s,S) pair with the Zheng-Federgruen (1991) algorithm.
+
+    Args:
+        period_pmf: Demand pmf for a single review period.
+        lead_time_pmf: Demand pmf over lead time plus one review period.
+        holding_cost: Holding cost per unit per period.
+        shortage_cost: Shortage penalty per unit per period.
+        ordering_cost: Fixed cost per order.
+
+    Returns:
+        Tuple of (s, S, cost per period, expected periods between orders).
+        An order is placed when inventory position drops to or below s.
+    """
+    cdf = np.cumsum(lead_time_pmf)
+    partial_mean = np.cumsum(np.arange(lead_time_pmf.size) * lead_time_pmf)
+    mean = partial_mean[-1]
+    last = lead_time_pmf.size - 1
+
+    def loss(y: np.ndarray) -> np.ndarray:
+        idx = np.minimum(np.maximum(y, 0), last)
+        under = np.where(y >= 0, y * cdf[idx] - partial_mean[idx], 0.0)
+        return holding_cost * under + shortage_cost * (mean - y + under)
+
+    # G(y) is tabulated densely on [lo, hi] and the table is widened on demand,
+    # as are the renewal masses when the search widens S - s.
+    lo, hi = -last - 16, 2 * last + 16
+    table = loss(np.arange(lo, hi + 1))
+    m = renewal_mass(period_pmf, last + 16)
+    M = np.cumsum(m)
+
+    def ensure(low: int, high: int) -> None:
+        nonlocal lo, hi, table, m, M
+        if low <= lo or high > hi:
+            lo, hi = min(lo, 2 * low - 1), max(hi, 2 * high)
+            table = loss(np.arange(lo, hi + 1))
+        if high - low > m.size:
+            m = renewal_mass(period_pmf, 2 * (high - low))
+            M = np.cumsum(m)
+
+    def G(y: int) -> float:
+        ensure(y - 1, y)
+        return table[y - lo]
+
+    def cost(s: int, S: int) -> float:
+        ensure(s, S)
+        span = S - s
+        levels = table[s + 1 - lo : S + 1 - lo][::-1]
+        return (ordering_cost + np.dot(m[:span], levels)) / M[span - 1]
+
+    # Myopic minimizer of the one-period cost
+    y_star = int(np.argmin(table)) + lo
+
+    S0 = y_star
+    s = y_star - 1
+    while cost(s, S0) > G(s):
+        s -= 1
+    c0 = cost(s, S0)
+
+    S = S0 + 1
+    while G(S) <= c0:
+        if cost(s, S) < c0:
+            S0 = S
+            while cost(s, S0) <= G(s + 1):
+                s += 1
+            c0 = cost(s, S0)
+        S += 1
+
+    return s, S0, float(c0), float(M[S0 - s - 1])
+
+
+def normalize_profile(profile: SSProfile) -> Tuple[SSProfile, float]:
+    """Express a profile in units of its holding cost and quantize it.
+
+    The optimal (s,S) depends on costs only through the ratios p/h and K/h,
+    so SKUs differing only in unit value share a single cache entry. Continuous
+    fields are rounded to a few significant digits for the same reason.
+
+    Returns:
+        Tuple of (normalized profile, holding cost to rescale costs by).
+    """
+    h = profile.holding_cost
+    normalized = profile._replace(
+        demand_mean=round_significant(profile.demand_mean),
+        demand_std=round_significant(profile.demand_std),
+        holding_cost=1.0,
+        shortage_cost=round_significant(profile.shortage_cost / h),
+        ordering_cost=round_significant(profile.ordering_cost / h),
+    )
+    return normalized, h
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def solve_profile(profile: SSProfile) -> SSSolution:
+    """Solve one (s,S) profile. Results are memoized per distinct profile."""
+    lead_time = profile.lead_time_pmf or fixed_lead_time(profile.lead_time)
+    lt_mean, lt_std = lead_time_moments(lead_time)
+    horizon = lt_mean + 1
+    demand_var = profile.demand_std ** 2
+    if profile.distribution == "poisson":
+        demand_var = profile.demand_mean
+    ltd_mean = profile.demand_mean * horizon
+    ltd_std = math.sqrt(horizon * demand_var + profile.demand_mean ** 2 * lt_std ** 2)
+
+    # Work in buckets of several units for high-volume items
+    bucket = max(1, int(math.ceil((ltd_mean + 7 * ltd_std) / MAX_SUPPORT_BUCKETS)))
+    distribution = profile.distribution
+    if distribution == "poisson" and bucket > 1:
+        distribution = "normal"
+    demand = DemandProfile(distribution, profile.demand_mean / bucket, math.sqrt(demand_var) / bucket, bucket)
+
+    # Demand over the lead time plus the review period, convolved through the
+    # shared lead-time demand cache
+    period_pmf = demand_pmf(demand.distribution, demand.mean, demand.std)
+    lead_time_pmf = lead_time_demand(demand, lead_time, review_periods=1)
+
+    s, S, cost, cycle = zheng_federgruen(
+        period_pmf,
+        lead_time_pmf,
+        profile.holding_cost * bucket,
+        profile.shortage_cost * bucket,
+        profile.ordering_cost,
+    )
+    return SSSolution(s * bucket, S * bucket, cost, cycle, bucket)
+
+
+def optimize_s_s(profile: SSProfile) -> SSSolution:
+    """Solve a single (s,S) problem through the shared profile cache."""
+    normalized, scale = normalize_profile(profile)
+    solution = solve_profile(normalized)
+    return solution._replace(cost_per_period=solution.cost_per_period * scale)
+
+
+def _solve_rows(
+    rows: np.ndarray,
+    distribution: Optional[str],
+    lead_time_profiles: List[Tuple[float, ...]],
+) -> np.ndarray:
+    """Solve normalized profile rows (mean, std, lead time, p/h, K/h, lead-time profile id)."""
+    solved = np.empty((rows.shape[0], 4))
+    for i, (mean, std, lead_time, shortage, ordering, profile_id) in enumerate(rows):
+        profile = SSProfile(
+            distribution or choose_distribution(mean, std),
+            float(mean), float(std), int(lead_time), 1.0, float(shortage), float(ordering),
+            lead_time_profiles[int(profile_id)] if profile_id >= 0 else None,
+        )
+        solved[i] = solve_profile(profile)[:4]
+    return solved
+
+
+def optimize_s_s_batch(
+    demand_mean: np.ndarray,
+    demand_std: np.ndarray,
+    lead_time: np.ndarray,
+    holding_cost: np.ndarray,
+    shortage_cost: np.ndarray,
+    ordering_cost: np.ndarray,
+    distribution: Optional[str] = None,
+    lead_time_pmfs: Optional[Sequence[Optional[Tuple[float, ...]]]] = None,
+    workers: int = 1,
+) -> Dict[str, np.ndarray]:
+    """Optimize (s,S) for many item-locations at once.
+
+    Profiles are normalized, quantized and de-duplicated first, so the solver
+    runs once per distinct profile rather than once per SKU. With workers > 1
+    the distinct profiles are split across a process pool.
+
+    Args:
+        lead_time_pmfs: Optional learned lead-time distribution per
+            item-location (see LeadTimeService); None entries fall back to
+            the fixed lead_time.
+
+    Returns:
+        Dict of arrays aligned with the inputs: reorder_point, order_up_to,
+        cost_per_period and cycle_length, plus the number of unique profiles.
+    """
+    n = len(demand_mean)
+    demand_mean, demand_std, lead_time, holding_cost, shortage_cost, ordering_cost = (
+        np.broadcast_to(np.asarray(values, dtype=float), (n,))
+        for values in (demand_mean, demand_std, lead_time, holding_cost, shortage_cost, ordering_cost)
+    )
+
+    profile_ids: Dict[Tuple[float, ...], int] = {}
+    lead_time_ids = np.full(n, -1.0)
+    if lead_time_pmfs is not None:
+        for i, pmf in enumerate(lead_time_pmfs):
+            if pmf is not None:
+                lead_time_ids[i] = profile_ids.setdefault(pmf, len(profile_ids))
+    lead_time_profiles = list(profile_ids)
+
+    matrix = np.column_stack([
+        round_significant_array(demand_mean),
+        round_significant_array(demand_std),
+        lead_time,
+        round_significant_array(shortage_cost / holding_cost),
+        round_significant_array(ordering_cost / holding_cost),
+        lead_time_ids,
+    ])
+    unique, inverse = np.unique(matrix, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    if workers > 1 and unique.shape[0] > workers:
+        chunks = np.array_split(unique, workers * 4)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            solved = np.concatenate(list(pool.map(
+                _solve_rows, chunks, [distribution] * len(chunks), [lead_time_profiles] * len(chunks)
+            )))
+    else:
+        solved = _solve_rows(unique, distribution, lead_time_profiles)
+
+    result = solved[inverse]
+    return {
+        "reorder_point": result[:, 0].astype(np.int64),
+        "order_up_to": result[:, 1].astype(np.int64),
+        "cost_per_period": result[:, 2] * holding_cost,
+        "cycle_length": result[:, 3],
+        "unique_profiles": np.int64(unique.shape[0]),
+    }
@@ -5,17 +5,25 @@ Provides business logic for inventory policy optimization including
 (s,S), Min-Max, EOQ, and base-stock policies.
 """
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 import structlog
 import math
+import numpy as np
 
 from ..models.user import User
 from ..schemas.policy import (
     PolicyCreate, PolicyUpdate, PolicyResponse,
     PolicyOptimization, PolicyRecommendation
 )
+from .demand_distributions import choose_distribution
+from .forecast_quantiles import QuantileCalibrationStore, model_codes, normal_calibration, quantile_safety_stock
+from .forecast_state import ForecastStateStore, find_series, series_key
+from .lead_time_service import (
+    fixed_lead_time, lead_time_key, lead_time_moments, safety_stock_batch
+)
+from .policy_search import SSProfile, optimize_s_s, optimize_s_s_batch
 
 logger = structlog.get_logger()
 
@@ -50,15 +58,19 @@ class PolicyService:
     async def optimize_policy(self, optimization_data: PolicyOptimization, user: User) -> PolicyRecommendation:
         """Optimize inventory policy parameters."""
         try:
+            forecast_safety_stock = None
+            if optimization_data.demand_distribution == "forecast":
+                forecast_safety_stock = self._forecast_safety_stock(optimization_data, user)
+            
             # Calculate optimal parameters based on policy type
             if optimization_data.policy_type == "s_s":
                 result = self._optimize_s_s_policy(optimization_data)
             elif optimization_data.policy_type == "min_max":
-                result = self._optimize_min_max_policy(optimization_data)
+                result = self._optimize_min_max_policy(optimization_data, forecast_safety_stock)
             elif optimization_data.policy_type == "eoq":
-                result = self._optimize_eoq_policy(optimization_data)
+                result = self._optimize_eoq_policy(optimization_data, forecast_safety_stock)
             elif optimization_data.policy_type == "base_stock":
-                result = self._optimize_base_stock_policy(optimization_data)
+                result = self._optimize_base_stock_policy(optimization_data, forecast_safety_stock)
             else:
                 raise ValueError(f"Unsupported policy type: {optimization_data.policy_type}")
             
@@ -84,32 +96,85 @@ class PolicyService:
             logger.error("Failed to optimize policy", error=str(e))
             raise
     
+    async def optimize_s_s_policies(
+        self, optimizations: List[PolicyOptimization], user: User
+    ) -> List[PolicyRecommendation]:
+        """Optimize (s,S) parameters for many item-locations in one pass.
+        
+        Item-locations sharing a demand/lead-time/cost profile are solved once.
+        """
+        try:
+            demand_mean = np.array([o.demand_mean for o in optimizations])
+            demand_std = np.array([o.demand_std for o in optimizations])
+            lead_time = np.array([o.lead_time_days for o in optimizations])
+            lead_time_pmfs = [self._lead_time_pmf(o) for o in optimizations]
+            expected_lead_time = np.array([lead_time_moments(pmf)[0] for pmf in lead_time_pmfs])
+            service_level = np.array([o.service_level for o in optimizations])
+            holding_cost = np.array([o.holding_cost_rate for o in optimizations]) / 365
+            shortage_cost = holding_cost * service_level / (1 - service_level)
+            ordering_cost = np.array([o.ordering_cost for o in optimizations])
+            
+            solved = optimize_s_s_batch(
+                demand_mean, demand_std, lead_time,
+                holding_cost, shortage_cost, ordering_cost,
+                lead_time_pmfs=lead_time_pmfs
+            )
+            
+            recommendations = []
+            for i, optimization in enumerate(optimizations):
+                reorder_point = int(solved["reorder_point"][i])
+                order_up_to = int(solved["order_up_to"][i])
+                expected_cost = float(solved["cost_per_period"][i]) * 365
+                recommendations.append(PolicyRecommendation(
+                    policy_type="s_s",
+                    optimal_parameters={
+                        "reorder_point": reorder_point,
+                        "order_up_to": order_up_to
+                    },
+                    expected_cost=round(expected_cost, 2),
+                    service_level=optimization.service_level,
+                    safety_stock=round(max(reorder_point - demand_mean[i] * expected_lead_time[i], 0), 2),
+                    reorder_point=reorder_point,
+                    order_quantity=order_up_to - reorder_point,
+                    annual_orders=round(365 / float(solved["cycle_length"][i]), 2),
+                    total_cost=round(expected_cost, 2)
+                ))
+            
+            logger.info("Batch (s,S) optimization completed",
+                       item_locations=len(optimizations),
+                       unique_profiles=int(solved["unique_profiles"]))
+            
+            return recommendations
+            
+        except Exception as e:
+            logger.error("Failed to optimize (s,S) policies", error=str(e))
+            raise
+    
     def _optimize_s_s_policy(self, data: PolicyOptimization) -> Dict[str, Any]:
-        """Optimize (s,S) policy parameters."""
-        # Simplified (s,S) optimization
+        """Optimize (s,S) policy parameters with the Zheng-Federgruen search."""
         demand_mean = data.demand_mean
         demand_std = data.demand_std
-        lead_time = data.lead_time_days
-        holding_cost = data.holding_cost_rate
-        ordering_cost = data.ordering_cost
+        lead_time = self._expected_lead_time(data)
         service_level = data.service_level
         
-        # Calculate safety stock
-        safety_stock = self._calculate_safety_stock(demand_std, lead_time, service_level)
+        # Daily costs; the shortage penalty is implied by the target service level
+        holding_cost = data.holding_cost_rate / 365
+        shortage_cost = holding_cost * service_level / (1 - service_level)
         
-        # Calculate reorder point (s)
-        reorder_point = demand_mean * lead_time + safety_stock
+        distribution = data.demand_distribution
+        if distribution in ("auto", "forecast"):
+            distribution = choose_distribution(demand_mean, demand_std)
         
-        # Calculate order-up-to level (S)
-        # Simplified: S = s + EOQ
-        eoq = self._calculate_eoq(demand_mean, ordering_cost, holding_cost)
-        order_up_to = reorder_point + eoq
+        solution = optimize_s_s(SSProfile(
+            distribution, demand_mean, demand_std, data.lead_time_days,
+            holding_cost, shortage_cost, data.ordering_cost,
+            self._lead_time_pmf(data)
+        ))
         
-        # Calculate expected costs
-        expected_cost = self._calculate_expected_cost_s_s(
-            demand_mean, demand_std, reorder_point, order_up_to, 
-            lead_time, holding_cost, ordering_cost
-        )
+        reorder_point = solution.reorder_point
+        order_up_to = solution.order_up_to
+        safety_stock = max(reorder_point - demand_mean * lead_time, 0)
+        expected_cost = solution.cost_per_period * 365
         
         return {
             "parameters": {
@@ -120,22 +185,25 @@ class PolicyService:
             "service_level": service_level,
             "safety_stock": round(safety_stock, 2),
             "reorder_point": round(reorder_point, 2),
-            "order_quantity": round(eoq, 2),
-            "annual_orders": round(365 * demand_mean / eoq, 2),
+            "order_quantity": round(order_up_to - reorder_point, 2),
+            "annual_orders": round(365 / solution.cycle_length, 2),
             "total_cost": round(expected_cost, 2)
         }
     
-    def _optimize_min_max_policy(self, data: PolicyOptimization) -> Dict[str, Any]:
+    def _optimize_min_max_policy(
+        self, data: PolicyOptimization, safety_stock: Optional[float] = None
+    ) -> Dict[str, Any]:
         """Optimize Min-Max policy parameters."""
         demand_mean = data.demand_mean
         demand_std = data.demand_std
-        lead_time = data.lead_time_days
+        lead_time = self._expected_lead_time(data)
         holding_cost = data.holding_cost_rate
         ordering_cost = data.ordering_cost
         service_level = data.service_level
         
         # Calculate safety stock
-        safety_stock = self._calculate_safety_stock(demand_std, lead_time, service_level)
+        if safety_stock is None:
+            safety_stock = self._calculate_safety_stock(data)
         
         # Calculate reorder point (min)
         reorder_point = demand_mean * lead_time + safety_stock
@@ -164,11 +232,13 @@ class PolicyService:
             "total_cost": round(expected_cost, 2)
         }
     
-    def _optimize_eoq_policy(self, data: PolicyOptimization) -> Dict[str, Any]:
+    def _optimize_eoq_policy(
+        self, data: PolicyOptimization, safety_stock: Optional[float] = None
+    ) -> Dict[str, Any]:
         """Optimize EOQ policy parameters."""
         demand_mean = data.demand_mean
         demand_std = data.demand_std
-        lead_time = data.lead_time_days
+        lead_time = self._expected_lead_time(data)
         holding_cost = data.holding_cost_rate
         ordering_cost = data.ordering_cost
         service_level = data.service_level
@@ -177,7 +247,8 @@ class PolicyService:
         eoq = self._calculate_eoq(demand_mean, ordering_cost, holding_cost)
         
         # Calculate safety stock
-        safety_stock = self._calculate_safety_stock(demand_std, lead_time, service_level)
+        if safety_stock is None:
+            safety_stock = self._calculate_safety_stock(data)
         
         # Calculate reorder point
         reorder_point = demand_mean * lead_time + safety_stock
@@ -201,16 +272,19 @@ class PolicyService:
             "total_cost": round(total_cost, 2)
         }
     
-    def _optimize_base_stock_policy(self, data: PolicyOptimization) -> Dict[str, Any]:
+    def _optimize_base_stock_policy(
+        self, data: PolicyOptimization, safety_stock: Optional[float] = None
+    ) -> Dict[str, Any]:
         """Optimize base-stock policy parameters."""
         demand_mean = data.demand_mean
         demand_std = data.demand_std
-        lead_time = data.lead_time_days
+        lead_time = self._expected_lead_time(data)
         holding_cost = data.holding_cost_rate
         service_level = data.service_level
         
         # Calculate safety stock
-        safety_stock = self._calculate_safety_stock(demand_std, lead_time, service_level)
+        if safety_stock is None:
+            safety_stock = self._calculate_safety_stock(data)
         
         # Calculate base stock level
         base_stock = demand_mean * lead_time + safety_stock
@@ -233,32 +307,56 @@ class PolicyService:
             "total_cost": round(expected_cost, 2)
         }
     
-    def _calculate_safety_stock(self, demand_std: float, lead_time: int, service_level: float) -> float:
-        """Calculate safety stock based on service level."""
-        # Z-score for service level (simplified)
-        z_scores = {0.90: 1.28, 0.95: 1.65, 0.98: 2.05, 0.99: 2.33}
-        z_score = z_scores.get(service_level, 1.65)
+    def _lead_time_pmf(self, data: PolicyOptimization) -> Tuple[float, ...]:
+        """Learned lead-time distribution, or the fixed lead time if none was given."""
+        if data.lead_time_pmf:
+            return lead_time_key(data.lead_time_pmf)
+        return fixed_lead_time(data.lead_time_days)
+    
+    def _expected_lead_time(self, data: PolicyOptimization) -> float:
+        """Mean lead time in days."""
+        return lead_time_moments(self._lead_time_pmf(data))[0]
+    
+    def _calculate_safety_stock(self, data: PolicyOptimization) -> float:
+        """Calculate safety stock from the lead-time demand distribution.
+        
+        Safety stock is the service-level quantile of demand over a (possibly
+        random) lead time less its mean, so supplier lead-time variability
+        is covered as well as demand variability.
+        """
+        distribution = data.demand_distribution
+        if distribution in ("auto", "forecast"):
+            distribution = choose_distribution(data.demand_mean, data.demand_std)
+        
+        safety_stock, _ = safety_stock_batch(
+            [distribution], [data.demand_mean], [data.demand_std],
+            [self._lead_time_pmf(data)], [data.service_level]
+        )
+        return float(safety_stock[0])
+    
+    def _forecast_safety_stock(self, data: PolicyOptimization, user: User) -> Optional[float]:
+        """Safety stock from the calibrated quantiles of the series' forecast errors.
         
-        return z_score * demand_std * math.sqrt(lead_time)
+        The service-level quantile of the backtested lead-time demand
+        errors, scaled by the series' MAE, over the expected lead time.
+        None if the series has no forecast state yet, in which case the
+        parametric lead-time demand distribution is used.
+        """
+        state = ForecastStateStore().load(user.organization_id, mmap=True)
+        row = find_series(state, series_key(data.item_id, data.location_id)) if state else None
+        if row is None:
+            return None
+        rows = np.array([row])
+        calibration = QuantileCalibrationStore().load(user.organization_id) or normal_calibration(state.end)
+        lead_time = max(int(round(self._expected_lead_time(data))), 1)
+        return float(quantile_safety_stock(
+            state.abs_error[rows], model_codes(state)[rows], calibration, lead_time, data.service_level
+        )[0])
     
     def _calculate_eoq(self, demand: float, ordering_cost: float, holding_cost: float) -> float:
         """Calculate Economic Order Quantity."""
         return math.sqrt((2 * demand * ordering_cost) / holding_cost)
     
-    def _calculate_expected_cost_s_s(self, demand_mean: float, demand_std: float, 
-                                   reorder_point: float, order_up_to: float,
-                                   lead_time: int, holding_cost: float, ordering_cost: float) -> float:
-        """Calculate expected cost for (s,S) policy."""
-        # Simplified cost calculation
-        order_quantity = order_up_to - reorder_point
-        annual_orders = 365 * demand_mean / order_quantity
-        annual_ordering_cost = annual_orders * ordering_cost
-        
-        average_inventory = (order_up_to + reorder_point) / 2
-        annual_holding_cost = average_inventory * holding_cost
-        
-        return annual_ordering_cost + annual_holding_cost
-    
     def _calculate_expected_cost_min_max(self, demand_mean: float, demand_std: float,
                                        min_level: float, max_level: float,
                                        lead_time: int, holding_cost: float, ordering_cost: float) -> float:
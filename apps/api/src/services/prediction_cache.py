@@ -0,0 +1,136 @@
+"""
+Prediction memoization for StockSense AI.
+
+Dashboards ask for the same demand prediction over and over, so
+predictions are memoized under a fingerprint of:
+
+- the model version: the organization's stored forecast state and
+  quantile calibration versions, plus a model generation bumped when a
+  model is retrained;
+- the series' data watermark: a generation bumped when a movement for
+  the item-location is recorded;
+- every parameter of the request.
+
+Invalidation never has to find entries: bumping a generation changes
+the fingerprint and orphaned entries fall out through LRU eviction, as
+in the response cache. Series generations live in a fixed table of
+counters indexed by a hash of the series, so memory stays bounded however
+many series move; a collision only costs a spurious miss. Concurrent
+identical requests share one computation.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+from ..schemas.forecast import ForecastRequest
+
+# Predictions kept in memory
+PREDICTION_CACHE_MAX_ENTRIES = 20_000
+
+# Counters the series generations are hashed into
+SERIES_GENERATION_SLOTS = 1 << 16
+
+
+class PredictionCache:
+    """Process-local LRU memo of demand predictions with single-flight misses."""
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_MAX_ENTRIES, slots: int = SERIES_GENERATION_SLOTS):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._series_generations = np.zeros(slots, dtype=np.int64)
+        self._model_generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _slot(self, organization_id: Any, item_id: Any, location_id: Any) -> int:
+        series = f"{organization_id}:{item_id}:{location_id}".lower()
+        digest = hashlib.blake2b(series.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % len(self._series_generations)
+
+    def fingerprint(self, organization_id: Any, request: ForecastRequest, model_version: str) -> str:
+        """Memo key of a prediction request under the given model version."""
+        watermark = int(self._series_generations[self._slot(organization_id, request.item_id, request.location_id)])
+        model_generation = self._model_generations.get(str(organization_id), 0)
+        params = json.dumps(request.dict(), sort_keys=True, default=str)
+        raw = f"{organization_id}|{model_version}|{model_generation}|{watermark}|{params}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Return the memoized prediction, computing it once on a miss.
+
+        Callers get their own copy, so they may modify it.
+        """
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(cached)
+
+        inflight = self._inflight.get(key)
+        while inflight is not None:
+            try:
+                value = await asyncio.shield(inflight)
+                self.hits += 1
+                return copy.deepcopy(value)
+            except asyncio.CancelledError:
+                # The leading request went away; take over unless we were cancelled too
+                if not inflight.cancelled():
+                    raise
+            inflight = self._inflight.get(key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            future.set_result(value)
+            return copy.deepcopy(value)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a failure nobody waited for is not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def invalidate_series(self, organization_id: Any, item_id: Any, location_id: Any) -> None:
+        """Orphan the predictions of an item-location, e.g. after a movement."""
+        self._series_generations[self._slot(organization_id, item_id, location_id)] += 1
+
+    def invalidate_model(self, organization_id: Any) -> None:
+        """Orphan every prediction of an organization, e.g. after retraining."""
+        namespace = str(organization_id)
+        self._model_generations[namespace] = self._model_generations.get(namespace, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: Optional[PredictionCache] = None
+
+
+def get_prediction_cache() -> PredictionCache:
+    """Process-wide prediction cache."""
+    global _cache
+    if _cache is None:
+        _cache = PredictionCache()
+    return _cache
+
+
+def set_prediction_cache(cache: Optional[PredictionCache]) -> None:
+    """Swap the process-wide prediction cache, e.g. in tests."""
+    global _cache
+    _cache = cache
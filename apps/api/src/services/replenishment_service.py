@@ -5,11 +5,26 @@ Provides business logic for multi-echelon replenishment planning
 and optimization.
 """
 
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Awaitable, Callable, Tuple
+from datetime import datetime, timedelta
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_
+import numpy as np
+import structlog
 
+from ..core.database import stream_partitions
+from ..models.inventory import Item, Location, Inventory, InventoryMovement
 from ..models.user import User
+from .allocation_engine import ALLOCATION_STRATEGIES, allocate, pack_requests
+from .load_builder import TruckProfile, apply_price_breaks, build_loads, packing_arrays, round_order_quantities
+from .network_planner import NetworkGraph, DEFAULT_LEAD_TIME_DAYS, plan_network
+
+logger = structlog.get_logger()
+
+# Compiled location hierarchy per organization, with the version of its
+# locations it was built from
+_networks: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any]]] = {}
 
 class ReplenishmentService:
     """Service for multi-echelon replenishment planning."""
@@ -17,33 +32,431 @@ class ReplenishmentService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def create_replenishment_plan(self, plan_data: Dict[str, Any], user: User) -> Dict[str, Any]:
-        """Create a new replenishment plan."""
+    async def create_replenishment_plan(
+        self,
+        plan_data: Dict[str, Any],
+        user: User,
+        progress: Optional[Callable[[float, str, List[Dict[str, Any]]], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """Create a new multi-echelon replenishment plan.
+        
+        Plans every item across the location hierarchy in chunks of SKUs:
+        safety stock is placed with the guaranteed-service model and net
+        requirements are propagated from stores up to their DCs. Orders are
+        rounded to case packs, pallets and vendor MOQs level by level, supplier
+        orders are moved to price breaks, and the lines are built into truck
+        loads per lane.
+        
+        Plan lines are not kept: each chunk's lines, numbered across the
+        plan, are handed to `progress` and dropped. Only what the load
+        builder needs is held per line (its lane and packs), and loads list
+        the line numbers they carry.
+        
+        Args:
+            plan_data: Optional keys: name, service_level (0.95),
+                plan_id, review_period_days (7), history_days (56),
+                holding_cost_rate (0.25 per year), sku_chunk_size (1000),
+                build_loads (True), local_search (True), truck_volume_m3,
+                truck_weight_kg.
+            user: Current user, for organization scoping.
+            progress: Optional coroutine called after each SKU chunk with
+                (fraction done, message, the chunk's plan lines).
+        
+        Returns:
+            The plan's id, name, status, loads and summary.
+        """
         try:
+            service_level = plan_data.get("service_level", 0.95)
+            review_period = plan_data.get("review_period_days", 7)
+            history_days = plan_data.get("history_days", 56)
+            holding_cost_rate = plan_data.get("holding_cost_rate", 0.25)
+            chunk_size = plan_data.get("sku_chunk_size", 1000)
+            
+            network = await self._get_network(user)
+            graph = network["graph"]
+            supplier_rows = (graph.parent < 0)[:, None]
+            
+            item_count = (await self.db.execute(
+                select(func.count(Item.id)).where(Item.organization_id == user.organization_id)
+            )).scalar() or 0
+            items_query = select(Item.id, Item.cost, Item.dimensions, Item.attributes).where(
+                Item.organization_id == user.organization_id
+            )
+            
+            planned_lines = 0
+            lanes: Dict[tuple, int] = {}
+            line_lanes = []
+            line_packs = []
+            line_pack_volume = []
+            line_pack_weight = []
+            totals = {"planned_units": 0.0, "safety_stock_units": 0.0, "order_value": 0.0}
+            done = 0
+            # Items are streamed chunk by chunk rather than loaded up front
+            async for chunk in stream_partitions(self.db, items_query, chunk_size):
+                item_ids = [item_id for item_id, _, _, _ in chunk]
+                item_index = {str(item_id): i for i, item_id in enumerate(item_ids)}
+                shape = (graph.n, len(chunk))
+                packing = packing_arrays([(dimensions, attributes) for _, _, dimensions, attributes in chunk])
+                
+                on_hand = np.zeros(shape)
+                inventory_result = await self.db.execute(
+                    select(Inventory.item_id, Inventory.location_id, Inventory.quantity, Inventory.reserved_quantity)
+                    .where(Inventory.item_id.in_(item_ids))
+                )
+                for item_id, location_id, quantity, reserved in inventory_result:
+                    node = graph.index.get(str(location_id))
+                    if node is not None:
+                        on_hand[node, item_index[str(item_id)]] = quantity - (reserved or 0)
+                
+                demand_mean, demand_std = await self._demand_statistics(graph, item_ids, item_index, history_days)
+                
+                unit_cost = np.array([float(cost or 0) for _, cost, _, _ in chunk])
+                holding_cost = network["holding_factor"][:, None] * unit_cost[None, :] * holding_cost_rate / 365
+                
+                def round_orders(nodes: np.ndarray, planned: np.ndarray) -> np.ndarray:
+                    # Vendor MOQs only apply to orders placed on suppliers
+                    moq = np.where(supplier_rows[nodes], packing["moq"][None, :], 0)
+                    return round_order_quantities(planned, packing["case_pack"], moq, packing["pallet_qty"])
+                
+                result = plan_network(
+                    graph,
+                    demand_mean,
+                    demand_std,
+                    on_hand,
+                    np.zeros(shape),  # open purchase/transfer orders are not tracked yet
+                    network["lead_time"],
+                    holding_cost,
+                    service_level=service_level,
+                    review_period=review_period,
+                    customer_service_time=network["customer_service_time"],
+                    round_orders=round_orders,
+                )
+                
+                planned = result["planned_orders"].astype(np.int64)
+                nodes, skus = np.nonzero(planned)
+                quantity = planned[nodes, skus]
+                unit_price = unit_cost[skus]
+                from_supplier = graph.parent[nodes] < 0
+                if from_supplier.any():
+                    quantity[from_supplier], unit_price[from_supplier] = apply_price_breaks(
+                        quantity[from_supplier],
+                        unit_price[from_supplier],
+                        packing["case_pack"][skus[from_supplier]],
+                        packing["tier_quantity"][skus[from_supplier]],
+                        packing["tier_price"][skus[from_supplier]],
+                    )
+                
+                lines = []
+                for node, sku, units, price in zip(nodes.tolist(), skus.tolist(), quantity.tolist(), unit_price.tolist()):
+                    parent = graph.parent[node]
+                    supplier_id = (chunk[sku][3] or {}).get("supplier_id")
+                    lines.append({
+                        "line": planned_lines + len(lines),
+                        "item_id": str(item_ids[sku]),
+                        "location_id": graph.location_ids[node],
+                        "source_location_id": graph.location_ids[parent] if parent >= 0 else None,
+                        "supplier_id": supplier_id if parent < 0 else None,
+                        "quantity": int(units),
+                        "unit_price": round(float(price), 4),
+                        "safety_stock": round(float(result["safety_stock"][node, sku]), 2),
+                        "service_time_days": int(result["service_time"][node, sku]),
+                    })
+                planned_lines += len(lines)
+                line_lanes.append(np.array([
+                    lanes.setdefault((line["source_location_id"] or line["supplier_id"], line["location_id"]), len(lanes))
+                    for line in lines
+                ], dtype=np.int64))
+                case_pack = packing["case_pack"][skus]
+                line_packs.append(quantity // case_pack)
+                line_pack_volume.append(packing["unit_volume"][skus] * case_pack)
+                line_pack_weight.append(packing["unit_weight"][skus] * case_pack)
+                totals["planned_units"] += float(quantity.sum())
+                totals["safety_stock_units"] += float(result["safety_stock"].sum())
+                totals["order_value"] += float(np.dot(quantity, unit_price))
+                
+                done += len(chunk)
+                if progress is not None:
+                    total = max(item_count, done)
+                    await progress(done / total, f"Planned {done} of {total} items", lines)
+            
+            loads = []
+            if planned_lines and plan_data.get("build_loads", True):
+                loads = self._build_loads(
+                    list(lanes),
+                    np.concatenate(line_lanes),
+                    np.concatenate(line_packs),
+                    np.concatenate(line_pack_volume),
+                    np.concatenate(line_pack_weight),
+                    TruckProfile(
+                        plan_data.get("truck_volume_m3", TruckProfile().volume_m3),
+                        plan_data.get("truck_weight_kg", TruckProfile().weight_kg)
+                    ),
+                    plan_data.get("local_search", True)
+                )
+            
             plan = {
-                "id": "rep_" + str(int(datetime.utcnow().timestamp())),
+                "id": plan_data.get("plan_id") or "rep_" + str(int(datetime.utcnow().timestamp())),
                 "name": plan_data.get("name", "Replenishment Plan"),
                 "status": "draft",
+                "loads": loads,
+                "summary": {
+                    "items": done,
+                    "locations": graph.n,
+                    "echelons": len(graph.levels),
+                    "planned_lines": planned_lines,
+                    "planned_units": totals["planned_units"],
+                    "order_value": round(totals["order_value"], 2),
+                    "safety_stock_units": round(totals["safety_stock_units"], 2),
+                    "loads": len(loads),
+                    "service_level": service_level,
+                },
                 "created_by": str(user.id),
                 "created_at": datetime.utcnow()
             }
             
+            logger.info("Replenishment plan created", plan_id=plan["id"], lines=planned_lines, loads=len(loads))
             return plan
-            
+        
         except Exception as e:
+            logger.error("Failed to create replenishment plan", error=str(e))
             raise
     
     async def optimize_allocations(self, allocation_data: Dict[str, Any], user: User) -> Dict[str, Any]:
-        """Optimize inventory allocations across locations."""
+        """Allocate scarce source stock across the source's child locations.
+        
+        Each child asks for enough to reach its max stock (or its reorder
+        point when no max is set), in whole case packs and never above max
+        stock. Children are served by their SLA priority tier
+        (`settings["sla_priority"]`, lower first).
+        
+        Args:
+            allocation_data: source_location_id (required); optional item_ids,
+                strategy (fair_share | priority | lp) and, for lp,
+                capacity_limits to honour each child's
+                `settings["receiving_capacity_units"]`.
+            user: Current user, for organization scoping.
+        """
         try:
-            # Simplified allocation optimization
+            source_id = str(allocation_data["source_location_id"])
+            strategy = allocation_data.get("strategy", "fair_share")
+            if strategy not in ALLOCATION_STRATEGIES:
+                raise ValueError(f"Unknown allocation strategy: {strategy}")
+            
+            network = await self._get_network(user)
+            graph = network["graph"]
+            source = graph.index.get(source_id)
+            if source is None:
+                raise ValueError(f"Unknown source location: {source_id}")
+            children = np.flatnonzero(graph.parent == source)
+            child_index = {graph.location_ids[node]: i for i, node in enumerate(children)}
+            
+            item_query = select(Item.id, Item.dimensions).where(Item.organization_id == user.organization_id)
+            if allocation_data.get("item_ids"):
+                item_query = item_query.where(Item.id.in_(allocation_data["item_ids"]))
+            items = (await self.db.execute(item_query)).all()
+            item_index = {str(item_id): i for i, (item_id, _) in enumerate(items)}
+            case_pack = np.array([int((dimensions or {}).get("case_pack", 1)) for _, dimensions in items], dtype=np.int64)
+            
+            shape = (children.size, len(items))
+            supply = np.zeros(len(items))
+            need = np.zeros(shape)
+            headroom = np.full(shape, np.inf)
+            inventory_result = await self.db.execute(
+                select(
+                    Inventory.item_id,
+                    Inventory.location_id,
+                    Inventory.quantity,
+                    Inventory.reserved_quantity,
+                    Inventory.reorder_point,
+                    Inventory.max_stock,
+                ).where(
+                    and_(
+                        Inventory.item_id.in_([item_id for item_id, _ in items]),
+                        Inventory.location_id.in_([graph.location_ids[node] for node in children] + [source_id])
+                    )
+                )
+            )
+            for item_id, location_id, quantity, reserved, reorder_point, max_stock in inventory_result:
+                sku = item_index[str(item_id)]
+                if str(location_id) == source_id:
+                    supply[sku] = quantity - (reserved or 0)
+                    continue
+                row = child_index[str(location_id)]
+                target = max_stock if max_stock is not None else reorder_point
+                need[row, sku] = max(target - quantity, 0)
+                if max_stock is not None:
+                    headroom[row, sku] = max_stock - quantity
+            
+            settings = network["settings"]
+            priority = np.array([settings[node].get("sla_priority", 3) for node in children])
+            capacity = None
+            if strategy == "lp" and allocation_data.get("capacity_limits"):
+                capacity = np.array([
+                    settings[node].get("receiving_capacity_units", np.inf) for node in children
+                ], dtype=float)
+            
+            started = time.perf_counter()
+            allocated = allocate(supply, need, headroom, case_pack, priority, strategy, location_capacity=capacity)
+            solve_ms = (time.perf_counter() - started) * 1000
+            
+            requested = pack_requests(need, headroom, case_pack) * case_pack[None, :]
+            allocations = []
+            rows, skus = np.nonzero(allocated)
+            for row, sku in zip(rows.tolist(), skus.tolist()):
+                allocations.append({
+                    "item_id": str(items[sku][0]),
+                    "location_id": graph.location_ids[children[row]],
+                    "source_location_id": source_id,
+                    "quantity": int(allocated[row, sku]),
+                    "requested": int(requested[row, sku]),
+                    "priority": int(priority[row]),
+                })
+            
+            total_requested = float(requested.sum())
             result = {
-                "allocations": [],
-                "total_cost": 0,
-                "service_level": 0.95
+                "allocations": allocations,
+                "strategy": strategy,
+                "allocated_units": int(allocated.sum()),
+                "requested_units": int(total_requested),
+                "short_items": int(np.count_nonzero(requested.sum(axis=0) > supply)),
+                "service_level": round(float(allocated.sum()) / total_requested, 4) if total_requested else 1.0,
+                "solve_time_ms": round(solve_ms, 2)
             }
             
+            logger.info("Allocations optimized", source_location_id=source_id, strategy=strategy, lines=len(allocations))
             return result
-            
+        
         except Exception as e:
+            logger.error("Failed to optimize allocations", error=str(e))
             raise
+    
+    def _build_loads(
+        self,
+        lane_keys: List[tuple],
+        lane: np.ndarray,
+        packs: np.ndarray,
+        pack_volume: np.ndarray,
+        pack_weight: np.ndarray,
+        truck: TruckProfile,
+        local_search: bool
+    ) -> List[Dict[str, Any]]:
+        """Bin-pack plan lines into trucks per (source, destination) lane.
+        
+        `lane` is each line's index into `lane_keys`; each load lists the
+        numbers of the lines it carries with their packs.
+        """
+        built = build_loads(lane, packs, pack_volume, pack_weight, truck, local_search)
+        
+        loads = []
+        for load, lane_id in enumerate(built["load_lane"].tolist()):
+            source, destination = lane_keys[lane_id]
+            volume = float(built["load_volume_m3"][load])
+            weight = float(built["load_weight_kg"][load])
+            loads.append({
+                "load_id": load,
+                "source": source,
+                "destination_location_id": destination,
+                "volume_m3": round(volume, 3),
+                "weight_kg": round(weight, 1),
+                "utilization": round(max(volume / truck.volume_m3, weight / truck.weight_kg), 4),
+                "lines": [],
+            })
+        for line, load, piece in zip(built["line"].tolist(), built["load"].tolist(), built["packs"].tolist()):
+            loads[load]["lines"].append({"line": line, "packs": piece})
+        return loads
+    
+    async def _get_network(self, user: User) -> Dict[str, Any]:
+        """Compiled location network for the user's organization.
+
+        The cached network is reused while the organization's locations
+        are unchanged: same count and latest updated_at. Any process that
+        writes a location therefore invalidates it for every process.
+        """
+        key = str(user.organization_id)
+        result = await self.db.execute(
+            select(func.count(Location.id), func.max(Location.updated_at)).where(
+                Location.organization_id == user.organization_id
+            )
+        )
+        version = tuple(result.one())
+        cached = _networks.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        result = await self.db.execute(
+            select(Location.id, Location.parent_id, Location.type, Location.settings).where(
+                and_(
+                    Location.organization_id == user.organization_id,
+                    Location.is_active == True
+                )
+            )
+        )
+        rows = result.all()
+        graph = NetworkGraph.from_locations((location_id, parent_id) for location_id, parent_id, _, _ in rows)
+        
+        settings = [location_settings or {} for _, _, _, location_settings in rows]
+        network = {
+            "graph": graph,
+            "lead_time": np.array([
+                s.get("lead_time_days", DEFAULT_LEAD_TIME_DAYS.get(location_type, 1))
+                for (_, _, location_type, _), s in zip(rows, settings)
+            ], dtype=np.int64),
+            "customer_service_time": np.array([s.get("customer_service_time_days", 0) for s in settings], dtype=np.int64),
+            "holding_factor": np.array([s.get("holding_cost_factor", 1.0) for s in settings], dtype=float),
+            "settings": settings,
+        }
+        _networks[key] = (version, network)
+        
+        logger.info("Network graph compiled", organization_id=key, locations=graph.n, echelons=len(graph.levels))
+        return network
+    
+    async def _demand_statistics(
+        self,
+        graph: NetworkGraph,
+        item_ids: List[Any],
+        item_index: Dict[str, int],
+        history_days: int
+    ) -> tuple:
+        """Daily demand mean and std per (location, item) from recent shipments."""
+        since = datetime.utcnow() - timedelta(days=history_days)
+        daily = (
+            select(
+                InventoryMovement.item_id,
+                InventoryMovement.location_id,
+                func.sum(InventoryMovement.quantity).label("units"),
+            )
+            .where(
+                and_(
+                    InventoryMovement.item_id.in_(item_ids),
+                    InventoryMovement.type == "shipment",
+                    InventoryMovement.created_at >= since
+                )
+            )
+            .group_by(
+                InventoryMovement.item_id,
+                InventoryMovement.location_id,
+                func.date(InventoryMovement.created_at)
+            )
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(
+                daily.c.item_id,
+                daily.c.location_id,
+                func.sum(daily.c.units),
+                func.sum(daily.c.units * daily.c.units),
+            ).group_by(daily.c.item_id, daily.c.location_id)
+        )
+        
+        total = np.zeros((graph.n, len(item_ids)))
+        squares = np.zeros((graph.n, len(item_ids)))
+        for item_id, location_id, units, units_squared in result:
+            node = graph.index.get(str(location_id))
+            if node is not None:
+                total[node, item_index[str(item_id)]] = units
+                squares[node, item_index[str(item_id)]] = units_squared
+        
+        # Days without shipments count as zero demand
+        mean = total / history_days
+        variance = np.maximum(squares / history_days - mean ** 2, 0.0)
+        return mean, np.sqrt(variance)
@@ -0,0 +1,430 @@
+"""
+Stock reservation service for StockSense AI.
+
+Holds stock for orders without overselling. Every change to reserved
+quantities is one conditional UPDATE over all the item-locations
+involved:
+
+- reserve: adds each line's units to reserved_quantity only where
+  quantity - reserved_quantity still covers them. Unless every line
+  matched, the transaction rolls back and nothing is held.
+- release / expire: gives back what a reservation still holds.
+- commit: keeps the units reserved past the hold's expiry; outbound
+  movements referencing the order then draw them down (`fulfil`).
+
+Rows are locked in id order, so reservations sharing item-locations wait
+for each other instead of deadlocking. available_quantity is written as
+quantity - reserved_quantity on every change; the condition is on that
+difference rather than on the stored column, so rows written before the
+column was maintained are reservable too.
+
+`sweep_reservations` expires stale holds in the background.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, update, and_, or_, case, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+import structlog
+
+from ..models.inventory import Item, Inventory, InventoryMovement
+from ..models.reservation import Reservation, ReservationLine
+from ..models.user import User
+from ..schemas.inventory import ReservationCreate, ReservationResponse
+from .availability import get_availability_index
+
+logger = structlog.get_logger()
+
+# Seconds between sweeps for expired holds
+RESERVATION_SWEEP_INTERVAL = 10.0
+
+# Expired reservations released per statement
+RESERVATION_SWEEP_BATCH = 500
+
+# Units per (item id, location id)
+Lines = Dict[Tuple[uuid.UUID, uuid.UUID], int]
+
+
+def _line_filter(lines: Lines, covered: bool = False):
+    """Inventory rows of some item-locations; with `covered`, only those whose unreserved units cover the line."""
+    return or_(*[
+        and_(
+            Inventory.item_id == item_id,
+            Inventory.location_id == location_id,
+            *([Inventory.quantity - Inventory.reserved_quantity >= quantity] if covered else [])
+        )
+        for (item_id, location_id), quantity in lines.items()
+    ])
+
+
+def _line_units(lines: Lines):
+    """Units of the line matching the row being updated."""
+    return case(
+        *[
+            (and_(Inventory.item_id == item_id, Inventory.location_id == location_id), quantity)
+            for (item_id, location_id), quantity in lines.items()
+        ],
+        else_=0
+    )
+
+
+class ReservationService:
+    """Service for stock reservations."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def reserve(self, reservation_data: ReservationCreate, user: User) -> ReservationResponse:
+        """Hold every line of a reservation, or none of them.
+
+        Raises:
+            ValueError: A line is not covered by unreserved stock.
+        """
+        try:
+            lines: Lines = {}
+            for line in reservation_data.lines:
+                key = (uuid.UUID(line.item_id), uuid.UUID(line.location_id))
+                lines[key] = lines.get(key, 0) + line.quantity
+
+            held = await self._update_reserved(user.organization_id, lines, reserve=True)
+            if len(held) < len(lines):
+                await self.db.rollback()
+                raise ValueError(await self._shortages(user, reservation_data.reference, lines))
+
+            now = datetime.utcnow()
+            reservation = Reservation(
+                id=uuid.uuid4(),
+                organization_id=user.organization_id,
+                reference=reservation_data.reference,
+                status='held',
+                expires_at=now + timedelta(seconds=reservation_data.ttl_seconds),
+                created_at=now,
+                updated_at=now
+            )
+            rows = [
+                ReservationLine(
+                    reservation_id=reservation.id,
+                    item_id=item_id,
+                    location_id=location_id,
+                    quantity=quantity,
+                    fulfilled_quantity=0
+                )
+                for (item_id, location_id), quantity in lines.items()
+            ]
+            self.db.add(reservation)
+            self.db.add_all(rows)
+            await self.db.commit()
+            self._publish(user.organization_id, held)
+
+            logger.info("Reservation held", reservation_id=str(reservation.id), lines=len(rows))
+            return ReservationResponse.from_model(reservation, rows)
+
+        except ValueError:
+            raise
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to reserve stock", error=str(e))
+            raise
+
+    async def get_reservation(self, reservation_id: str, user: User) -> Optional[ReservationResponse]:
+        """Get a reservation with its lines."""
+        reservation = await self._reservation(reservation_id, user)
+        if reservation is None:
+            return None
+        return ReservationResponse.from_model(reservation, await self._lines(reservation.id))
+
+    async def commit_reservation(self, reservation_id: str, user: User) -> Optional[ReservationResponse]:
+        """Keep a hold's units reserved until the order ships; it no longer expires.
+
+        Raises:
+            ValueError: The reservation is no longer held.
+        """
+        try:
+            now = datetime.utcnow()
+            result = await self.db.execute(
+                update(Reservation)
+                .where(
+                    and_(
+                        Reservation.id == uuid.UUID(reservation_id),
+                        Reservation.organization_id == user.organization_id,
+                        Reservation.status == 'held',
+                        Reservation.expires_at > now
+                    )
+                )
+                .values(status='committed', expires_at=None, updated_at=now)
+                .returning(Reservation)
+                .execution_options(synchronize_session=False)
+            )
+            reservation = result.scalar_one_or_none()
+            if reservation is None:
+                await self.db.rollback()
+                return await self._not_transitioned(reservation_id, user, "committed")
+            await self.db.commit()
+
+            logger.info("Reservation committed", reservation_id=reservation_id)
+            return ReservationResponse.from_model(reservation, await self._lines(reservation.id))
+
+        except ValueError:
+            raise
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to commit reservation", reservation_id=reservation_id, error=str(e))
+            raise
+
+    async def release_reservation(self, reservation_id: str, user: User) -> Optional[ReservationResponse]:
+        """Give back the units a held or committed reservation still holds.
+
+        Raises:
+            ValueError: The reservation was already released or expired.
+        """
+        try:
+            now = datetime.utcnow()
+            result = await self.db.execute(
+                update(Reservation)
+                .where(
+                    and_(
+                        Reservation.id == uuid.UUID(reservation_id),
+                        Reservation.organization_id == user.organization_id,
+                        Reservation.status.in_(('held', 'committed'))
+                    )
+                )
+                .values(status='released', updated_at=now)
+                .returning(Reservation)
+                .execution_options(synchronize_session=False)
+            )
+            reservation = result.scalar_one_or_none()
+            if reservation is None:
+                await self.db.rollback()
+                return await self._not_transitioned(reservation_id, user, "released")
+
+            lines = await self._lines(reservation.id)
+            outstanding: Lines = {}
+            for line in lines:
+                units = line.quantity - (line.fulfilled_quantity or 0)
+                if units > 0:
+                    key = (line.item_id, line.location_id)
+                    outstanding[key] = outstanding.get(key, 0) + units
+            released = await self._update_reserved(user.organization_id, outstanding, reserve=False) if outstanding else []
+            await self.db.commit()
+            self._publish(user.organization_id, released)
+
+            logger.info("Reservation released", reservation_id=reservation_id)
+            return ReservationResponse.from_model(reservation, lines)
+
+        except ValueError:
+            raise
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to release reservation", reservation_id=reservation_id, error=str(e))
+            raise
+
+    async def expire_reservations(self, batch: int = RESERVATION_SWEEP_BATCH) -> int:
+        """Release holds whose expiry has passed, `batch` reservations per transaction.
+
+        Holds locked by a concurrent commit or release are skipped.
+
+        Returns:
+            Number of reservations expired.
+        """
+        expired_count = 0
+        try:
+            while True:
+                now = datetime.utcnow()
+                stale = (
+                    select(Reservation.id)
+                    .where(and_(Reservation.status == 'held', Reservation.expires_at <= now))
+                    .order_by(Reservation.expires_at)
+                    .limit(batch)
+                    .with_for_update(skip_locked=True)
+                )
+                result = await self.db.execute(
+                    update(Reservation)
+                    .where(Reservation.id.in_(stale))
+                    .values(status='expired', updated_at=now)
+                    .returning(Reservation.id, Reservation.organization_id)
+                    .execution_options(synchronize_session=False)
+                )
+                expired = result.all()
+                by_organization: Dict[Any, List[Any]] = {}
+                for reservation_id, organization_id in expired:
+                    by_organization.setdefault(organization_id, []).append(reservation_id)
+
+                released = []
+                for organization_id, reservation_ids in by_organization.items():
+                    outstanding = await self._outstanding(reservation_ids)
+                    if outstanding:
+                        released.append((organization_id, await self._update_reserved(organization_id, outstanding, reserve=False)))
+                await self.db.commit()
+                for organization_id, rows in released:
+                    self._publish(organization_id, rows)
+
+                expired_count += len(expired)
+                if len(expired) < batch:
+                    break
+
+            if expired_count:
+                logger.info("Reservations expired", count=expired_count)
+            return expired_count
+
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Failed to expire reservations", error=str(e))
+            raise
+
+    async def fulfil(self, movement: InventoryMovement, user: User) -> int:
+        """Draw down the reservations a shipment against a sales order fulfils.
+
+        Adds to the session without committing, so the lines are fulfilled
+        with the movement.
+
+        Returns:
+            Units that are no longer reserved.
+        """
+        if movement.type != "shipment" or movement.reference_type != "so" or not movement.reference:
+            return 0
+        result = await self.db.execute(
+            select(ReservationLine)
+            .join(Reservation, Reservation.id == ReservationLine.reservation_id)
+            .where(
+                and_(
+                    Reservation.organization_id == user.organization_id,
+                    Reservation.reference == movement.reference,
+                    Reservation.status.in_(('held', 'committed')),
+                    ReservationLine.item_id == uuid.UUID(str(movement.item_id)),
+                    ReservationLine.location_id == uuid.UUID(str(movement.location_id)),
+                    ReservationLine.fulfilled_quantity < ReservationLine.quantity
+                )
+            )
+            .order_by(Reservation.created_at)
+            .with_for_update(of=ReservationLine)
+        )
+        remaining = movement.quantity
+        fulfilled = 0
+        for line in result.scalars().all():
+            if remaining <= 0:
+                break
+            units = min(line.quantity - line.fulfilled_quantity, remaining)
+            line.fulfilled_quantity += units
+            line.updated_at = datetime.utcnow()
+            remaining -= units
+            fulfilled += units
+        return fulfilled
+
+    async def _update_reserved(self, organization_id: Any, lines: Lines, reserve: bool) -> Sequence[Any]:
+        """Add (or give back) each line's units in one statement; returns the rows updated.
+
+        Reserving only updates rows whose unreserved units cover their
+        line; the caller compares the rows returned with the lines.
+        """
+        units = _line_units(lines)
+        locked = (
+            self._organization_inventory(organization_id)
+            .where(_line_filter(lines))
+            .order_by(Inventory.id)
+            .with_for_update(of=Inventory)
+        )
+        condition = Inventory.id.in_(locked)
+        if reserve:
+            condition = and_(condition, _line_filter(lines, covered=True))
+        reserved = Inventory.reserved_quantity + units if reserve else Inventory.reserved_quantity - units
+        result = await self.db.execute(
+            update(Inventory)
+            .where(condition)
+            .values(
+                reserved_quantity=reserved,
+                available_quantity=Inventory.quantity - reserved,
+                updated_at=datetime.utcnow()
+            )
+            .returning(Inventory.item_id, Inventory.location_id, Inventory.quantity, Inventory.reserved_quantity)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+    def _organization_inventory(self, organization_id: Any):
+        """Ids of the inventory rows of an organization's items."""
+        return select(Inventory.id).join(Item, Item.id == Inventory.item_id).where(Item.organization_id == organization_id)
+
+    async def _outstanding(self, reservation_ids: List[Any]) -> Lines:
+        """Units some reservations still hold, per item-location."""
+        result = await self.db.execute(
+            select(
+                ReservationLine.item_id,
+                ReservationLine.location_id,
+                func.sum(ReservationLine.quantity - ReservationLine.fulfilled_quantity)
+            )
+            .where(ReservationLine.reservation_id.in_(reservation_ids))
+            .group_by(ReservationLine.item_id, ReservationLine.location_id)
+        )
+        return {(item_id, location_id): int(units) for item_id, location_id, units in result.all() if units > 0}
+
+    async def _shortages(self, user: User, reference: str, lines: Lines) -> str:
+        """Describe the lines that unreserved stock does not cover."""
+        result = await self.db.execute(
+            select(Inventory.item_id, Inventory.location_id, Inventory.quantity - Inventory.reserved_quantity)
+            .where(
+                and_(
+                    Inventory.id.in_(self._organization_inventory(user.organization_id)),
+                    _line_filter(lines)
+                )
+            )
+        )
+        available = {(item_id, location_id): units for item_id, location_id, units in result.all()}
+        short = [
+            f"item {item_id} at location {location_id}: {quantity} requested, "
+            f"{max(available.get((item_id, location_id), 0), 0)} available"
+            for (item_id, location_id), quantity in lines.items()
+            if available.get((item_id, location_id), 0) < quantity
+        ]
+        return f"Insufficient stock for reservation {reference}: " + "; ".join(short or ["stock changed, retry"])
+
+    async def _reservation(self, reservation_id: str, user: User) -> Optional[Reservation]:
+        result = await self.db.execute(
+            select(Reservation).where(
+                and_(
+                    Reservation.id == uuid.UUID(reservation_id),
+                    Reservation.organization_id == user.organization_id
+                )
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def _lines(self, reservation_id: Any) -> List[ReservationLine]:
+        result = await self.db.execute(select(ReservationLine).where(ReservationLine.reservation_id == reservation_id))
+        return list(result.scalars().all())
+
+    async def _not_transitioned(self, reservation_id: str, user: User, target: str) -> None:
+        """None for an unknown reservation; otherwise why it cannot be `target`."""
+        reservation = await self._reservation(reservation_id, user)
+        if reservation is None:
+            return None
+        status = "expired" if reservation.status == 'held' else reservation.status
+        raise ValueError(f"Reservation is {status} and cannot be {target}")
+
+    @staticmethod
+    def _publish(organization_id: Any, rows: Sequence[Any]) -> None:
+        """Update the availability index with the on-hand and reserved quantities of updated rows."""
+        index = get_availability_index()
+        for item_id, location_id, quantity, reserved in rows:
+            index.set_on_hand(organization_id, item_id, location_id, quantity, reserved)
+
+
+async def sweep_reservations(
+    session_factory: Optional[async_sessionmaker] = None,
+    interval: float = RESERVATION_SWEEP_INTERVAL
+) -> None:
+    """Expire stale holds every `interval` seconds until cancelled."""
+    if session_factory is None:
+        from ..core.database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+    while True:
+        try:
+            async with session_factory() as db:
+                await ReservationService(db).expire_reservations()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Reservation sweep failed", error=str(e))
+        await asyncio.sleep(interval)
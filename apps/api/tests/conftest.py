@@ -0,0 +1,61 @@
+"""
+Shared test fixtures.
+
+Database tests run against the Postgres server named by TEST_DATABASE_URL
+(an asyncpg URL, e.g. postgresql+asyncpg://postgres@localhost/stocksense_test)
+and are skipped without it. Each test gets its own schema, created from
+the models and dropped afterwards.
+"""
+
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.models import Base
+from src.models.user import Organization
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Connections per test engine; concurrent sessions beyond it wait for one
+TEST_POOL_SIZE = 50
+
+
+@pytest_asyncio.fixture
+async def db_sessions():
+    """Session factory bound to a fresh schema of the test database."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    schema = f"test_{uuid.uuid4().hex}"
+    admin = create_async_engine(TEST_DATABASE_URL)
+    async with admin.begin() as connection:
+        await connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+    engine = create_async_engine(
+        TEST_DATABASE_URL,
+        pool_size=TEST_POOL_SIZE,
+        max_overflow=0,
+        connect_args={"server_settings": {"search_path": schema}}
+    )
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    finally:
+        await engine.dispose()
+        async with admin.begin() as connection:
+            await connection.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        await admin.dispose()
+
+
+@pytest_asyncio.fixture
+async def user(db_sessions):
+    """A user of a new organization; services only read its ids."""
+    organization = Organization(id=uuid.uuid4(), name="Test Organization")
+    async with db_sessions() as db:
+        db.add(organization)
+        await db.commit()
+    return SimpleNamespace(id=uuid.uuid4(), organization_id=organization.id)
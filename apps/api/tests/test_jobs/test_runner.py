@@ -0,0 +1,64 @@
+"""Tests for claiming and finishing jobs on Postgres."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import update
+
+from src.jobs.broker import InMemoryBroker, set_broker
+from src.jobs.runner import execute_job, job_handler
+from src.models.job import Job
+from src.models.user import User
+
+runs = []
+
+
+@job_handler("test_wait", "jobs:write")
+async def wait(context, db, user, params):
+    runs.append(context.attempt)
+    await asyncio.sleep(params.get("seconds", 0.1))
+    if params.get("requeue"):
+        # A stale-job scan requeues the job and another worker claims it
+        async with context.session_factory() as other:
+            await other.execute(update(Job).where(Job.id == context.job_id).values(attempts=Job.attempts + 1))
+            await other.commit()
+    return {"attempt": context.attempt}
+
+
+async def queue_job(db_sessions, user, params):
+    set_broker(InMemoryBroker())
+    async with db_sessions() as db:
+        db.add(User(
+            id=user.id, organization_id=user.organization_id, email=f"{user.id}@example.com",
+            first_name="Test", last_name="User", hashed_password="-", salt="-"
+        ))
+        await db.flush()
+        job = Job(organization_id=user.organization_id, created_by=user.id, type="test_wait", params=params)
+        db.add(job)
+        await db.commit()
+    runs.clear()
+    return job.id
+
+
+@pytest.mark.asyncio
+async def test_a_job_is_claimed_by_one_worker_only(db_sessions, user):
+    job_id = await queue_job(db_sessions, user, {"seconds": 0.2})
+
+    outcomes = await asyncio.gather(*[execute_job(job_id, db_sessions) for _ in range(4)])
+
+    assert sorted(outcomes, key=str) == [None, None, None, "succeeded"]
+    assert runs == [1]
+    async with db_sessions() as db:
+        job = await db.get(Job, job_id)
+    assert (job.status, job.attempts, job.result) == ("succeeded", 1, {"attempt": 1})
+
+
+@pytest.mark.asyncio
+async def test_a_superseded_attempt_does_not_record_its_outcome(db_sessions, user):
+    job_id = await queue_job(db_sessions, user, {"requeue": True})
+
+    assert await execute_job(job_id, db_sessions) is None
+
+    async with db_sessions() as db:
+        job = await db.get(Job, job_id)
+    assert (job.status, job.attempts, job.finished_at) == ("running", 2, None)
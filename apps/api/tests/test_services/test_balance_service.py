@@ -0,0 +1,84 @@
+"""Tests for inventory balance history on Postgres."""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from src.models.inventory import Item, Location, Inventory, InventoryMovement
+from src.schemas.inventory import MovementCreate
+from src.services.balance_service import BalanceHistoryService
+from src.services.balance_snapshots import BalanceSnapshotStore
+from src.services.inventory_service import InventoryService
+
+
+async def seed(db_sessions, user):
+    """One item at one location of the user's organization."""
+    async with db_sessions() as db:
+        location = Location(id=uuid.uuid4(), organization_id=user.organization_id, code="DC-1", name="DC 1", type="dc")
+        item = Item(id=uuid.uuid4(), organization_id=user.organization_id, sku="SKU-1", name="Item 1", category="test")
+        db.add_all([location, item])
+        await db.commit()
+    return str(item.id), str(location.id)
+
+
+async def move(db_sessions, user, item_id, location_id, movement_type, quantity, days_ago):
+    async with db_sessions() as db:
+        return await InventoryService(db).record_movement(MovementCreate(
+            item_id=item_id, location_id=location_id, movement_type=movement_type, quantity=quantity,
+            movement_date=datetime.utcnow() - timedelta(days=days_ago)
+        ), user)
+
+
+async def on_hand(db_sessions, user, item_id, days):
+    async with db_sessions() as db:
+        today = datetime.utcnow().date()
+        history = await BalanceHistoryService(db).get_history(item_id, user, today - timedelta(days=days), today)
+        quantity = (await db.execute(select(Inventory.quantity))).scalar_one()
+    return [entry.on_hand for entry in history.history], quantity
+
+
+@pytest.mark.asyncio
+async def test_history_replays_movements_to_the_inventory_level(db_sessions, user):
+    item_id, location_id = await seed(db_sessions, user)
+    await move(db_sessions, user, item_id, location_id, "in", 100, 3)
+    await move(db_sessions, user, item_id, location_id, "out", 30, 2)
+    adjustment = await move(db_sessions, user, item_id, location_id, "adjustment", 50, 1)
+    await move(db_sessions, user, item_id, location_id, "in", 5, 0)
+
+    assert adjustment.quantity == -20
+    assert await on_hand(db_sessions, user, item_id, 3) == ([100, 70, 50, 55], 55)
+
+    async with db_sessions() as db:
+        await BalanceHistoryService(db).write_snapshots(user)
+    assert await on_hand(db_sessions, user, item_id, 3) == ([100, 70, 50, 55], 55)
+
+
+@pytest.mark.asyncio
+async def test_backdated_movements_rebuild_the_snapshots_they_land_in(db_sessions, user):
+    item_id, location_id = await seed(db_sessions, user)
+    await move(db_sessions, user, item_id, location_id, "in", 100, 40)
+    async with db_sessions() as db:
+        await BalanceHistoryService(db).write_snapshots(user)
+
+    await move(db_sessions, user, item_id, location_id, "out", 30, 35)
+    async with db_sessions() as db:
+        await BalanceHistoryService(db).write_snapshots(user)
+        movements = (await db.execute(select(InventoryMovement.quantity))).scalars().all()
+
+    assert sorted(movements) == [30, 100]
+    history, quantity = await on_hand(db_sessions, user, item_id, 40)
+    assert history == [100] * 5 + [70] * 36
+    assert quantity == 70
+
+
+@pytest.mark.asyncio
+async def test_snapshots_stop_at_today(db_sessions, user):
+    item_id, location_id = await seed(db_sessions, user)
+    await move(db_sessions, user, item_id, location_id, "in", 10, 1)
+    async with db_sessions() as db:
+        await BalanceHistoryService(db).write_snapshots(user, end=datetime.utcnow().date() + timedelta(days=60))
+
+    store = BalanceSnapshotStore(user.organization_id)
+    assert store.segment(store.months()[-1]).end == datetime.utcnow().date()
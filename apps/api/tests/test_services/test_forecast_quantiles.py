@@ -0,0 +1,66 @@
+"""Tests for calibrated quantile forecasts and safety stock."""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.services.forecast_quantiles import (
+    CALIBRATED_MODELS, calibrate, model_codes, quantile_forecasts, quantile_safety_stock
+)
+from src.services.forecast_state import absorb, empty_state, forecast
+
+END = date(2025, 7, 1)
+HISTORY = 182
+HORIZON = 28
+SERIES = 3000
+
+# Upper quantiles and service levels a buffer is sized for; low quantiles
+# of intermittent demand sit on the mass at zero and are not checked
+QUANTILES = (0.9, 0.95, 0.99)
+SERVICE_LEVELS = (0.9, 0.95, 0.99)
+
+
+def generate(rng: np.random.Generator, n_series: int, n_days: int) -> np.ndarray:
+    """Weekly seasonal demand: a third Poisson, a third negative binomial, a third intermittent."""
+    mean = rng.gamma(2.0, 5.0, (n_series, 1)) * (1 + 0.4 * np.sin(2 * np.pi * np.arange(n_days) / 7))
+    values = rng.poisson(mean).astype(np.float32)
+    third = n_series // 3
+    values[third:2 * third] = rng.negative_binomial(2.0, 2.0 / (2.0 + mean[third:2 * third]))
+    occurs = rng.random((third, n_days)) < rng.uniform(0.1, 0.4, (third, 1))
+    values[2 * third:3 * third] = np.where(occurs, np.ceil(rng.gamma(1.5, 4.0, (third, n_days))), 0)
+    return values
+
+
+@pytest.fixture(scope="module")
+def holdout():
+    """Calibration on one set of series, and forecasts of the next HORIZON days of another."""
+    rng = np.random.default_rng(11)
+    calibration = calibrate(generate(rng, SERIES, HISTORY), END)
+    values = generate(rng, SERIES, HISTORY + HORIZON)
+    state = absorb(empty_state(END, SERIES), values[:, :HISTORY])
+    return calibration, state, forecast(state, HORIZON), model_codes(state), values[:, HISTORY:]
+
+
+@pytest.mark.parametrize("model", range(len(CALIBRATED_MODELS)), ids=CALIBRATED_MODELS)
+def test_calibrated_quantiles_are_exceeded_one_minus_q_of_the_time(holdout, model):
+    calibration, state, point, models, actual = holdout
+    rows = models == model
+    assert rows.sum() > 100
+    values = quantile_forecasts(point[rows], state.abs_error[rows], models[rows], calibration, QUANTILES)
+    exceeded = (actual[rows][:, None, :] > values).mean(axis=(0, 2))
+    for q, share in zip(QUANTILES, exceeded.tolist()):
+        assert share == pytest.approx(1 - q, abs=0.02), f"p{q * 100:g}"
+
+
+@pytest.mark.parametrize("lead_time", [7, 14])
+@pytest.mark.parametrize("model", range(len(CALIBRATED_MODELS)), ids=CALIBRATED_MODELS)
+def test_quantile_safety_stock_reaches_the_cycle_service_level(holdout, model, lead_time):
+    calibration, state, point, models, actual = holdout
+    rows = models == model
+    demand = actual[rows, :lead_time].sum(axis=1)
+    expected = point[rows, :lead_time].sum(axis=1)
+    for service_level in SERVICE_LEVELS:
+        buffer = quantile_safety_stock(state.abs_error[rows], models[rows], calibration, lead_time, service_level)
+        reached = (demand <= expected + buffer).mean()
+        assert reached >= service_level - 0.03, f"service level {service_level:g}"
@@ -0,0 +1,26 @@
+"""Tests for lead-time demand and safety stock."""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.services.lead_time_service import fixed_lead_time, safety_stock_batch
+
+
+def test_bucketed_poisson_matches_normal_approximation():
+    # 2000/day over 7 days is bucketed; the lead-time demand std is sqrt(14000)
+    safety_stock, expected = safety_stock_batch(
+        ["poisson"], np.array([2000.0]), np.array([math.sqrt(2000.0)]), [fixed_lead_time(7)], np.array([0.95])
+    )
+    assert expected[0] == pytest.approx(14000, rel=1e-3)
+    assert safety_stock[0] == pytest.approx(1.645 * math.sqrt(14000), rel=0.05)
+
+
+def test_zero_day_lead_time_has_no_lead_time_demand():
+    safety_stock, expected = safety_stock_batch(
+        ["normal", "poisson"], np.array([5.0, 3.0]), np.array([2.0, 1.7]),
+        [fixed_lead_time(0), fixed_lead_time(0)], np.array([0.95, 0.95])
+    )
+    assert safety_stock.tolist() == [0.0, 0.0]
+    assert expected.tolist() == [0.0, 0.0]
@@ -0,0 +1,18 @@
+"""Tests for order rounding and load building."""
+
+import numpy as np
+
+from src.services.load_builder import round_order_quantities
+
+
+def test_pallet_rounding_keeps_whole_case_packs():
+    # 70 units in cases of 12 is 72; a 40-unit pallet rounds that up to 80,
+    # which is not a whole number of cases, so it goes on to 84
+    rounded = round_order_quantities(np.array([70]), np.array([12]), pallet_qty=np.array([40]))
+    assert rounded.tolist() == [84]
+    assert rounded[0] % 12 == 0
+
+
+def test_pallet_rounding_of_case_multiples_is_unchanged():
+    rounded = round_order_quantities(np.array([33, 10, 0]), np.array([4, 4, 4]), pallet_qty=np.array([40, 40, 40]))
+    assert rounded.tolist() == [40, 12, 0]
@@ -0,0 +1,113 @@
+"""Tests for stock reservations on Postgres."""
+
+import asyncio
+import random
+import uuid
+from collections import Counter
+
+import pytest
+from sqlalchemy import select
+
+from src.models.inventory import Item, Location, Inventory, InventoryMovement
+from src.models.reservation import ReservationLine
+from src.schemas.inventory import MovementCreate, ReservationCreate, ReservationLineRequest
+from src.services.inventory_service import InventoryService
+from src.services.reservation_service import ReservationService
+
+RESERVATIONS = 3000
+CONCURRENCY = 50
+HOT_STOCK = 2000
+
+
+async def seed(db_sessions, user, stock):
+    """One item-location per entry of `stock`, owned by the user's organization."""
+    keys = []
+    async with db_sessions() as db:
+        location = Location(id=uuid.uuid4(), organization_id=user.organization_id, code="DC-1", name="DC 1", type="dc")
+        db.add(location)
+        await db.flush()
+        for number, quantity in enumerate(stock):
+            item = Item(
+                id=uuid.uuid4(), organization_id=user.organization_id,
+                sku=f"SKU-{number}", name=f"Item {number}", category="test"
+            )
+            db.add(item)
+            await db.flush()
+            db.add(Inventory(item_id=item.id, location_id=location.id, quantity=quantity, available_quantity=quantity))
+            keys.append((item.id, location.id))
+        await db.commit()
+    return keys
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_never_oversell_a_hot_item(db_sessions, user):
+    hot, *others = await seed(db_sessions, user, [HOT_STOCK] + [1_000_000] * 20)
+    rng = random.Random(49)
+    pending = asyncio.Queue()
+    for number in range(RESERVATIONS):
+        lines = [ReservationLineRequest(item_id=str(hot[0]), location_id=str(hot[1]), quantity=rng.randint(1, 3))]
+        if rng.random() < 0.3:
+            other = rng.choice(others)
+            lines.append(ReservationLineRequest(item_id=str(other[0]), location_id=str(other[1]), quantity=rng.randint(1, 5)))
+        pending.put_nowait(ReservationCreate(reference=f"SO-{number}", lines=lines, ttl_seconds=600))
+
+    held = Counter()
+    refused = 0
+
+    async def worker():
+        nonlocal refused
+        while not pending.empty():
+            request = pending.get_nowait()
+            async with db_sessions() as db:
+                try:
+                    response = await ReservationService(db).reserve(request, user)
+                except ValueError:
+                    refused += 1
+                    continue
+            for line in response.lines:
+                held[(uuid.UUID(line.item_id), uuid.UUID(line.location_id))] += line.quantity
+
+    await asyncio.gather(*[worker() for _ in range(CONCURRENCY)])
+
+    # Demand is about four times the hot item's stock
+    assert refused > 0
+    async with db_sessions() as db:
+        rows = (await db.execute(
+            select(Inventory.item_id, Inventory.location_id, Inventory.quantity,
+                   Inventory.reserved_quantity, Inventory.available_quantity)
+        )).all()
+    assert len(rows) == 1 + len(others)
+    for item_id, location_id, quantity, reserved, available in rows:
+        assert reserved <= quantity
+        assert reserved == held[(item_id, location_id)]
+        assert available == quantity - reserved
+    assert HOT_STOCK - 3 < held[hot] <= HOT_STOCK
+
+
+@pytest.mark.asyncio
+async def test_sales_order_shipment_fulfils_its_reservation(db_sessions, user):
+    (item_id, location_id), = await seed(db_sessions, user, [100])
+    async with db_sessions() as db:
+        reservation = await ReservationService(db).reserve(ReservationCreate(
+            reference="SO-1",
+            lines=[ReservationLineRequest(item_id=str(item_id), location_id=str(location_id), quantity=30)]
+        ), user)
+    async with db_sessions() as db:
+        await ReservationService(db).commit_reservation(reservation.id, user)
+
+    async with db_sessions() as db:
+        movement = await InventoryService(db).record_movement(MovementCreate(
+            item_id=str(item_id), location_id=str(location_id), movement_type="out",
+            quantity=20, reference_number="SO-1", reference_type="so"
+        ), user)
+    assert (movement.movement_type, movement.reference_number, movement.reference_type) == ("out", "SO-1", "so")
+
+    async with db_sessions() as db:
+        quantity, reserved, available = (await db.execute(
+            select(Inventory.quantity, Inventory.reserved_quantity, Inventory.available_quantity)
+        )).one()
+        recorded = (await db.execute(select(InventoryMovement.type, InventoryMovement.reference))).one()
+        fulfilled = (await db.execute(select(ReservationLine.fulfilled_quantity))).scalar_one()
+    assert (quantity, reserved, available) == (80, 10, 70)
+    assert tuple(recorded) == ("shipment", "SO-1")
+    assert fulfilled == 20